@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+"""Benchmark the firmware parsing and scanning hot paths on synthetic images.
+
+Generates randomized but well-formed stand-ins for everything the analysis
+scripts read - a .pec image with a SquashFS superblock buried behind decoy
+magics, IS_fl.bin / IO_fl.bin / NVRAM_SDR00.dat tables, a stripped ARM
+fullfw ELF with driver vtables, literal pools and debug strings, and a
+decompressed kernel carrying kallsyms tables - into a scratch extracted/
+tree, then times the unmodified functions from extract_firmware.py,
+parse_io_tables.py, iosapi_catalogue.py, cross_check_dts.py, dts_tree.py,
+check_tmp100_driver.py, kernel_symbols.py, module_index.py, i2c_farm.py and
+ipmi_lan_sim.py against them.
+
+Each benchmark is timed the way pytest-benchmark does it: one warm-up
+call, then rounds until --min-time has elapsed (at least MIN_ROUNDS),
+reporting min/median/mean/stddev and ops/s. A separate call runs under
+tracemalloc for the peak allocation. Console output of the functions
+goes to /dev/null.
+
+Results can be saved as a baseline and later runs compared against it;
+a median more than --threshold percent slower (and slower by more than
+NOISE_FLOOR) is a regression, and --compare exits 1 if there is one.
+The committed bench-parsers-baseline.json was taken at --scale 1 --seed 1
+on the machine recorded in it; timings only compare on like hardware, so
+re-run --save before tracking changes somewhere else.
+
+Usage:
+    python3 bench_parsers.py [--scale 4] [-k sdr] [--min-time 0.5]
+    python3 bench_parsers.py --save              # write bench-parsers-baseline.json
+    python3 bench_parsers.py --compare           # compare against it
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import check_tmp100_driver  # noqa: E402
+import cross_check_dts  # noqa: E402
+import extract_firmware  # noqa: E402
+import i2c_farm  # noqa: E402
+import iosapi_catalogue  # noqa: E402
+import ipmi_lan_sim  # noqa: E402
+import kernel_symbols  # noqa: E402
+import module_index  # noqa: E402
+import parse_io_tables  # noqa: E402
+from dts_tree import parse_dts  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(SCRIPT_DIR, "bench-parsers-baseline.json")
+DTS_PATH = os.path.join(SCRIPT_DIR, "aspeed-bmc-dell-c410x.dts")
+
+# Sizes at --scale 1; everything grows linearly with the scale except the
+# IS_fl.bin sensor count, whose header bytes cap it at 255 + 255 and which
+# never drops below the 72 entries cross_check_dts.py walks
+PEC_BYTES = 8 << 20
+FULLFW_BYTES = 2 << 20
+IS_SENSORS = 72
+IO_ENTRIES_PER_TYPE = 8
+SDR_RECORDS = 400
+VMLINUX_BYTES = 3 << 20
+KERNEL_SYMBOLS = 4000
+MODULE_FUNCTIONS = 400
+
+MIN_ROUNDS = 5
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_THRESHOLD = 10.0
+# Ignore median changes smaller than this (timer and scheduler noise)
+NOISE_FLOOR = 50e-6
+
+CODE_VADDR = 0x00008000
+DATA_VADDR = 0x00400000
+DRIVER_CHIPS = ["TMP100", "INA219", "ADT7462", "PCA9548", "PCA9544", "PCA9555",
+                "PMBus", "EE24Cxx", "ONCHIP"]
+I2C_ADDRESSES_8BIT = [0x80 + 2 * i for i in range(16)] + [0xB0, 0xB8, 0x9E, 0x5C]
+
+KERNEL_VADDR = 0xC0008000
+KERNEL_NAME_WORDS = ["aspeed", "i2c", "init", "probe", "read", "write", "irq", "handler", "driver",
+                     "dev", "get", "set", "sys", "do", "kmem", "cache", "alloc", "free", "lock",
+                     "unlock", "tmp100", "sensor", "gpio", "pwm", "fan", "smbus", "xfer", "ops"]
+# Pair tokens built for the synthetic kallsyms token table; the real build
+# fills every unused byte value, which is slow in Python and changes nothing
+# for the decoder
+KALLSYMS_TOKEN_ROUNDS = 32
+
+
+# ---------------------------------------------------------------------------
+# Synthetic firmware generators
+# ---------------------------------------------------------------------------
+
+def gen_squashfs_superblock(rng: random.Random, inodes: int = 1234) -> bytes:
+    """A 96-byte SquashFS 3.1 little-endian superblock."""
+    sb = bytearray(rng.randbytes(96))
+    struct.pack_into('<4sI', sb, 0, extract_firmware.SQSH_MAGIC, inodes)
+    struct.pack_into('<HH', sb, 28, 3, 1)
+    return bytes(sb)
+
+
+def gen_pec(size: int, rng: random.Random, decoy_every: int = 64 * 1024) -> tuple[bytes, int]:
+    """Random image with decoy "hsqs" magics and a real superblock near the end.
+
+    Returns:
+        (image, offset of the real superblock)
+    """
+    data = bytearray(rng.randbytes(size))
+    for pos in range(decoy_every, size - 200, decoy_every):
+        # Implausible inode counts, so find_squashfs has to keep looking
+        struct.pack_into('<4sI', data, pos, extract_firmware.SQSH_MAGIC, rng.choice([0, 5, 1 << 24]))
+    offset = (size * 3 // 4) & ~3
+    data[offset:offset + 96] = gen_squashfs_superblock(rng)
+    return bytes(data), offset
+
+
+@dataclass
+class SyntheticFullfw:
+    image: bytes
+    vtables: dict[str, int]       # chip -> vtable vaddr
+
+
+def gen_fullfw(size: int, rng: random.Random) -> SyntheticFullfw:
+    """A stripped 32-bit ARM ELF with one code and one data LOAD segment.
+
+    The code segment is random ARM-condition words with MOV-immediate I2C
+    addresses sprinkled in and a literal pool at the end of every 256-byte
+    "function". The data segment is random words (almost never valid code
+    pointers) with a vtable of code pointers per driver chip, each followed
+    by its debug string, and TMP100/MuxWriteRead strings for the string scans.
+    """
+    header_size = 0x1000
+    code_size = (size * 3 // 5) & ~0xFF
+    data_size = (size - header_size - code_size) & ~3
+    code = bytearray(rng.randbytes(code_size))
+    for off in range(0, code_size, 4):
+        code[off + 3] = 0xE0 | (code[off + 3] & 0x0F)
+    for _ in range(code_size // 64):
+        off = rng.randrange(0, code_size, 4)
+        rd = rng.randrange(16)
+        struct.pack_into('<I', code, off, 0xE3A00000 | rd << 12 | rng.choice(I2C_ADDRESSES_8BIT))
+
+    data = bytearray(rng.randbytes(data_size))
+    # Keep random words out of the code range (top byte >= 0x80)
+    for off in range(3, data_size, 4):
+        data[off] |= 0x80
+
+    functions = list(range(CODE_VADDR, CODE_VADDR + code_size, 256))
+    vtables = {}
+    string_area = data_size - 4096
+    for n, chip in enumerate(DRIVER_CHIPS):
+        slot_off = 256 + n * (data_size - 8192) // len(DRIVER_CHIPS) & ~3
+        name = f"OEM{chip}_Read failed\0".encode()
+        data[string_area:string_area + len(name)] = name
+        string_vaddr = DATA_VADDR + string_area
+        string_area += len(name) + 3 & ~3
+        slots = rng.sample(functions, 6)
+        for i, func in enumerate(slots):
+            struct.pack_into('<I', data, slot_off + 4 * i, func)
+            # Literal pool: the function's last word points at the chip string
+            struct.pack_into('<I', code, func - CODE_VADDR + 252, string_vaddr)
+        struct.pack_into('<I', data, slot_off + 24, 0)
+        near = f"{chip} driver\0".encode()
+        data[slot_off + 28:slot_off + 28 + len(near)] = near
+        vtables[chip] = DATA_VADDR + slot_off
+    for pattern in (b"TMP100", b"I2CTEMP", b"MuxWriteRead", b"lm75"):
+        for _ in range(4):
+            off = rng.randrange(0, data_size - 64)
+            data[off:off + len(pattern) + 1] = pattern + b"\0"
+
+    code_off = header_size
+    data_off = code_off + code_size
+    ehdr = b"\x7fELF" + bytes([1, 1, 1]) + b"\0" * 9 + struct.pack(
+        '<HHIIIIIHHHHHH', 2, 40, 1, CODE_VADDR, 52, 0, 0, 52, 32, 2, 40, 0, 0)
+    phdrs = (struct.pack('<8I', 1, code_off, CODE_VADDR, CODE_VADDR, code_size, code_size, 5, 4)
+             + struct.pack('<8I', 1, data_off, DATA_VADDR, DATA_VADDR, data_size, data_size, 6, 4))
+    header = (ehdr + phdrs).ljust(header_size, b"\0")
+    return SyntheticFullfw(header + bytes(code) + bytes(data), vtables)
+
+
+def gen_is_fl(count: int, vtables: dict[str, int], rng: random.Random) -> bytes:
+    """IS_fl.bin: 4-byte header (version, pad, analog, discrete), 22-byte entries."""
+    analog = min(255, count * 2 // 3)
+    discrete = min(255, count - analog)
+    chips = [c for c in ("INA219", "ADT7462", "TMP100") if c in vtables]
+    out = bytearray(struct.pack('<BBBB', 1, 0, analog, discrete))
+    for i in range(analog + discrete):
+        entry = bytearray(rng.randbytes(parse_io_tables.IS_ENTRY_SIZE))
+        entry[0] = i & 0xFF
+        entry[14] = rng.choice(I2C_ADDRESSES_8BIT)
+        entry[15] = 0xF0 + rng.randrange(7)
+        entry[16] = rng.randrange(2) << 4 | rng.randrange(8)
+        struct.pack_into('<I', entry, 18, vtables[rng.choice(chips)])
+        out += entry
+    return bytes(out)
+
+
+def gen_io_fl(per_type: int, vtables: dict[str, int], rng: random.Random) -> bytes:
+    """IO_fl.bin: header, 37-slot dispatch table, 12-byte entries."""
+    slots = parse_io_tables.IO_DISPATCH_SLOTS
+    out = bytearray(struct.pack('<BBH', 1, 0, slots * per_type))
+    for t in range(slots):
+        out += struct.pack('<HH', per_type, t * per_type)
+    drivers = list(vtables.values())
+    ports = list(parse_io_tables.ONCHIP_GPIO_PORTS)
+    for t in range(slots):
+        for _ in range(per_type):
+            if t == parse_io_tables.IO_TYPE_GPIO and rng.random() < 0.5:
+                port_cfg = rng.choice(ports)
+            else:
+                port_cfg = (0xF0 + rng.randrange(7)) << 8 | rng.choice(I2C_ADDRESSES_8BIT)
+            out += struct.pack('<HHHIH', rng.getrandbits(16), rng.getrandbits(16),
+                               port_cfg, rng.choice(drivers), rng.getrandbits(16))
+    return bytes(out)
+
+
+def gen_sdr(count: int, rng: random.Random) -> bytes:
+    """NVRAM_SDR00.dat: alternating Full (0x01) and Compact (0x02) records."""
+    out = bytearray()
+    for i in range(count):
+        name = f"Sensor {i:04d}".encode()[:16]
+        full = i % 2 == 0
+        body = bytearray(rng.randbytes(43 if full else 21))
+        body[42 if full else 20] = 0xC0 | len(name)
+        body += name
+        out += struct.pack('<HBBB', i & 0xFFFF, 0x51, 0x01 if full else 0x02, len(body)) + body
+    return bytes(out)
+
+
+def _kallsyms_tables(symbols: list[tuple[int, str, str]], start: int) -> bytes:
+    """The tables scripts/kallsyms.c emits, for placement at ``start`` (16-aligned)."""
+    seqs = [list((t + name).encode()) for _, t, name in symbols]
+    tokens = {b: bytes([b]) for b in range(256)}
+    used = {b for seq in seqs for b in seq}
+    free = [b for b in range(256) if b not in used]
+    for index in free[:KALLSYMS_TOKEN_ROUNDS]:
+        pairs = collections.Counter(p for seq in seqs for p in zip(seq, seq[1:]))
+        (a, b), _ = pairs.most_common(1)[0]
+        tokens[index] = tokens[a] + tokens[b]
+        for n, seq in enumerate(seqs):
+            out, i = [], 0
+            while i < len(seq):
+                if i + 1 < len(seq) and seq[i] == a and seq[i + 1] == b:
+                    out.append(index)
+                    i += 2
+                else:
+                    out.append(seq[i])
+                    i += 1
+            seqs[n] = out
+
+    blob = bytearray()
+
+    def label() -> None:
+        blob.extend(bytes(-(start + len(blob)) % 16))
+
+    blob += struct.pack(f'<{len(symbols)}I', *(addr for addr, _, _ in symbols))
+    label()
+    blob += struct.pack('<I', len(symbols))
+    label()
+    names_at = len(blob)
+    markers = []
+    for i, seq in enumerate(seqs):
+        if i % 256 == 0:
+            markers.append(len(blob) - names_at)
+        blob += bytes([len(seq)] + seq)
+    label()
+    blob += struct.pack(f'<{len(markers)}I', *markers)
+    label()
+    table_at = len(blob)
+    index = []
+    for b in range(256):
+        index.append(len(blob) - table_at)
+        blob += tokens[b] + b"\0"
+    label()
+    blob += struct.pack('<256H', *index)
+    return bytes(blob)
+
+
+def gen_vmlinux(size: int, count: int, rng: random.Random) -> tuple[bytes, list[tuple[int, str, str]]]:
+    """A decompressed ARM kernel image with kallsyms tables in its "rodata".
+
+    Returns:
+        (image, [(address, type, name)] sorted by address)
+    """
+    names = {"_text"}
+    while len(names) < count:
+        words = rng.sample(KERNEL_NAME_WORDS, rng.randint(2, 4))
+        names.add("_".join(words) + (str(rng.randrange(10)) if rng.random() < 0.2 else ""))
+    text_size = size * 3 // 5
+    addresses = sorted(rng.sample(range(KERNEL_VADDR + 4, KERNEL_VADDR + text_size, 4), count - 1))
+    symbols = [(KERNEL_VADDR, "T", "_text")] + [
+        (addr, rng.choice("TtTtDdRrBb"), name)
+        for addr, name in zip(addresses, sorted(names - {"_text"}, key=lambda _: rng.random()))]
+    image = bytearray(rng.randbytes(size))
+    start = text_size + 0x1000 & ~0xF
+    tables = _kallsyms_tables(symbols, start)
+    image[start:start + len(tables)] = tables
+    return bytes(image[:max(size, start + len(tables))]), symbols
+
+
+def gen_kernel_module(functions: int, rng: random.Random) -> bytes:
+    """An ARM relocatable .ko like the aess_*drv.ko modules.
+
+    Every 64-byte function has mov/cmp/orr immediates (I2C addresses
+    among them), a call to an imported symbol and a two-word literal pool
+    with a GPIO register address and a relocated pointer to one of its
+    strings. Mapping symbols mark the pools as data, and .rodata holds a
+    normal_i2c address list.
+    """
+    imports = ["printk", "i2c_transfer", "request_irq", "ioremap", "kmalloc"]
+    strtab = bytearray(b"\0")
+
+    def name_off(name: str) -> int:
+        strtab.extend(name.encode() + b"\0")
+        return len(strtab) - len(name) - 1
+
+    text = bytearray()
+    strings = bytearray()
+    calls = []
+    # Symbol 0 is null; 1-3 are the section symbols of .text, .rodata.str1.4, .rodata
+    symbols = [struct.pack('<IIIBBH', 0, 0, 0, 0, 0, 0)]
+    symbols += [struct.pack('<IIIBBH', 0, 0, 0, 3, 0, shndx) for shndx in (1, 3, 4)]
+    globals_ = []
+    for n in range(functions):
+        start = len(text)
+        chip = rng.choice(DRIVER_CHIPS)
+        message = f"{chip}: bus {n % 7} read failed" if n % 3 else f"GPIO{'ABCDEFGH'[n % 8]}{n % 8} alert"
+        string_off = len(strings)
+        strings.extend(message.encode() + b"\0")
+        strings.extend(bytes(-len(strings) % 4))
+        words = [
+            0xE3A00000 | rng.choice(I2C_ADDRESSES_8BIT),   # mov r0, #addr
+            0xE3510000 | rng.randrange(256),               # cmp r1, #imm
+            0xE3822000 | 1 << rng.randrange(8),            # orr r2, r2, #bit
+            0xE59F3000 | 36 - 12 - 8,                       # ldr r3, [pc, #16] (GPIO register)
+            0xE59F4000 | 40 - 16 - 8,                       # ldr r4, [pc, #16] (string)
+            0xEBFFFFFE,                                     # bl <import>
+            0xE1A00000, 0xE1A00000, 0xE1A0F00E,             # nop, nop, mov pc, lr
+        ]
+        text += struct.pack('<9I', *words)
+        text += struct.pack('<II', module_index.GPIO_BASE + rng.choice([0x00, 0x04, 0x20, 0x24, 0x70]),
+                            string_off)
+        text += bytes(64 - (len(text) - start))
+        calls.append((start + 20, rng.choice(imports)))
+        symbols.append(struct.pack('<IIIBBH', name_off("$a"), start, 0, 0, 0, 1))
+        symbols.append(struct.pack('<IIIBBH', name_off("$d"), start + 36, 0, 0, 0, 1))
+        globals_.append(struct.pack('<IIIBBH', name_off(f"aess_func_{n}"), start, 64, 0x12, 0, 1))
+    rodata = struct.pack('<4H', 0x4C, 0x4D, 0x2E, module_index.I2C_CLIENT_END)
+    globals_.append(struct.pack('<IIIBBH', name_off("normal_i2c"), 0, len(rodata), 0x11, 0, 4))
+    first_global = len(symbols)
+    symbols += globals_
+    import_index = {}
+    for callee in imports:
+        import_index[callee] = len(symbols)
+        symbols.append(struct.pack('<IIIBBH', name_off(callee), 0, 0, 0x10, 0, 0))
+    # R_ARM_ABS32 against .rodata.str1.4 on each string literal, R_ARM_PC24 on each call
+    rel = bytearray()
+    for offset, callee in calls:
+        rel += struct.pack('<II', offset + 20, 2 << 8 | module_index.R_ARM_ABS32)
+        rel += struct.pack('<II', offset, import_index[callee] << 8 | 1)
+    modinfo = (b"license=GPL\0author=Synthetic\0description=Synthetic AESS driver\0"
+               b"vermagic=2.6.23.1-ASPEED-v.0.11 mod_unload ARMv5 \0depends=\0")
+
+    names = [".text", ".rel.text", ".rodata.str1.4", ".rodata", ".modinfo", ".symtab", ".strtab",
+             ".shstrtab"]
+    shstrtab = b"\0" + b"".join(n.encode() + b"\0" for n in names)
+    bodies = [bytes(text), bytes(rel), bytes(strings), rodata, modinfo, b"".join(symbols),
+              bytes(strtab), shstrtab]
+    # (type, flags, link, info, entsize)
+    attrs = [(1, 6, 0, 0, 0), (9, 0, 6, 1, 8), (1, 0x32, 0, 0, 1), (1, 2, 0, 0, 0), (1, 2, 0, 0, 0),
+             (2, 0, 7, first_global, 16), (3, 0, 0, 0, 0), (3, 0, 0, 0, 0)]
+    out = bytearray(52)
+    offsets = []
+    for blob in bodies:
+        out += bytes(-len(out) % 4)
+        offsets.append(len(out))
+        out += blob
+    out += bytes(-len(out) % 4)
+    shoff = len(out)
+    out += bytes(40)
+    name_pos = 1
+    for name, blob, offset, (stype, flags, link, info, entsize) in zip(names, bodies, offsets, attrs):
+        out += struct.pack('<10I', name_pos, stype, flags, 0, offset, len(blob), link, info, 4, entsize)
+        name_pos += len(name) + 1
+    out[:52] = b"\x7fELF" + bytes([1, 1, 1]) + b"\0" * 9 + struct.pack(
+        '<HHIIIIIHHHHHH', 1, 40, 1, 0, 0, shoff, 0x05000000, 52, 0, 0, 40, len(names) + 1,
+        len(names))
+    return bytes(out)
+
+
+@dataclass
+class Corpus:
+    """Generated inputs, and the scratch root they were written under."""
+
+    root: str
+    pec: bytes
+    fullfw: SyntheticFullfw
+    is_fl: bytes
+    io_fl: bytes
+    sdr: bytes
+    dts_text: str
+    vmlinux: bytes
+    kernel_symbols: list[tuple[int, str, str]]
+    kernel_module: bytes
+
+
+def build_corpus(root: str, scale: float, seed: int) -> Corpus:
+    rng = random.Random(seed)
+    pec, _ = gen_pec(int(PEC_BYTES * scale), rng)
+    fullfw = gen_fullfw(int(FULLFW_BYTES * scale), rng)
+    vmlinux, symbols = gen_vmlinux(int(VMLINUX_BYTES * scale), int(KERNEL_SYMBOLS * scale), rng)
+    corpus = Corpus(
+        root=root,
+        pec=pec,
+        fullfw=fullfw,
+        is_fl=gen_is_fl(min(510, max(IS_SENSORS, int(IS_SENSORS * scale))), fullfw.vtables, rng),
+        io_fl=gen_io_fl(max(1, int(IO_ENTRIES_PER_TYPE * scale)), fullfw.vtables, rng),
+        sdr=gen_sdr(min(0xFFFF, int(SDR_RECORDS * scale)), rng),
+        dts_text=open(DTS_PATH).read(),
+        vmlinux=vmlinux,
+        kernel_symbols=symbols,
+        kernel_module=gen_kernel_module(max(1, int(MODULE_FUNCTIONS * scale)), rng),
+    )
+    evb = os.path.join(root, parse_io_tables.BASE)
+    os.makedirs(evb, exist_ok=True)
+    for name, blob in (("IS_fl.bin", corpus.is_fl), ("IO_fl.bin", corpus.io_fl),
+                       ("NVRAM_SDR00.dat", corpus.sdr)):
+        with open(os.path.join(evb, name), "wb") as f:
+            f.write(blob)
+    os.makedirs(os.path.dirname(os.path.join(root, iosapi_catalogue.FULLFW)), exist_ok=True)
+    with open(os.path.join(root, iosapi_catalogue.FULLFW), "wb") as f:
+        f.write(fullfw.image)
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def benchmarks(c: Corpus) -> dict[str, Callable[[], object]]:
+    """{name: zero-argument callable}, run with the scratch root as cwd."""
+    image = c.fullfw.image
+    segments = iosapi_catalogue.read_elf_segments(image)
+    code_ranges = [(v, v + sz) for v, _, sz, flags in segments if flags & iosapi_catalogue.PF_X]
+    seeds = set(c.fullfw.vtables.values())
+    segments3 = [(v, off, sz) for v, off, sz, _ in segments]
+    tmp100 = c.fullfw.vtables["TMP100"]
+    pca9548 = c.fullfw.vtables["PCA9548"]
+    # The catalogue cache under extracted/ makes load_catalogue() cheap after this
+    iosapi_catalogue.load_catalogue(rebuild=True)
+    catalogue = iosapi_catalogue.load_catalogue()
+    sensors = parse_io_tables.decode_is_fl(c.is_fl)
+    io_types = parse_io_tables.decode_io_fl(c.io_fl)
+    topo = cross_check_dts.firmware_topology(sensors, io_types, catalogue)
+    tree = parse_dts(c.dts_text, DTS_PATH)
+    kallsyms = kernel_symbols.find_kallsyms(c.vmlinux)
+    index = kernel_symbols.SymbolIndex(kallsyms.addresses, kallsyms.types, kallsyms.names)
+    probes = [addr + 2 for addr, _, _ in c.kernel_symbols[::4]]
+    poller = i2c_farm.FirmwarePoller(i2c_farm.build_farm(topo, io_types))
+    bmc = ipmi_lan_sim.VirtualBmc(ipmi_lan_sim.BmcProfile.from_tables(
+        bytes(15), c.sdr, bytes(512), c.is_fl))
+    session = bmc._new_session(ipmi_lan_sim.AUTH_NONE)
+    session.active = True
+    sensor_reads = [struct.pack("<4sBII", b"\x06\x00\xff\x07", 0, n, session.id) + bytes((8,))
+                    + ipmi_lan_sim.ipmi_request(ipmi_lan_sim.NETFN_SENSOR, 0x2D, bytes((sensor,)), n & 0x3F)
+                    for n, sensor in enumerate(sorted(bmc.profile.sensors))]
+
+    return {
+        "extract.find_squashfs": lambda: extract_firmware.find_squashfs(c.pec),
+        "io_tables.decode_is_fl": lambda: parse_io_tables.decode_is_fl(c.is_fl),
+        "io_tables.decode_io_fl": lambda: parse_io_tables.decode_io_fl(c.io_fl),
+        "io_tables.parse_is_fl_bin": parse_io_tables.parse_is_fl_bin,
+        "io_tables.parse_io_fl_bin": parse_io_tables.parse_io_fl_bin,
+        "io_tables.parse_sdr": parse_io_tables.parse_sdr,
+        "catalogue.read_elf_segments": lambda: iosapi_catalogue.read_elf_segments(image),
+        "catalogue.discover_heuristic": lambda: iosapi_catalogue.discover_heuristic(
+            image, segments, code_ranges, seeds),
+        "catalogue.table_driver_pointers": iosapi_catalogue.table_driver_pointers,
+        "dts.parse_dts": lambda: parse_dts(c.dts_text, DTS_PATH),
+        "cross_check.firmware_topology": lambda: cross_check_dts.firmware_topology(
+            sensors, io_types, catalogue),
+        "cross_check.diff_topology": lambda: cross_check_dts.diff_topology(topo, tree),
+        "cross_check.i2c_address_convention": cross_check_dts.analyze_i2c_address_convention,
+        "cross_check.pca9555_addresses": cross_check_dts.analyze_pca9555_addresses,
+        "cross_check.pmbus_psu": cross_check_dts.analyze_pmbus_psu,
+        "tmp100.find_elf_load_offset": lambda: check_tmp100_driver.find_elf_load_offset(image),
+        "tmp100.analyze_tmp100_driver": lambda: check_tmp100_driver.analyze_tmp100_driver(
+            image, segments3, tmp100),
+        "tmp100.search_for_i2c_addresses": lambda: check_tmp100_driver.search_for_i2c_addresses(
+            image, segments3, tmp100, pca9548),
+        "tmp100.search_for_string_refs": lambda: check_tmp100_driver.search_for_string_refs(image),
+        "kernel.find_kallsyms": lambda: kernel_symbols.find_kallsyms(c.vmlinux),
+        "kernel.symbolize": lambda: [index.symbolize(addr) for addr in probes],
+        "modules.analyze_module": lambda: module_index.analyze_module(c.kernel_module),
+        "i2c_farm.build_farm": lambda: i2c_farm.build_farm(topo, io_types),
+        "i2c_farm.sweep": poller.sweep,
+        "ipmi.handle_packet": lambda: [bmc.handle_packet(p) for p in sensor_reads],
+    }
+
+
+def measure(fn: Callable[[], object], min_time: float) -> dict:
+    """Time ``fn`` pytest-benchmark style, then measure its peak allocation."""
+    fn()
+    times = []
+    start = time.perf_counter()
+    while len(times) < MIN_ROUNDS or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rounds": len(times),
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "median": statistics.median(times),
+        "ops": 1 / statistics.fmean(times),
+        "peak_bytes": peak,
+    }
+
+
+def run(scale: float, seed: int, min_time: float, keyword: str | None = None) -> dict:
+    """Generate the corpus and run every (matching) benchmark."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-parsers-") as root:
+        start = time.monotonic()
+        corpus = build_corpus(root, scale, seed)
+        print(f"[bench] Generated corpus in {time.monotonic() - start:.1f}s: "
+              f"pec {len(corpus.pec):,} B, fullfw {len(corpus.fullfw.image):,} B, "
+              f"IS {len(corpus.is_fl):,} B, IO {len(corpus.io_fl):,} B, "
+              f"SDR {len(corpus.sdr):,} B, vmlinux {len(corpus.vmlinux):,} B "
+              f"({len(corpus.kernel_symbols):,} symbols)", file=sys.stderr)
+        os.chdir(root)
+        results = {}
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                cases = benchmarks(corpus)
+                for name, fn in cases.items():
+                    if keyword and keyword not in name:
+                        continue
+                    print(f"[bench] {name}", file=sys.stderr)
+                    results[name] = measure(fn, min_time)
+        finally:
+            os.chdir(cwd)
+    return {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "scale": scale,
+        "seed": seed,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "benchmarks": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting and baselines
+# ---------------------------------------------------------------------------
+
+def compare(current: dict, baseline: dict, threshold: float) -> dict[str, dict]:
+    """Per-benchmark change against a baseline.
+
+    Returns:
+        {name: {"ratio", "peak_ratio", "regression"}} for benchmarks in both.
+    """
+    changes = {}
+    for name, cur in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        ratio = cur["median"] / base["median"] if base["median"] else 1.0
+        changes[name] = {
+            "ratio": ratio,
+            "peak_ratio": cur["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1.0,
+            "regression": (ratio > 1 + threshold / 100
+                           and cur["median"] - base["median"] > NOISE_FLOOR),
+        }
+    return changes
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:10.3f}"
+
+
+def print_report(results: dict, changes: dict | None = None) -> None:
+    print("=" * 112)
+    print(f"bench_parsers: scale {results['scale']}, seed {results['seed']}, "
+          f"Python {results['machine']['python']}")
+    print("-" * 112)
+    print(f"{'name':38s} {'min ms':>10s} {'median ms':>10s} {'mean ms':>10s} {'stddev':>10s} "
+          f"{'rounds':>6s} {'ops/s':>9s} {'peak KiB':>9s}" + ("  vs base" if changes else ""))
+    for name, r in results["benchmarks"].items():
+        line = (f"{name:38s} {_ms(r['min'])} {_ms(r['median'])} {_ms(r['mean'])} {_ms(r['stddev'])} "
+                f"{r['rounds']:6d} {r['ops']:9.1f} {r['peak_bytes'] / 1024:9.1f}")
+        if changes and name in changes:
+            ch = changes[name]
+            line += f"  {(ch['ratio'] - 1) * 100:+6.1f}%"
+            if ch["regression"]:
+                line += "  REGRESSION"
+        print(line)
+    print("=" * 112)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the firmware parsers on synthetic images.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply the synthetic input sizes (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="Generator seed (default: %(default)s)")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="Seconds to spend timing each benchmark (default: %(default)s)")
+    parser.add_argument("-k", dest="keyword", help="Only benchmarks whose name contains this")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, metavar="FILE",
+                        help="Store the results as a baseline (default file: %(const)s)")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="FILE",
+                        help="Compare against a baseline; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Median slowdown in percent that counts as a regression "
+                        "(default: %(default)s)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if (baseline.get("scale"), baseline.get("seed")) != (args.scale, args.seed):
+            print(f"[bench] WARNING: baseline was run with scale {baseline.get('scale')} "
+                  f"seed {baseline.get('seed')}", file=sys.stderr)
+
+    results = run(args.scale, args.seed, args.min_time, args.keyword)
+    changes = compare(results, baseline, args.threshold) if baseline else None
+    print_report(results, changes)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[bench] Saved baseline to {args.save}")
+    if changes:
+        regressions = [name for name, ch in changes.items() if ch["regression"]]
+        if regressions:
+            print(f"[bench] {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"[bench] No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#   "pyserial>=3.5",
+#   "requests>=2.28",
+# ]
+# ///
+"""Benchmark the tftp_boot.py serial pipeline against uboot_sim.py.
+
+Runs the real tftp_boot.py functions (interrupt_autoboot, send_command,
+read_until_prompt) on a pty whose other end is a simulated U-Boot, at
+115200 and higher simulated baud rates (0 = unpaced, the pipeline's own
+ceiling). For each rate it measures:
+
+  - interrupt: autoboot banner written -> interrupt key received by the
+    simulator (0 when a key was already queued before the banner)
+  - prompt: last byte of the U-Boot prompt written -> send_command()
+    returning
+  - throughput: console bytes/s while reading a large "md.l" dump, as a
+    fraction of the line rate, and reader CPU time per KiB
+
+Console echo is sent to /dev/null while measuring.
+
+Usage:
+    uv run bench_serial.py [--baud 115200 --baud 921600] [--iterations 20]
+        [--md-bytes 4096] [--json bench-serial.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from tftp_boot import (
+    add_console_tap,
+    interrupt_autoboot,
+    open_serial,
+    read_until_prompt,
+    send_command,
+    UBOOT_PROMPTS,
+)
+from uboot_sim import UBootSim, open_pty
+
+DEFAULT_BAUD_RATES = [115200, 230400, 460800, 921600, 0]
+
+# Power-on output is replayed at this fraction of its recorded timing so
+# that repeated resets stay quick; the countdown itself is not scaled
+PREBOOT_TIME_SCALE = 0.05
+
+
+class _SimulatedBoard:
+    """A UBootSim on a pty, running in a thread, and the port opened on it."""
+
+    def __init__(self, baud: int) -> None:
+        self.master, slave = open_pty()
+        # Open the client end first: the simulator treats a closed pty as
+        # a disconnect
+        self.ser = open_serial(slave)
+        self.sim = UBootSim(self.master, baud=baud, time_scale=PREBOOT_TIME_SCALE)
+        self.thread = threading.Thread(target=self.sim.run, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.sim.stop()
+        self.ser.close()
+        self.thread.join(timeout=5)
+        os.close(self.master)
+
+
+def _stats(samples: list[float], scale: float = 1000.0) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "median": round(statistics.median(ordered) * scale, 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * scale, 3),
+        "max": round(ordered[-1] * scale, 3),
+    }
+
+
+def bench_interrupt(board: _SimulatedBoard, iterations: int) -> tuple[list[float], list[float]]:
+    """Reset the board repeatedly and catch autoboot each time.
+
+    Returns:
+        (interrupt latencies, prompt detection latencies) in seconds.
+    """
+    sim = board.sim
+    interrupts, prompts = [], []
+    for i in range(iterations):
+        mark = len(sim.events)
+        if i:
+            send_command(board.ser, "reset", expect_prompt=False)
+        if interrupt_autoboot(board.ser, timeout=10) is None:
+            raise RuntimeError("simulator did not reach the U-Boot prompt")
+        done = time.monotonic()
+        banner = sim.last_event("autoboot_banner", mark)
+        interrupt = sim.last_event("interrupt", mark)
+        prompt = sim.last_event("prompt", mark)
+        if banner is not None and interrupt is not None:
+            interrupts.append(max(0.0, interrupt - banner))
+        if prompt is not None:
+            prompts.append(done - prompt)
+        # Let the trailing interrupt spaces land before the next reset
+        read_until_prompt(board.ser, UBOOT_PROMPTS, timeout=0.2)
+    return interrupts, prompts
+
+
+def bench_prompt(board: _SimulatedBoard, iterations: int) -> list[float]:
+    """Round-trip short commands; returns prompt detection latencies."""
+    latencies = []
+    for _ in range(iterations):
+        mark = len(board.sim.events)
+        _, found = send_command(board.ser, "version", timeout=5)
+        done = time.monotonic()
+        prompt = board.sim.last_event("prompt", mark)
+        if found and prompt is not None:
+            latencies.append(done - prompt)
+    return latencies
+
+
+def bench_throughput(board: _SimulatedBoard, md_bytes: int) -> dict:
+    """Read an md.l dump of ``md_bytes`` of memory through read_until_prompt."""
+    received = 0
+
+    def count(chunk: bytes) -> None:
+        nonlocal received
+        received += len(chunk)
+
+    add_console_tap(board.ser, count)
+    cpu = time.thread_time()
+    start = time.monotonic()
+    _, found = send_command(board.ser, f"md.l 40000000 {md_bytes // 4:x}", timeout=120)
+    elapsed = time.monotonic() - start
+    cpu = time.thread_time() - cpu
+    if not found:
+        raise RuntimeError("md dump did not end at a prompt")
+    return {
+        "bytes": received,
+        "seconds": round(elapsed, 4),
+        "bytes_per_sec": round(received / elapsed),
+        "cpu_us_per_kib": round(cpu / (received / 1024) * 1e6, 1),
+    }
+
+
+def run_baud(baud: int, iterations: int, md_bytes: int) -> dict:
+    board = _SimulatedBoard(baud)
+    try:
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            interrupts, boot_prompts = bench_interrupt(board, max(1, iterations // 4))
+            prompts = bench_prompt(board, iterations)
+            throughput = bench_throughput(board, md_bytes)
+    finally:
+        board.close()
+
+    line_rate = baud / 10 if baud else None
+    if line_rate:
+        throughput["efficiency"] = round(throughput["bytes_per_sec"] / line_rate, 3)
+    return {
+        "baud": baud,
+        "line_rate": line_rate,
+        "interrupt_ms": _stats(interrupts),
+        "boot_prompt_ms": _stats(boot_prompts),
+        "prompt_ms": _stats(prompts),
+        "throughput": throughput,
+        "dropped_bytes": board.sim.dropped,
+    }
+
+
+def print_results(results: list[dict]) -> None:
+    print("=" * 96)
+    print(f"{'baud':>8s}  {'interrupt ms':>16s}  {'prompt ms (p50/p95/max)':>26s}  "
+          f"{'throughput B/s':>14s}  {'eff':>5s}  {'cpu us/KiB':>10s}")
+    print("-" * 96)
+    for r in results:
+        i, p, t = r["interrupt_ms"], r["prompt_ms"], r["throughput"]
+        interrupt = f"{i['median']:.2f}/{i['max']:.2f}" if i else "-"
+        prompt = f"{p['median']:.2f}/{p['p95']:.2f}/{p['max']:.2f}" if p else "-"
+        eff = f"{t['efficiency']:.2f}" if "efficiency" in t else "-"
+        print(f"{r['baud'] or 'unpaced':>8}  {interrupt:>16s}  {prompt:>26s}  "
+              f"{t['bytes_per_sec']:>14,d}  {eff:>5s}  {t['cpu_us_per_kib']:>10.1f}")
+    print("=" * 96)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the serial pipeline on uboot_sim.")
+    parser.add_argument("--baud", type=int, action="append",
+                        help=f"Simulated baud rate, 0 = unpaced; repeatable "
+                        f"(default: {' '.join(map(str, DEFAULT_BAUD_RATES))})")
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="Prompt round trips per rate (default: %(default)s)")
+    parser.add_argument("--md-bytes", type=int, default=4096,
+                        help="Memory dumped for the throughput test (default: %(default)s)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for baud in args.baud or DEFAULT_BAUD_RATES:
+        print(f"[bench] {baud or 'unpaced'} baud...", file=sys.stderr)
+        results.append(run_baud(baud, args.iterations, args.md_bytes))
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[bench] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""Boot-phase timing for C410X serial boots.
+
+BootTimer is fed the raw serial stream (tftp_boot.py registers it as a
+console tap). It timestamps every line against a monotonic clock and
+records when known phase markers appear: the U-Boot banner, the
+autoboot countdown, the first prompt, each U-Boot command echoed back
+(each command of a ';' list as the one before it finishes), DHCP
+completion, each TFTP "Bytes transferred", "Starting kernel", the Linux
+banner, initcall_debug lines and the login prompt.
+
+Each boot produces a record that is appended to a JSONL history and
+compared with earlier runs, so boot-time regressions can be tracked
+kernel by kernel.
+
+Usage:
+    python3 boot_timing.py [--log boot-timing.jsonl] [--unit NAME] [--kernel FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+DEFAULT_HISTORY = "boot-timing.jsonl"
+
+# (phase, regex, matches on a partial line). The first occurrence of a
+# phase is recorded under its name, later ones as "name#2", "name#3"...
+PHASE_MARKERS: list[tuple[str, re.Pattern, bool]] = [
+    ("uboot_banner", re.compile(rb"U-Boot \d+\.\d+"), False),
+    ("autoboot", re.compile(rb"Hit any key to stop autoboot"), True),
+    ("dhcp_bound", re.compile(rb"DHCP client bound to address"), False),
+    ("tftp_done", re.compile(rb"Bytes transferred = (\d+)"), False),
+    ("starting_kernel", re.compile(rb"Starting kernel"), False),
+    ("kernel_banner", re.compile(rb"Linux version \S+"), False),
+    ("free_init", re.compile(rb"Freeing init memory"), False),
+    ("login_prompt", re.compile(rb"login: ?$"), True),
+]
+
+# U-Boot prompt, optionally followed by the echoed command
+UBOOT_PROMPT_RE = re.compile(rb"ast2050evb> *(\S*)")
+
+# initcall_debug: "initcall foo_init+0x0/0x40 returned 0 after 1234 usecs"
+INITCALL_RE = re.compile(rb"initcall (\S+?)(?:\+0x[0-9a-f]+/0x[0-9a-f]+)? returned -?\d+ after (\d+) usecs")
+
+# Output that ends a U-Boot command, for timing the commands of a ';' list
+# that is echoed only once (tftp_boot.py --pipelined)
+COMMAND_DONE = {
+    "dhcp": "dhcp_bound",
+    "tftpboot": "tftp_done",
+}
+
+# Named intervals reported per boot: (label, start phase, end phase)
+INTERVALS = [
+    ("power-on to U-Boot prompt", "power_on", "uboot_prompt"),
+    ("dhcp", "cmd_dhcp", "dhcp_bound"),
+    ("tftpboot kernel", "cmd_tftpboot", "tftp_done"),
+    ("tftpboot initrd", "cmd_tftpboot#2", "tftp_done#2"),
+    ("bootm to kernel banner", "cmd_bootm", "kernel_banner"),
+    ("kernel banner to login", "kernel_banner", "login_prompt"),
+    ("total", "power_on", "login_prompt"),
+]
+
+# A slowdown counts as a regression above both of these
+REGRESSION_PERCENT = 10.0
+REGRESSION_SECONDS = 0.5
+
+# Initcalls slower than this are kept in the record
+SLOW_INITCALL_USECS = 10000
+
+MAX_LINE = 4096
+
+
+class BootTimer:
+    """Timestamp serial lines and detect boot phase markers.
+
+    Args:
+        clock: Monotonic clock (seconds).
+        transcript: Optional path; every line is written there prefixed
+            with its offset from the timer's start.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        transcript: Optional[str] = None,
+    ) -> None:
+        self.clock = clock
+        self.start = clock()
+        self.phases: dict[str, float] = {}
+        self.info: dict[str, dict] = {}
+        self.initcalls: list[tuple[str, int, float]] = []
+        self.lines = 0
+        self._counts: dict[str, int] = {}
+        self._partial = b""
+        self._partial_seen: set[str] = set()
+        # Commands of the current ';' list not started yet, the marker the
+        # running one is waiting for, and variables the list has set
+        self._commands: list[str] = []
+        self._waiting: Optional[str] = None
+        self._env: dict[str, str] = {}
+        self._transcript = open(transcript, "w") if transcript else None
+
+    def elapsed(self) -> float:
+        return self.clock() - self.start
+
+    def mark(self, phase: str, **info) -> str:
+        """Record a phase at the current time; returns the stored name."""
+        n = self._counts.get(phase, 0) + 1
+        self._counts[phase] = n
+        name = phase if n == 1 else f"{phase}#{n}"
+        self.phases[name] = self.elapsed()
+        if info:
+            self.info[name] = info
+        if phase == self._waiting:
+            self._waiting = None
+            self._next_command()
+        return name
+
+    def _start_commands(self, line: str) -> None:
+        """Queue the commands of an echoed command line.
+
+        A ';' list is echoed once, so each command is marked when the one
+        before it finishes (COMMAND_DONE; commands without a marker finish
+        at once). "run" is expanded from the list's own setenvs, which is
+        how the pipelined boot guards its fatal steps.
+        """
+        commands = []
+        for command in line.split(";"):
+            words = command.split()
+            if not words:
+                continue
+            commands.append(words[0])
+            if words[0] == "setenv" and len(words) > 2:
+                self._env[words[1]] = " ".join(words[2:])
+            elif words[0] == "run":
+                for var in words[1:]:
+                    commands += [c.split()[0] for c in self._env.get(var, "").split(";") if c.split()]
+        self._commands = commands
+        self._waiting = None
+        self._next_command()
+
+    def _next_command(self) -> None:
+        while self._commands and self._waiting is None:
+            command = self._commands.pop(0)
+            self.mark("cmd_" + command)
+            self._waiting = COMMAND_DONE.get(command)
+
+    def feed(self, data: bytes) -> None:
+        """Console tap: consume a chunk of serial output."""
+        now = self.elapsed()
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()[-MAX_LINE:]
+        for line in lines:
+            self._line(line.rstrip(b"\r"), now)
+        if self._partial:
+            self._check_partial(self._partial)
+
+    def _line(self, line: bytes, now: float) -> None:
+        self.lines += 1
+        if self._transcript:
+            self._transcript.write(f"+{now:10.6f} {line.decode('ascii', 'replace')}\n")
+        seen, self._partial_seen = self._partial_seen, set()
+
+        m = UBOOT_PROMPT_RE.search(line)
+        if m:
+            if "uboot_prompt" not in self.phases:
+                self.phases["uboot_prompt"] = now
+            if m.group(1):
+                self._start_commands(line[m.start(1):].decode("ascii", "replace"))
+
+        for phase, regex, _ in PHASE_MARKERS:
+            if phase in seen:
+                continue
+            m = regex.search(line)
+            if m:
+                name = self.mark(phase)
+                if m.groups():
+                    self.info[name] = {"value": m.group(1).decode("ascii", "replace")}
+
+        m = INITCALL_RE.search(line)
+        if m:
+            usecs = int(m.group(2))
+            if usecs >= SLOW_INITCALL_USECS:
+                self.initcalls.append((m.group(1).decode("ascii", "replace"), usecs, now))
+
+    def _check_partial(self, partial: bytes) -> None:
+        # Prompts arrive without a newline; catch them as soon as they show
+        if "uboot_prompt" not in self.phases and UBOOT_PROMPT_RE.search(partial):
+            self.phases["uboot_prompt"] = self.elapsed()
+        for phase, regex, on_partial in PHASE_MARKERS:
+            if on_partial and phase not in self._partial_seen and regex.search(partial):
+                self._partial_seen.add(phase)
+                self.mark(phase)
+
+    def intervals(self) -> dict[str, float]:
+        """Durations of the INTERVALS whose both ends were seen."""
+        out = {}
+        for label, begin, end in INTERVALS:
+            if begin == "power_on" and begin not in self.phases:
+                begin = "start"
+            t0 = 0.0 if begin == "start" else self.phases.get(begin)
+            t1 = self.phases.get(end)
+            if t0 is not None and t1 is not None and t1 >= t0:
+                out[label] = t1 - t0
+        return out
+
+    def record(self, **meta) -> dict:
+        """Build the per-boot timing record."""
+        if self._transcript:
+            self._transcript.flush()
+        return {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **meta,
+            "phases": {k: round(v, 6) for k, v in sorted(self.phases.items(), key=lambda kv: kv[1])},
+            "info": self.info,
+            "intervals": {k: round(v, 6) for k, v in self.intervals().items()},
+            "slow_initcalls": sorted(self.initcalls, key=lambda c: -c[1])[:20],
+            "lines": self.lines,
+        }
+
+    def close(self) -> None:
+        if self._transcript:
+            self._transcript.close()
+            self._transcript = None
+
+
+# ---------------------------------------------------------------------------
+# History and comparison
+# ---------------------------------------------------------------------------
+
+def append_history(path: str, record: dict) -> None:
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def load_history(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def compare(record: dict, history: list[dict], last: int = 10) -> list[dict]:
+    """Compare a record's intervals with the median of earlier runs.
+
+    Only successful runs of the same unit (when known) are used as the
+    baseline; the most recent ``last`` of them.
+
+    Returns:
+        One row per interval: label, current, baseline, delta, runs,
+        regression flag.
+    """
+    baseline = [r for r in history
+                if r is not record and r.get("ok", True)
+                and (not record.get("unit") or r.get("unit") == record.get("unit"))][-last:]
+    rows = []
+    for label, _, _ in INTERVALS:
+        current = record["intervals"].get(label)
+        previous = [r["intervals"][label] for r in baseline if label in r.get("intervals", {})]
+        base = statistics.median(previous) if previous else None
+        delta = current - base if current is not None and base is not None else None
+        regression = bool(
+            delta is not None and delta > REGRESSION_SECONDS
+            and base > 0 and delta / base * 100 > REGRESSION_PERCENT)
+        rows.append({"label": label, "current": current, "baseline": base,
+                     "delta": delta, "runs": len(previous), "regression": regression})
+    return rows
+
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{value:8.2f}s" if value is not None else f"{'-':>9s}"
+
+
+def print_report(record: dict, rows: list[dict], tag: str = "[timing]") -> None:
+    """Print a per-boot timing report with the comparison rows."""
+    what = " ".join(f"{k}={record[k]}" for k in ("unit", "kernel") if record.get(k))
+    print(f"\n{tag} Boot timing {what}")
+    print(f"{tag} {'interval':28s} {'this run':>9s} {'median':>9s} {'delta':>9s}  runs")
+    for row in rows:
+        if row["current"] is None and row["baseline"] is None:
+            continue
+        delta = f"{row['delta']:+8.2f}s" if row["delta"] is not None else f"{'-':>9s}"
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{tag} {row['label']:28s} {_fmt(row['current'])} {_fmt(row['baseline'])} "
+              f"{delta}  {row['runs']:4d}{flag}")
+    for name, usecs, at in record.get("slow_initcalls", [])[:5]:
+        print(f"{tag}   slow initcall {name}: {usecs / 1000:.1f} ms (at +{at:.2f}s)")
+
+
+def finish_boot_timing(timer: BootTimer, history_path: str, tag: str = "[timing]", **meta) -> dict:
+    """Close out a boot: build the record, compare, report and append it."""
+    record = timer.record(**meta)
+    timer.close()
+    history = load_history(history_path)
+    print_report(record, compare(record, history), tag)
+    append_history(history_path, record)
+    print(f"{tag} Appended to {history_path}")
+    return record
+
+
+# ---------------------------------------------------------------------------
+# CLI: inspect the history
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show boot timing history.")
+    parser.add_argument("--log", default=DEFAULT_HISTORY, help="History file (default: %(default)s)")
+    parser.add_argument("--unit", help="Only runs of this unit")
+    parser.add_argument("--kernel", help="Only runs of this kernel")
+    parser.add_argument("--last", type=int, default=20, help="Runs to list (default: %(default)s)")
+    args = parser.parse_args()
+
+    history = [r for r in load_history(args.log)
+               if (not args.unit or r.get("unit") == args.unit)
+               and (not args.kernel or r.get("kernel") == args.kernel)]
+    if not history:
+        print(f"No matching runs in {args.log}")
+        sys.exit(1)
+
+    labels = [label for label, _, _ in INTERVALS]
+    short = ["U-Boot", "dhcp", "tftp-k", "tftp-i", "bootm", "login", "total"]
+    print(f"{'time':25s} {'unit':14s} {'kernel':22s} " + " ".join(f"{s:>7s}" for s in short))
+    for r in history[-args.last:]:
+        cells = [f"{r['intervals'][l]:7.2f}" if l in r.get("intervals", {}) else f"{'-':>7s}"
+                 for l in labels]
+        print(f"{r.get('time', '?'):25s} {str(r.get('unit', '-')):14s} "
+              f"{str(r.get('kernel', '-'))[:22]:22s} " + " ".join(cells))
+
+    print_report(history[-1], compare(history[-1], history[:-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """Analyze the TMP100 IOSAPI driver in fullfw to determine actual I2C address.
 
-The TMP100 IOSAPI driver vtable is at address 0x000FCBFC in the fullfw binary.
-We need to find the actual function code and look for I2C address usage.
+The TMP100 IOSAPI driver vtable is looked up in the driver catalogue built by
+iosapi_catalogue.py (0x000FCBFC in firmware v1.35). We need to find the actual
+function code and look for I2C address usage.
 """
 
 import os
 import struct
 import re
 
+from iosapi_catalogue import find_driver, load_catalogue
+
 FULLFW = "extracted/rootfs/sbin/fullfw"
 
 
@@ -70,10 +73,8 @@ def vaddr_to_file_offset(vaddr, segments):
     return None
 
 
-def analyze_tmp100_driver(data, segments):
+def analyze_tmp100_driver(data, segments, vtable_vaddr):
     """Find and analyze the TMP100 IOSAPI driver code."""
-    # The TMP100 IOSAPI driver vtable is at virtual address 0x000FCBFC
-    vtable_vaddr = 0x000FCBFC
     vtable_foff = vaddr_to_file_offset(vtable_vaddr, segments)
 
     if vtable_foff is None:
@@ -123,7 +124,7 @@ def analyze_tmp100_driver(data, segments):
                     print(f"    +0x{j:03X}: MOV R{rd}, #0x{imm:02X}  (potential I2C address)")
 
 
-def search_for_i2c_addresses(data, segments):
+def search_for_i2c_addresses(data, segments, vtable_vaddr, pca9548_vtable_vaddr=None):
     """Search for specific I2C address patterns near TMP100 code."""
     print("\n  Searching fullfw for TMP100/LM75-related I2C addresses...")
 
@@ -132,7 +133,6 @@ def search_for_i2c_addresses(data, segments):
     # 0x2E, or standard TMP100 addresses near the driver code area.
 
     # First, find where the TMP100 IOSAPI driver functions are located
-    vtable_vaddr = 0x000FCBFC
     vtable_foff = vaddr_to_file_offset(vtable_vaddr, segments)
     if vtable_foff is None:
         return
@@ -145,15 +145,17 @@ def search_for_i2c_addresses(data, segments):
 
     # Check a broader area around the TMP100 driver
     # Also check the PCA9548 driver area for mux addresses
-    pca9548_vtable_vaddr = 0x000FCBFC + 0x20  # Approximate
+    if pca9548_vtable_vaddr is not None:
+        print(f"  PCA9548 switch vtable at vaddr 0x{pca9548_vtable_vaddr:08X}")
 
     # Search for byte sequence 0x5C in context of I2C transactions
     # In ARM code, the address would be loaded as an immediate or from memory
-    target_area_start = vaddr_to_file_offset(0x000FC000, segments)
-    target_area_end = vaddr_to_file_offset(0x000FD000, segments)
+    area_vaddr = vtable_vaddr & ~0xFFF
+    target_area_start = vaddr_to_file_offset(area_vaddr, segments)
+    target_area_end = vaddr_to_file_offset(area_vaddr + 0x1000, segments)
     if target_area_start and target_area_end:
         area = data[target_area_start:target_area_end]
-        print(f"  Scanning driver area 0x000FC000-0x000FD000 ({len(area)} bytes):")
+        print(f"  Scanning driver area 0x{area_vaddr:08X}-0x{area_vaddr + 0x1000:08X} ({len(area)} bytes):")
 
         # Look for the byte 0x5C in this area
         pos = 0
@@ -168,7 +170,7 @@ def search_for_i2c_addresses(data, segments):
                 ctx_end = min(len(area), pos + 8)
                 ctx = area[ctx_start:ctx_end]
                 ctx_hex = ' '.join(f'{b:02X}' for b in ctx)
-                vaddr = 0x000FC000 + pos
+                vaddr = area_vaddr + pos
                 print(f"    0x{vaddr:08X}: ...{ctx_hex}... (byte 0x5C at offset +{pos-ctx_start})")
             count_5c += 1
             pos += 1
@@ -248,8 +250,15 @@ def main():
             p_filesz = struct.unpack_from('<I', data, off + 16)[0]
             segments.append((p_vaddr, p_offset, p_filesz))
 
-    analyze_tmp100_driver(data, segments)
-    search_for_i2c_addresses(data, segments)
+    catalogue = load_catalogue()
+    tmp100_vtable = find_driver(catalogue, "TMP100")
+    if tmp100_vtable is None:
+        print("  TMP100 driver not found in the driver catalogue (see iosapi_catalogue.py)")
+        return
+
+    analyze_tmp100_driver(data, segments, tmp100_vtable)
+    search_for_i2c_addresses(data, segments, tmp100_vtable,
+                             find_driver(catalogue, "PCA9548"))
     search_for_string_refs(data)
 
 
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""Persistent compressed console logs for C410X serial sessions.
+
+ConsoleLogWriter is a background thread that receives every byte read
+from every unit (tftp_boot.py registers one console tap per unit) and
+appends it to day-rotated log segments. Each unit's output is cut into
+gzip members of up to MEMBER_MAX_BYTES at line boundaries; concatenated
+members are an ordinary gzip file, so ``zcat`` still works on a segment.
+
+Every member gets one line in index.jsonl: segment, compressed offset and
+length, unit, boot id, wall-clock range, the boot-phase markers it
+contains (same markers as boot_timing.py, with their offsets) and a
+trigram Bloom filter of its text. Queries read the index and decompress
+only the members they need: one boot's kernel log is a seek to the
+"starting_kernel" member, and a literal grep skips every member whose
+filter rules the pattern out.
+
+SessionRecorder is a simpler tap for tftp_boot.py --record: it keeps one
+session's raw chunks with their timing, for replay by uboot_sim.py.
+
+Layout:
+    console-logs/index.jsonl
+    console-logs/2026-10-19/143702.gz
+    ...
+
+Usage:
+    python3 console_log.py boots [--unit NAME] [--since 2026-10-01]
+    python3 console_log.py show BOOT [--kernel | --from PHASE --to PHASE]
+    python3 console_log.py grep PATTERN [--unit NAME] [--since DATE] [-i] [--regex]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+from boot_timing import PHASE_MARKERS, UBOOT_PROMPT_RE
+
+DEFAULT_LOG_DIR = "console-logs"
+INDEX_NAME = "index.jsonl"
+
+# A unit's buffer becomes a gzip member at this size, or this many
+# seconds after its first byte, or when its boot ends
+MEMBER_MAX_BYTES = 64 * 1024
+MEMBER_MAX_AGE = 10.0
+# Start a new segment file beyond this size (and every day)
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+# Trigram Bloom filter per member: 16384 bits, 2 hashes. ~4000 distinct
+# trigrams in a 64 KiB member of kernel log gives ~15% false positives
+# per trigram, and a pattern needs all of its trigrams to match.
+BLOOM_BITS = 16384
+
+
+# ---------------------------------------------------------------------------
+# Trigram Bloom filter
+# ---------------------------------------------------------------------------
+
+def _trigrams(data: bytes) -> set[bytes]:
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def bloom_build(data: bytes) -> bytes:
+    bits = bytearray(BLOOM_BITS // 8)
+    for gram in _trigrams(data):
+        h = zlib.crc32(gram)
+        for bit in (h % BLOOM_BITS, (h >> 16) % BLOOM_BITS):
+            bits[bit >> 3] |= 1 << (bit & 7)
+    return bytes(bits)
+
+
+def bloom_may_contain(bits: bytes, literal: bytes) -> bool:
+    """False only if ``literal`` cannot occur (case-insensitively)."""
+    for gram in _trigrams(literal):
+        h = zlib.crc32(gram)
+        for bit in (h % BLOOM_BITS, (h >> 16) % BLOOM_BITS):
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+    return True
+
+
+def _bloom_encode(bits: bytes) -> str:
+    return base64.b64encode(zlib.compress(bits, 9)).decode("ascii")
+
+
+def _bloom_decode(text: str) -> bytes:
+    return zlib.decompress(base64.b64decode(text))
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class _UnitBuffer:
+    """Pending output of one unit, not yet compressed."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.t0 = 0.0
+        self.t1 = 0.0
+        self.markers: list[list] = []
+        self.boot: Optional[str] = None
+        self.line_start = 0
+        self.seen: set[str] = set()
+        self.prompt_seen = False
+
+
+class ConsoleLogWriter:
+    """Background writer of per-unit console output to indexed gzip segments.
+
+    Args:
+        directory: Log directory (created if missing).
+        member_bytes: Uncompressed size at which a member is cut.
+        member_age: Seconds after which buffered output is written anyway.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_LOG_DIR,
+        member_bytes: int = MEMBER_MAX_BYTES,
+        member_age: float = MEMBER_MAX_AGE,
+    ) -> None:
+        self.directory = directory
+        self.member_bytes = member_bytes
+        self.member_age = member_age
+        self.members = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._units: dict[str, _UnitBuffer] = {}
+        self._segment = None
+        self._segment_path = ""
+        self._segment_day = ""
+        os.makedirs(directory, exist_ok=True)
+        self._index = open(os.path.join(directory, INDEX_NAME), "a")
+        self._thread = threading.Thread(target=self._run, name="console-log", daemon=True)
+        self._thread.start()
+
+    # -- producer side (any thread) ---------------------------------------
+
+    def tap(self, unit: str) -> Callable[[bytes], None]:
+        """Console tap that logs ``unit``'s output."""
+        def feed(chunk: bytes) -> None:
+            self._queue.put(("data", unit, time.time(), bytes(chunk)))
+        return feed
+
+    def begin_boot(self, unit: str, **meta) -> str:
+        """Start a new boot of ``unit``; returns its boot id."""
+        now = time.time()
+        boot = f"{unit}@{datetime.fromtimestamp(now).strftime('%Y%m%dT%H%M%S')}"
+        self._queue.put(("begin", unit, now, {"boot": boot, **meta}))
+        return boot
+
+    def end_boot(self, unit: str, **meta) -> None:
+        """Close ``unit``'s boot (flushes its output), recording ``meta``."""
+        self._queue.put(("end", unit, time.time(), meta))
+
+    def close(self) -> None:
+        self._queue.put(("stop", "", time.time(), None))
+        self._thread.join()
+
+    # -- writer thread ----------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            try:
+                kind, unit, now, payload = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._flush_aged(time.time())
+                continue
+            if kind == "data":
+                self._append(unit, now, payload)
+            elif kind == "begin":
+                self._flush(unit, final=True)
+                buf = self._units[unit] = _UnitBuffer()
+                buf.boot = payload["boot"]
+                self._write_index({"type": "boot", "unit": unit, "t": round(now, 3), **payload})
+            elif kind == "end":
+                self._flush(unit, final=True)
+                buf = self._units.pop(unit, None)
+                self._write_index({"type": "end", "unit": unit, "t": round(now, 3),
+                                   "boot": buf.boot if buf else None, **payload})
+            elif kind == "stop":
+                for name in list(self._units):
+                    self._flush(name, final=True)
+                self._index.close()
+                if self._segment:
+                    self._segment.close()
+                return
+            self._flush_aged(now)
+
+    def _append(self, unit: str, now: float, chunk: bytes) -> None:
+        buf = self._units.get(unit)
+        if buf is None:
+            buf = self._units[unit] = _UnitBuffer()
+        if not buf.data:
+            buf.t0 = now
+        buf.t1 = now
+        start = len(buf.data)
+        buf.data += chunk
+        self._scan(buf, start, now)
+        if len(buf.data) >= self.member_bytes:
+            self._flush(unit)
+
+    def _scan(self, buf: _UnitBuffer, start: int, now: float) -> None:
+        """Record phase markers in the newly completed lines."""
+        data = buf.data
+        end = data.rfind(b"\n", start) + 1
+        if end > buf.line_start:
+            offset = buf.line_start
+            for line in bytes(data[buf.line_start:end - 1]).split(b"\n"):
+                self._match_line(buf, line, offset, now)
+                offset += len(line) + 1
+            buf.line_start = end
+        # Prompts arrive without a newline
+        tail = bytes(data[buf.line_start:])
+        if not buf.prompt_seen and UBOOT_PROMPT_RE.search(tail):
+            buf.prompt_seen = True
+            buf.markers.append(["uboot_prompt", round(now, 3), buf.line_start])
+        for phase, regex, partial in PHASE_MARKERS:
+            if partial and phase not in buf.seen and regex.search(tail):
+                buf.seen.add(phase)
+                buf.markers.append([phase, round(now, 3), buf.line_start])
+
+    def _match_line(self, buf: _UnitBuffer, line: bytes, offset: int, now: float) -> None:
+        if not buf.prompt_seen and UBOOT_PROMPT_RE.search(line):
+            buf.prompt_seen = True
+            buf.markers.append(["uboot_prompt", round(now, 3), offset])
+        for phase, regex, partial in PHASE_MARKERS:
+            if phase in buf.seen and partial:
+                continue
+            if regex.search(line):
+                buf.markers.append([phase, round(now, 3), offset])
+                if partial:
+                    buf.seen.add(phase)
+
+    def _flush_aged(self, now: float) -> None:
+        for name, buf in list(self._units.items()):
+            if buf.data and now - buf.t0 >= self.member_age:
+                self._flush(name)
+
+    def _flush(self, unit: str, final: bool = False) -> None:
+        """Compress the unit's buffered complete lines into one member."""
+        buf = self._units.get(unit)
+        if buf is None or not buf.data:
+            return
+        # Cut at a line boundary so grep never sees a line split in two
+        cut = len(buf.data) if final else (buf.data.rfind(b"\n") + 1 or len(buf.data))
+        data = bytes(buf.data[:cut])
+        markers = [m for m in buf.markers if m[2] < cut]
+
+        segment = self._open_segment(buf.t0)
+        offset = segment.tell()
+        member = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+        blob = member.compress(data) + member.flush()
+        segment.write(blob)
+        segment.flush()
+
+        self._write_index({
+            "type": "member",
+            "unit": unit,
+            "boot": buf.boot,
+            "seg": self._segment_path,
+            "off": offset,
+            "len": len(blob),
+            "bytes": len(data),
+            "t0": round(buf.t0, 3),
+            "t1": round(buf.t1, 3),
+            "markers": markers,
+            "bloom": _bloom_encode(bloom_build(data)),
+        })
+        self.members += 1
+        self.raw_bytes += len(data)
+        self.compressed_bytes += len(blob)
+
+        del buf.data[:cut]
+        buf.markers = [[p, t, o - cut] for p, t, o in buf.markers if o >= cut]
+        buf.line_start = max(0, buf.line_start - cut)
+        buf.t0 = buf.t1
+
+    def _open_segment(self, t: float):
+        day = datetime.fromtimestamp(t).strftime("%Y-%m-%d")
+        if (self._segment is None or day != self._segment_day
+                or self._segment.tell() >= SEGMENT_MAX_BYTES):
+            if self._segment:
+                self._segment.close()
+            os.makedirs(os.path.join(self.directory, day), exist_ok=True)
+            name = datetime.fromtimestamp(t).strftime("%H%M%S")
+            path = os.path.join(day, f"{name}.gz")
+            n = 1
+            while os.path.exists(os.path.join(self.directory, path)):
+                n += 1
+                path = os.path.join(day, f"{name}-{n}.gz")
+            self._segment = open(os.path.join(self.directory, path), "ab")
+            self._segment_path = path
+            self._segment_day = day
+        return self._segment
+
+    def _write_index(self, record: dict) -> None:
+        self._index.write(json.dumps(record, sort_keys=True) + "\n")
+        self._index.flush()
+
+
+# ---------------------------------------------------------------------------
+# Session recording
+# ---------------------------------------------------------------------------
+
+class SessionRecorder:
+    """Console tap that records received chunks for later replay by uboot_sim.py.
+
+    Each chunk becomes one JSONL line: {"t": seconds since the recorder
+    was created, "rx": bytes as latin-1 text}.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.start = time.monotonic()
+        self._file = open(path, "w")
+
+    def __call__(self, chunk: bytes) -> None:
+        if self._file:
+            t = round(time.monotonic() - self.start, 6)
+            self._file.write(json.dumps({"t": t, "rx": chunk.decode("latin-1")}) + "\n")
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def load_index(directory: str) -> list[dict]:
+    path = os.path.join(directory, INDEX_NAME)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Torn last line from an interrupted writer
+                continue
+    return records
+
+
+def read_member(directory: str, member: dict) -> bytes:
+    with open(os.path.join(directory, member["seg"]), "rb") as f:
+        f.seek(member["off"])
+        blob = f.read(member["len"])
+    return zlib.decompressobj(31).decompress(blob)
+
+
+def list_boots(records: list[dict]) -> list[dict]:
+    """Boots in the index with their member count, phases and result."""
+    boots: dict[str, dict] = {}
+    for r in records:
+        boot = r.get("boot")
+        if not boot:
+            continue
+        info = boots.setdefault(boot, {"boot": boot, "unit": r["unit"], "start": r["t"] if "t" in r else r["t0"],
+                                       "members": 0, "bytes": 0, "phases": {}, "ok": None})
+        if r["type"] == "boot":
+            info.update({k: v for k, v in r.items() if k not in ("type", "t")})
+            info["start"] = r["t"]
+        elif r["type"] == "member":
+            info["members"] += 1
+            info["bytes"] += r["bytes"]
+            for phase, t, _ in r["markers"]:
+                info["phases"].setdefault(phase, t)
+        elif r["type"] == "end":
+            info.update({k: v for k, v in r.items() if k not in ("type", "t", "boot", "unit")})
+            info["end"] = r["t"]
+    return list(boots.values())
+
+
+def boot_output(directory: str, records: list[dict], boot: str,
+                start_phase: Optional[str] = None, end_phase: Optional[str] = None) -> bytes:
+    """A boot's console output, optionally from/to a phase marker.
+
+    Only members from the one containing ``start_phase`` up to the one
+    containing ``end_phase`` are decompressed.
+    """
+    members = [r for r in records if r["type"] == "member" and r.get("boot") == boot]
+    out = bytearray()
+    started = start_phase is None
+    for member in members:
+        phases = {p: o for p, _, o in reversed(member["markers"])}
+        if not started:
+            if start_phase not in phases:
+                continue
+            data = read_member(directory, member)[phases[start_phase]:]
+            started = True
+        else:
+            data = read_member(directory, member)
+        if end_phase and end_phase in phases:
+            stop = phases[end_phase] - (member["bytes"] - len(data))
+            line_end = data.find(b"\n", max(0, stop))
+            out += data[:line_end + 1 if line_end >= 0 else len(data)]
+            break
+        out += data
+    return bytes(out)
+
+
+def _parse_time(text: Optional[str]) -> Optional[float]:
+    if not text:
+        return None
+    return datetime.fromisoformat(text).timestamp()
+
+
+def grep(
+    directory: str,
+    records: list[dict],
+    pattern: str,
+    regex: bool = False,
+    ignore_case: bool = False,
+    unit: Optional[str] = None,
+    boot: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    stats: Optional[dict] = None,
+) -> Iterator[tuple[dict, bytes]]:
+    """Yield (member, line) for matching lines.
+
+    Members outside the unit/boot/time filters are never read; for a
+    literal pattern, neither are members whose Bloom filter excludes it.
+    """
+    flags = re.IGNORECASE if ignore_case else 0
+    needle = pattern.encode()
+    compiled = re.compile(needle if regex else re.escape(needle), flags)
+    literal = None if regex else needle
+    stats = stats if stats is not None else {}
+    stats.update(members=0, read=0, skipped_bloom=0)
+
+    for member in records:
+        if member["type"] != "member":
+            continue
+        if unit and member["unit"] != unit or boot and member.get("boot") != boot:
+            continue
+        if since and member["t1"] < since or until and member["t0"] > until:
+            continue
+        stats["members"] += 1
+        if literal and len(literal) >= 3 and not bloom_may_contain(_bloom_decode(member["bloom"]), literal):
+            stats["skipped_bloom"] += 1
+            continue
+        stats["read"] += 1
+        for line in read_member(directory, member).split(b"\n"):
+            if compiled.search(line):
+                yield member, line.rstrip(b"\r")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _fmt_time(t: Optional[float]) -> str:
+    return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S") if t else "-"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query persistent C410X console logs.")
+    parser.add_argument("--dir", default=DEFAULT_LOG_DIR, help="Log directory (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("boots", help="List logged boots")
+    p.add_argument("--unit")
+    p.add_argument("--since", help="ISO date/time")
+    p.add_argument("--until", help="ISO date/time")
+
+    p = sub.add_parser("show", help="Print one boot's console output")
+    p.add_argument("boot", help="Boot id (from 'boots'); a unique prefix is enough")
+    p.add_argument("--kernel", action="store_true", help="Only the kernel log (from 'Starting kernel')")
+    p.add_argument("--from", dest="start", metavar="PHASE", help="Start at this phase marker")
+    p.add_argument("--to", dest="end", metavar="PHASE", help="Stop after this phase marker's line")
+
+    p = sub.add_parser("grep", help="Search logged output")
+    p.add_argument("pattern")
+    p.add_argument("--regex", action="store_true", help="Pattern is a regular expression")
+    p.add_argument("-i", "--ignore-case", action="store_true")
+    p.add_argument("--unit")
+    p.add_argument("--boot")
+    p.add_argument("--since", help="ISO date/time")
+    p.add_argument("--until", help="ISO date/time")
+    args = parser.parse_args()
+
+    records = load_index(args.dir)
+    if not records:
+        print(f"No console logs in {args.dir}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "boots":
+        since, until = _parse_time(args.since), _parse_time(args.until)
+        print(f"{'boot':34s} {'start':19s} {'result':7s} {'KiB':>7s}  phases")
+        for info in list_boots(records):
+            if args.unit and info["unit"] != args.unit:
+                continue
+            if since and info["start"] < since or until and info["start"] > until:
+                continue
+            result = {True: "ok", False: "FAILED"}.get(info.get("ok"), "-")
+            phases = " ".join(sorted(info["phases"], key=info["phases"].get))
+            print(f"{info['boot']:34s} {_fmt_time(info['start']):19s} {result:7s} "
+                  f"{info['bytes'] / 1024:7.1f}  {phases}")
+
+    elif args.command == "show":
+        boots = [b["boot"] for b in list_boots(records) if b["boot"].startswith(args.boot)]
+        if len(boots) != 1:
+            print(f"{'No' if not boots else 'Ambiguous'} boot {args.boot!r}", file=sys.stderr)
+            sys.exit(1)
+        start = "starting_kernel" if args.kernel else args.start
+        data = boot_output(args.dir, records, boots[0], start, args.end)
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    elif args.command == "grep":
+        stats: dict = {}
+        matches = 0
+        for member, line in grep(args.dir, records, args.pattern, regex=args.regex,
+                                 ignore_case=args.ignore_case, unit=args.unit, boot=args.boot,
+                                 since=_parse_time(args.since), until=_parse_time(args.until),
+                                 stats=stats):
+            matches += 1
+            print(f"{member.get('boot') or member['unit']} {_fmt_time(member['t0'])}: "
+                  f"{line.decode('utf-8', 'replace')}")
+        print(f"[grep] {matches} lines; read {stats['read']} of {stats['members']} members "
+              f"({stats['skipped_bloom']} skipped by filter)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
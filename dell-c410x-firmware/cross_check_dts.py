@@ -3,12 +3,61 @@
 
 This script parses the raw IO table binaries and compares them
 against the device tree source to find discrepancies.
+
+Usage:
+    python3 cross_check_dts.py                  # all analyses
+    python3 cross_check_dts.py --validate       # DTS vs firmware diff only
+    python3 cross_check_dts.py --validate --watch [--dts FILE]
 """
 
+import argparse
+import json
 import os
 import struct
+import time
+from collections import namedtuple
+
+from dts_tree import load_device_tree
+from iosapi_catalogue import load_catalogue
+from parse_io_tables import (IO_TYPE_GPIO, IO_TYPE_PCA9544, decode_io_fl,
+                             decode_is_fl, i2c_address_7bit, onchip_gpio_pins,
+                             pca9555_location)
 
 BASE = "extracted/rootfs/etc/default/ipmi/evb"
+DTS_FILE = "aspeed-bmc-dell-c410x.dts"
+
+# DTS compatible strings acceptable for each firmware chip name. The
+# TMP100 is register-compatible with the TMP75 the DTS binds to.
+CHIP_COMPATIBLES = {
+    "INA219": ("ti,ina219",),
+    "ADT7462": ("adi,adt7462",),
+    "TMP100": ("ti,tmp100", "ti,tmp75"),
+    "LM75": ("national,lm75", "ti,lm75"),
+    "PCA9555": ("nxp,pca9555",),
+    "PCA9548": ("nxp,pca9548",),
+    "PCA9544": ("nxp,pca9544",),
+}
+
+# TMP100 reg_mux high nibble selects the PCA9548; the mux addresses
+# themselves are not in the tables (assumed 0x70/0x71, see STATUS.md)
+TMP100_MUX_ADDRESSES = (0x70, 0x71)
+
+# Firmware bus IDs are 0xF0 + controller number (&i2cN)
+FW_BUS_BASE = 0xF0
+
+# Wildcard mux path: device sits behind some mux whose channel the
+# tables do not record
+ANY_MUX = "any"
+
+Finding = namedtuple("Finding", "category status key expected actual")
+
+# Expected 7-bit address ranges by sensor chip
+EXPECTED_ADDRESS_RANGES = {
+    "INA219": "0x40-0x4F",
+    "ADT7462": "0x58 or 0x5C",
+    "TMP100": "0x48-0x4F",
+    "LM75": "0x48-0x4F",
+}
 
 
 def read_file(name):
@@ -25,6 +74,8 @@ def analyze_i2c_address_convention():
     print("=" * 72)
     print()
 
+    drivers = load_catalogue()
+
     # Parse all entries and check address byte values
     for i in range(72):
         offset = 4 + i * 22
@@ -40,16 +91,13 @@ def analyze_i2c_address_convention():
         is_8bit = dev_addr > 0x7F
         addr_7bit = dev_addr >> 1 if is_8bit else dev_addr
 
-        # Known device identifications
-        known = {
-            0x000FCC0C: ("INA219", "0x40-0x4F"),
-            0x000FCBCC: ("ADT7462-temp", "0x58 or 0x5C"),
-            0x000FCBDC: ("ADT7462-fan", "0x58 or 0x5C"),
-            0x000FCBFC: ("TMP100", "0x48-0x4F"),
-            0x000FC344: ("FB-temp", "0x48-0x4F"),
-        }
-
-        chip_name, expected_range = known.get(iosapi, ("unknown", "?"))
+        # Identify the chip from the fullfw driver catalogue
+        driver = drivers.get(iosapi)
+        if driver is not None:
+            chip_name = driver["label"]
+            expected_range = EXPECTED_ADDRESS_RANGES.get((driver.get("chip") or "").upper(), "?")
+        else:
+            chip_name, expected_range = "unknown", "?"
 
         if dev_addr != 0:
             format_str = "8-bit" if is_8bit else "AMBIGUOUS (<0x80)"
@@ -404,15 +452,247 @@ def analyze_pmbus_psu():
     print()
 
 
+def firmware_topology(sensors, io_types, drivers):
+    """Build the expected board topology from decoded IS/IO tables.
+
+    Returns a dict with:
+      i2c:     {(bus, mux_path, addr): {"chip", "sources"}} where bus is
+               the controller number and mux_path is a tuple of
+               (mux_addr, channel) pairs, or ANY_MUX
+      muxes:   {(bus, mux_addr or None): {"chip", "channels"}}
+      gpio:    {pin name: [sources]} for AST2050 on-chip pins
+      pca9555: {(bus, addr): pin count}
+    """
+    topo = {"i2c": {}, "muxes": {}, "gpio": {}, "pca9555": {}}
+
+    def add_device(key, chip, source):
+        dev = topo["i2c"].setdefault(key, {"chip": chip, "sources": []})
+        dev["sources"].append(source)
+
+    for s in sensors:
+        driver = drivers.get(s["iosapi"])
+        if driver is None or s["bus"] < FW_BUS_BASE:
+            continue
+        chip = (driver.get("chip") or "").upper()
+        bus = s["bus"] - FW_BUS_BASE
+        addr = i2c_address_7bit(s["dev_addr"])
+        source = f"IS_fl.bin sensor 0x{s['sensor']:02X}"
+        if chip == "TMP100":
+            mux_index = s["reg_mux"] >> 4
+            if mux_index >= len(TMP100_MUX_ADDRESSES):
+                continue
+            mux = (TMP100_MUX_ADDRESSES[mux_index], s["reg_mux"] & 0x07)
+            add_device((bus, (mux,), addr), chip, source)
+            entry = topo["muxes"].setdefault(
+                (bus, mux[0]), {"chip": "PCA9548", "channels": set()})
+            entry["channels"].add(mux[1])
+        elif chip == "ADT7462" and IO_TYPE_PCA9544 in io_types:
+            add_device((bus, ANY_MUX, addr), chip, source)
+            topo["muxes"].setdefault(
+                (bus, None), {"chip": "PCA9544", "channels": set()})
+        else:
+            add_device((bus, (), addr), chip, source)
+
+    for entry in io_types.get(IO_TYPE_GPIO, []):
+        source = f"IO_fl.bin entry {entry['index']}"
+        for pin in onchip_gpio_pins(entry):
+            topo["gpio"].setdefault(pin, []).append(source)
+        location = pca9555_location(entry)
+        if location is not None and location[0] >= FW_BUS_BASE:
+            key = (location[0] - FW_BUS_BASE, location[1])
+            topo["pca9555"][key] = topo["pca9555"].get(key, 0) + 1
+
+    return topo
+
+
+def _fmt_i2c(bus, mux_path, addr):
+    if mux_path == ANY_MUX:
+        via = " -> mux@??"
+    else:
+        via = "".join(f" -> mux@{m:02x}.{ch}" for m, ch in mux_path)
+    return f"i2c{bus}{via} @0x{addr:02X}"
+
+
+def _dts_gpio_usage(tree):
+    """Map AST2050 pin names to the DTS names/consumers that use them."""
+    usage = {}
+    gpio = tree.by_label.get("gpio")
+    if gpio is not None:
+        for i, name in enumerate(gpio.strings("gpio-line-names")):
+            if name:
+                usage.setdefault(f"{chr(ord('A') + i // 8)}{i % 8}", []).append(name)
+    for node in tree.root.walk():
+        for prop in ("gpios", "interrupts"):
+            for cell in node.cells(prop):
+                if isinstance(cell, str) and cell.startswith("ASPEED_GPIO("):
+                    letter, pin = cell[len("ASPEED_GPIO("):-1].replace(" ", "").split(",")
+                    usage.setdefault(f"{letter}{pin}", []).append(node.path)
+    return usage
+
+
+def diff_topology(topo, tree):
+    """Compare firmware topology against a DeviceTree; return Findings."""
+    findings = []
+    matched = set()
+    covered = set()
+
+    # I2C clients
+    for (bus, mux_path, addr), dev in sorted(topo["i2c"].items(), key=str):
+        key = _fmt_i2c(bus, mux_path, addr)
+        allowed = CHIP_COMPATIBLES.get(dev["chip"], ())
+        covered.update(allowed)
+        candidates = [(path, node) for path, node in tree.by_bus_reg.get((bus, addr), [])
+                      if (path != () if mux_path == ANY_MUX else path == mux_path)]
+        if not candidates:
+            findings.append(Finding("i2c", "missing", key, dev["chip"], None))
+            continue
+        path, node = candidates[0]
+        matched.add(node.path)
+        compat = node.compatible[0] if node.compatible else None
+        status = "ok" if compat in allowed else "mismatch"
+        findings.append(Finding("i2c", status, key, dev["chip"], compat))
+
+    # Muxes and their channels
+    for (bus, mux_addr), mux in sorted(topo["muxes"].items(), key=str):
+        allowed = CHIP_COMPATIBLES[mux["chip"]]
+        covered.update(allowed)
+        nodes = [(reg, node) for b, path, reg, node in tree.i2c_devices()
+                 if b == bus and path == () and any(c in allowed for c in node.compatible)
+                 and (mux_addr is None or reg == mux_addr)]
+        label = f"i2c{bus} {mux['chip']}@" + (f"0x{mux_addr:02X}" if mux_addr is not None else "??")
+        if not nodes:
+            findings.append(Finding("mux", "missing", label, mux["chip"], None))
+            continue
+        reg, node = nodes[0]
+        matched.add(node.path)
+        findings.append(Finding("mux", "ok", label, mux["chip"], node.compatible[0]))
+        dts_channels = {child.reg() for child in node.children.values() if child.children}
+        for ch in sorted(mux["channels"] - dts_channels):
+            findings.append(Finding("mux-channel", "missing", f"{label}.{ch}", "populated", None))
+        if mux["channels"]:
+            for ch in sorted(dts_channels - mux["channels"]):
+                findings.append(Finding("mux-channel", "extra", f"{label}.{ch}", None, "populated"))
+
+    # PCA9555 expanders
+    covered.update(CHIP_COMPATIBLES["PCA9555"])
+    for (bus, addr), pins in sorted(topo["pca9555"].items()):
+        key = f"i2c{bus} @0x{addr:02X}"
+        nodes = [node for path, node in tree.by_bus_reg.get((bus, addr), [])
+                 if "nxp,pca9555" in node.compatible]
+        if not nodes:
+            findings.append(Finding("pca9555", "missing", key, f"{pins} pins", None))
+            continue
+        matched.add(nodes[0].path)
+        named = sum(1 for n in nodes[0].strings("gpio-line-names") if n)
+        status = "ok" if named >= pins else "mismatch"
+        findings.append(Finding("pca9555", status, key, f"{pins} pins", f"{named} named lines"))
+
+    # Anything the DTS declares that the firmware tables cover but do not list
+    for bus, path, reg, node in tree.i2c_devices():
+        if node.path in matched:
+            continue
+        compat = node.compatible[0] if node.compatible else None
+        status = "extra" if compat in covered else "unchecked"
+        findings.append(Finding("i2c", status, _fmt_i2c(bus, path, reg), None, compat))
+
+    # AST2050 on-chip GPIO
+    usage = _dts_gpio_usage(tree)
+    for pin in sorted(set(topo["gpio"]) | set(usage)):
+        fw, dts = topo["gpio"].get(pin), usage.get(pin)
+        if fw and dts:
+            findings.append(Finding("gpio", "ok", f"GPIO{pin}", fw[0], dts[0]))
+        elif fw:
+            findings.append(Finding("gpio", "missing", f"GPIO{pin}", fw[0], None))
+        elif topo["gpio"]:
+            findings.append(Finding("gpio", "extra", f"GPIO{pin}", None, dts[0]))
+
+    return findings
+
+
+def load_firmware_topology():
+    """Decode the extracted IS/IO tables into a firmware topology."""
+    sensors = decode_is_fl(read_file("IS_fl.bin"))
+    io_types = decode_io_fl(read_file("IO_fl.bin"))
+    return firmware_topology(sensors, io_types, load_catalogue())
+
+
+def print_findings(findings, path, elapsed):
+    print("=" * 72)
+    print(f"DTS VALIDATION: {path}")
+    print("=" * 72)
+    print()
+    counts = {}
+    for f in findings:
+        counts[f.status] = counts.get(f.status, 0) + 1
+        if f.status == "ok":
+            continue
+        print(f"  [{f.status.upper():9s}] {f.category:11s} {f.key:32s} "
+              f"firmware={f.expected or '-'} dts={f.actual or '-'}")
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"\n  {len(findings)} checks ({summary}) in {elapsed * 1000:.1f} ms")
+    print()
+
+
+def validate_dts(path, topo=None, as_json=False):
+    """Parse a DTS/DTB and diff it against the firmware topology."""
+    if topo is None:
+        topo = load_firmware_topology()
+    start = time.perf_counter()
+    findings = diff_topology(topo, load_device_tree(path))
+    elapsed = time.perf_counter() - start
+    if as_json:
+        print(json.dumps([f._asdict() for f in findings], indent=1))
+    else:
+        print_findings(findings, path, elapsed)
+    return findings
+
+
+def watch_dts(path, as_json=False, interval=0.2):
+    """Re-validate the DTS every time it is saved."""
+    topo = load_firmware_topology()
+    last = None
+    while True:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime is not None and mtime != last:
+            last = mtime
+            try:
+                validate_dts(path, topo, as_json)
+            except ValueError as e:
+                print(f"  {path}: parse error: {e}")
+        time.sleep(interval)
+
+
 def main():
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--validate", action="store_true",
+                        help="only diff the DTS against the decoded firmware tables")
+    parser.add_argument("--dts", default=DTS_FILE,
+                        help=f"DTS or DTB to validate (default: {DTS_FILE})")
+    parser.add_argument("--watch", action="store_true",
+                        help="re-validate whenever the DTS changes")
+    parser.add_argument("--json", action="store_true",
+                        help="emit findings as JSON")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_dts(args.dts, args.json)
+        return
+    if args.validate:
+        validate_dts(args.dts, as_json=args.json)
+        return
+
     analyze_i2c_address_convention()
     analyze_pca9555_addresses()
     analyze_uboot_env()
     analyze_flash_layout()
     analyze_pca9548_mux()
     analyze_pmbus_psu()
+    validate_dts(args.dts)
 
 
 if __name__ == '__main__':
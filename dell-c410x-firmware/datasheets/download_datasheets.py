@@ -3,14 +3,43 @@
 
 This script downloads publicly available datasheets from manufacturer websites
 for all ICs identified in the Dell PowerEdge C410X BMC firmware analysis.
+
+Downloads run concurrently, at most --per-host connections to any one
+host. For each datasheet the fallback URLs are raced: the next mirror is
+started if the current one has not produced a PDF within RACE_DELAY
+seconds (or as soon as it fails), and the first one to answer with a PDF
+is kept while the rest are dropped.
+
+Bodies are streamed to ``<name>.part``. An interrupted transfer is resumed
+with a Range request (guarded by If-Range) from the same URL, both within
+a run and on the next run. The ETag and Last-Modified of every completed
+download are kept in .download-cache.json, so re-runs only make
+conditional requests and leave unchanged files alone.
+
+Usage:
+    python3 download_datasheets.py [--jobs 6] [--per-host 2] [--only TMP75]
+    python3 download_datasheets.py --no-revalidate        # skip existing files
+    python3 download_datasheets.py --rewrite http://127.0.0.1:8000 --dest /tmp/ds
+        # fetch http://127.0.0.1:8000/<host>/<path> instead (local stand-in)
 """
 
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
 import os
+import queue
 import ssl
 import sys
+import threading
 import time
-import urllib.request
 import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -141,112 +170,428 @@ DATASHEETS = [
     ),
 ]
 
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+CACHE_FILE = ".download-cache.json"
+
+DEFAULT_JOBS = 6
+DEFAULT_PER_HOST = 2
+DEFAULT_TIMEOUT = 60
+
+# Start the next mirror if the current one has not answered with a PDF
+# after this long (a failure starts it straight away)
+RACE_DELAY = 3.0
+
+# In-run Range resumes of an interrupted transfer before giving up
+RESUME_ATTEMPTS = 3
+
+CHUNK_SIZE = 64 * 1024
+MIN_PDF_SIZE = 1000
+
+
+class DownloadError(Exception):
+    """A URL (or every mirror) failed to produce a usable PDF."""
 
-def download_from_url(url, filepath, timeout=60):
-    """Try to download a single URL. Returns True on success."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
-        "Accept": "application/pdf,*/*",
-    }
-    req = urllib.request.Request(url, headers=headers)
 
-    # Create an SSL context that doesn't verify certificates (some manufacturer
-    # sites have broken cert chains)
+def _ssl_context() -> ssl.SSLContext:
+    # Some manufacturer sites have broken cert chains
     ctx = ssl.create_default_context()
     ctx.check_hostname = False
     ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+_SSL_CONTEXT = _ssl_context()
+_print_lock = threading.Lock()
+
+
+def _log(filename: str, message: str) -> None:
+    with _print_lock:
+        print(f"  [{filename}] {message}", flush=True)
+
+
+class HostLimiter:
+    """At most ``limit`` open connections to any one host."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.Semaphore] = {}
+
+    def acquire(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.Semaphore(self.limit))
+        slot.acquire()
+        return slot
 
-    try:
-        with urllib.request.urlopen(req, timeout=timeout, context=ctx) as response:
-            data = response.read()
-
-            if len(data) < 1000:
-                print(f"    WARN: Very small ({len(data)} bytes), skipping")
-                return False
-
-            # Check if it's actually a PDF (starts with %PDF)
-            if not data[:5].startswith(b"%PDF"):
-                print(f"    WARN: Not a PDF file (starts with {data[:20]!r}), skipping")
-                return False
-
-            with open(filepath, "wb") as f:
-                f.write(data)
-
-            print(f"    OK: {len(data):,} bytes")
-            return True
-
-    except urllib.error.HTTPError as e:
-        print(f"    FAIL: HTTP {e.code} - {e.reason}")
-        return False
-    except urllib.error.URLError as e:
-        print(f"    FAIL: {e.reason}")
-        return False
-    except Exception as e:
-        print(f"    FAIL: {e}")
-        return False
 
+class ValidatorCache:
+    """Per-file ETag/Last-Modified, and where an unfinished .part came from.
 
-def download_file(urls, filepath, description, timeout=60):
-    """Download a file, trying multiple URLs as fallbacks."""
-    print(f"  Downloading: {description}")
-    print(f"  -> {os.path.basename(filepath)}")
+    Entries look like::
 
-    if os.path.exists(filepath):
-        size = os.path.getsize(filepath)
-        if size > 1000:
-            print(f"  SKIP: Already exists ({size:,} bytes)")
-            return True
+        {"url": ..., "etag": ..., "last_modified": ..., "size": ...,
+         "part": {"url": ..., "etag": ..., "last_modified": ...}}
 
-    if isinstance(urls, str):
-        urls = [urls]
+    "part" is only present while a .part file is being written.
+    """
 
-    for i, url in enumerate(urls):
-        print(f"  Trying URL {i + 1}/{len(urls)}: {url}")
-        if download_from_url(url, filepath, timeout=timeout):
-            return True
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._entries = json.load(f)
 
-    return False
+    def get(self, filename: str) -> dict:
+        with self._lock:
+            return dict(self._entries.get(filename, {}))
+
+    def update(self, filename: str, **fields) -> None:
+        with self._lock:
+            entry = self._entries.setdefault(filename, {})
+            for key, value in fields.items():
+                if value is None:
+                    entry.pop(key, None)
+                else:
+                    entry[key] = value
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+@dataclass
+class Attempt:
+    """An open response from one mirror, holding its host slot."""
+
+    source: str
+    status: int
+    response: object
+    slot: threading.Semaphore
+    first: bytes = b""
+    closed: bool = field(default=False, repr=False)
+
+    def header(self, name: str) -> Optional[str]:
+        return self.response.headers.get(name)
+
+    def validators(self) -> dict:
+        return {"etag": self.header("ETag"), "last_modified": self.header("Last-Modified")}
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.response.close()
+            self.slot.release()
+
+
+def rewrite_url(url: str, base: Optional[str]) -> str:
+    """Map ``scheme://host/path?q`` to ``base/host/path?q`` (local stand-in)."""
+    if not base:
+        return url
+    parts = urllib.parse.urlsplit(url)
+    rewritten = f"{base.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+def open_mirror(source: str, headers: dict, limiter: HostLimiter, rewrite: Optional[str],
+                timeout: float) -> Attempt:
+    """Request one URL and read the first chunk of a 200 to check it is a PDF.
+
+    Args:
+        source: The URL from DATASHEETS (its host is the one limited).
+        headers: Extra request headers (Range, conditional headers).
+        limiter: Per-host connection limits.
+        rewrite: Base URL of a local stand-in, see rewrite_url().
+        timeout: Socket timeout in seconds.
+
+    Raises:
+        DownloadError: HTTP error or not a PDF.
+    """
+    slot = limiter.acquire(urllib.parse.urlsplit(source).hostname or "")
+    req = urllib.request.Request(rewrite_url(source, rewrite), headers={
+        "User-Agent": USER_AGENT,
+        "Accept": "application/pdf,*/*",
+        **headers,
+    })
+    try:
+        try:
+            response = urllib.request.urlopen(req, timeout=timeout, context=_SSL_CONTEXT)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return Attempt(source, 304, e, slot)
+            e.close()
+            raise DownloadError(f"HTTP {e.code} - {e.reason}") from None
+        except urllib.error.URLError as e:
+            raise DownloadError(str(e.reason)) from None
+        attempt = Attempt(source, response.status, response, slot)
+        if attempt.status == 200:
+            attempt.first = response.read(CHUNK_SIZE)
+            if not attempt.first.startswith(b"%PDF"):
+                response.close()
+                raise DownloadError(f"Not a PDF file (starts with {attempt.first[:20]!r})")
+        return attempt
+    except DownloadError:
+        slot.release()
+        raise
+    except Exception as e:
+        slot.release()
+        raise DownloadError(str(e) or type(e).__name__) from None
+
+
+def race_mirrors(candidates: list[tuple[str, dict]], limiter: HostLimiter,
+                 rewrite: Optional[str], timeout: float, log) -> Attempt:
+    """Open the first of ``candidates`` ((url, headers) in preference order)
+    to answer, starting each next one after RACE_DELAY or a failure.
+
+    The losers are closed in the background as they come in.
+
+    Raises:
+        DownloadError: Every candidate failed.
+    """
+    results: queue.Queue = queue.Queue()
+    pending = list(candidates)
+    running = 0
+    errors = []
+
+    def attempt(url: str, headers: dict) -> None:
+        try:
+            results.put((url, open_mirror(url, headers, limiter, rewrite, timeout), None))
+        except DownloadError as e:
+            results.put((url, None, e))
+
+    def launch() -> None:
+        nonlocal running
+        url, headers = pending.pop(0)
+        running += 1
+        threading.Thread(target=attempt, args=(url, headers), daemon=True).start()
+
+    launch()
+    while running:
+        try:
+            url, won, error = results.get(timeout=RACE_DELAY if pending else None)
+        except queue.Empty:
+            log(f"No answer after {RACE_DELAY:.0f}s, also trying {pending[0][0]}")
+            launch()
+            continue
+        running -= 1
+        if won is not None:
+            if running:
+                threading.Thread(target=_close_losers, args=(results, running), daemon=True).start()
+            return won
+        errors.append(f"{url}: {error}")
+        log(f"FAIL: {url}: {error}")
+        if pending:
+            launch()
+    raise DownloadError("all mirrors failed")
+
+
+def _close_losers(results: queue.Queue, count: int) -> None:
+    for _ in range(count):
+        _, attempt, _ = results.get()
+        if attempt is not None:
+            attempt.close()
+
+
+def _content_range_start(value: Optional[str]) -> Optional[int]:
+    # "bytes 1000-4999/5000"
+    try:
+        return int(value.split()[1].split("-")[0])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _mirror_candidates(urls: list[str], entry: dict, part_path: str) -> list[tuple[str, dict]]:
+    """Mirrors in order, the one a .part came from first with a Range header."""
+    candidates = [(url, {}) for url in urls]
+    part = entry.get("part")
+    if not part or not os.path.exists(part_path):
+        return candidates
+    have = os.path.getsize(part_path)
+    validator = part.get("etag") or part.get("last_modified")
+    if have == 0 or not validator or part["url"] not in urls:
+        return candidates
+    resume = (part["url"], {"Range": f"bytes={have}-", "If-Range": validator})
+    return [resume] + [c for c in candidates if c[0] != part["url"]]
+
+
+def _stream(attempt: Attempt, part_path: str) -> tuple[int, bool]:
+    """Write a 200 (truncating) or 206 (appending) body to ``part_path``.
+
+    Returns:
+        (bytes now in the .part file, True if this was a resume)
+    """
+    resumed = attempt.status == 206
+    if resumed:
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        start = _content_range_start(attempt.header("Content-Range"))
+        if start != have:
+            raise DownloadError(f"Range answered from {start}, have {have} bytes")
+    length = attempt.header("Content-Length")
+    received = len(attempt.first)
+    with open(part_path, "ab" if resumed else "wb") as f:
+        f.write(attempt.first)
+        while True:
+            chunk = attempt.response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            received += len(chunk)
+    # read(amt) returns short rather than raising when the peer hangs up
+    if length is not None and length.isdigit() and received < int(length):
+        raise http.client.IncompleteRead(b"", int(length) - received)
+    return os.path.getsize(part_path), resumed
+
+
+def download_file(filename: str, urls: list[str], dest: str, cache: ValidatorCache,
+                  limiter: HostLimiter, rewrite: Optional[str] = None,
+                  revalidate: bool = True, timeout: float = DEFAULT_TIMEOUT) -> str:
+    """Bring one datasheet up to date.
+
+    Returns:
+        "downloaded", "resumed", "not modified", "kept" (existing file,
+        revalidation failed) or "skipped" (existing file, not revalidated).
+
+    Raises:
+        DownloadError: No mirror produced the file.
+    """
+    filepath = os.path.join(dest, filename)
+    part_path = filepath + ".part"
+    entry = cache.get(filename)
+
+    def log(message: str) -> None:
+        _log(filename, message)
+
+    attempt = None
+    if os.path.exists(filepath) and os.path.getsize(filepath) > MIN_PDF_SIZE:
+        if not revalidate:
+            return "skipped"
+        source = entry.get("url") if entry.get("url") in urls else urls[0]
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        headers["If-Modified-Since"] = entry.get("last_modified") or time.strftime(
+            "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(os.path.getmtime(filepath)))
+        try:
+            attempt = open_mirror(source, headers, limiter, rewrite, timeout)
+        except DownloadError as e:
+            log(f"KEEP: could not revalidate ({e})")
+            return "kept"
+        if attempt.status == 304:
+            attempt.close()
+            if not entry:
+                cache.update(filename, url=source, size=os.path.getsize(filepath))
+            return "not modified"
+        log(f"Changed upstream, re-downloading from {source}")
+
+    for _ in range(RESUME_ATTEMPTS):
+        if attempt is None:
+            attempt = race_mirrors(_mirror_candidates(urls, entry, part_path),
+                                   limiter, rewrite, timeout, log)
+        if attempt.status == 200:
+            # Remember where this .part comes from, so a later run can resume it
+            cache.update(filename, part={"url": attempt.source, **attempt.validators()})
+        try:
+            size, resumed = _stream(attempt, part_path)
+        except DownloadError as e:
+            log(f"WARN: {e}, restarting")
+            os.remove(part_path)
+            cache.update(filename, part=None)
+            entry = cache.get(filename)
+            continue
+        except (OSError, http.client.HTTPException) as e:
+            have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            log(f"WARN: interrupted at {have:,} bytes ({e or type(e).__name__}), resuming")
+            entry = cache.get(filename)
+            continue
+        finally:
+            attempt.close()
+            attempt = None
+
+        with open(part_path, "rb") as f:
+            magic = f.read(5)
+        if size < MIN_PDF_SIZE or not magic.startswith(b"%PDF"):
+            os.remove(part_path)
+            cache.update(filename, part=None)
+            raise DownloadError(f"Bad download ({size:,} bytes, starts with {magic!r})")
+        part = cache.get(filename).get("part", {})
+        os.replace(part_path, filepath)
+        cache.update(filename, url=part.get("url"), etag=part.get("etag"),
+                     last_modified=part.get("last_modified"), size=size, part=None)
+        log(f"OK: {size:,} bytes{' (resumed)' if resumed else ''}")
+        return "resumed" if resumed else "downloaded"
+
+    raise DownloadError(f"gave up after {RESUME_ATTEMPTS} attempts")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Download the C410X component datasheets.")
+    parser.add_argument("--dest", default=SCRIPT_DIR,
+                        help="Directory to download into (default: this script's directory)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Datasheets fetched at once (default: %(default)s)")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                        help="Connections per host (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Socket timeout in seconds (default: %(default)s)")
+    parser.add_argument("--only", action="append",
+                        help="Only datasheets whose filename contains this; repeatable")
+    parser.add_argument("--no-revalidate", action="store_true",
+                        help="Skip files that already exist without asking the server")
+    parser.add_argument("--rewrite", metavar="BASE_URL",
+                        help="Fetch BASE_URL/<host>/<path> instead of each URL (local testing)")
+    args = parser.parse_args()
+
     print("=" * 70)
     print("Dell C410X Component Datasheet Downloader")
     print("=" * 70)
     print()
 
+    entries = [e for e in DATASHEETS
+               if not args.only or any(o.lower() in e[0].lower() for o in args.only)]
+    os.makedirs(args.dest, exist_ok=True)
+    cache = ValidatorCache(os.path.join(args.dest, CACHE_FILE))
+    limiter = HostLimiter(args.per_host)
+
+    def fetch(entry):
+        filename, urls, description = entry
+        try:
+            return download_file(filename, urls, args.dest, cache, limiter, args.rewrite,
+                                 revalidate=not args.no_revalidate, timeout=args.timeout)
+        except DownloadError as e:
+            _log(filename, f"FAIL: {e}")
+            return e
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = list(pool.map(fetch, entries))
+
     succeeded = []
     failed = []
-
-    for filename, urls, description in DATASHEETS:
-        filepath = os.path.join(SCRIPT_DIR, filename)
-        print()
-        ok = download_file(urls, filepath, description)
-        if ok:
-            succeeded.append((filename, description))
-        else:
+    for (filename, urls, description), result in zip(entries, results):
+        if isinstance(result, DownloadError):
             failed.append((filename, urls, description))
-        # Be polite - small delay between downloads
-        time.sleep(0.5)
+        else:
+            succeeded.append((filename, description, result))
 
     print()
     print("=" * 70)
-    print(f"Results: {len(succeeded)} succeeded, {len(failed)} failed")
+    print(f"Results: {len(succeeded)} succeeded, {len(failed)} failed "
+          f"in {time.monotonic() - start:.1f}s")
     print("=" * 70)
 
     if succeeded:
-        print("\nSuccessfully downloaded:")
-        for filename, description in succeeded:
-            filepath = os.path.join(SCRIPT_DIR, filename)
+        print("\nUp to date:")
+        for filename, description, status in succeeded:
+            filepath = os.path.join(args.dest, filename)
             size = os.path.getsize(filepath)
-            print(f"  {filename} ({size:,} bytes)")
+            print(f"  {filename} ({size:,} bytes, {status})")
 
     if failed:
         print("\nFailed downloads:")
         for filename, urls, description in failed:
             print(f"  {filename}")
             print(f"    {description}")
-            if isinstance(urls, str):
-                urls = [urls]
             for url in urls:
                 print(f"    URL: {url}")
 
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""Full-text and register-table index over the datasheet PDFs.
+
+Every PDF in this directory is run through ``pdftotext -layout``
+(poppler-utils) once, in a process pool. Layout mode keeps table columns
+lined up, so register-map rows (an address column followed by a name and
+description) are picked out of the page text as well. Pages go into an
+SQLite FTS5 table, register rows into a plain table, both keyed by the
+SHA-256 of the PDF: a rebuild only extracts files whose hash is new, and
+drops rows for files that changed or disappeared.
+
+Usage:
+    python3 index_datasheets.py build [--jobs N]
+    python3 index_datasheets.py reg ADT7462 0x1D        # by address
+    python3 index_datasheets.py reg INA219 calibration  # by name
+    python3 index_datasheets.py search "fan pulses per revolution" [--chip ADT7462]
+    python3 index_datasheets.py stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(SCRIPT_DIR, "datasheets.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    sha256     TEXT PRIMARY KEY,
+    filename   TEXT NOT NULL,
+    chips      TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    pages      INTEGER NOT NULL,
+    registers  INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text, sha256 UNINDEXED, page UNINDEXED
+);
+CREATE TABLE IF NOT EXISTS registers (
+    sha256       TEXT NOT NULL,
+    page         INTEGER NOT NULL,
+    address      INTEGER NOT NULL,
+    address_end  INTEGER NOT NULL,
+    address_dec  INTEGER,
+    address_text TEXT NOT NULL,
+    name         TEXT NOT NULL,
+    row          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS registers_sha_addr ON registers (sha256, address);
+"""
+
+# A register-map row in -layout output: an address column, then at least
+# two spaces, then the rest of the row. Addresses appear as 0x1D, 1Dh,
+# 1D, or plain decimal (PCA9555 command bytes), optionally as a range
+# ("0x3D to 0x3F", "08h-0Bh"). A bare address needs a digit, or pin
+# tables ("ADD  Address select pin") read as registers 0xADD, 0xBAD...
+_ADDR = r"0x[0-9A-Fa-f]{1,4}|[0-9A-Fa-f]{1,4}h|(?=[A-Fa-f]{0,2}[0-9])[0-9A-Fa-f]{1,3}"
+_ROW_RE = re.compile(
+    rf"^\s{{0,16}}(?P<addr>{_ADDR})(?:\s*(?:to|-|–)\s*(?P<end>{_ADDR}))?\s{{2,}}(?P<rest>\S.*)$")
+_FIELD_SPLIT_RE = re.compile(r"\s{2,}")
+_ACCESS_RE = re.compile(r"^(?:R|W|RO|WO|RW|R/W|R/W1C|RC|Read|Write|Read/Write)$", re.IGNORECASE)
+_REGISTER_PAGE_RE = re.compile(r"register", re.IGNORECASE)
+_MAX_NAME = 60
+
+
+def chips_for(filename: str) -> list[str]:
+    """Part numbers a datasheet covers, from its filename.
+
+    >>> chips_for("AST2050_AST1100_Datasheet.pdf")
+    ['AST2050', 'AST1100']
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return [p for p in stem.split("_") if re.search(r"\d", p)] or [stem]
+
+
+def parse_address(text: str) -> tuple[int, Optional[int]]:
+    """(address read as hex, address read as decimal or None).
+
+    Bare digit strings are ambiguous - "10" is 0x10 in an ADT7462 table
+    but 10 in a PCA9555 command table - so both readings are kept.
+    """
+    if text.lower().startswith("0x"):
+        return int(text, 16), None
+    if text.lower().endswith("h"):
+        return int(text[:-1], 16), None
+    return int(text, 16), int(text) if text.isdigit() else None
+
+
+def parse_registers(page_text: str) -> list[tuple]:
+    """Pick register-map rows out of one page of -layout text.
+
+    Returns:
+        [(address text, end address text or None, register name, whole
+        row)] for rows on pages that mention registers at all.
+    """
+    if not _REGISTER_PAGE_RE.search(page_text):
+        return []
+    rows = []
+    for line in page_text.splitlines():
+        m = _ROW_RE.match(line)
+        if m is None or "...." in line:
+            continue
+        fields = [f for f in _FIELD_SPLIT_RE.split(m.group("rest").strip())
+                  if not _ACCESS_RE.match(f)]
+        name = next((f for f in fields if re.search(r"[A-Za-z]{2}", f)), None)
+        if name is None or len(name) > _MAX_NAME:
+            continue
+        address = m.group("addr")
+        # A bare 4-digit "address" is a year, a part number or a bit pattern
+        if len(address) > 3 and not address.lower().startswith("0x") and not address.endswith("h"):
+            continue
+        rows.append((address, m.group("end"), name, " ".join(line.split())))
+    return rows
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extract(path: str) -> tuple[list[str], list[tuple]]:
+    """Worker: text of every page, and the register rows found on them.
+
+    Returns:
+        (pages, [(page number, address text, end text, name, row)])
+    """
+    proc = subprocess.run(["pdftotext", "-layout", "-enc", "UTF-8", path, "-"],
+                          capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"pdftotext failed on {os.path.basename(path)}: "
+                           f"{proc.stderr.decode(errors='replace').strip()}")
+    pages = proc.stdout.decode("utf-8", errors="replace").split("\f")
+    if pages and not pages[-1].strip():
+        pages.pop()
+    registers = [(number, *row)
+                 for number, text in enumerate(pages, 1)
+                 for row in parse_registers(text)]
+    return pages, registers
+
+
+def open_db(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def build(db: sqlite3.Connection, directory: str, jobs: Optional[int] = None) -> dict:
+    """Bring the index up to date with the PDFs in ``directory``.
+
+    Returns:
+        Counts of "indexed", "failed", "unchanged" and "removed" files.
+    """
+    if shutil.which("pdftotext") is None:
+        raise RuntimeError("pdftotext not found (install poppler-utils)")
+
+    on_disk = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.pdf"))):
+        on_disk[sha256_file(path)] = path
+    known = {sha: filename for sha, filename in db.execute("SELECT sha256, filename FROM files")}
+
+    removed = [sha for sha in known if sha not in on_disk]
+    for sha in removed:
+        print(f"[index] Dropping {known[sha]}")
+        for table in ("files", "pages", "registers"):
+            db.execute(f"DELETE FROM {table} WHERE sha256 = ?", (sha,))
+    for sha, path in on_disk.items():
+        # Same content under a new name: no need to extract again
+        if sha in known and known[sha] != os.path.basename(path):
+            db.execute("UPDATE files SET filename = ?, chips = ? WHERE sha256 = ?",
+                       (os.path.basename(path), " ".join(chips_for(path)), sha))
+    db.commit()
+
+    todo = {sha: path for sha, path in on_disk.items() if sha not in known}
+    if todo:
+        print(f"[index] Extracting {len(todo)} PDF(s)...")
+    start = time.monotonic()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {sha: pool.submit(extract, path) for sha, path in todo.items()}
+        for sha, future in futures.items():
+            path = todo[sha]
+            try:
+                pages, registers = future.result()
+            except RuntimeError as e:
+                # Left out of the index, so the next build tries it again
+                print(f"[index]   WARN: {e}")
+                failed += 1
+                continue
+            db.executemany("INSERT INTO pages (text, sha256, page) VALUES (?, ?, ?)",
+                           [(text, sha, n) for n, text in enumerate(pages, 1)])
+            db.executemany(
+                "INSERT INTO registers (sha256, page, address, address_end, address_dec, "
+                "address_text, name, row) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(sha, page, parse_address(addr)[0],
+                  parse_address(end)[0] if end else parse_address(addr)[0],
+                  None if end else parse_address(addr)[1],
+                  f"{addr}-{end}" if end else addr, name, row)
+                 for page, addr, end, name, row in registers])
+            db.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (sha, os.path.basename(path), " ".join(chips_for(path)),
+                        os.path.getsize(path), len(pages), len(registers), time.time()))
+            db.commit()
+            print(f"[index]   {os.path.basename(path)}: {len(pages)} pages, "
+                  f"{len(registers)} register rows")
+    if todo:
+        print(f"[index] Extracted in {time.monotonic() - start:.1f}s")
+    return {"indexed": len(todo) - failed, "failed": failed, "unchanged": len(on_disk) - len(todo), "removed": len(removed)}
+
+
+def _chip_files(db: sqlite3.Connection, chip: Optional[str]) -> dict[str, str]:
+    """{sha256: filename} of the datasheets covering ``chip`` (all if None)."""
+    rows = db.execute("SELECT sha256, filename, chips FROM files").fetchall()
+    if chip is None:
+        return {sha: filename for sha, filename, _ in rows}
+    chip = chip.upper()
+    return {sha: filename for sha, filename, chips in rows
+            if any(c.upper().startswith(chip) or chip.startswith(c.upper())
+                   for c in chips.split())}
+
+
+def _in(shas) -> str:
+    return ",".join("?" * len(shas))
+
+
+def lookup_register(db: sqlite3.Connection, chip: str, register: str) -> list[tuple]:
+    """Register rows for ``chip`` matching an address (0x1D, 1Dh, 29) or a name.
+
+    Returns:
+        [(filename, page, address text, name, row)]
+    """
+    files = _chip_files(db, chip)
+    if not files:
+        return []
+    shas = list(files)
+    m = re.fullmatch(r"0x([0-9A-Fa-f]+)|([0-9A-Fa-f]+)h|(\d+)", register.strip())
+    if m:
+        if m.group(3) is not None:
+            value = int(m.group(3))
+            where, params = ("(address_dec = ? OR (address_dec IS NULL AND "
+                             "? BETWEEN address AND address_end))", [value, value])
+        else:
+            value = int(m.group(1) or m.group(2), 16)
+            where, params = "? BETWEEN address AND address_end", [value]
+    else:
+        where, params = "(name LIKE ? OR row LIKE ?)", [f"%{register}%"] * 2
+    rows = db.execute(
+        f"SELECT sha256, page, address_text, name, row FROM registers "
+        f"WHERE sha256 IN ({_in(shas)}) AND {where} ORDER BY sha256, page, rowid",
+        shas + params).fetchall()
+    return [(files[sha], page, addr, name, row) for sha, page, addr, name, row in rows]
+
+
+def search(db: sqlite3.Connection, query: str, chip: Optional[str] = None,
+           limit: int = 20) -> list[tuple]:
+    """Full-text search over the pages.
+
+    Returns:
+        [(filename, page, snippet)] best match first.
+    """
+    files = _chip_files(db, chip)
+    if not files:
+        return []
+    shas = list(files)
+    rows = db.execute(
+        f"SELECT sha256, page, snippet(pages, 0, '[', ']', ' ... ', 12) FROM pages "
+        f"WHERE pages MATCH ? AND sha256 IN ({_in(shas)}) ORDER BY rank LIMIT ?",
+        [query] + shas + [limit]).fetchall()
+    return [(files[sha], page, " ".join(snippet.split())) for sha, page, snippet in rows]
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Index and query the datasheet PDFs.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Index file (default: %(default)s)")
+    parser.add_argument("--dir", default=SCRIPT_DIR, help="PDF directory (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="Extract new or changed PDFs into the index")
+    p.add_argument("--jobs", type=int, help="Extraction processes (default: CPU count)")
+    p = sub.add_parser("reg", help="Look up a register by address or name")
+    p.add_argument("chip", help="Part number, e.g. ADT7462 or PCA9555")
+    p.add_argument("register", help="Address (0x1D, 1Dh, 29) or name substring")
+    p = sub.add_parser("search", help="Full-text search (FTS5 query syntax)")
+    p.add_argument("query")
+    p.add_argument("--chip", help="Only this part's datasheets")
+    p.add_argument("--limit", type=int, default=20)
+    sub.add_parser("stats", help="List the indexed datasheets")
+    args = parser.parse_args()
+
+    db = open_db(args.db)
+    if args.command == "build":
+        try:
+            counts = build(db, args.dir, args.jobs)
+        except RuntimeError as e:
+            print(f"[index] ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"[index] {counts['indexed']} indexed, {counts['failed']} failed, "
+              f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+        if counts["failed"]:
+            sys.exit(1)
+
+    elif args.command == "reg":
+        rows = lookup_register(db, args.chip, args.register)
+        for filename, page, addr, name, row in rows:
+            print(f"{filename} p{page:<4d} {addr:>8s}  {name}")
+            print(f"    {row}")
+        if not rows:
+            # Not in a parsed table: fall back to the pages mentioning it
+            print(f"No register rows for {args.chip} {args.register}; pages mentioning it:")
+            for filename, page, snippet in search(db, _fts_phrase(args.register), args.chip, 5):
+                print(f"{filename} p{page:<4d} {snippet}")
+
+    elif args.command == "search":
+        try:
+            results = search(db, args.query, args.chip, args.limit)
+        except sqlite3.OperationalError as e:
+            print(f"[index] Bad query: {e}", file=sys.stderr)
+            sys.exit(1)
+        for filename, page, snippet in results:
+            print(f"{filename} p{page:<4d} {snippet}")
+
+    else:
+        for filename, chips, size, pages, registers in db.execute(
+                "SELECT filename, chips, size, pages, registers FROM files ORDER BY filename"):
+            print(f"{filename:36s} {chips:18s} {size:>10,d} B {pages:>5d} pages "
+                  f"{registers:>5d} register rows")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""Parse a device tree (DTS source or DTB blob) into an indexed node tree.
+
+The parser understands the subset of DTS used by board files such as
+aspeed-bmc-dell-c410x.dts: nodes, labels, properties (strings, cell
+lists, byte strings), /delete-node/, and top-level &label { ... }
+overrides. Preprocessor lines (#include, #define) are recorded but not
+expanded, so references into aspeed-g4.dtsi (&i2c0, &gpio, ...) become
+top-level placeholder nodes carrying the referenced label. Macro cells
+such as ASPEED_GPIO(E, 5) are kept as raw strings.
+
+The resulting DeviceTree is indexed by path, label, compatible string
+and (I2C bus, mux path, reg address), which is what cross_check_dts.py
+joins against the decoded IO tables.
+
+Usage:
+    python3 dts_tree.py [aspeed-bmc-dell-c410x.dts | board.dtb]
+"""
+
+import os
+import re
+import struct
+import sys
+
+DTS_FILE = "aspeed-bmc-dell-c410x.dts"
+
+FDT_MAGIC = 0xD00DFEED
+FDT_BEGIN_NODE = 1
+FDT_END_NODE = 2
+FDT_PROP = 3
+FDT_NOP = 4
+FDT_END = 9
+
+# I2C bus controller labels (aspeed-g4.dtsi) and mux compatibles
+I2C_BUS_LABEL_RE = re.compile(r'^i2c(\d+)$')
+I2C_MUX_COMPATIBLES = ("nxp,pca9544", "nxp,pca9545", "nxp,pca9546", "nxp,pca9548")
+# dtc only accepts C identifiers as labels; we parse a wider set and warn
+VALID_LABEL_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<pp>\#(?:include|define|undef|if|ifdef|ifndef|else|endif)\b[^\n]*)
+  | (?P<directive>/[a-z][a-z0-9-]*/)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<cells><[^>]*>)
+  | (?P<bytes>\[[^\]]*\])
+  | (?P<ref>&\{[^}]*\}|&[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<label>[A-Za-z_][A-Za-z0-9_\-]*:)
+  | (?P<punct>[{};=,])
+  | (?P<word>[A-Za-z0-9_,.+\-@#?/]+)
+''', re.VERBOSE | re.DOTALL)
+
+
+class DTSyntaxError(ValueError):
+    pass
+
+
+class Macro(str):
+    """An unexpanded preprocessor macro used as a property value."""
+
+
+class Node:
+    """One device tree node."""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.labels = []
+        self.props = {}
+        self.children = {}
+
+    @property
+    def path(self):
+        if self.parent is None:
+            return "/" if self.name == "/" else self.name
+        parent = self.parent.path
+        return f"{parent.rstrip('/')}/{self.name}"
+
+    @property
+    def unit_address(self):
+        return self.name.split('@', 1)[1] if '@' in self.name else None
+
+    def child(self, name):
+        """Return the named child, creating it if needed."""
+        if name not in self.children:
+            self.children[name] = Node(name, self)
+        return self.children[name]
+
+    def walk(self):
+        yield self
+        for child in self.children.values():
+            yield from child.walk()
+
+    def strings(self, prop):
+        """Property value as a list of strings (DTS strings or DTB NUL list)."""
+        value = self.props.get(prop)
+        if value is None:
+            return []
+        if isinstance(value, bytes):
+            return [s.decode('ascii', errors='replace') for s in value.split(b'\x00')[:-1]]
+        return [v for v in value if isinstance(v, str) and not isinstance(v, Macro)]
+
+    def cells(self, prop):
+        """Property value as a flat list of cells (ints, or raw macro strings)."""
+        value = self.props.get(prop)
+        if value is None:
+            return []
+        if isinstance(value, bytes):
+            return list(struct.unpack(f'>{len(value) // 4}I', value[:len(value) // 4 * 4]))
+        cells = []
+        for v in value:
+            if isinstance(v, list):
+                cells.extend(v)
+        return cells
+
+    def reg(self):
+        """First cell of the reg property as an int, or None."""
+        cells = self.cells("reg")
+        if cells and isinstance(cells[0], int):
+            return cells[0]
+        return None
+
+    @property
+    def compatible(self):
+        return self.strings("compatible")
+
+    def __repr__(self):
+        return f"<Node {self.path}>"
+
+
+# ---------------------------------------------------------------------------
+# DTS source parser
+# ---------------------------------------------------------------------------
+
+def _parse_int(token):
+    try:
+        return int(token, 0)
+    except ValueError:
+        return None
+
+
+def _split_cells(body):
+    """Split the inside of <...> at top-level whitespace (macro-aware)."""
+    cells, depth, current = [], 0, ""
+    for ch in body:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch.isspace() and depth == 0:
+            if current:
+                cells.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        cells.append(current)
+    return [v if (v := _parse_int(c)) is not None else c for c in cells]
+
+
+def _tokenize(text):
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind in ('ws', 'comment'):
+            continue
+        yield kind, m.group()
+
+
+class DeviceTree:
+    """An indexed device tree."""
+
+    def __init__(self, root, includes=(), source=None, warnings=()):
+        self.root = root
+        self.includes = list(includes)
+        self.source = source
+        self.warnings = list(warnings)
+        self.reindex()
+
+    def reindex(self):
+        self.by_path = {}
+        self.by_label = {}
+        self.by_compatible = {}
+        self.by_bus_reg = {}
+        for node in self.root.walk():
+            self.by_path[node.path] = node
+            for label in node.labels:
+                self.by_label[label] = node
+            for compat in node.compatible:
+                self.by_compatible.setdefault(compat, []).append(node)
+        for bus, mux_path, reg, node in self.i2c_devices():
+            self.by_bus_reg.setdefault((bus, reg), []).append((mux_path, node))
+
+    def i2c_buses(self):
+        """Yield (bus_number, node) for every I2C controller node (label i2cN)."""
+        for label, node in sorted(self.by_label.items()):
+            m = I2C_BUS_LABEL_RE.match(label)
+            if m:
+                yield int(m.group(1)), node
+
+    def i2c_devices(self):
+        """Yield (bus_number, mux_path, reg, node) for every I2C client.
+
+        mux_path is a tuple of (mux_reg, channel) pairs from the bus
+        controller down to the device; muxes themselves are yielded too.
+        """
+        for bus, bus_node in self.i2c_buses():
+            yield from self._i2c_children(bus, bus_node, ())
+
+    def _i2c_children(self, bus, parent, mux_path):
+        for child in parent.children.values():
+            reg = child.reg()
+            if reg is None:
+                continue
+            yield bus, mux_path, reg, child
+            if any(c in I2C_MUX_COMPATIBLES for c in child.compatible):
+                for channel_node in child.children.values():
+                    channel = channel_node.reg()
+                    if channel is not None:
+                        yield from self._i2c_children(
+                            bus, channel_node, mux_path + ((reg, channel),))
+
+
+def parse_dts(text, source=None):
+    """Parse DTS source text into a DeviceTree."""
+    root = Node("/")
+    includes = []
+    warnings = []
+    refs = {}           # label -> Node (for &label overrides)
+    stack = []          # open nodes
+    pending_labels = []
+    tokens = list(_tokenize(text))
+    i = 0
+
+    def expect(kind, value=None):
+        nonlocal i
+        if i >= len(tokens):
+            raise DTSyntaxError(f"unexpected end of input, expected {value or kind}")
+        k, v = tokens[i]
+        if k != kind or (value is not None and v != value):
+            raise DTSyntaxError(f"expected {value or kind}, got {v!r}")
+        i += 1
+        return v
+
+    def resolve(ref):
+        label = ref[2:-1] if ref.startswith('&{') else ref[1:]
+        if ref.startswith('&{'):
+            node = root
+            for part in label.strip('/').split('/'):
+                node = node.child(part)
+            return node
+        if label not in refs:
+            # Defined in an include we do not expand: make a placeholder
+            placeholder = root.child(f"&{label}")
+            placeholder.labels.append(label)
+            refs[label] = placeholder
+        return refs[label]
+
+    while i < len(tokens):
+        kind, value = tokens[i]
+
+        if kind == 'pp':
+            m = re.match(r'#include\s+[<"]([^>"]+)[>"]', value)
+            if m:
+                includes.append(m.group(1))
+            i += 1
+            continue
+
+        if kind == 'directive':
+            i += 1
+            if value == '/delete-node/':
+                k, target = tokens[i]
+                i += 1
+                expect('punct', ';')
+                if k == 'ref':
+                    node = resolve(target)
+                    if node.parent is not None:
+                        node.parent.children.pop(node.name, None)
+                elif stack:
+                    stack[-1].children.pop(target, None)
+            elif value == '/delete-property/':
+                k, target = tokens[i]
+                i += 1
+                expect('punct', ';')
+                if stack:
+                    stack[-1].props.pop(target, None)
+            elif value in ('/dts-v1/', '/plugin/', '/memreserve/'):
+                while i < len(tokens) and tokens[i] != ('punct', ';'):
+                    i += 1
+                i += 1
+            continue
+
+        if kind == 'label':
+            if not VALID_LABEL_RE.match(value[:-1]):
+                warnings.append(f"label {value[:-1]!r} is not a valid dtc label")
+            pending_labels.append(value[:-1])
+            i += 1
+            continue
+
+        if kind == 'punct' and value == '}':
+            stack.pop()
+            i += 1
+            expect('punct', ';')
+            continue
+
+        if kind == 'ref' and not stack:
+            node = resolve(value)
+            i += 1
+            node.labels.extend(l for l in pending_labels if l not in node.labels)
+            for label in pending_labels:
+                refs[label] = node
+            pending_labels = []
+            expect('punct', '{')
+            stack.append(node)
+            continue
+
+        if kind == 'word':
+            name = value
+            i += 1
+            nk, nv = tokens[i] if i < len(tokens) else (None, None)
+            if nk == 'punct' and nv == '{':
+                i += 1
+                if name == '/' and not stack:
+                    node = root
+                elif not stack:
+                    raise DTSyntaxError(f"node {name!r} outside of a parent")
+                else:
+                    node = stack[-1].child(name)
+                for label in pending_labels:
+                    if label not in node.labels:
+                        node.labels.append(label)
+                    refs[label] = node
+                pending_labels = []
+                stack.append(node)
+                continue
+            if not stack:
+                raise DTSyntaxError(f"property {name!r} outside of a node")
+            pending_labels = []
+            if nk == 'punct' and nv == ';':
+                stack[-1].props[name] = []
+                i += 1
+                continue
+            expect('punct', '=')
+            parts = []
+            while True:
+                vk, vv = tokens[i]
+                i += 1
+                if vk == 'string':
+                    parts.append(vv[1:-1].encode().decode('unicode_escape'))
+                elif vk == 'cells':
+                    parts.append(_split_cells(vv[1:-1]))
+                elif vk == 'bytes':
+                    parts.append(bytes.fromhex(vv[1:-1].replace(' ', '')))
+                elif vk == 'ref':
+                    parts.append(vv)
+                elif vk == 'word':
+                    parts.append(Macro(vv))
+                elif vk == 'label':
+                    continue
+                else:
+                    raise DTSyntaxError(f"bad value for {name!r}: {vv!r}")
+                sep = expect('punct')
+                if sep == ';':
+                    break
+                if sep != ',':
+                    raise DTSyntaxError(f"expected ',' or ';' after {name!r}")
+            stack[-1].props[name] = parts
+            continue
+
+        raise DTSyntaxError(f"unexpected token {value!r}")
+
+    if stack:
+        raise DTSyntaxError(f"unterminated node {stack[-1].path}")
+    return DeviceTree(root, includes, source, warnings)
+
+
+# ---------------------------------------------------------------------------
+# DTB (flattened device tree) parser
+# ---------------------------------------------------------------------------
+
+def parse_dtb(blob, source=None):
+    """Parse a flattened device tree blob into a DeviceTree."""
+    magic, totalsize, off_struct, off_strings = struct.unpack_from('>IIII', blob, 0)
+    if magic != FDT_MAGIC:
+        raise DTSyntaxError("not a DTB (bad magic)")
+
+    def get_string(off):
+        end = blob.index(b'\x00', off_strings + off)
+        return blob[off_strings + off:end].decode('ascii')
+
+    root = None
+    stack = []
+    pos = off_struct
+    while True:
+        token = struct.unpack_from('>I', blob, pos)[0]
+        pos += 4
+        if token == FDT_BEGIN_NODE:
+            end = blob.index(b'\x00', pos)
+            name = blob[pos:end].decode('ascii') or "/"
+            pos = (end + 4) & ~3
+            if stack:
+                node = stack[-1].child(name)
+            else:
+                node = root = Node("/")
+            stack.append(node)
+        elif token == FDT_END_NODE:
+            stack.pop()
+        elif token == FDT_PROP:
+            length, nameoff = struct.unpack_from('>II', blob, pos)
+            pos += 8
+            stack[-1].props[get_string(nameoff)] = blob[pos:pos + length]
+            pos = (pos + length + 3) & ~3
+        elif token == FDT_NOP:
+            continue
+        elif token == FDT_END:
+            break
+        else:
+            raise DTSyntaxError(f"bad FDT token 0x{token:X} at 0x{pos - 4:X}")
+
+    # Recover labels from __symbols__ (dtc -@)
+    symbols = root.children.get("__symbols__")
+    if symbols is not None:
+        by_path = {n.path: n for n in root.walk()}
+        for label, value in symbols.props.items():
+            target = by_path.get(value.rstrip(b'\x00').decode('ascii'))
+            if target is not None:
+                target.labels.append(label)
+    return DeviceTree(root, source=source)
+
+
+def load_device_tree(path):
+    """Load a .dts or .dtb file, choosing the parser by content."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] == struct.pack('>I', FDT_MAGIC):
+        return parse_dtb(data, source=path)
+    return parse_dts(data.decode('utf-8'), source=path)
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    path = sys.argv[1] if len(sys.argv) > 1 else DTS_FILE
+    tree = load_device_tree(path)
+
+    print(f"{path}: {len(tree.by_path)} nodes, {len(tree.by_label)} labels")
+    if tree.includes:
+        print(f"  Includes (not expanded): {', '.join(tree.includes)}")
+    for warning in tree.warnings:
+        print(f"  WARNING: {warning}")
+    print("\n  Compatible strings:")
+    for compat, nodes in sorted(tree.by_compatible.items()):
+        print(f"    {compat:24s} {len(nodes):3d} node(s)")
+    print("\n  I2C devices:")
+    for bus, mux_path, reg, node in tree.i2c_devices():
+        via = "".join(f" -> mux@{m:02x}.{ch}" for m, ch in mux_path)
+        compat = node.compatible[0] if node.compatible else "?"
+        print(f"    i2c{bus}{via} @0x{reg:02X}: {compat:20s} {node.path}")
+
+
+if __name__ == '__main__':
+    main()
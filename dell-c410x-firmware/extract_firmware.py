@@ -32,6 +32,7 @@ TARGET_FILES = [
     "etc/default/ipmi/evb/ID_devid.bin",
     "etc/default/ipmi/evb/FI_fwid.bin",
     "etc/default/ipmi/evb/bmcsetting",
+    "sbin/fullfw",  # IOAPI/IOSAPI driver vtables (see iosapi_catalogue.py)
 ]
 
 
@@ -146,6 +147,7 @@ def main():
             break
 
     print("\nDone! Binary files are in extracted/rootfs/etc/default/ipmi/evb/")
+    print("Run iosapi_catalogue.py to catalogue the fullfw driver vtables.")
 
 
 if __name__ == '__main__':
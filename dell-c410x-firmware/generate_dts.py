@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""Generate the board DTS from the decoded IO/IS tables.
+
+Emits one fragment per I2C bus (INA219, ADT7462, TMP100 and PCA9555
+nodes, with the PCA9548/PCA9544 mux trees they sit behind) plus an
+&gpio fragment with the on-chip GPIO line names. Human-readable names
+(line names, node labels) are borrowed from the hand-maintained
+aspeed-bmc-dell-c410x.dts when it has them.
+
+Each fragment records the table regions (file, offset, length) it was
+built from. The rendered text is cached in extracted/dts_fragments.json
+keyed by a hash of those bytes, so regenerating after a table change
+only re-renders the fragments that actually read the changed entries.
+
+The hand-maintained DTS is never overwritten; output goes to --output.
+
+Usage:
+    python3 generate_dts.py [--output FILE] [--force] [--names-from DTS]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from cross_check_dts import CHIP_COMPATIBLES, FW_BUS_BASE, TMP100_MUX_ADDRESSES
+from dts_tree import load_device_tree
+from iosapi_catalogue import load_catalogue
+from parse_io_tables import (IO_TYPE_GPIO, IO_TYPE_PCA9544, IO_ENTRY_SIZE,
+                             IS_ENTRY_SIZE, PCA9544_ADDRESS, decode_io_fl,
+                             decode_is_fl, i2c_address_7bit, onchip_gpio_pins,
+                             pca9555_location)
+
+BASE = "extracted/rootfs/etc/default/ipmi/evb"
+DTS_FILE = "aspeed-bmc-dell-c410x.dts"
+OUTPUT = "extracted/aspeed-bmc-dell-c410x.generated.dts"
+FRAGMENT_CACHE = "extracted/dts_fragments.json"
+TABLES = ("IS_fl.bin", "IO_fl.bin")
+
+# Bump when the rendering changes so cached fragments are discarded
+GENERATOR_VERSION = 1
+
+# On-chip GPIO ports A..N are emitted in gpio-line-names order
+GPIO_PORTS = "ABCDEFGHIJKLMN"
+
+HEADER = """\
+// SPDX-License-Identifier: GPL-2.0-or-later
+//
+// Device Tree Source for Dell PowerEdge C410X BMC
+//
+// GENERATED by generate_dts.py from IS_fl.bin / IO_fl.bin -- do not edit.
+// Compare against the hand-maintained aspeed-bmc-dell-c410x.dts with
+// cross_check_dts.py --validate --dts <this file>.
+
+/dts-v1/;
+
+#include "aspeed-g4.dtsi"
+#include <dt-bindings/gpio/aspeed-gpio.h>
+
+/ {
+\tmodel = "Dell PowerEdge C410X BMC";
+\tcompatible = "dell,poweredge-c410x-bmc", "aspeed,ast2400";
+};
+"""
+
+
+def read_tables():
+    tables = {}
+    for name in TABLES:
+        with open(os.path.join(BASE, name), 'rb') as f:
+            tables[name] = f.read()
+    return tables
+
+
+def reference_names(path):
+    """Pull line names and node labels from a DTS, keyed by location."""
+    names = {"gpio": [], "pca9555": {}, "labels": {}}
+    if not path or not os.path.exists(path):
+        return names
+    tree = load_device_tree(path)
+    gpio = tree.by_label.get("gpio")
+    if gpio is not None:
+        names["gpio"] = gpio.strings("gpio-line-names")
+    for bus, mux_path, reg, node in tree.i2c_devices():
+        key = f"{bus}/{','.join(f'{m:x}.{c}' for m, c in mux_path)}/{reg:x}"
+        if node.strings("label"):
+            names["labels"][key] = node.strings("label")[0]
+        if "nxp,pca9555" in node.compatible:
+            names["pca9555"][key] = node.strings("gpio-line-names")
+    return names
+
+
+# ---------------------------------------------------------------------------
+# Fragment planning: which table regions feed which fragment
+# ---------------------------------------------------------------------------
+
+def _sensor_region(sensor):
+    return ("IS_fl.bin", sensor["offset"], IS_ENTRY_SIZE)
+
+
+def _io_region(entry):
+    return ("IO_fl.bin", entry["offset"], IO_ENTRY_SIZE)
+
+
+def plan_fragments(tables, drivers):
+    """Group decoded table entries into fragments.
+
+    Returns {fragment name: {"regions": [...], "devices" or "pins": ...}}
+    where regions are (table, offset, length) or ("driver", ptr, chip).
+    """
+    sensors = decode_is_fl(tables["IS_fl.bin"])
+    io_types = decode_io_fl(tables["IO_fl.bin"])
+    fragments = {}
+
+    def bus_fragment(bus):
+        return fragments.setdefault(f"&i2c{bus}", {"regions": [], "devices": {}})
+
+    for s in sensors:
+        driver = drivers.get(s["iosapi"])
+        if driver is None or s["bus"] < FW_BUS_BASE:
+            continue
+        chip = (driver.get("chip") or "").upper()
+        if chip not in CHIP_COMPATIBLES:
+            continue
+        bus = s["bus"] - FW_BUS_BASE
+        frag = bus_fragment(bus)
+        frag["regions"].append(_sensor_region(s))
+        # Drivers are part of the input too: a different catalogue entry
+        # for the same pointer must re-render the fragment
+        frag["regions"].append(("driver", s["iosapi"], chip))
+        if chip == "TMP100":
+            mux_index = s["reg_mux"] >> 4
+            if mux_index >= len(TMP100_MUX_ADDRESSES):
+                continue
+            mux = ("PCA9548", TMP100_MUX_ADDRESSES[mux_index], s["reg_mux"] & 0x07)
+        elif chip == "ADT7462":
+            mux = ("PCA9544", PCA9544_ADDRESS, None)
+        else:
+            mux = None
+        key = (mux, i2c_address_7bit(s["dev_addr"]))
+        frag["devices"].setdefault(key, {"chip": chip, "sensors": []})
+        frag["devices"][key]["sensors"].append(s["sensor"])
+
+    for entry in io_types.get(IO_TYPE_PCA9544, []):
+        for frag in fragments.values():
+            if any(mux and mux[0] == "PCA9544" for mux, _ in frag["devices"]):
+                frag["regions"].append(_io_region(entry))
+
+    gpio = {"regions": [], "pins": {}}
+    for entry in io_types.get(IO_TYPE_GPIO, []):
+        location = pca9555_location(entry)
+        if location is not None:
+            if location[0] < FW_BUS_BASE:
+                continue
+            frag = bus_fragment(location[0] - FW_BUS_BASE)
+            frag["regions"].append(_io_region(entry))
+            key = (None, location[1])
+            frag["devices"].setdefault(key, {"chip": "PCA9555", "sensors": [], "pins": 0})
+            frag["devices"][key]["pins"] += 1
+            continue
+        pins = onchip_gpio_pins(entry)
+        if pins:
+            gpio["regions"].append(_io_region(entry))
+            for pin in pins:
+                gpio["pins"].setdefault(pin, entry["index"])
+    if gpio["pins"]:
+        fragments["&gpio"] = gpio
+
+    return fragments
+
+
+def fragment_key(tables, fragment, names):
+    """Hash the bytes of every region (and names) a fragment depends on."""
+    h = hashlib.sha256(f"v{GENERATOR_VERSION}".encode())
+    for region in fragment["regions"]:
+        if region[0] in tables:
+            name, offset, length = region
+            h.update(f"{name}:{offset}:{length}".encode())
+            h.update(tables[name][offset:offset + length])
+        else:
+            h.update(repr(region).encode())
+    h.update(json.dumps(names, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def fragment_names(fragment_name, names):
+    """The subset of reference names a fragment renders with."""
+    if fragment_name == "&gpio":
+        return names["gpio"]
+    bus = fragment_name[len("&i2c"):]
+    return {kind: {k: v for k, v in names[kind].items() if k.split("/")[0] == bus}
+            for kind in ("pca9555", "labels")}
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _node_name(chip):
+    return {"INA219": "ina219", "ADT7462": "adt7462", "PCA9555": "gpio",
+            "TMP100": "temperature-sensor", "LM75": "temperature-sensor"}.get(chip, chip.lower())
+
+
+def _render_device(chip, addr, dev, names, ref_key, indent):
+    t = "\t" * indent
+    lines = [f"{t}{_node_name(chip)}@{addr:x} {{"]
+    lines.append(f'{t}\tcompatible = "{CHIP_COMPATIBLES[chip][0]}";')
+    lines.append(f"{t}\treg = <0x{addr:02x}>;")
+    label = names["labels"].get(ref_key)
+    if label:
+        lines.append(f'{t}\tlabel = "{label}";')
+    if chip == "PCA9555":
+        lines.append(f"{t}\tgpio-controller;")
+        lines.append(f"{t}\t#gpio-cells = <2>;")
+        line_names = names["pca9555"].get(ref_key)
+        if line_names:
+            lines.append(f"{t}\tgpio-line-names =")
+            body = ", ".join(f'"{n}"' for n in line_names)
+            lines.append(f"{t}\t\t{body};")
+        lines.append(f"{t}\t/* {dev['pins']} pins used by IO_fl.bin type 14 */")
+    if dev["sensors"]:
+        sensors = ", ".join(f"0x{n:02X}" for n in sorted(set(dev["sensors"])))
+        lines.append(f"{t}\t/* IS_fl.bin sensors {sensors} */")
+    lines.append(f"{t}}};")
+    return lines
+
+
+def _render_mux(chip, mux_addr, channels, bus, names):
+    lines = [f"\ti2c-mux@{mux_addr:x} {{",
+             f'\t\tcompatible = "{CHIP_COMPATIBLES[chip][0]}";',
+             "\t\t#address-cells = <1>;",
+             "\t\t#size-cells = <0>;",
+             f"\t\treg = <0x{mux_addr:02x}>;"]
+    for channel, devices in sorted(channels.items()):
+        lines += ["",
+                  f"\t\ti2c@{channel} {{",
+                  "\t\t\t#address-cells = <1>;",
+                  "\t\t\t#size-cells = <0>;",
+                  f"\t\t\treg = <{channel}>;"]
+        for addr, dev in sorted(devices.items()):
+            ref_key = f"{bus}/{mux_addr:x}.{channel}/{addr:x}"
+            lines += [""] + _render_device(dev["chip"], addr, dev, names, ref_key, 3)
+        lines.append("\t\t};")
+    lines.append("\t};")
+    return lines
+
+
+def render_bus(bus, fragment, names):
+    direct, muxes = {}, {}
+    for (mux, addr), dev in fragment["devices"].items():
+        if mux is None:
+            direct[addr] = dev
+        else:
+            chip, mux_addr, channel = mux
+            muxes.setdefault((chip, mux_addr), {}).setdefault(channel, {})[addr] = dev
+
+    lines = [f"&i2c{bus} {{", '\tstatus = "okay";']
+    for addr, dev in sorted(direct.items()):
+        lines += [""] + _render_device(dev["chip"], addr, dev, names, f"{bus}//{addr:x}", 1)
+    for (chip, mux_addr), channels in sorted(muxes.items()):
+        if None in channels:
+            # The tables do not record which PCA9544 channel each ADT7462
+            # is on; assign channels in address order
+            devices = channels.pop(None)
+            for channel, addr in enumerate(sorted(devices)):
+                channels.setdefault(channel, {})[addr] = devices[addr]
+        lines += [""] + _render_mux(chip, mux_addr, channels, bus, names)
+    lines.append("};")
+    return "\n".join(lines) + "\n"
+
+
+def render_gpio(fragment, names):
+    used = fragment["pins"]
+    last_port = max(GPIO_PORTS.index(pin[0]) for pin in used)
+    lines = ["&gpio {", "\tgpio-line-names ="]
+    values = []
+    for p in range(last_port + 1):
+        letter = GPIO_PORTS[p]
+        for bit in range(8):
+            index = p * 8 + bit
+            pin = f"{letter}{bit}"
+            if pin not in used:
+                name = ""
+            elif index < len(names) and names[index]:
+                name = names[index]
+            else:
+                name = f"io-{used[pin]}"
+            values.append(f'\t\t/* {pin:>3s} */ "{name}"')
+    lines.append(",\n".join(values) + ";")
+    lines.append("};")
+    return "\n".join(lines) + "\n"
+
+
+def render_fragment(name, fragment, names):
+    if name == "&gpio":
+        return render_gpio(fragment, names)
+    return render_bus(int(name[len("&i2c"):]), fragment, names)
+
+
+def _fragment_order(name):
+    return (name == "&gpio", int(name[4:]) if name.startswith("&i2c") else 0)
+
+
+def generate(tables, drivers, names, cache_path=FRAGMENT_CACHE, force=False):
+    """Render the DTS, reusing cached fragments whose inputs are unchanged.
+
+    Returns (dts text, {fragment name: "cached" | "rendered"}).
+    """
+    cache = {}
+    if not force and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f).get("fragments", {})
+
+    fragments = plan_fragments(tables, drivers)
+    status, out_cache, parts = {}, {}, [HEADER]
+    for name in sorted(fragments, key=_fragment_order):
+        frag_names = fragment_names(name, names)
+        key = fragment_key(tables, fragments[name], frag_names)
+        cached = cache.get(name)
+        if cached and cached["key"] == key:
+            text = cached["text"]
+            status[name] = "cached"
+        else:
+            text = render_fragment(name, fragments[name], frag_names)
+            status[name] = "rendered"
+        out_cache[name] = {"key": key, "text": text}
+        parts.append(text)
+
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump({"version": GENERATOR_VERSION, "fragments": out_cache}, f, indent=1)
+    return "\n".join(parts), status
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Generate the C410X DTS from the IO tables")
+    parser.add_argument("--output", default=OUTPUT,
+                        help=f"where to write the generated DTS (default: {OUTPUT})")
+    parser.add_argument("--names-from", default=DTS_FILE,
+                        help="DTS to borrow line names and labels from ('' for none)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the fragment cache and re-render everything")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.output) == os.path.abspath(DTS_FILE):
+        parser.error(f"refusing to overwrite the hand-maintained {DTS_FILE}")
+
+    drivers = load_catalogue()
+    if not drivers:
+        print("WARNING: no driver catalogue (run iosapi_catalogue.py); "
+              "sensor fragments will be empty")
+
+    text, status = generate(read_tables(), drivers, reference_names(args.names_from),
+                            force=args.force)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        f.write(text)
+
+    for name, state in status.items():
+        print(f"  {name:8s} {state}")
+    rendered = sum(1 for s in status.values() if s == "rendered")
+    print(f"Wrote {args.output} ({rendered}/{len(status)} fragments re-rendered)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,887 @@
+#!/usr/bin/env python3
+"""In-process I2C device farm built from the decoded IS/IO tables.
+
+cross_check_dts.firmware_topology() turns IS_fl.bin / IO_fl.bin into the
+board's I2C tree: INA219s, ADT7462s behind a PCA9544, TMP100s behind
+PCA9548s, PCA9555 expanders. build_farm() puts an emulated device at
+every one of those addresses, plus the FRU EEPROM from the type 9 entries
+and a PMBus PSU per type 31 entry, and FirmwarePoller reads them the way
+the sensor scan does (select the mux channel, then read the measurement
+registers).
+
+Devices follow their datasheet register maps (datasheets/): pointer
+registers, register widths and byte order, read-only and computed
+registers (INA219 current/power, PCA9555 input ports), PCA9548/PCA9544
+control registers, 24C256 two-byte addressing with page wrap, PMBus
+command codes with LINEAR11 values. Writing a mux control register
+changes which downstream devices are visible, and two visible devices on
+the same address collide.
+
+Each I2CBus counts transactions and keeps a simulated clock: every
+transfer costs the bits it would put on the wire (start, address and
+data bytes with their ACKs, repeated start, stop) at the bus speed
+(100 or 400 kHz), so a polling loop can be checked against its period.
+Address lookups go through a per-bus view that is rebuilt only when a
+mux selection changes, which keeps the transaction path short.
+
+Usage:
+    python3 i2c_farm.py tree
+    python3 i2c_farm.py poll [--sweeps 100] [--speed 400000] [--speed 5=100000]
+    python3 i2c_farm.py bench [--transactions 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from cross_check_dts import (  # noqa: E402
+    ANY_MUX, FW_BUS_BASE, firmware_topology, read_file,
+)
+from iosapi_catalogue import load_catalogue  # noqa: E402
+from parse_io_tables import (  # noqa: E402
+    IO_TYPE_EEPROM, IO_TYPE_PMBUS, PCA9544_ADDRESS, decode_io_fl,
+    decode_is_fl,
+)
+
+STANDARD_MODE = 100_000
+FAST_MODE = 400_000
+
+# PSUs: PMBus on I2C5 at 0x58 up (ANALYSIS.md, "I2C Device Map"); the
+# tables do not record the bus (STATUS.md)
+PSU_BUS = 5
+PSU_BASE_ADDRESS = 0x58
+MAX_PSUS = 4
+
+# Bits on the wire: START + address byte + ACK ... + STOP; a read after a
+# write adds a repeated START and a second address byte
+_BITS_FIXED = 1 + 9 + 1
+_BITS_RESTART = 1 + 9
+
+
+class I2CError(OSError):
+    """A transfer failed the way the Linux i2c core reports it."""
+
+
+# ---------------------------------------------------------------------------
+# Devices
+# ---------------------------------------------------------------------------
+
+class I2CDevice:
+    """Base device: ACKs its address, ignores writes, reads 0xFF."""
+
+    chip = "generic"
+
+    def __init__(self, address: int) -> None:
+        self.address = address
+        self.bus: Optional[I2CBus] = None
+
+    def write(self, data: bytes) -> None:
+        pass
+
+    def read(self, length: int) -> bytes:
+        return b"\xff" * length
+
+    def __repr__(self) -> str:
+        return f"{self.chip}@0x{self.address:02X}"
+
+
+class RegisterDevice(I2CDevice):
+    """Pointer-register device: the first byte written selects a register.
+
+    Args:
+        address: 7-bit address.
+        count: Number of registers.
+        width: Bytes per register (MSB first).
+        auto_increment: Reads and writes move on to the next register.
+        read_only: Registers writes do not change.
+        reset: Power-on values, {register: value}.
+    """
+
+    chip = "registers"
+
+    def __init__(self, address: int, count: int, width: int = 1, auto_increment: bool = False,
+                 read_only: frozenset[int] = frozenset(), reset: Optional[dict[int, int]] = None) -> None:
+        super().__init__(address)
+        self.count = count
+        self.width = width
+        self.auto_increment = auto_increment
+        self.read_only = read_only
+        self.regs = [0] * count
+        for reg, value in (reset or {}).items():
+            self.regs[reg] = value
+        self.pointer = 0
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.pointer = data[0] % self.count
+        w = self.width
+        for i in range(1, len(data) - w + 1, w):
+            reg = self.pointer
+            if reg not in self.read_only:
+                self.regs[reg] = int.from_bytes(data[i:i + w], "big")
+                self.written(reg)
+            if self.auto_increment:
+                self.pointer = (reg + 1) % self.count
+
+    def written(self, reg: int) -> None:
+        """Hook after a register write."""
+
+    def read(self, length: int) -> bytes:
+        w = self.width
+        if length == w and not self.auto_increment:
+            return self.regs[self.pointer].to_bytes(w, "big")
+        out = bytearray()
+        while len(out) < length:
+            out += self.regs[self.pointer].to_bytes(w, "big")
+            if self.auto_increment:
+                self.pointer = (self.pointer + 1) % self.count
+        return bytes(out[:length])
+
+
+class TMP100(RegisterDevice):
+    """TMP100/TMP75/LM75: temperature (12-bit, left-justified), config, TLOW, THIGH."""
+
+    chip = "TMP100"
+    TEMP, CONFIG, TLOW, THIGH = range(4)
+
+    def __init__(self, address: int, celsius: float = 30.0) -> None:
+        super().__init__(address, 4, width=2, read_only=frozenset({self.TEMP}),
+                         reset={self.TLOW: 75 << 8, self.THIGH: 80 << 8})
+        self.set_temperature(celsius)
+
+    def set_temperature(self, celsius: float) -> None:
+        self.regs[self.TEMP] = (int(round(celsius * 16)) << 4) & 0xFFFF
+
+    def write(self, data: bytes) -> None:
+        # The configuration register is a single byte
+        if len(data) == 2 and data[0] % 4 == self.CONFIG:
+            self.pointer = self.CONFIG
+            self.regs[self.CONFIG] = data[1] << 8
+            return
+        super().write(data)
+
+
+class LM75(TMP100):
+    chip = "LM75"
+
+
+class INA219(RegisterDevice):
+    """INA219: current/power registers computed from shunt, bus and calibration."""
+
+    chip = "INA219"
+    CONFIG, SHUNT, BUS, POWER, CURRENT, CALIBRATION = range(6)
+    SHUNT_LSB = 10e-6   # V
+    BUS_LSB = 4e-3      # V
+
+    def __init__(self, address: int, volts: float = 12.0, amps: float = 5.0,
+                 shunt_ohms: float = 0.002) -> None:
+        super().__init__(address, 6, width=2,
+                         read_only=frozenset({self.SHUNT, self.BUS, self.POWER, self.CURRENT}),
+                         reset={self.CONFIG: 0x399F})
+        self.shunt_ohms = shunt_ohms
+        self.set_load(volts, amps)
+
+    def set_load(self, volts: float, amps: float) -> None:
+        shunt = int(round(amps * self.shunt_ohms / self.SHUNT_LSB))
+        self.regs[self.SHUNT] = shunt & 0xFFFF
+        # Bus voltage in bits 15:3, conversion-ready flag in bit 1
+        self.regs[self.BUS] = (int(round(volts / self.BUS_LSB)) << 3 | 0x2) & 0xFFFF
+        self.written(self.CALIBRATION)
+
+    def written(self, reg: int) -> None:
+        if reg == self.CALIBRATION or reg == self.SHUNT:
+            shunt = self.regs[self.SHUNT] - 0x10000 if self.regs[self.SHUNT] & 0x8000 else self.regs[self.SHUNT]
+            current = shunt * (self.regs[self.CALIBRATION] & 0xFFFE) // 4096
+            self.regs[self.CURRENT] = current & 0xFFFF
+            self.regs[self.POWER] = abs(current) * (self.regs[self.BUS] >> 3) // 5000 & 0xFFFF
+        elif reg == self.CONFIG and self.regs[self.CONFIG] & 0x8000:
+            # Reset bit
+            self.regs[self.CONFIG] = 0x399F
+            self.regs[self.CALIBRATION] = 0
+            self.written(self.CALIBRATION)
+
+
+class ADT7462(RegisterDevice):
+    """ADT7462: 8-bit register file with ID, temperature, tach and PWM registers."""
+
+    chip = "ADT7462"
+    DEVICE_ID, COMPANY_ID, REVISION = 0x3D, 0x3E, 0x3F
+    # Temperature value registers, low byte then high byte, local first
+    TEMPERATURES = (0x88, 0x8A, 0x8C, 0x8E)
+    TACH_BASE = 0x98   # 8 tachs, low/high pairs
+    PWM_BASE = 0xAA    # 4 duty cycles
+
+    def __init__(self, address: int, celsius: float = 35.0) -> None:
+        super().__init__(address, 256, read_only=frozenset(
+            {self.DEVICE_ID, self.COMPANY_ID, self.REVISION}
+            | {r + i for r in self.TEMPERATURES for i in (0, 1)}
+            | set(range(self.TACH_BASE, self.TACH_BASE + 16))),
+            reset={self.DEVICE_ID: 0x62, self.COMPANY_ID: 0x41, self.REVISION: 0x04})
+        for channel in range(len(self.TEMPERATURES)):
+            self.set_temperature(channel, celsius + channel)
+        for tach in range(8):
+            self.set_tach(tach, 5400)
+        for pwm in range(4):
+            self.regs[self.PWM_BASE + pwm] = 0x80
+
+    def set_temperature(self, channel: int, celsius: float) -> None:
+        # Offset-64 format, 0.25 degree resolution in the low byte's top bits
+        value = int(round((celsius + 64) * 4))
+        reg = self.TEMPERATURES[channel]
+        self.regs[reg] = (value & 0x3) << 6
+        self.regs[reg + 1] = (value >> 2) & 0xFF
+
+    def set_tach(self, tach: int, rpm: int) -> None:
+        # Count of a 90 kHz clock per revolution; the Linux adt7462 driver
+        # reads it back as RPM = 90000 * 60 / count
+        count = 0xFFFF if rpm <= 0 else min(0xFFFE, 90_000 * 60 // rpm)
+        self.regs[self.TACH_BASE + 2 * tach] = count & 0xFF
+        self.regs[self.TACH_BASE + 2 * tach + 1] = count >> 8
+
+
+class PCA9555(RegisterDevice):
+    """PCA9555: input, output, polarity and configuration register pairs."""
+
+    chip = "PCA9555"
+    INPUT0, INPUT1, OUTPUT0, OUTPUT1, POLARITY0, POLARITY1, CONFIG0, CONFIG1 = range(8)
+
+    def __init__(self, address: int, pins: int = 0xFFFF) -> None:
+        super().__init__(address, 8, read_only=frozenset({self.INPUT0, self.INPUT1}),
+                         reset={self.OUTPUT0: 0xFF, self.OUTPUT1: 0xFF,
+                                self.CONFIG0: 0xFF, self.CONFIG1: 0xFF})
+        self.pins = pins
+        self._refresh()
+
+    def set_pins(self, pins: int) -> None:
+        """Levels driven onto the pins from outside (bit per pin, port 0 low)."""
+        self.pins = pins & 0xFFFF
+        self._refresh()
+
+    def _refresh(self) -> None:
+        for port in (0, 1):
+            pins = self.pins >> (8 * port) & 0xFF
+            config = self.regs[self.CONFIG0 + port]
+            level = (pins & config) | (self.regs[self.OUTPUT0 + port] & ~config & 0xFF)
+            self.regs[self.INPUT0 + port] = level ^ self.regs[self.POLARITY0 + port]
+
+    def written(self, reg: int) -> None:
+        self._refresh()
+
+    def write(self, data: bytes) -> None:
+        # Data bytes alternate within the addressed register pair
+        if not data:
+            return
+        self.pointer = data[0] & 0x7
+        for byte in data[1:]:
+            if self.pointer not in self.read_only:
+                self.regs[self.pointer] = byte
+            self.pointer ^= 1
+        self._refresh()
+
+    def read(self, length: int) -> bytes:
+        out = bytearray()
+        for _ in range(length):
+            out.append(self.regs[self.pointer])
+            self.pointer ^= 1
+        return bytes(out)
+
+
+class Mux(I2CDevice):
+    """Base for the I2C multiplexers: a control register and channel segments."""
+
+    channels_count = 0
+
+    def __init__(self, address: int) -> None:
+        super().__init__(address)
+        self.control = 0
+        self.channels: list[dict[int, I2CDevice]] = [{} for _ in range(self.channels_count)]
+
+    def attach(self, channel: int, device: I2CDevice) -> I2CDevice:
+        self.channels[channel][device.address] = device
+        device.bus = self.bus
+        return device
+
+    def enabled(self) -> list[int]:
+        raise NotImplementedError
+
+    def select_byte(self, channel: int) -> int:
+        raise NotImplementedError
+
+    def write(self, data: bytes) -> None:
+        if data:
+            self.control = data[-1]
+            if self.bus is not None:
+                self.bus.invalidate()
+
+    def read(self, length: int) -> bytes:
+        return bytes([self.control]) * length
+
+
+class PCA9548(Mux):
+    """8 channels, one enable bit each."""
+
+    chip = "PCA9548"
+    channels_count = 8
+
+    def enabled(self) -> list[int]:
+        return [ch for ch in range(8) if self.control >> ch & 1]
+
+    def select_byte(self, channel: int) -> int:
+        return 1 << channel
+
+
+class PCA9544(Mux):
+    """4 channels: bit 2 enables, bits 1:0 pick the channel."""
+
+    chip = "PCA9544"
+    channels_count = 4
+
+    def enabled(self) -> list[int]:
+        return [self.control & 0x3] if self.control & 0x4 else []
+
+    def select_byte(self, channel: int) -> int:
+        return 0x4 | channel
+
+    def write(self, data: bytes) -> None:
+        if data:
+            data = bytes([data[-1] & 0x7])
+        super().write(data)
+
+
+class AT24C256(I2CDevice):
+    """32 KiB EEPROM: two address bytes, 64-byte write pages, sequential reads."""
+
+    chip = "24C256"
+    SIZE = 32 * 1024
+    PAGE = 64
+
+    def __init__(self, address: int, contents: bytes = b"") -> None:
+        super().__init__(address)
+        self.memory = bytearray(b"\xff" * self.SIZE)
+        self.memory[:len(contents)] = contents[:self.SIZE]
+        self.pointer = 0
+
+    def write(self, data: bytes) -> None:
+        if len(data) < 2:
+            return
+        self.pointer = ((data[0] << 8) | data[1]) % self.SIZE
+        page = self.pointer - self.pointer % self.PAGE
+        for byte in data[2:]:
+            self.memory[self.pointer] = byte
+            self.pointer = page + (self.pointer + 1) % self.PAGE
+
+    def read(self, length: int) -> bytes:
+        start = self.pointer
+        end = start + length
+        self.pointer = end % self.SIZE
+        if end <= self.SIZE:
+            return bytes(self.memory[start:end])
+        return bytes(self.memory[start:] + self.memory[:end - self.SIZE])
+
+
+def linear11(value: float) -> int:
+    """Encode a PMBus LINEAR11 word."""
+    exponent = -16
+    while exponent < 15 and not -1024 <= value / 2.0 ** exponent < 1024:
+        exponent += 1
+    mantissa = int(round(value / 2.0 ** exponent))
+    while not -1024 <= mantissa < 1024:
+        exponent += 1
+        mantissa = int(round(value / 2.0 ** exponent))
+    return (exponent & 0x1F) << 11 | (mantissa & 0x7FF)
+
+
+def decode_linear11(word: int) -> float:
+    exponent = word >> 11
+    mantissa = word & 0x7FF
+    if exponent > 15:
+        exponent -= 32
+    if mantissa > 1023:
+        mantissa -= 2048
+    return mantissa * 2.0 ** exponent
+
+
+class PMBusPSU(I2CDevice):
+    """PMBus power supply: status bytes, LINEAR11 readings, block MFR strings."""
+
+    chip = "PMBus"
+    CLEAR_FAULTS = 0x03
+    VOUT_MODE = 0x20
+    STATUS_BYTE, STATUS_WORD = 0x78, 0x79
+    STATUS_CML = 0x7E
+    STATUS_BYTES = (0x78, 0x7A, 0x7B, 0x7C, 0x7D, 0x7E, 0x7F, 0x80, 0x81, 0x82)
+    READ_VIN, READ_IIN, READ_VOUT, READ_IOUT = 0x88, 0x89, 0x8B, 0x8C
+    READ_TEMPERATURE_1, READ_FAN_SPEED_1, READ_POUT, READ_PIN = 0x8D, 0x90, 0x96, 0x97
+    PMBUS_REVISION, MFR_ID, MFR_MODEL = 0x98, 0x99, 0x9A
+    VOUT_EXPONENT = -9
+    CML_INVALID_COMMAND = 0x80
+
+    def __init__(self, address: int, watts: float = 600.0) -> None:
+        super().__init__(address)
+        self.words: dict[int, int] = {}
+        self.bytes_: dict[int, int] = {reg: 0 for reg in self.STATUS_BYTES}
+        self.bytes_[self.VOUT_MODE] = self.VOUT_EXPONENT & 0x1F
+        self.bytes_[self.PMBUS_REVISION] = 0x11
+        self.blocks = {self.MFR_ID: b"DELL", self.MFR_MODEL: b"C410X-PSU"}
+        self.command = 0
+        self.set_output(12.0, watts / 12.0)
+
+    def set_output(self, volts: float, amps: float, vin: float = 230.0, celsius: float = 40.0) -> None:
+        efficiency = 0.92
+        pout = volts * amps
+        pin = pout / efficiency
+        self.words.update({
+            self.READ_VIN: linear11(vin), self.READ_IIN: linear11(pin / vin),
+            self.READ_VOUT: int(round(volts / 2.0 ** self.VOUT_EXPONENT)) & 0xFFFF,
+            self.READ_IOUT: linear11(amps), self.READ_POUT: linear11(pout),
+            self.READ_PIN: linear11(pin), self.READ_TEMPERATURE_1: linear11(celsius),
+            self.READ_FAN_SPEED_1: linear11(8000),
+        })
+
+    def _status_word(self) -> int:
+        return self.bytes_[self.STATUS_BYTE] | (self.bytes_[0x7A] and 0x8000) | (
+            self.bytes_[0x7B] and 0x4000) | (self.bytes_[0x7C] and 0x2000)
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.command = data[0]
+        if self.command == self.CLEAR_FAULTS:
+            for reg in self.STATUS_BYTES:
+                self.bytes_[reg] = 0
+        elif (self.command not in self.words and self.command not in self.bytes_
+              and self.command not in self.blocks and self.command != self.STATUS_WORD):
+            self._invalid()
+
+    def _invalid(self) -> None:
+        self.bytes_[self.STATUS_CML] |= self.CML_INVALID_COMMAND
+        self.bytes_[self.STATUS_BYTE] |= 0x02  # CML
+
+    def read(self, length: int) -> bytes:
+        cmd = self.command
+        if cmd in self.words:
+            return struct.pack("<H", self.words[cmd])[:length].ljust(length, b"\xff")
+        if cmd == self.STATUS_WORD:
+            return struct.pack("<H", self._status_word())[:length].ljust(length, b"\xff")
+        if cmd in self.bytes_:
+            return bytes([self.bytes_[cmd]]) + b"\xff" * (length - 1)
+        if cmd in self.blocks:
+            block = self.blocks[cmd]
+            return (bytes([len(block)]) + block)[:length].ljust(length, b"\xff")
+        return b"\xff" * length
+
+
+CHIP_CLASSES = {"TMP100": TMP100, "LM75": LM75, "INA219": INA219, "ADT7462": ADT7462,
+                "PCA9555": PCA9555, "PCA9548": PCA9548, "PCA9544": PCA9544}
+
+
+class _Collision(I2CDevice):
+    """Two or more devices answering the same address."""
+
+    chip = "collision"
+
+    def __init__(self, address: int, devices: list[I2CDevice]) -> None:
+        super().__init__(address)
+        self.devices = devices
+
+    def write(self, data: bytes) -> None:
+        raise I2CError(errno.EIO, f"address 0x{self.address:02X} collision: {self.devices}")
+
+    read = write
+
+
+# ---------------------------------------------------------------------------
+# Bus
+# ---------------------------------------------------------------------------
+
+class I2CBus:
+    """One controller's segment and everything reachable through its muxes.
+
+    Args:
+        number: Controller number (the firmware calls it 0xF0 + number).
+        speed_hz: SCL frequency for the simulated clock.
+    """
+
+    def __init__(self, number: int, speed_hz: int = STANDARD_MODE) -> None:
+        self.number = number
+        self.devices: dict[int, I2CDevice] = {}
+        self.transactions = 0
+        self.nacks = 0
+        self.bits = 0
+        self._view: Optional[dict[int, I2CDevice]] = None
+        self.set_speed(speed_hz)
+
+    def set_speed(self, speed_hz: int) -> None:
+        self.speed_hz = speed_hz
+
+    @property
+    def elapsed(self) -> float:
+        """Simulated seconds of bus time used so far."""
+        return self.bits / self.speed_hz
+
+    def attach(self, device: I2CDevice) -> I2CDevice:
+        self.devices[device.address] = device
+        device.bus = self
+        self.invalidate()
+        return device
+
+    def invalidate(self) -> None:
+        self._view = None
+
+    def view(self) -> dict[int, I2CDevice]:
+        """{address: device} currently reachable, given the mux selections."""
+        if self._view is not None:
+            return self._view
+        found: dict[int, list[I2CDevice]] = {}
+
+        def visit(segment: dict[int, I2CDevice]) -> None:
+            for addr, dev in segment.items():
+                found.setdefault(addr, []).append(dev)
+                if isinstance(dev, Mux):
+                    for ch in dev.enabled():
+                        visit(dev.channels[ch])
+
+        visit(self.devices)
+        self._view = {addr: devs[0] if len(devs) == 1 else _Collision(addr, devs)
+                      for addr, devs in found.items()}
+        return self._view
+
+    def transfer(self, addr: int, write: bytes = b"", read: int = 0) -> bytes:
+        """Write ``write`` then (repeated start) read ``read`` bytes.
+
+        Raises:
+            I2CError: ENXIO if nothing ACKs the address, EIO on a collision.
+        """
+        view = self._view
+        if view is None:
+            view = self.view()
+        bits = _BITS_FIXED + 9 * len(write)
+        if read:
+            bits += 9 * read + (_BITS_RESTART if write else 0)
+        self.bits += bits
+        self.transactions += 1
+        dev = view.get(addr)
+        if dev is None:
+            self.nacks += 1
+            raise I2CError(errno.ENXIO, f"i2c{self.number}: no ACK from 0x{addr:02X}")
+        if write:
+            dev.write(write)
+        return dev.read(read) if read else b""
+
+    # SMBus helpers, like i2c-dev's
+    def read_byte_data(self, addr: int, reg: int) -> int:
+        return self.transfer(addr, bytes((reg,)), 1)[0]
+
+    def write_byte_data(self, addr: int, reg: int, value: int) -> None:
+        self.transfer(addr, bytes((reg, value)))
+
+    def read_word_data(self, addr: int, reg: int) -> int:
+        """SMBus word read (little endian on the wire, as PMBus uses)."""
+        data = self.transfer(addr, bytes((reg,)), 2)
+        return data[0] | data[1] << 8
+
+    def read_block_data(self, addr: int, reg: int, max_length: int = 32) -> bytes:
+        data = self.transfer(addr, bytes((reg,)), max_length + 1)
+        return data[1:1 + data[0]]
+
+    def reset_stats(self) -> None:
+        self.transactions = self.nacks = self.bits = 0
+
+
+# ---------------------------------------------------------------------------
+# Farm
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Placement:
+    """Where a device sits: bus, the (mux address, channel) hops to it, address."""
+
+    bus: int
+    mux_path: tuple[tuple[int, int], ...]
+    device: I2CDevice
+    sources: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Farm:
+    buses: dict[int, I2CBus]
+    placements: list[Placement]
+
+    def bus(self, number: int) -> I2CBus:
+        return self.buses[number]
+
+    def find(self, chip: Optional[str] = None, bus: Optional[int] = None,
+             address: Optional[int] = None) -> list[Placement]:
+        return [p for p in self.placements
+                if (chip is None or p.device.chip == chip) and (bus is None or p.bus == bus)
+                and (address is None or p.device.address == address)]
+
+    def select(self, placement: Placement) -> int:
+        """Set the muxes on the way to a device; returns the transfers made.
+
+        Other muxes on the same segment that still have a channel open are
+        switched off first, as the firmware does, so that devices sharing
+        an address on different muxes do not collide.
+        """
+        bus = self.buses[placement.bus]
+        parent = bus.devices
+        transfers = 0
+        for mux_addr, channel in placement.mux_path:
+            for addr, other in parent.items():
+                if addr != mux_addr and isinstance(other, Mux) and other.control:
+                    bus.transfer(addr, b"\x00")
+                    transfers += 1
+            mux = parent[mux_addr]
+            bus.transfer(mux_addr, bytes((mux.select_byte(channel),)))
+            parent = mux.channels[channel]
+            transfers += 1
+        return transfers
+
+    def set_speed(self, speed_hz: int) -> None:
+        for bus in self.buses.values():
+            bus.set_speed(speed_hz)
+
+    def reset_stats(self) -> None:
+        for bus in self.buses.values():
+            bus.reset_stats()
+
+
+def build_farm(topo: dict, io_types: Optional[dict] = None, speed_hz: int = STANDARD_MODE) -> Farm:
+    """Emulated devices for a firmware_topology() result.
+
+    Args:
+        topo: cross_check_dts.firmware_topology() output.
+        io_types: decode_io_fl() output, for the FRU EEPROM and PSUs.
+        speed_hz: Initial speed of every bus.
+    """
+    buses: dict[int, I2CBus] = {}
+    placements = []
+
+    def bus_for(number: int) -> I2CBus:
+        if number not in buses:
+            buses[number] = I2CBus(number, speed_hz)
+        return buses[number]
+
+    # Muxes first, so devices behind them have somewhere to go; the tables
+    # only say the ADT7462s sit behind "a" PCA9544, so it takes the first
+    # address from PCA9544_ADDRESS its A2..A0 pins allow that is free
+    by_device: dict[int, Placement] = {}
+    unknown_mux: dict[int, list[int]] = {}
+    for (bus, mux_addr), info in sorted(topo["muxes"].items(), key=lambda kv: (kv[0][1] is None, kv[0])):
+        target = bus_for(bus)
+        if mux_addr is None:
+            mux_addr = next((a for a in range(PCA9544_ADDRESS, PCA9544_ADDRESS + 8)
+                             if a not in target.devices), PCA9544_ADDRESS)
+            unknown_mux[bus] = [mux_addr, 0]
+        mux = target.attach(CHIP_CLASSES[info["chip"]](mux_addr))
+        placement = Placement(bus, (), mux, ["IS_fl.bin"])
+        by_device[id(mux)] = placement
+        placements.append(placement)
+
+    chip_count: dict[str, int] = {}
+    for (bus, mux_path, addr), info in sorted(topo["i2c"].items(), key=lambda kv: repr(kv[0])):
+        target = bus_for(bus)
+        if mux_path == ANY_MUX:
+            # One channel per device, in address order
+            mux_addr, n = unknown_mux[bus]
+            unknown_mux[bus][1] = n + 1
+            mux = target.devices[mux_addr]
+            mux_path = ((mux_addr, n % len(mux.channels)),)
+        segment = target.devices
+        for mux_addr, channel in mux_path:
+            segment = segment[mux_addr].channels[channel]
+        if addr in segment:
+            # Two table entries for one address (or a device on a mux's
+            # address): one chip answers, and both sources point at it
+            by_device[id(segment[addr])].sources.extend(info["sources"])
+            continue
+        dev = CHIP_CLASSES.get(info["chip"], I2CDevice)(addr)
+        chip_count[dev.chip] = chip_count.get(dev.chip, 0) + 1
+        if isinstance(dev, TMP100):
+            dev.set_temperature(28.0 + chip_count[dev.chip] % 16)
+        segment[addr] = dev
+        dev.bus = target
+        placement = Placement(bus, tuple(mux_path), dev, list(info["sources"]))
+        by_device[id(dev)] = placement
+        placements.append(placement)
+
+    for (bus, addr), pins in sorted(topo["pca9555"].items()):
+        if addr in bus_for(bus).devices:
+            continue
+        dev = bus_for(bus).attach(PCA9555(addr))
+        placements.append(Placement(bus, (), dev, [f"IO_fl.bin ({pins} pins)"]))
+
+    for entry in (io_types or {}).get(IO_TYPE_EEPROM, []):
+        bus, addr8 = entry["port_cfg"] >> 8, entry["port_cfg"] & 0xFF
+        if bus >= FW_BUS_BASE and addr8 and addr8 >> 1 not in bus_for(bus - FW_BUS_BASE).devices:
+            dev = bus_for(bus - FW_BUS_BASE).attach(AT24C256(addr8 >> 1))
+            placements.append(Placement(bus - FW_BUS_BASE, (), dev, [f"IO_fl.bin entry {entry['index']}"]))
+
+    for n, entry in enumerate((io_types or {}).get(IO_TYPE_PMBUS, [])[:MAX_PSUS]):
+        dev = bus_for(PSU_BUS).attach(PMBusPSU(PSU_BASE_ADDRESS + n))
+        placements.append(Placement(PSU_BUS, (), dev, [f"IO_fl.bin entry {entry['index']} (bus assumed)"]))
+
+    return Farm(dict(sorted(buses.items())), placements)
+
+
+def load_farm(speed_hz: int = STANDARD_MODE) -> Farm:
+    """Farm for the extracted IS/IO tables (run extract_firmware.py first)."""
+    sensors = decode_is_fl(read_file("IS_fl.bin"))
+    io_types = decode_io_fl(read_file("IO_fl.bin"))
+    return build_farm(firmware_topology(sensors, io_types, load_catalogue()), io_types, speed_hz)
+
+
+# ---------------------------------------------------------------------------
+# Polling
+# ---------------------------------------------------------------------------
+
+# What one scan reads from each chip: [(register or command, bytes)]
+POLL_READS = {
+    "TMP100": [(TMP100.TEMP, 2)],
+    "LM75": [(TMP100.TEMP, 2)],
+    "INA219": [(INA219.BUS, 2), (INA219.POWER, 2)],
+    "ADT7462": [(reg, 1) for t in ADT7462.TEMPERATURES for reg in (t, t + 1)]
+               + [(ADT7462.TACH_BASE + i, 1) for i in range(16)],
+    "PCA9555": [(PCA9555.INPUT0, 2)],
+    "PMBus": [(PMBusPSU.STATUS_WORD, 2), (PMBusPSU.READ_POUT, 2)],
+}
+
+
+class FirmwarePoller:
+    """Reads every sensor once per sweep, the way the firmware's scan does.
+
+    Each device is reached by writing the mux control registers on its
+    path and then reading its measurement registers one transfer each.
+    """
+
+    def __init__(self, farm: Farm) -> None:
+        self.farm = farm
+        self.plan = []
+        for p in farm.placements:
+            reads = POLL_READS.get(p.device.chip)
+            if reads:
+                self.plan.append((p, farm.buses[p.bus], p.device.address,
+                                  [(bytes((reg,)), n) for reg, n in reads]))
+        self.errors = 0
+
+    def sweep(self) -> int:
+        """One scan; returns the number of transfers made."""
+        transfers = 0
+        select = self.farm.select
+        for placement, bus, addr, reads in self.plan:
+            if placement.mux_path:
+                transfers += select(placement)
+            transfer = bus.transfer
+            for reg, n in reads:
+                try:
+                    transfer(addr, reg, n)
+                except I2CError:
+                    self.errors += 1
+            transfers += len(reads)
+        return transfers
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def print_tree(farm: Farm) -> None:
+    for number, bus in farm.buses.items():
+        print(f"i2c{number} (firmware bus 0x{FW_BUS_BASE + number:02X}), {bus.speed_hz // 1000} kHz")
+
+        def show(segment: dict[int, I2CDevice], indent: str) -> None:
+            for addr, dev in sorted(segment.items()):
+                print(f"{indent}0x{addr:02X} {dev.chip}")
+                if isinstance(dev, Mux):
+                    for ch, child in enumerate(dev.channels):
+                        if child:
+                            print(f"{indent}  ch{ch}:")
+                            show(child, indent + "    ")
+
+        show(bus.devices, "  ")
+
+
+def _parse_speeds(values: list[str]) -> tuple[int, dict[int, int]]:
+    default = STANDARD_MODE
+    per_bus = {}
+    for value in values:
+        bus, sep, hz = value.partition("=")
+        if sep:
+            per_bus[int(bus, 0)] = int(hz)
+        else:
+            default = int(bus)
+    return default, per_bus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Emulate the C410X I2C devices from the IO tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("tree", help="Show the emulated topology")
+    p = sub.add_parser("poll", help="Run firmware-style sensor sweeps")
+    p.add_argument("--sweeps", type=int, default=100)
+    p.add_argument("--speed", action="append", default=[], metavar="[BUS=]HZ",
+                   help="Bus speed, for all buses or one (default: 100000)")
+    p = sub.add_parser("bench", help="Raw transaction rate")
+    p.add_argument("--transactions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    os.chdir(SCRIPT_DIR)
+    try:
+        farm = load_farm()
+    except FileNotFoundError as e:
+        print(f"ERROR: {e.filename} not found (run extract_firmware.py first)", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "tree":
+        print_tree(farm)
+        return
+
+    if args.command == "poll":
+        default, per_bus = _parse_speeds(args.speed)
+        farm.set_speed(default)
+        for number, hz in per_bus.items():
+            farm.bus(number).set_speed(hz)
+        poller = FirmwarePoller(farm)
+        start = time.perf_counter()
+        transfers = sum(poller.sweep() for _ in range(args.sweeps))
+        wall = time.perf_counter() - start
+        print(f"{args.sweeps} sweep(s), {transfers:,} transfers in {wall:.3f}s "
+              f"({transfers / wall:,.0f}/s), {poller.errors} error(s)")
+        print(f"  {'bus':6s} {'kHz':>5s} {'transfers':>10s} {'bus ms/sweep':>13s}")
+        for number, bus in farm.buses.items():
+            print(f"  i2c{number:<3d} {bus.speed_hz // 1000:5d} {bus.transactions:10,d} "
+                  f"{bus.elapsed / args.sweeps * 1000:13.2f}")
+        slowest = max(bus.elapsed for bus in farm.buses.values()) / args.sweeps
+        print(f"  Minimum scan period (slowest bus): {slowest * 1000:.2f} ms")
+        return
+
+    # bench: back-to-back register reads on the first sensor found
+    target = next((p for p in farm.placements if p.device.chip in ("INA219", "TMP100")),
+                  farm.placements[0])
+    farm.select(target)
+    bus = farm.bus(target.bus)
+    transfer = bus.transfer
+    addr = target.device.address
+    reg = b"\x00"
+    start = time.perf_counter()
+    for _ in range(args.transactions):
+        transfer(addr, reg, 2)
+    wall = time.perf_counter() - start
+    print(f"{args.transactions:,} transfers to {target.device!r} on i2c{target.bus} in {wall:.3f}s "
+          f"({args.transactions / wall:,.0f}/s); simulated bus time {bus.elapsed:.1f}s "
+          f"at {bus.speed_hz // 1000} kHz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""Build a catalogue of the IOAPI/IOSAPI driver vtables in fullfw.
+
+IO_fl.bin and IS_fl.bin refer to their drivers by the RAM address of a
+vtable inside the fullfw ELF (e.g. 0x000FCC0C for the INA219 sensor
+driver). Those addresses move between firmware versions, so instead of
+hardcoding them this script discovers every driver vtable in fullfw,
+resolves its function pointers and names it:
+
+  1. From the ELF symbol table (G_s*_IOAPI / G_s*_IOSAPI / G_s*_ISRAPI
+     objects), when fullfw still carries symbols.
+  2. Otherwise by scanning the data segments for runs of pointers into
+     the text segment, and naming each run from the strings its
+     functions reference (debug messages such as "OEMINA219Read ...")
+     and from the SDR types and names of the IS_fl.bin sensors it reads.
+
+The catalogue is cached as JSON keyed by the SHA-256 of fullfw, so the
+table decoders only pay for discovery once per firmware version and then
+classify drivers with a dict lookup (see load_catalogue()).
+"""
+
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+
+FULLFW = "extracted/rootfs/sbin/fullfw"
+CATALOGUE = "extracted/iosapi_catalogue.json"
+BASE = "extracted/rootfs/etc/default/ipmi/evb"
+# Bumped whenever discovery changes what it records, so old caches rebuild
+CATALOGUE_VERSION = 3
+
+# Driver vtable symbols, e.g. G_sOEMINA219_I2CADC_IOSAPI, G_sONCHIP_GPIO_IOAPI
+API_SYMBOL_RE = re.compile(
+    r'^G_s(?:OEM)?(?P<chip>[A-Za-z0-9]+?)_(?P<func>[A-Za-z0-9]+)_(?P<api>IOS?API|ISRAPI)$')
+
+# Chip names we expect to find in driver symbols or debug strings
+CHIP_RE = re.compile(
+    r'(INA219|ADT7462|ADT7473|TMP100|TMP75|LM75|W83792|PCA9544|PCA9548|'
+    r'PCA9555|PMBus|EE24Cxx|ONCHIP|GenericSensor|GenericAnalog)', re.IGNORECASE)
+
+# Human-readable role for the function part of a driver name
+FUNC_ROLES = {
+    "I2CADC": "ADC",
+    "I2CTEMP": "Temp",
+    "I2CFAN": "Fan",
+    "I2CGPIO": "GPIO",
+    "I2CSWITCH": "Mux",
+    "GPIO": "GPIO",
+    "PSU": "PSU",
+    "EEPROM": "EEPROM",
+}
+
+# Keywords in a stripped driver's debug strings that give away its role,
+# mapped onto the function part of a symbol name (see FUNC_ROLES)
+ROLE_RE = [
+    ("I2CTEMP", re.compile(r'Temp', re.IGNORECASE)),
+    ("I2CFAN", re.compile(r'Fan|Tach', re.IGNORECASE)),
+    ("I2CADC", re.compile(r'ADC|Volt|Curr|Power', re.IGNORECASE)),
+    ("PSU", re.compile(r'PSU|PMBus', re.IGNORECASE)),
+    ("GPIO", re.compile(r'GPIO|Presen', re.IGNORECASE)),
+]
+
+# SDR sensor type (IPMI 2.0 table 42-3) of the analog sensors a driver
+# reads -> its role. Discrete sensors are read through GPIO drivers.
+SENSOR_TYPE_ROLES = {
+    0x01: "I2CTEMP",
+    0x02: "I2CADC",
+    0x03: "I2CADC",
+    0x04: "I2CFAN",
+    0x08: "PSU",
+    0x0B: "I2CADC",
+}
+
+# What a discrete sensor of this SDR type reports, for GPIO driver labels
+DISCRETE_TYPE_NAMES = {
+    0x08: "Presence",
+    0x09: "Power Unit",
+    0x22: "Power State",
+    0x25: "Presence",
+}
+
+# An I2C temperature driver whose strings name no chip but whose sensors
+# sit at these 7-bit addresses is taken to be an LM75 (or compatible)
+LM75_ADDRESSES = range(0x48, 0x50)
+
+# A heuristic vtable must have at least this many consecutive code pointers
+MIN_VTABLE_SLOTS = 2
+MAX_VTABLE_SLOTS = 16
+
+PT_LOAD = 1
+PF_X = 1
+SHT_SYMTAB = 2
+SHT_DYNSYM = 11
+STT_OBJECT = 1
+STT_FUNC = 2
+
+
+# ---------------------------------------------------------------------------
+# ELF helpers (32-bit little-endian ARM, as used by fullfw)
+# ---------------------------------------------------------------------------
+
+def read_elf_segments(data):
+    """Return the PT_LOAD segments as (vaddr, offset, filesz, flags) tuples."""
+    if data[:4] != b'\x7fELF':
+        raise ValueError("not an ELF file")
+    e_phoff = struct.unpack_from('<I', data, 28)[0]
+    e_phentsize = struct.unpack_from('<H', data, 42)[0]
+    e_phnum = struct.unpack_from('<H', data, 44)[0]
+
+    segments = []
+    for i in range(e_phnum):
+        off = e_phoff + i * e_phentsize
+        p_type, p_offset, p_vaddr = struct.unpack_from('<III', data, off)
+        p_filesz = struct.unpack_from('<I', data, off + 16)[0]
+        p_flags = struct.unpack_from('<I', data, off + 24)[0]
+        if p_type == PT_LOAD:
+            segments.append((p_vaddr, p_offset, p_filesz, p_flags))
+    return segments
+
+
+def read_elf_symbols(data):
+    """Return {name: (value, size, type)} from .symtab and .dynsym."""
+    e_shoff = struct.unpack_from('<I', data, 32)[0]
+    e_shentsize = struct.unpack_from('<H', data, 46)[0]
+    e_shnum = struct.unpack_from('<H', data, 48)[0]
+    if e_shoff == 0 or e_shnum == 0:
+        return {}
+
+    sections = []
+    for i in range(e_shnum):
+        off = e_shoff + i * e_shentsize
+        if off + 40 > len(data):
+            break
+        sh = struct.unpack_from('<IIIIIIIIII', data, off)
+        sections.append(sh)
+
+    symbols = {}
+    for sh_name, sh_type, _, _, sh_offset, sh_size, sh_link, _, _, sh_entsize in sections:
+        if sh_type not in (SHT_SYMTAB, SHT_DYNSYM) or sh_link >= len(sections):
+            continue
+        strtab_off = sections[sh_link][4]
+        entsize = sh_entsize or 16
+        for off in range(sh_offset, sh_offset + sh_size, entsize):
+            st_name, st_value, st_size, st_info = struct.unpack_from('<IIIB', data, off)
+            if st_name == 0:
+                continue
+            end = data.find(b'\x00', strtab_off + st_name)
+            name = data[strtab_off + st_name:end].decode('ascii', errors='replace')
+            symbols[name] = (st_value, st_size, st_info & 0xF)
+    return symbols
+
+
+def vaddr_to_offset(vaddr, segments):
+    """Convert a virtual address to a file offset, or None if unmapped."""
+    for seg_vaddr, seg_offset, seg_filesz, _ in segments:
+        if seg_vaddr <= vaddr < seg_vaddr + seg_filesz:
+            return vaddr - seg_vaddr + seg_offset
+    return None
+
+
+def _is_code_pointer(value, code_ranges):
+    if value & 3:
+        return False
+    for start, end in code_ranges:
+        if start <= value < end:
+            return True
+    return False
+
+
+def _read_cstring(data, offset, max_len=80):
+    """Read a printable NUL-terminated string at offset, or None."""
+    end = data.find(b'\x00', offset, offset + max_len)
+    if end <= offset:
+        return None
+    raw = data[offset:end]
+    if not all(32 <= b < 127 for b in raw):
+        return None
+    return raw.decode('ascii')
+
+
+# ---------------------------------------------------------------------------
+# Discovery
+# ---------------------------------------------------------------------------
+
+def _describe(name, chip=None, func=None, api=None, label=None):
+    """Derive chip/role/label fields from a driver name."""
+    m = API_SYMBOL_RE.match(name)
+    if m:
+        chip, func, api = m.group('chip'), m.group('func'), m.group('api')
+    role = FUNC_ROLES.get(func or "", func or "")
+    if label is None:
+        label = f"{chip} {role}".strip() if chip else name
+    return {"name": name, "api": api, "chip": chip, "func": func, "label": label}
+
+
+def _vtable_slots(data, segments, code_ranges, vaddr, size=0):
+    """Read the function pointers of a vtable starting at vaddr."""
+    foff = vaddr_to_offset(vaddr, segments)
+    if foff is None:
+        return []
+    count = size // 4 if size else MAX_VTABLE_SLOTS
+    slots = []
+    for i in range(count):
+        if foff + i * 4 + 4 > len(data):
+            break
+        ptr = struct.unpack_from('<I', data, foff + i * 4)[0]
+        if ptr != 0 and not _is_code_pointer(ptr, code_ranges):
+            if not size:
+                break
+        slots.append(ptr)
+    return slots
+
+
+def discover_from_symbols(data, segments, code_ranges, symbols):
+    """Find driver vtables via their G_s*_IO(S)API symbols."""
+    func_names = {v: n for n, (v, _, t) in symbols.items() if t == STT_FUNC}
+    drivers = {}
+    for name, (value, size, sym_type) in symbols.items():
+        if not API_SYMBOL_RE.match(name) or sym_type not in (STT_OBJECT, 0):
+            continue
+        slots = _vtable_slots(data, segments, code_ranges, value, size)
+        entry = _describe(name)
+        entry["source"] = "symtab"
+        entry["functions"] = [
+            {"vaddr": f"0x{p:08X}", "name": func_names.get(p & ~1, "")}
+            for p in slots
+        ]
+        drivers[value] = entry
+    return drivers
+
+
+def _strings_near(data, segments, vaddr, radius=256):
+    """Printable strings stored within `radius` bytes after a vtable."""
+    foff = vaddr_to_offset(vaddr, segments)
+    if foff is None:
+        return []
+    return [s.decode('ascii') for s in
+            re.findall(rb'[\x20-\x7e]{6,}', data[foff:foff + radius])]
+
+
+def _strings_referenced_by(data, segments, func_vaddr, func_end, max_len=1024):
+    """Strings loaded from the literal pool of the function at func_vaddr.
+
+    The scan stops at func_end (the next known function start) so that one
+    driver's strings are not attributed to its neighbour.
+    """
+    foff = vaddr_to_offset(func_vaddr & ~1, segments)
+    if foff is None:
+        return []
+    length = min(max_len, max(4, func_end - (func_vaddr & ~1)))
+    strings = []
+    for off in range(foff, min(len(data) - 3, foff + length), 4):
+        ptr = struct.unpack_from('<I', data, off)[0]
+        soff = vaddr_to_offset(ptr, segments)
+        if soff is None:
+            continue
+        s = _read_cstring(data, soff)
+        if s and len(s) >= 4:
+            strings.append(s)
+    return strings
+
+
+def _identifier(strings):
+    """First identifier-like token (e.g. a function name) in a list of strings."""
+    for s in strings:
+        m = re.match(r'[A-Za-z_][A-Za-z0-9_]{3,}', s)
+        if m:
+            return m.group(0)
+    return ""
+
+
+def _role(*tiers):
+    """Driver role (a FUNC_ROLES key) from the first tier of strings that
+    points at one role more often than at any other, or None."""
+    for strings in tiers:
+        hits = {}
+        for s in strings:
+            for func, regex in ROLE_RE:
+                if regex.search(s):
+                    hits[func] = hits.get(func, 0) + 1
+        ranked = sorted(hits.values(), reverse=True)
+        if ranked and (len(ranked) == 1 or ranked[0] > ranked[1]):
+            return max(hits, key=hits.get)
+    return None
+
+
+def _table_role(sensors):
+    """Role shared by every sensor a driver reads (see table_sensors()), or None."""
+    roles = {SENSOR_TYPE_ROLES.get(s["type"]) if s["analog"] else "GPIO" for s in sensors}
+    return roles.pop() if len(roles) == 1 else None
+
+
+def _table_label(sensors, chip, func):
+    """Label for a driver no string names, from its sensors' SDR names.
+
+    "PCIE 1".."PCIE 16" read through a GPIO driver as entity presence
+    sensors give "PCIE Presence (GPIO)"; "FB Temp" gives "FB Temp".
+    """
+    names = [s["name"].split() for s in sensors if s["name"]]
+    if chip or not names:
+        return None
+    stem = []
+    for words in zip(*names):
+        if len(set(words)) > 1 or words[0].isdigit():
+            break
+        stem.append(words[0])
+    role = FUNC_ROLES.get(func or "", func or "")
+    if func == "GPIO":
+        kinds = {DISCRETE_TYPE_NAMES.get(s["type"], "State") for s in sensors}
+        kind = kinds.pop() if len(kinds) == 1 else "State"
+        return f"{' '.join(stem) or 'unknown'} {kind} (GPIO)"
+    if not stem:
+        return None
+    if stem[-1].lower() == role.lower():
+        stem.pop()
+    return " ".join(stem + [role]).strip()
+
+
+def discover_heuristic(data, segments, code_ranges, seeds=(), sensors=None):
+    """Find driver vtables in a stripped fullfw.
+
+    Scans every non-executable LOAD segment for runs of consecutive code
+    pointers. Runs are split at any seed address (driver pointers taken
+    from the IO tables), since drivers are often laid out back to back.
+
+    The chip comes from CHIP_RE. The role comes from the SDR types of the
+    sensors the driver reads (sensors, from table_sensors()) when they all
+    agree, and otherwise from ROLE_RE, looked up first in the strings of
+    the functions only this vtable points at (drivers for one chip share
+    most of their functions), then in all of its functions' strings and
+    finally in the strings stored after it. Drivers no string names get
+    their label from their sensors' names, and I2C temperature drivers at
+    LM75_ADDRESSES the chip LM75.
+    """
+    sensors = sensors or {}
+    seeds = set(seeds)
+    drivers = {}
+    for seg_vaddr, seg_offset, seg_filesz, seg_flags in segments:
+        if seg_flags & PF_X:
+            continue
+        run_start = None
+        run = []
+        for i in range(0, seg_filesz - 3, 4):
+            vaddr = seg_vaddr + i
+            ptr = struct.unpack_from('<I', data, seg_offset + i)[0]
+            is_code = _is_code_pointer(ptr, code_ranges)
+            if run and (not is_code or vaddr in seeds or len(run) >= MAX_VTABLE_SLOTS):
+                if len(run) >= MIN_VTABLE_SLOTS or run_start in seeds:
+                    drivers[run_start] = run
+                run_start, run = None, []
+            if is_code:
+                if run_start is None:
+                    run_start = vaddr
+                run.append(ptr)
+        if len(run) >= MIN_VTABLE_SLOTS:
+            drivers[run_start] = run
+
+    func_starts = sorted({p & ~1 for slots in drivers.values() for p in slots})
+
+    def func_end(ptr):
+        i = func_starts.index(ptr & ~1)
+        return func_starts[i + 1] if i + 1 < len(func_starts) else (ptr & ~1) + 1024
+
+    users = {}
+    for slots in drivers.values():
+        for p in set(slots):
+            users[p] = users.get(p, 0) + 1
+
+    catalogue = {}
+    for vaddr, slots in drivers.items():
+        slot_strings = [_strings_referenced_by(data, segments, p, func_end(p)) for p in slots]
+        nearby = _strings_near(data, segments, vaddr)
+        chip = None
+        for s in [s for strings in slot_strings for s in strings] + nearby:
+            m = CHIP_RE.search(s)
+            if m:
+                chip = m.group(1)
+                break
+        # Only keep anonymous runs when the tables actually point at them
+        if chip is None and vaddr not in seeds:
+            continue
+        own = [s for p, strings in zip(slots, slot_strings) if users[p] == 1 for s in strings]
+        used_by = sensors.get(vaddr, [])
+        func = _table_role(used_by) or _role(own, [s for strings in slot_strings for s in strings], nearby)
+        label = _table_label(used_by, chip, func)
+        if chip is None and func == "I2CTEMP" and used_by \
+                and all(s["dev_addr"] >> 1 in LM75_ADDRESSES for s in used_by):
+            chip = "LM75"
+        name = f"{chip or 'unknown'}_{func}_driver@0x{vaddr:08X}" if func \
+            else f"{chip or 'unknown'}_driver@0x{vaddr:08X}"
+        entry = _describe(name, chip=chip, func=func, label=label)
+        entry["source"] = "strings"
+        entry["functions"] = [
+            {"vaddr": f"0x{p:08X}", "name": _identifier(strings)}
+            for p, strings in zip(slots, slot_strings)
+        ]
+        catalogue[vaddr] = entry
+    return catalogue
+
+
+def table_driver_pointers(base=BASE):
+    """Collect every driver pointer referenced by IO_fl.bin and IS_fl.bin."""
+    seeds = set()
+    path = os.path.join(base, "IS_fl.bin")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        total = data[2] + data[3]
+        for i in range(total):
+            off = 4 + i * 22
+            if off + 22 <= len(data):
+                seeds.add(struct.unpack_from('<I', data, off + 18)[0])
+    path = os.path.join(base, "IO_fl.bin")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        entry_start = 4 + 37 * 4
+        for off in range(entry_start, len(data) - 11, 12):
+            seeds.add(struct.unpack_from('<I', data, off + 6)[0])
+    seeds.discard(0)
+    return seeds
+
+
+def table_sensors(base=BASE):
+    """Map each IS_fl.bin driver pointer to the sensors it reads.
+
+    Returns {vtable_vaddr: [{"sensor", "analog", "dev_addr", "type",
+    "name"}]}, with the SDR sensor type and ID string taken from
+    NVRAM_SDR00.dat (type None and name "" for sensors it lacks).
+    """
+    path = os.path.join(base, "IS_fl.bin")
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'rb') as f:
+        is_fl = f.read()
+
+    sdr = {}
+    path = os.path.join(base, "NVRAM_SDR00.dat")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        off = 0
+        while off + 5 <= len(data):
+            rec_type, rec_len = data[off + 3], data[off + 4]
+            if rec_len == 0 or off + 5 + rec_len > len(data):
+                break
+            body = data[off + 5:off + 5 + rec_len]
+            # Full and compact records: ID string length in the byte before it
+            name_at = {0x01: 43, 0x02: 21}.get(rec_type)
+            if name_at is not None and len(body) >= name_at:
+                name = body[name_at:name_at + (body[name_at - 1] & 0x1F)]
+                sdr.setdefault(body[2], (body[7], name.decode('ascii', errors='replace').strip()))
+            off += 5 + rec_len
+
+    analog = is_fl[2]
+    by_driver = {}
+    for i in range(is_fl[2] + is_fl[3]):
+        off = 4 + i * 22
+        if off + 22 > len(is_fl):
+            break
+        sensor_type, name = sdr.get(is_fl[off], (None, ""))
+        by_driver.setdefault(struct.unpack_from('<I', is_fl, off + 18)[0], []).append({
+            "sensor": is_fl[off], "analog": i < analog, "dev_addr": is_fl[off + 14],
+            "type": sensor_type, "name": name})
+    by_driver.pop(0, None)
+    return by_driver
+
+
+def build_catalogue(data, seeds=(), sensors=None):
+    """Discover all driver vtables in a fullfw image."""
+    segments = read_elf_segments(data)
+    code_ranges = [(v, v + sz) for v, _, sz, flags in segments if flags & PF_X]
+    symbols = read_elf_symbols(data)
+    catalogue = discover_from_symbols(data, segments, code_ranges, symbols)
+    if not catalogue:
+        catalogue = discover_heuristic(data, segments, code_ranges, seeds, sensors)
+    return catalogue
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_catalogue(fullfw=FULLFW, cache=CATALOGUE, rebuild=False):
+    """Return {vtable_vaddr: driver_info}, building the cache if needed.
+
+    The cache is reused as long as its recorded SHA-256 matches fullfw
+    and it was written by the current CATALOGUE_VERSION.
+    If fullfw has not been extracted an existing cache is used as-is; if
+    neither exists an empty catalogue is returned.
+    """
+    cached = None
+    if os.path.exists(cache):
+        with open(cache) as f:
+            cached = json.load(f)
+
+    if not os.path.exists(fullfw):
+        if cached is None:
+            return {}
+        return {int(k, 16): v for k, v in cached["drivers"].items()}
+
+    digest = _sha256(fullfw)
+    if cached is not None and cached.get("sha256") == digest \
+            and cached.get("version") == CATALOGUE_VERSION and not rebuild:
+        return {int(k, 16): v for k, v in cached["drivers"].items()}
+
+    with open(fullfw, 'rb') as f:
+        data = f.read()
+    catalogue = build_catalogue(data, table_driver_pointers(), table_sensors())
+
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    with open(cache, 'w') as f:
+        json.dump({
+            "version": CATALOGUE_VERSION,
+            "sha256": digest,
+            "fullfw": fullfw,
+            "drivers": {f"0x{k:08X}": v for k, v in sorted(catalogue.items())},
+        }, f, indent=2)
+    return catalogue
+
+
+def find_driver(catalogue, chip, func=None):
+    """Return the vaddr of the first driver matching chip (and func), or None."""
+    for vaddr, info in sorted(catalogue.items()):
+        if (info.get("chip") or "").upper() != chip.upper():
+            continue
+        if func is None or info.get("func") == func:
+            return vaddr
+    return None
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if not os.path.exists(FULLFW):
+        print(f"ERROR: {FULLFW} not found (run extract_firmware.py first)")
+        sys.exit(1)
+
+    catalogue = load_catalogue(rebuild='--rebuild' in sys.argv)
+    seeds = table_driver_pointers()
+
+    print(f"Driver catalogue for {FULLFW}: {len(catalogue)} vtables")
+    print(f"  {'Vtable':>10s} {'Slots':>5s} {'Source':>7s}  Name")
+    for vaddr, info in sorted(catalogue.items()):
+        used = "*" if vaddr in seeds else " "
+        print(f" {used}0x{vaddr:08X} {len(info['functions']):5d} {info['source']:>7s}  {info['name']}")
+        for i, func in enumerate(info["functions"]):
+            print(f"      [{i}] {func['vaddr']} {func['name']}")
+
+    missing = sorted(seeds - set(catalogue))
+    if missing:
+        print("\n  Driver pointers referenced by the IO tables but not catalogued:")
+        for vaddr in missing:
+            print(f"    0x{vaddr:08X}")
+    print(f"\n  (* = referenced by IO_fl.bin/IS_fl.bin) cached in {CATALOGUE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,926 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""Stand-in C410X BMCs speaking IPMI over LAN (RMCP / RMCP+).
+
+Serves the BMC's own tables out of the extracted firmware, so management
+software can be load-tested against many "C410X BMCs" on one host:
+
+  - Get Device ID answers with ID_devid.bin
+  - the SDR repository (Get SDR Repository Info / Reserve / Get SDR,
+    partial reads included) is NVRAM_SDR00.dat, split by decode_sdr()
+  - FRU 0 (Get FRU Inventory Area Info / Read FRU Data) is NVRAM_FRU00.dat
+  - Get Sensor Reading and Get Sensor Thresholds cover every IS_fl.bin
+    sensor (and every SDR sensor record). Readings are synthetic: they
+    wander around the middle of the SDR thresholds, with a different
+    phase per BMC, and the threshold status bits follow.
+
+Sessions work the way ipmitool expects:
+
+  - IPMI 1.5 (ipmitool -I lan): Get Channel Authentication Capabilities,
+    Get Session Challenge, Activate Session, auth types none, MD5 and
+    straight password
+  - IPMI 2.0 / RMCP+ (ipmitool -I lanplus): Open Session and RAKP 1-4
+    with cipher suites 0, 1 and 2 (RAKP-HMAC-SHA1, HMAC-SHA1-96
+    integrity). Suite 3 needs AES-CBC, which the standard library does
+    not have, so it is not offered (Get Channel Cipher Suites says so).
+  - ASF presence ping/pong
+
+Each BMC is one UDP endpoint on its own port; one event loop runs
+hundreds of them. Requests are answered inline from precomputed tables,
+so the simulator is rarely what limits a poller.
+
+Usage:
+    python3 ipmi_lan_sim.py serve [--count 200] [--base-port 16230]
+    ipmitool -I lanplus -C 2 -H 127.0.0.1 -p 16230 -U root -P root sdr
+    python3 ipmi_lan_sim.py bench [--count 100] [--duration 5]
+    python3 ipmi_lan_sim.py bench --connect 127.0.0.1:16230 --count 200
+    python3 ipmi_lan_sim.py check
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import math
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from parse_io_tables import BASE, decode_is_fl, decode_sdr  # noqa: E402
+
+DEFAULT_BASE_PORT = 16230
+DEFAULT_USER = "root"          # oemdef.bin defaults (ANALYSIS.md, "Security Notes")
+DEFAULT_PASSWORD = "root"
+MAX_SESSIONS = 32
+SESSION_TIMEOUT = 60.0
+
+# RMCP
+RMCP_VERSION = 0x06
+RMCP_NO_ACK = 0xFF
+RMCP_CLASS_ASF = 0x06
+RMCP_CLASS_IPMI = 0x07
+ASF_IANA = 4542
+ASF_PING = 0x80
+ASF_PONG = 0x40
+
+# Session header auth types
+AUTH_NONE = 0
+AUTH_MD5 = 2
+AUTH_PASSWORD = 4
+AUTH_RMCPP = 6
+SUPPORTED_AUTH = (AUTH_NONE, AUTH_MD5, AUTH_PASSWORD)
+
+# RMCP+ payload types
+PAYLOAD_IPMI = 0x00
+PAYLOAD_OPEN_SESSION_REQUEST = 0x10
+PAYLOAD_OPEN_SESSION_RESPONSE = 0x11
+PAYLOAD_RAKP1 = 0x12
+PAYLOAD_RAKP2 = 0x13
+PAYLOAD_RAKP3 = 0x14
+PAYLOAD_RAKP4 = 0x15
+PAYLOAD_ENCRYPTED = 0x80
+PAYLOAD_AUTHENTICATED = 0x40
+
+# RMCP+ status codes (IPMI 2.0 table 13-15)
+RMCPP_OK = 0x00
+RMCPP_NO_RESOURCES = 0x01
+RMCPP_INVALID_SESSION = 0x02
+RMCPP_INVALID_AUTH_ALG = 0x04
+RMCPP_INVALID_INTEGRITY_ALG = 0x05
+RMCPP_INVALID_ROLE = 0x09
+RMCPP_UNAUTHORIZED_NAME = 0x0D
+RMCPP_INVALID_ICV = 0x0F
+RMCPP_INVALID_CONFIDENTIALITY_ALG = 0x10
+
+# Cipher suites offered: id -> (authentication, integrity, confidentiality)
+CIPHER_SUITES = {0: (0, 0, 0), 1: (1, 0, 0), 2: (1, 1, 0)}
+HMAC_SHA1_96 = 12
+
+# Network functions and completion codes
+NETFN_CHASSIS = 0x00
+NETFN_SENSOR = 0x04
+NETFN_APP = 0x06
+NETFN_STORAGE = 0x0A
+CC_OK = 0x00
+CC_NO_SESSION_SLOT = 0x81
+CC_INVALID_COMMAND = 0xC1
+CC_TIMEOUT = 0xC3
+CC_INVALID_RESERVATION = 0xC5
+CC_REQUEST_LENGTH = 0xC7
+CC_NOT_PRESENT = 0xCB
+CC_INVALID_FIELD = 0xCC
+CC_INSUFFICIENT_PRIVILEGE = 0xD4
+
+BMC_ADDRESS = 0x20
+PRIV_ADMIN = 4
+# Sensor readings wander over this many seconds
+READING_PERIOD = 120.0
+
+# Full Sensor Record body offsets (IPMI 2.0 table 43-1, byte number - 6)
+SDR_SENSOR_NUMBER = 2
+SDR_EVENT_TYPE = 8
+SDR_READABLE_MASK = 13   # byte 19; byte 20 is the settable mask
+SDR_THRESHOLDS = 31    # UNR, UC, UNC, LNR, LC, LNC
+SDR_FULL = 0x01
+SDR_COMPACT = 0x02
+EVENT_TYPE_THRESHOLD = 0x01
+
+
+def _checksum(data: bytes) -> int:
+    return -sum(data) & 0xFF
+
+
+def _pad(secret: str, length: int) -> bytes:
+    return secret.encode()[:length].ljust(length, b"\0")
+
+
+def _md5_authcode(password: bytes, session_id: int, message: bytes, seq: int) -> bytes:
+    return hashlib.md5(password + struct.pack("<I", session_id) + message
+                       + struct.pack("<I", seq) + password).digest()
+
+
+def _hmac_sha1(key: bytes, data: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha1).digest()
+
+
+def ipmi_request(netfn: int, cmd: int, data: bytes = b"", seq: int = 0, rq_addr: int = 0x81) -> bytes:
+    """An IPMB-format request to the BMC (rsSA 0x20, LUN 0)."""
+    head = bytes((BMC_ADDRESS, netfn << 2))
+    body = bytes((rq_addr, seq << 2, cmd)) + data
+    return head + bytes((_checksum(head),)) + body + bytes((_checksum(body),))
+
+
+def _ipmi_response(request: bytes, cc: int, data: bytes = b"") -> bytes:
+    head = bytes((request[3], (request[1] | 0x04) & 0xFC | request[4] & 0x03))
+    body = bytes((BMC_ADDRESS, request[4] & 0xFC, request[5], cc)) + data
+    return head + bytes((_checksum(head),)) + body + bytes((_checksum(body),))
+
+
+# ---------------------------------------------------------------------------
+# Tables
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SensorModel:
+    """What a sensor reports; readings are base + amplitude * sin(...)."""
+
+    number: int
+    threshold: bool
+    base: float = 0x60
+    amplitude: float = 4.0
+    readable: int = 0
+    thresholds: tuple[int, ...] = (0, 0, 0, 0, 0, 0)   # LNC, LC, LNR, UNC, UC, UNR
+
+    def status(self, raw: int) -> int:
+        """Threshold comparison status bits for a raw reading."""
+        lnc, lc, lnr, unc, uc, unr = self.thresholds
+        bits = 0
+        for bit, limit, low in ((0, lnc, True), (1, lc, True), (2, lnr, True),
+                                (3, unc, False), (4, uc, False), (5, unr, False)):
+            if self.readable >> bit & 1 and (raw <= limit if low else raw >= limit):
+                bits |= 1 << bit
+        return bits
+
+
+@dataclass
+class BmcProfile:
+    """The firmware tables every virtual BMC serves (shared, read-only)."""
+
+    device_id: bytes
+    sdr: list[bytes]
+    sdr_ids: list[int]
+    fru: bytes
+    sensors: dict[int, SensorModel]
+
+    @classmethod
+    def from_tables(cls, devid: bytes, sdr_data: bytes, fru: bytes, is_fl: bytes) -> "BmcProfile":
+        records = decode_sdr(sdr_data)
+        sensors: dict[int, SensorModel] = {}
+        for record in records:
+            body = record["raw"][5:]
+            if record["type"] not in (SDR_FULL, SDR_COMPACT) or len(body) <= SDR_EVENT_TYPE:
+                continue
+            model = SensorModel(body[SDR_SENSOR_NUMBER], body[SDR_EVENT_TYPE] == EVENT_TYPE_THRESHOLD)
+            if model.threshold and record["type"] == SDR_FULL and len(body) > SDR_THRESHOLDS + 5:
+                unr, uc, unc, lnr, lc, lnc = body[SDR_THRESHOLDS:SDR_THRESHOLDS + 6]
+                model.thresholds = (lnc, lc, lnr, unc, uc, unr)
+                model.readable = body[SDR_READABLE_MASK] & 0x3F
+                if model.readable & 0x09 == 0x09 and lnc < unc:
+                    model.base = (lnc + unc) / 2
+                    model.amplitude = max(1.0, (unc - lnc) / 8)
+            sensors.setdefault(model.number, model)
+        for s in decode_is_fl(is_fl):
+            if s["sensor"] not in sensors:
+                sensors[s["sensor"]] = SensorModel(s["sensor"], s["analog"])
+        return cls(
+            device_id=devid[:15].ljust(11, b"\0"),
+            sdr=[record["raw"] for record in records],
+            sdr_ids=[record["record_id"] for record in records],
+            fru=fru,
+            sensors=sensors,
+        )
+
+
+def check_sensor_model() -> list[str]:
+    """Decode a made-up Full Sensor Record and check what its sensor reports.
+
+    Needs no extracted tables. Returns the failures (empty when all is well).
+    """
+    # Laid out by the spec's byte numbers rather than the SDR_* offsets,
+    # so that a wrong offset shows up here
+    record = bytearray(48)
+    record[0:5] = struct.pack("<HBBB", 1, 0x51, SDR_FULL, len(record) - 5)
+    record[8 - 1] = 0x42                    # sensor number
+    record[14 - 1] = EVENT_TYPE_THRESHOLD   # event/reading type code
+    record[19 - 1] = 0x3F                   # readable threshold mask
+    record[20 - 1] = 0x3F                   # settable threshold mask
+    record[37 - 1:43 - 1] = bytes((0xA0, 0x90, 0x80, 0x10, 0x20, 0x30))  # UNR .. LNC
+    profile = BmcProfile.from_tables(b"", bytes(record), b"", bytes(4))
+    sensor = profile.sensors[0x42]
+
+    failures = []
+    if sensor.readable != 0x3F:
+        failures.append(f"readable mask 0x{sensor.readable:02X}, expected 0x3F")
+    if sensor.thresholds != (0x30, 0x20, 0x10, 0x80, 0x90, 0xA0):
+        failures.append(f"thresholds {sensor.thresholds}")
+    if sensor.base != 0x58:
+        failures.append(f"readings centre on {sensor.base:g}, expected 0x58 (88) between LNC and UNC")
+    for raw, bits in ((0x58, 0x00), (0x30, 0x01), (0x18, 0x03), (0x08, 0x07),
+                      (0x80, 0x08), (0x95, 0x18), (0xB0, 0x38)):
+        if sensor.status(raw) != bits:
+            failures.append(f"status(0x{raw:02X}) = 0x{sensor.status(raw):02X}, expected 0x{bits:02X}")
+    return failures
+
+
+def load_profile(base: str = BASE) -> BmcProfile:
+    """Profile from the extracted evb/ tables (run extract_firmware.py first)."""
+    def read(name: str) -> bytes:
+        with open(os.path.join(base, name), "rb") as f:
+            return f.read()
+
+    return BmcProfile.from_tables(read("ID_devid.bin"), read("NVRAM_SDR00.dat"),
+                                  read("NVRAM_FRU00.dat"), read("IS_fl.bin"))
+
+
+# ---------------------------------------------------------------------------
+# BMC
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Session:
+    id: int
+    auth_type: int                      # AUTH_* for 1.5, AUTH_RMCPP for 2.0
+    remote_id: int = 0                  # console's session ID (RMCP+)
+    privilege: int = PRIV_ADMIN
+    active: bool = False
+    challenge: bytes = b""
+    out_seq: int = 1
+    last_seen: float = 0.0
+    # RMCP+ handshake state and keys
+    suite: tuple[int, int, int] = (0, 0, 0)
+    rm: bytes = b""
+    rc: bytes = b""
+    role: int = 0
+    username: bytes = b""
+    sik: bytes = b""
+    k1: bytes = b""
+
+
+@dataclass
+class BmcStats:
+    packets: int = 0
+    requests: int = 0
+    sessions: int = 0
+    errors: int = 0
+    dropped: int = 0
+    by_command: dict[tuple[int, int], int] = field(default_factory=dict)
+
+
+class VirtualBmc(asyncio.DatagramProtocol):
+    """One stand-in BMC: a UDP endpoint with its own sessions and readings.
+
+    Args:
+        profile: Firmware tables to serve.
+        index: BMC number; changes the GUID and the reading phases.
+        user, password: The one account that can log in.
+    """
+
+    def __init__(self, profile: BmcProfile, index: int = 0, user: str = DEFAULT_USER,
+                 password: str = DEFAULT_PASSWORD) -> None:
+        self.profile = profile
+        self.index = index
+        self.user = user.encode()
+        self.password16 = _pad(password, 16)
+        self.password20 = _pad(password, 20)
+        self.guid = struct.pack("<IHH", 0x43343130, 0xD311, index & 0xFFFF) + os.urandom(8)
+        self.sessions: dict[int, Session] = {}
+        self.reservation = 0
+        self.stats = BmcStats()
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._phase = {n: (index * 7919 + n * 104729) % 1000 / 1000 * 2 * math.pi
+                       for n in profile.sensors}
+        self.commands: dict[tuple[int, int], Callable[[Optional[Session], bytes], tuple[int, bytes]]] = {
+            (NETFN_APP, 0x01): self.get_device_id,
+            (NETFN_APP, 0x37): self.get_system_guid,
+            (NETFN_APP, 0x38): self.get_channel_auth_caps,
+            (NETFN_APP, 0x39): self.get_session_challenge,
+            (NETFN_APP, 0x3A): self.activate_session,
+            (NETFN_APP, 0x3B): self.set_session_privilege,
+            (NETFN_APP, 0x3C): self.close_session,
+            (NETFN_APP, 0x54): self.get_channel_cipher_suites,
+            (NETFN_CHASSIS, 0x01): self.get_chassis_status,
+            (NETFN_SENSOR, 0x27): self.get_sensor_thresholds,
+            (NETFN_SENSOR, 0x2D): self.get_sensor_reading,
+            (NETFN_STORAGE, 0x10): self.get_fru_area_info,
+            (NETFN_STORAGE, 0x11): self.read_fru_data,
+            (NETFN_STORAGE, 0x20): self.get_sdr_repository_info,
+            (NETFN_STORAGE, 0x22): self.reserve_sdr_repository,
+            (NETFN_STORAGE, 0x23): self.get_sdr,
+            (NETFN_STORAGE, 0x40): self.get_sel_info,
+        }
+
+    # -- transport ----------------------------------------------------------
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, packet: bytes, addr: tuple) -> None:
+        self.stats.packets += 1
+        try:
+            reply = self.handle_packet(packet)
+        except (IndexError, struct.error, ValueError):
+            reply = None
+        if reply is None:
+            self.stats.dropped += 1
+        else:
+            self.transport.sendto(reply, addr)
+
+    def handle_packet(self, packet: bytes) -> Optional[bytes]:
+        """Answer one RMCP datagram; None means drop it."""
+        if len(packet) < 5 or packet[0] != RMCP_VERSION:
+            return None
+        rmcp_class = packet[3] & 0x1F
+        if rmcp_class == RMCP_CLASS_ASF:
+            return self._asf(packet)
+        if rmcp_class != RMCP_CLASS_IPMI:
+            return None
+        if packet[4] == AUTH_RMCPP:
+            return self._rmcpp(packet)
+        return self._ipmi15(packet)
+
+    def _asf(self, packet: bytes) -> Optional[bytes]:
+        iana, msg_type, tag = struct.unpack_from(">IBB", packet, 4)
+        if iana != ASF_IANA or msg_type != ASF_PING:
+            return None
+        pong = struct.pack(">IIBB6x", ASF_IANA, 0, 0x81, 0x00)
+        return packet[:4] + struct.pack(">IBBBB", ASF_IANA, ASF_PONG, tag, 0, len(pong)) + pong
+
+    # -- IPMI 1.5 sessions --------------------------------------------------
+
+    def _ipmi15(self, packet: bytes) -> Optional[bytes]:
+        auth_type, seq, sid = struct.unpack_from("<BII", packet, 4)
+        pos = 13
+        authcode = b""
+        if auth_type != AUTH_NONE:
+            authcode = packet[pos:pos + 16]
+            pos += 16
+        length = packet[pos]
+        message = packet[pos + 1:pos + 1 + length]
+        if len(message) != length or length < 7:
+            return None
+
+        session = None
+        if sid:
+            session = self.sessions.get(sid)
+            if session is None or session.auth_type != auth_type:
+                return None
+            if not hmac.compare_digest(self._authcode15(auth_type, sid, message, seq), authcode):
+                self.stats.errors += 1
+                return None
+            session.last_seen = time.monotonic()
+
+        active = session is not None and session.active
+        cc, data = self._dispatch(session, message)
+        response = _ipmi_response(message, cc, data)
+        out_seq = 0
+        if active:
+            # The Activate Session response itself still goes out with 0
+            out_seq = session.out_seq
+            session.out_seq = (session.out_seq + 1) & 0xFFFFFFFF or 1
+        out_type = session.auth_type if session is not None else AUTH_NONE
+        head = packet[:4] + struct.pack("<BII", out_type, out_seq, sid)
+        if out_type != AUTH_NONE:
+            head += self._authcode15(out_type, sid, response, out_seq)
+        return head + bytes((len(response),)) + response
+
+    def _authcode15(self, auth_type: int, sid: int, message: bytes, seq: int) -> bytes:
+        if auth_type == AUTH_MD5:
+            return _md5_authcode(self.password16, sid, message, seq)
+        if auth_type == AUTH_PASSWORD:
+            return self.password16
+        return b""
+
+    def _new_session(self, auth_type: int) -> Optional[Session]:
+        now = time.monotonic()
+        for sid in [sid for sid, s in self.sessions.items() if now - s.last_seen > SESSION_TIMEOUT]:
+            del self.sessions[sid]
+        if len(self.sessions) >= MAX_SESSIONS:
+            return None
+        sid = 0
+        while sid == 0 or sid in self.sessions:
+            sid = struct.unpack("<I", os.urandom(4))[0]
+        session = self.sessions[sid] = Session(sid, auth_type, last_seen=now)
+        return session
+
+    # -- RMCP+ --------------------------------------------------------------
+
+    def _rmcpp(self, packet: bytes) -> Optional[bytes]:
+        payload_type, sid, seq, length = struct.unpack_from("<BIIH", packet, 5)
+        payload = packet[16:16 + length]
+        if len(payload) != length or payload_type & PAYLOAD_ENCRYPTED:
+            return None
+        kind = payload_type & 0x3F
+        if kind == PAYLOAD_OPEN_SESSION_REQUEST:
+            return self._rmcpp_packet(packet, PAYLOAD_OPEN_SESSION_RESPONSE, 0, self._open_session(payload))
+        if kind == PAYLOAD_RAKP1:
+            return self._rmcpp_packet(packet, PAYLOAD_RAKP2, 0, self._rakp1(payload))
+        if kind == PAYLOAD_RAKP3:
+            return self._rmcpp_packet(packet, PAYLOAD_RAKP4, 0, self._rakp3(payload))
+        if kind != PAYLOAD_IPMI:
+            return None
+
+        session = self.sessions.get(sid)
+        if session is None or not session.active or session.auth_type != AUTH_RMCPP:
+            return None
+        if session.suite[1]:
+            if not payload_type & PAYLOAD_AUTHENTICATED or len(packet) < 16 + length + 2 + HMAC_SHA1_96:
+                return None
+            signed = packet[4:-HMAC_SHA1_96]
+            if not hmac.compare_digest(_hmac_sha1(session.k1, signed)[:HMAC_SHA1_96],
+                                       packet[-HMAC_SHA1_96:]):
+                self.stats.errors += 1
+                return None
+        session.last_seen = time.monotonic()
+        if len(payload) < 7:
+            return None
+        cc, data = self._dispatch(session, payload)
+        out_seq = session.out_seq
+        session.out_seq = (session.out_seq + 1) & 0xFFFFFFFF or 1
+        return self._rmcpp_packet(packet, PAYLOAD_IPMI, session.remote_id,
+                                  _ipmi_response(payload, cc, data), session, out_seq)
+
+    def _rmcpp_packet(self, request: bytes, payload_type: int, sid: int, payload: Optional[bytes],
+                      session: Optional[Session] = None, seq: int = 0) -> Optional[bytes]:
+        if payload is None:
+            return None
+        integrity = session is not None and session.suite[1]
+        if integrity:
+            payload_type |= PAYLOAD_AUTHENTICATED
+        out = bytearray(request[:4])
+        out += struct.pack("<BBIIH", AUTH_RMCPP, payload_type, sid, seq, len(payload)) + payload
+        if integrity:
+            # Pad so AuthType .. Next Header is a whole number of dwords
+            pad = -(len(out) - 4 + 2) % 4
+            out += b"\xff" * pad + bytes((pad, RMCP_CLASS_IPMI))
+            out += _hmac_sha1(session.k1, bytes(out[4:]))[:HMAC_SHA1_96]
+        return bytes(out)
+
+    def _open_session(self, payload: bytes) -> Optional[bytes]:
+        if len(payload) < 32:
+            return None
+        tag, role = payload[0], payload[1]
+        remote_id = struct.unpack_from("<I", payload, 4)[0]
+        algs = (payload[12], payload[20], payload[28])
+
+        def reply(status: int, sid: int = 0) -> bytes:
+            out = struct.pack("<BBBxII", tag, status, role or PRIV_ADMIN, remote_id, sid)
+            if status == RMCPP_OK:
+                out += b"".join(struct.pack("<BxxBB3x", kind, 8, alg) for kind, alg in enumerate(algs))
+            return out
+
+        if algs not in CIPHER_SUITES.values():
+            if algs[2] != 0:
+                return reply(RMCPP_INVALID_CONFIDENTIALITY_ALG)
+            return reply(RMCPP_INVALID_AUTH_ALG if algs[0] > 1 else RMCPP_INVALID_INTEGRITY_ALG)
+        if role & 0x0F > PRIV_ADMIN:
+            return reply(RMCPP_INVALID_ROLE)
+        session = self._new_session(AUTH_RMCPP)
+        if session is None:
+            return reply(RMCPP_NO_RESOURCES)
+        session.remote_id = remote_id
+        session.suite = algs
+        self.stats.sessions += 1
+        return reply(RMCPP_OK, session.id)
+
+    def _rakp1(self, payload: bytes) -> Optional[bytes]:
+        if len(payload) < 28:
+            return None
+        tag = payload[0]
+        sid = struct.unpack_from("<I", payload, 4)[0]
+        session = self.sessions.get(sid)
+        if session is None or session.auth_type != AUTH_RMCPP:
+            return struct.pack("<BBxxI", tag, RMCPP_INVALID_SESSION, 0)
+        session.rm = payload[8:24]
+        session.role = payload[24]
+        session.username = payload[28:28 + payload[27]]
+        if session.username and session.username != self.user:
+            del self.sessions[sid]
+            return struct.pack("<BBxxI", tag, RMCPP_UNAUTHORIZED_NAME, session.remote_id)
+        session.rc = os.urandom(16)
+        out = struct.pack("<BBxxI", tag, RMCPP_OK, session.remote_id) + session.rc + self.guid
+        if session.suite[0]:
+            out += _hmac_sha1(self.password20, struct.pack("<II", session.remote_id, session.id)
+                              + session.rm + session.rc + self.guid
+                              + bytes((session.role, len(session.username))) + session.username)
+        return out
+
+    def _rakp3(self, payload: bytes) -> Optional[bytes]:
+        if len(payload) < 8:
+            return None
+        tag, status = payload[0], payload[1]
+        sid = struct.unpack_from("<I", payload, 4)[0]
+        session = self.sessions.get(sid)
+        if session is None or not session.rc:
+            return struct.pack("<BBxxI", tag, RMCPP_INVALID_SESSION, 0)
+        tail = bytes((session.role, len(session.username))) + session.username
+        if status != RMCPP_OK:
+            del self.sessions[sid]
+            return None
+        if session.suite[0]:
+            expected = _hmac_sha1(self.password20, session.rc + struct.pack("<I", session.remote_id) + tail)
+            if not hmac.compare_digest(expected, payload[8:28]):
+                del self.sessions[sid]
+                self.stats.errors += 1
+                return struct.pack("<BBxxI", tag, RMCPP_INVALID_ICV, session.remote_id)
+            session.sik = _hmac_sha1(self.password20, session.rm + session.rc + tail)
+            session.k1 = _hmac_sha1(session.sik, b"\x01" * 20)
+        session.active = True
+        session.privilege = session.role & 0x0F or PRIV_ADMIN
+        out = struct.pack("<BBxxI", tag, RMCPP_OK, session.remote_id)
+        if session.suite[0]:
+            out += _hmac_sha1(session.sik, session.rm + struct.pack("<I", session.id)
+                              + self.guid)[:HMAC_SHA1_96]
+        return out
+
+    # -- IPMI commands ------------------------------------------------------
+
+    def _dispatch(self, session: Optional[Session], message: bytes) -> tuple[int, bytes]:
+        key = (message[1] >> 2, message[5])
+        self.stats.requests += 1
+        self.stats.by_command[key] = self.stats.by_command.get(key, 0) + 1
+        handler = self.commands.get(key)
+        if handler is None:
+            return CC_INVALID_COMMAND, b""
+        if session is None and key not in ((NETFN_APP, 0x38), (NETFN_APP, 0x39), (NETFN_APP, 0x54)):
+            return CC_INSUFFICIENT_PRIVILEGE, b""
+        if session is not None and not session.active and key != (NETFN_APP, 0x3A):
+            return CC_INSUFFICIENT_PRIVILEGE, b""
+        return handler(session, message[6:-1])
+
+    def get_device_id(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        return CC_OK, self.profile.device_id
+
+    def get_system_guid(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        return CC_OK, self.guid
+
+    def get_channel_auth_caps(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if len(data) < 2:
+            return CC_REQUEST_LENGTH, b""
+        v2 = bool(data[0] & 0x80)
+        types = sum(1 << t for t in SUPPORTED_AUTH) | (0x80 if v2 else 0)
+        # Non-null user names only; IPMI 1.5 and 2.0 connections when asked
+        return CC_OK, bytes((1, types, 0x04, 0x03 if v2 else 0x00, 0, 0, 0, 0))
+
+    def get_session_challenge(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if len(data) < 17:
+            return CC_REQUEST_LENGTH, b""
+        if data[0] not in SUPPORTED_AUTH:
+            return CC_INVALID_FIELD, b""
+        if data[1:17].rstrip(b"\0") != self.user:
+            return 0x81 if data[1:17].strip(b"\0") else 0x82, b""   # invalid / null user name
+        session = self._new_session(data[0])
+        if session is None:
+            return CC_NO_SESSION_SLOT, b""
+        session.challenge = os.urandom(16)
+        return CC_OK, struct.pack("<I", session.id) + session.challenge
+
+    def activate_session(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if session is None or len(data) < 22:
+            return CC_REQUEST_LENGTH, b""
+        if not hmac.compare_digest(data[2:18], session.challenge):
+            return 0x84, b""                                        # invalid session ID/challenge
+        session.active = True
+        session.privilege = data[1] & 0x0F or PRIV_ADMIN
+        self.stats.sessions += 1
+        return CC_OK, struct.pack("<BIIB", session.auth_type, session.id, session.out_seq,
+                                  session.privilege)
+
+    def set_session_privilege(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if data and data[0] & 0x0F:
+            if data[0] & 0x0F > PRIV_ADMIN:
+                return 0x81, b""                                    # requested level not available
+            session.privilege = data[0] & 0x0F
+        return CC_OK, bytes((session.privilege,))
+
+    def close_session(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        sid = struct.unpack_from("<I", data)[0] if len(data) >= 4 else session.id
+        if self.sessions.pop(sid or session.id, None) is None:
+            return 0x87, b""                                        # invalid session ID
+        return CC_OK, b""
+
+    def get_channel_cipher_suites(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if len(data) < 3:
+            return CC_REQUEST_LENGTH, b""
+        records = b"".join(bytes((0xC0, suite, auth, 0x40 | integ, 0x80 | conf))
+                           for suite, (auth, integ, conf) in CIPHER_SUITES.items())
+        index = data[2] & 0x3F
+        return CC_OK, bytes((1,)) + records[16 * index:16 * index + 16]
+
+    def get_chassis_status(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        return CC_OK, bytes((0x01, 0x00, 0x00))                     # power on, no faults
+
+    def reading(self, sensor: SensorModel, now: Optional[float] = None) -> int:
+        """The sensor's raw reading at ``now``; each BMC has its own phase."""
+        t = time.monotonic() if now is None else now
+        raw = sensor.base + sensor.amplitude * math.sin(
+            2 * math.pi * t / READING_PERIOD + self._phase[sensor.number])
+        return min(255, max(0, int(raw)))
+
+    def get_sensor_reading(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if not data:
+            return CC_REQUEST_LENGTH, b""
+        sensor = self.profile.sensors.get(data[0])
+        if sensor is None:
+            return CC_NOT_PRESENT, b""
+        if not sensor.threshold:
+            return CC_OK, b"\x00\xc0\x00\x80"                       # no states asserted
+        raw = self.reading(sensor)
+        return CC_OK, bytes((raw, 0xC0, 0xC0 | sensor.status(raw)))
+
+    def get_sensor_thresholds(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if not data:
+            return CC_REQUEST_LENGTH, b""
+        sensor = self.profile.sensors.get(data[0])
+        if sensor is None:
+            return CC_NOT_PRESENT, b""
+        if not sensor.threshold:
+            return CC_INVALID_COMMAND, b""
+        return CC_OK, bytes((sensor.readable,)) + bytes(sensor.thresholds)
+
+    def get_fru_area_info(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if not data:
+            return CC_REQUEST_LENGTH, b""
+        if data[0] != 0:
+            return CC_NOT_PRESENT, b""
+        return CC_OK, struct.pack("<HB", len(self.profile.fru), 0)  # byte access
+
+    def read_fru_data(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if len(data) < 4:
+            return CC_REQUEST_LENGTH, b""
+        fru_id, offset, count = struct.unpack_from("<BHB", data)
+        if fru_id != 0:
+            return CC_NOT_PRESENT, b""
+        if offset >= len(self.profile.fru):
+            return CC_INVALID_FIELD, b""
+        chunk = self.profile.fru[offset:offset + count]
+        return CC_OK, bytes((len(chunk),)) + chunk
+
+    def get_sdr_repository_info(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        # SDR 1.5/2.0, no free space, no timestamps, Reserve SDR supported
+        return CC_OK, struct.pack("<BHHIIB", 0x51, len(self.profile.sdr), 0, 0, 0, 0x02)
+
+    def reserve_sdr_repository(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        self.reservation = self.reservation % 0xFFFF + 1
+        return CC_OK, struct.pack("<H", self.reservation)
+
+    def get_sdr(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        if len(data) < 6:
+            return CC_REQUEST_LENGTH, b""
+        reservation, record_id, offset, count = struct.unpack_from("<HHBB", data)
+        if offset and reservation != self.reservation:
+            return CC_INVALID_RESERVATION, b""
+        ids = self.profile.sdr_ids
+        if not ids:
+            return CC_NOT_PRESENT, b""
+        try:
+            index = 0 if record_id == 0 else ids.index(record_id)
+        except ValueError:
+            return CC_NOT_PRESENT, b""
+        next_id = ids[index + 1] if index + 1 < len(ids) else 0xFFFF
+        record = self.profile.sdr[index]
+        end = len(record) if count == 0xFF else offset + count
+        return CC_OK, struct.pack("<H", next_id) + record[offset:end]
+
+    def get_sel_info(self, session: Optional[Session], data: bytes) -> tuple[int, bytes]:
+        # Empty SEL (NVRAM_SEL00.dat ships empty)
+        return CC_OK, struct.pack("<BHHIIB", 0x51, 0, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0x02)
+
+
+async def start_bmcs(profile: BmcProfile, count: int, host: str = "127.0.0.1",
+                     base_port: int = DEFAULT_BASE_PORT, user: str = DEFAULT_USER,
+                     password: str = DEFAULT_PASSWORD) -> list[VirtualBmc]:
+    """Bind ``count`` virtual BMCs on consecutive UDP ports from ``base_port``."""
+    loop = asyncio.get_running_loop()
+    bmcs = []
+    for i in range(count):
+        _, bmc = await loop.create_datagram_endpoint(
+            lambda i=i: VirtualBmc(profile, i, user, password), local_addr=(host, base_port + i))
+        bmcs.append(bmc)
+    return bmcs
+
+
+# ---------------------------------------------------------------------------
+# Load client
+# ---------------------------------------------------------------------------
+
+class IpmiLanClient(asyncio.DatagramProtocol):
+    """Minimal IPMI 1.5 (MD5) client: one outstanding request at a time.
+
+    Enough to drive the simulator (or a real BMC) the way a sensor
+    poller does; use ipmitool for anything else.
+    """
+
+    def __init__(self, user: str, password: str, timeout: float = 1.0) -> None:
+        self.user16 = _pad(user, 16)
+        self.password16 = _pad(password, 16)
+        self.timeout = timeout
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.session_id = 0
+        self.auth_type = AUTH_NONE
+        self.seq = 0
+        self.active = False
+        self.rq_seq = 0
+        self.waiter: Optional[asyncio.Future] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, packet: bytes, addr: tuple) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(packet)
+
+    async def request(self, netfn: int, cmd: int, data: bytes = b"") -> tuple[int, bytes]:
+        """Send one command; returns (completion code, response data)."""
+        self.rq_seq = (self.rq_seq + 1) & 0x3F
+        message = ipmi_request(netfn, cmd, data, self.rq_seq)
+        if self.active:
+            self.seq = (self.seq + 1) & 0xFFFFFFFF or 1
+        head = struct.pack("<BBBBBII", RMCP_VERSION, 0, RMCP_NO_ACK, RMCP_CLASS_IPMI,
+                           self.auth_type, self.seq, self.session_id)
+        if self.auth_type == AUTH_MD5:
+            head += _md5_authcode(self.password16, self.session_id, message, self.seq)
+        self.waiter = asyncio.get_running_loop().create_future()
+        self.transport.sendto(head + bytes((len(message),)) + message)
+        try:
+            packet = await asyncio.wait_for(self.waiter, self.timeout)
+        except asyncio.TimeoutError:
+            return CC_TIMEOUT, b""
+        pos = 13 + (16 if packet[4] != AUTH_NONE else 0)
+        response = packet[pos + 1:pos + 1 + packet[pos]]
+        return response[6], response[7:-1]
+
+    async def login(self) -> None:
+        cc, data = await self.request(NETFN_APP, 0x38, bytes((0x0E, PRIV_ADMIN)))
+        if cc != CC_OK or not data[1] & (1 << AUTH_MD5):
+            raise ConnectionError(f"Get Channel Auth Capabilities failed (cc 0x{cc:02X})")
+        cc, data = await self.request(NETFN_APP, 0x39, bytes((AUTH_MD5,)) + self.user16)
+        if cc != CC_OK:
+            raise ConnectionError(f"Get Session Challenge failed (cc 0x{cc:02X})")
+        self.session_id = struct.unpack_from("<I", data)[0]
+        self.auth_type = AUTH_MD5
+        cc, data = await self.request(NETFN_APP, 0x3A, bytes((AUTH_MD5, PRIV_ADMIN)) + data[4:20]
+                                      + struct.pack("<I", 1))
+        if cc != CC_OK:
+            raise ConnectionError(f"Activate Session failed (cc 0x{cc:02X})")
+        self.session_id = struct.unpack_from("<I", data, 1)[0]
+        self.active = True
+
+    async def logout(self) -> None:
+        await self.request(NETFN_APP, 0x3C, struct.pack("<I", self.session_id))
+        self.transport.close()
+
+
+async def poll_sensors(host: str, port: int, sensors: list[int], deadline: float,
+                       user: str, password: str, latencies: list[float]) -> int:
+    """Log in and read every sensor in turn until ``deadline``; returns requests made."""
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_datagram_endpoint(
+        lambda: IpmiLanClient(user, password), remote_addr=(host, port))
+    await client.login()
+    count = 0
+    while time.monotonic() < deadline:
+        for number in sensors:
+            start = time.perf_counter()
+            cc, _ = await client.request(NETFN_SENSOR, 0x2D, bytes((number,)))
+            latencies.append(time.perf_counter() - start)
+            count += 1
+            if cc == CC_TIMEOUT:
+                break
+    await client.logout()
+    return count
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stand-in C410X BMCs over IPMI/RMCP+.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: %(default)s)")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT,
+                        help="UDP port of the first BMC (default: %(default)s)")
+    parser.add_argument("--count", type=int, default=1, help="Number of BMCs (default: %(default)s)")
+    parser.add_argument("--user", default=DEFAULT_USER)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--tables", default=os.path.join(SCRIPT_DIR, BASE),
+                        help="Directory with ID_devid.bin, NVRAM_SDR00.dat, NVRAM_FRU00.dat, IS_fl.bin")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="Run the BMCs until interrupted")
+    p = sub.add_parser("bench", help="Poll every sensor of every BMC and report the rate")
+    p.add_argument("--duration", type=float, default=5.0)
+    p.add_argument("--connect", metavar="HOST:PORT",
+                   help="Poll BMCs already running elsewhere instead of starting them here")
+    sub.add_parser("check", help="Check SDR threshold decoding on a made-up record (no tables needed)")
+    return parser.parse_args()
+
+
+def _print_stats(bmcs: list[VirtualBmc]) -> None:
+    totals = BmcStats()
+    for bmc in bmcs:
+        for name in ("packets", "requests", "sessions", "errors", "dropped"):
+            setattr(totals, name, getattr(totals, name) + getattr(bmc.stats, name))
+    print(f"[ipmi] {len(bmcs)} BMC(s): {totals.packets} packets, {totals.requests} requests, "
+          f"{totals.sessions} sessions, {totals.errors} auth errors, {totals.dropped} dropped")
+
+
+async def _serve(args: argparse.Namespace, profile: BmcProfile) -> None:
+    bmcs = await start_bmcs(profile, args.count, args.host, args.base_port, args.user, args.password)
+    print(f"[ipmi] {args.count} BMC(s) on {args.host}:{args.base_port}-{args.base_port + args.count - 1}, "
+          f"{len(profile.sensors)} sensors, {len(profile.sdr)} SDRs, {len(profile.fru)}-byte FRU")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        _print_stats(bmcs)
+
+
+async def _bench(args: argparse.Namespace, profile: BmcProfile) -> None:
+    host, port = args.host, args.base_port
+    bmcs = []
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        port = int(port)
+    else:
+        bmcs = await start_bmcs(profile, args.count, host, port, args.user, args.password)
+    sensors = sorted(profile.sensors)
+    latencies: list[float] = []
+    start = time.monotonic()
+    counts = await asyncio.gather(*(
+        poll_sensors(host, port + i, sensors, start + args.duration, args.user, args.password, latencies)
+        for i in range(args.count)))
+    elapsed = time.monotonic() - start
+    latencies.sort()
+    total = sum(counts)
+    print(f"[ipmi] {args.count} BMC(s), {total:,} Get Sensor Reading in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f}/s)")
+    if latencies:
+        print(f"[ipmi] latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    if bmcs:
+        _print_stats(bmcs)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "check":
+        failures = check_sensor_model()
+        for failure in failures:
+            print(f"[ipmi] FAIL: {failure}")
+        print(f"[ipmi] sensor model check: {'FAILED' if failures else 'ok'}")
+        sys.exit(1 if failures else 0)
+    try:
+        profile = load_profile(args.tables)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e.filename} not found (run extract_firmware.py first)", file=sys.stderr)
+        sys.exit(1)
+    try:
+        asyncio.run(_serve(args, profile) if args.command == "serve" else _bench(args, profile))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
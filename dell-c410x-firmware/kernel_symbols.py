@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""Decompress the BMC kernel and index its kallsyms symbol table.
+
+The .pec carries a gzip'd uImage at 0x258 (see ANALYSIS.md, "Kernel").
+This stream-decompresses it once into extracted/kernel/vmlinux-<hash>.bin
+(hash = SHA-256 of the compressed payload, so a new firmware version gets
+its own copy and an unchanged one is never decompressed again), checking
+the uImage data CRC on the way.
+
+The 2.6.23 kernel is built with CONFIG_KALLSYMS, so vmlinux.bin carries
+the compressed symbol tables scripts/kallsyms.c emits into .rodata, in
+this order, each aligned to at most 16 bytes:
+
+    kallsyms_addresses     u32[num_syms], sorted
+    kallsyms_num_syms      u32
+    kallsyms_names         per symbol: length byte + that many token indexes
+    kallsyms_markers       u32 offset into names of every 256th symbol
+    kallsyms_token_table   256 NUL-terminated token strings
+    kallsyms_token_index   u16 offset of each token in token_table
+
+The tables have no header, so they are found from the inside out: the
+token table always holds the single-character tokens "0".."9" at their
+own indexes, the token index must agree with it, the markers are the
+strictly increasing u32 run ending just before the token table, and
+num_syms is the word in front of a names table whose every 256th entry
+starts where the markers say. The decoded symbols are cached as JSON
+next to the kernel, and SymbolIndex answers address and name queries by
+bisection.
+
+Usage:
+    python3 kernel_symbols.py info [--image backup/c410xbmc135.zip]
+    python3 kernel_symbols.py addr 0xC01A2B3C 0xC0008000
+    python3 kernel_symbols.py sym 'aspeed_i2c.*'
+    python3 kernel_symbols.py dump aspeed_i2c_driver --words 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from extract_firmware import FIRMWARE_ZIP  # noqa: E402
+from pec_container import (  # noqa: E402
+    DCSI_HEADER_SIZE, UIMAGE_HEADER_SIZE, UIMAGE_MAGIC, PecError, PecImage, UImageHeader,
+)
+
+KERNEL_DIR = "extracted/kernel"
+CHUNK_SIZE = 256 * 1024
+
+IH_COMP_NONE = 0
+IH_COMP_GZIP = 1
+
+# "0\0" .. "9\0": single-character tokens sit at their own index
+DIGIT_TOKENS = b"".join(bytes([c, 0]) for c in range(ord("0"), ord("9") + 1))
+TOKEN_COUNT = 256
+MAX_ALIGN = 16
+SYMBOLS_PER_MARKER = 256
+
+
+class KallsymsError(ValueError):
+    """No usable kallsyms tables."""
+
+
+# ---------------------------------------------------------------------------
+# Kernel image
+# ---------------------------------------------------------------------------
+
+def read_uimage(path: str) -> tuple[UImageHeader, bytes]:
+    """The uImage header and payload from a .pec, firmware .zip or bare uImage."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    if len(head) == 4 and struct.unpack(">I", head)[0] == UIMAGE_MAGIC:
+        with open(path, "rb") as f:
+            data = f.read()
+        header = UImageHeader.parse(data)
+        return header, data[UIMAGE_HEADER_SIZE:UIMAGE_HEADER_SIZE + header.size]
+    pec = PecImage.load(path)
+    start = DCSI_HEADER_SIZE + UIMAGE_HEADER_SIZE
+    return pec.uimage, bytes(pec.data[start:start + pec.uimage.size])
+
+
+def decompress_kernel(header: UImageHeader, payload: bytes, out_path: str) -> int:
+    """Stream-decompress ``payload`` to ``out_path``; returns the size written.
+
+    Raises:
+        PecError: Data CRC mismatch, unsupported compression or a bad stream.
+    """
+    if header.comp not in (IH_COMP_NONE, IH_COMP_GZIP):
+        raise PecError(f"uImage compression type {header.comp} not supported")
+    crc = 0
+    written = 0
+    decomp = zlib.decompressobj(16 + zlib.MAX_WBITS) if header.comp == IH_COMP_GZIP else None
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        for pos in range(0, len(payload), CHUNK_SIZE):
+            chunk = payload[pos:pos + CHUNK_SIZE]
+            crc = zlib.crc32(chunk, crc)
+            if decomp is None:
+                out = chunk
+            elif decomp.eof:
+                continue  # padding after the gzip member
+            else:
+                try:
+                    out = decomp.decompress(chunk)
+                except zlib.error as e:
+                    os.unlink(tmp)
+                    raise PecError(f"kernel gzip stream: {e}") from None
+            f.write(out)
+            written += len(out)
+        if decomp is not None and not decomp.eof:
+            os.unlink(tmp)
+            raise PecError("kernel gzip stream is truncated")
+    if crc != header.dcrc:
+        os.unlink(tmp)
+        raise PecError(f"uImage data CRC 0x{crc:08X} != header 0x{header.dcrc:08X}")
+    os.replace(tmp, out_path)
+    return written
+
+
+def kernel_paths(payload: bytes, kernel_dir: str = KERNEL_DIR) -> tuple[str, str, str]:
+    """(digest, vmlinux path, symbol cache path) for a kernel payload."""
+    digest = hashlib.sha256(payload).hexdigest()
+    stem = digest[:16]
+    return (digest, os.path.join(kernel_dir, f"vmlinux-{stem}.bin"),
+            os.path.join(kernel_dir, f"kallsyms-{stem}.json"))
+
+
+# ---------------------------------------------------------------------------
+# kallsyms
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Kallsyms:
+    """Decoded tables and where they were found in vmlinux.bin."""
+
+    addresses: list[int]
+    types: str
+    names: list[str]
+    addresses_offset: int
+    names_offset: int
+    token_table_offset: int
+
+
+def _align(value: int, alignment: int) -> int:
+    return (value + alignment - 1) & ~(alignment - 1)
+
+
+def _token_table_start(data: bytes, digits_at: int) -> int:
+    """Walk back from the "0" token to token 0."""
+    pos = digits_at
+    for _ in range(ord("0")):
+        if pos == 0 or data[pos - 1] != 0:
+            return -1
+        pos = data.rfind(b"\0", 0, pos - 1) + 1
+    return pos
+
+
+def _read_tokens(data: bytes, start: int) -> Optional[tuple[list[str], int]]:
+    """The 256 tokens at ``start``, if a matching token index follows them."""
+    offsets = []
+    tokens = []
+    pos = start
+    for _ in range(TOKEN_COUNT):
+        end = data.find(b"\0", pos)
+        if end == -1:
+            return None
+        offsets.append(pos - start)
+        tokens.append(data[pos:end].decode("latin-1"))
+        pos = end + 1
+    expected = struct.pack(f"<{TOKEN_COUNT}H", *offsets) if offsets[-1] <= 0xFFFF else None
+    if expected is None:
+        return None
+    for index_at in range(_align(pos, 2), pos + MAX_ALIGN, 2):
+        if data[index_at:index_at + len(expected)] == expected:
+            return tokens, index_at
+    return None
+
+
+def _markers_before(data: bytes, end: int) -> Optional[tuple[int, list[int]]]:
+    """The strictly increasing u32 run, starting with 0, that ends before ``end``."""
+    pos = end & ~3
+    for _ in range(MAX_ALIGN // 4):
+        if pos >= 4 and struct.unpack_from("<I", data, pos - 4)[0] == 0:
+            pos -= 4
+    markers = []
+    while pos >= 4:
+        value, = struct.unpack_from("<I", data, pos - 4)
+        if markers and value >= markers[-1]:
+            return None
+        pos -= 4
+        markers.append(value)
+        if value == 0:
+            markers.reverse()
+            return pos, markers
+    return None
+
+
+def _check_names(data: bytes, start: int, num_syms: int, markers: list[int],
+                 markers_at: int) -> Optional[list[int]]:
+    """Offsets of each name entry, if the names table at ``start`` fits the markers."""
+    offsets = []
+    pos = start
+    for i in range(num_syms):
+        if i % SYMBOLS_PER_MARKER == 0 and markers[i // SYMBOLS_PER_MARKER] != pos - start:
+            return None
+        if pos >= markers_at:
+            return None
+        offsets.append(pos)
+        pos += 1 + data[pos]
+    if not markers_at - MAX_ALIGN < pos <= markers_at:
+        return None
+    return offsets
+
+
+def find_kallsyms(data: bytes) -> Kallsyms:
+    """Locate and decode the kallsyms tables in a decompressed kernel.
+
+    Raises:
+        KallsymsError: The tables could not be found or do not agree.
+    """
+    search = data.find(DIGIT_TOKENS)
+    while search != -1:
+        token_start = _token_table_start(data, search)
+        found = _read_tokens(data, token_start) if token_start >= 0 else None
+        if found is not None:
+            result = _decode_from_tokens(data, token_start, found[0])
+            if result is not None:
+                return result
+        search = data.find(DIGIT_TOKENS, search + 1)
+    raise KallsymsError("no kallsyms token table found (kernel built without CONFIG_KALLSYMS?)")
+
+
+def _decode_from_tokens(data: bytes, token_start: int, tokens: list[str]) -> Optional[Kallsyms]:
+    found = _markers_before(data, token_start)
+    if found is None:
+        return None
+    markers_at, markers = found
+    lowest = (len(markers) - 1) * SYMBOLS_PER_MARKER + 1
+    highest = len(markers) * SYMBOLS_PER_MARKER
+    # num_syms sits in front of markers[-1] bytes of names, then at most
+    # 256 more entries of at most 256 bytes each
+    pos = (markers_at - markers[-1] - 4) & ~3
+    limit = max(0, pos - SYMBOLS_PER_MARKER * 256 - MAX_ALIGN)
+    while pos >= limit:
+        num_syms, = struct.unpack_from("<I", data, pos)
+        if lowest <= num_syms <= highest:
+            for alignment in (4, 8, 16):
+                names_at = _align(pos + 4, alignment)
+                offsets = _check_names(data, names_at, num_syms, markers, markers_at)
+                if offsets is None:
+                    continue
+                addresses_at = _addresses_before(data, pos, num_syms)
+                if addresses_at is None:
+                    continue
+                return _expand(data, tokens, offsets, addresses_at, num_syms,
+                               names_at, token_start)
+        pos -= 4
+    return None
+
+
+def _addresses_before(data: bytes, num_syms_at: int, num_syms: int) -> Optional[int]:
+    for pad in range(0, MAX_ALIGN, 4):
+        start = num_syms_at - pad - 4 * num_syms
+        if start < 0:
+            return None
+        if any(data[start + 4 * num_syms:num_syms_at]):
+            continue
+        addresses = struct.unpack_from(f"<{num_syms}I", data, start)
+        if addresses[-1] and all(a <= b for a, b in zip(addresses, addresses[1:])):
+            return start
+    return None
+
+
+def _expand(data: bytes, tokens: list[str], offsets: list[int], addresses_at: int,
+            num_syms: int, names_at: int, token_start: int) -> Kallsyms:
+    names = []
+    types = []
+    for pos in offsets:
+        name = "".join(tokens[b] for b in data[pos + 1:pos + 1 + data[pos]])
+        types.append(name[:1] or "?")
+        names.append(name[1:])
+    return Kallsyms(
+        addresses=list(struct.unpack_from(f"<{num_syms}I", data, addresses_at)),
+        types="".join(types),
+        names=names,
+        addresses_offset=addresses_at,
+        names_offset=names_at,
+        token_table_offset=token_start,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class SymbolIndex:
+    """Sorted address -> symbol index over a kallsyms dump.
+
+    Args:
+        addresses: Symbol addresses, ascending.
+        types: One nm type letter per symbol.
+        names: Symbol names.
+    """
+
+    def __init__(self, addresses: list[int], types: str, names: list[str]) -> None:
+        self.addresses = addresses
+        self.types = types
+        self.names = names
+        self._by_name: dict[str, int] = {}
+        for i, name in enumerate(names):
+            self._by_name.setdefault(name, i)
+        # Where the kernel image starts, so a vaddr maps to a vmlinux.bin offset
+        text = self._by_name.get("_text", self._by_name.get("stext"))
+        self.base = addresses[text] if text is not None else (addresses[0] if addresses else 0)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def lookup(self, addr: int) -> Optional[tuple[str, int, int]]:
+        """(name, offset into it, size) of the symbol covering ``addr``."""
+        i = bisect.bisect_right(self.addresses, addr) - 1
+        if i < 0:
+            return None
+        start = self.addresses[i]
+        # Prefer the first name at an address shared by aliases
+        while i > 0 and self.addresses[i - 1] == start:
+            i -= 1
+        nxt = bisect.bisect_right(self.addresses, start)
+        size = self.addresses[nxt] - start if nxt < len(self.addresses) else 0
+        if size and addr - start >= size:
+            return None
+        return self.names[i], addr - start, size
+
+    def symbolize(self, addr: int) -> str:
+        hit = self.lookup(addr)
+        if hit is None:
+            return f"0x{addr:08X}"
+        name, offset, _ = hit
+        return f"{name}+0x{offset:X}" if offset else name
+
+    def address(self, name: str) -> Optional[int]:
+        i = self._by_name.get(name)
+        return None if i is None else self.addresses[i]
+
+    def find(self, pattern: str) -> list[tuple[int, str, str]]:
+        """(address, type, name) of every symbol whose name matches ``pattern``."""
+        regex = re.compile(pattern)
+        return [(a, t, n) for a, t, n in zip(self.addresses, self.types, self.names)
+                if regex.fullmatch(n)]
+
+    def offset(self, addr: int) -> int:
+        """File offset of ``addr`` in vmlinux.bin."""
+        return addr - self.base
+
+
+def load_symbols(image: str = FIRMWARE_ZIP, kernel_dir: str = KERNEL_DIR,
+                 rebuild: bool = False) -> tuple[SymbolIndex, str]:
+    """Return (index, vmlinux path), decompressing and decoding only when needed.
+
+    Both the kernel and its symbols are cached under ``kernel_dir`` by the
+    SHA-256 of the compressed kernel.
+    """
+    header, payload = read_uimage(image)
+    digest, vmlinux, cache = kernel_paths(payload, kernel_dir)
+    os.makedirs(kernel_dir, exist_ok=True)
+    if rebuild or not os.path.exists(vmlinux):
+        decompress_kernel(header, payload, vmlinux)
+
+    if os.path.exists(cache) and not rebuild:
+        with open(cache) as f:
+            cached = json.load(f)
+        if cached.get("sha256") == digest:
+            return SymbolIndex(cached["addresses"], cached["types"], cached["names"]), vmlinux
+
+    with open(vmlinux, "rb") as f:
+        table = find_kallsyms(f.read())
+    with open(cache, "w") as f:
+        json.dump({
+            "sha256": digest,
+            "uimage": header.name,
+            "addresses_offset": table.addresses_offset,
+            "names_offset": table.names_offset,
+            "token_table_offset": table.token_table_offset,
+            "addresses": table.addresses,
+            "types": table.types,
+            "names": table.names,
+        }, f)
+    return SymbolIndex(table.addresses, table.types, table.names), vmlinux
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Decompress the BMC kernel and query its symbols.")
+    parser.add_argument("--image", help=f".pec, firmware .zip or bare uImage (default: {FIRMWARE_ZIP})")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cached kernel and symbols")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("info", help="Kernel and symbol table summary")
+    p = sub.add_parser("addr", help="Symbolize addresses")
+    p.add_argument("addresses", nargs="+", type=lambda s: int(s, 0))
+    p = sub.add_parser("sym", help="Symbols whose names match a regex")
+    p.add_argument("pattern")
+    p = sub.add_parser("dump", help="Words of a data symbol (e.g. a driver table), symbolized")
+    p.add_argument("symbol")
+    p.add_argument("--words", type=int, help="Words to show (default: the symbol's size)")
+    args = parser.parse_args()
+    image = os.path.abspath(args.image) if args.image else FIRMWARE_ZIP
+    os.chdir(SCRIPT_DIR)
+
+    try:
+        index, vmlinux = load_symbols(image, rebuild=args.rebuild)
+    except (PecError, KallsymsError, OSError) as e:
+        print(f"[kernel] ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "info":
+        counts: dict[str, int] = {}
+        for t in index.types:
+            counts[t] = counts.get(t, 0) + 1
+        print(f"Kernel: {vmlinux} ({os.path.getsize(vmlinux):,} bytes)")
+        print(f"Symbols: {len(index):,}  0x{index.addresses[0]:08X}-0x{index.addresses[-1]:08X}"
+              f"  image base 0x{index.base:08X}")
+        print("Types: " + "  ".join(f"{t}:{n}" for t, n in sorted(counts.items())))
+
+    elif args.command == "addr":
+        for addr in args.addresses:
+            print(f"0x{addr:08X}  {index.symbolize(addr)}")
+
+    elif args.command == "sym":
+        matches = index.find(args.pattern)
+        for addr, t, name in matches:
+            print(f"0x{addr:08X} {t} {name}")
+        if not matches:
+            sys.exit(1)
+
+    else:
+        addr = index.address(args.symbol)
+        if addr is None:
+            print(f"[kernel] ERROR: no symbol {args.symbol!r}", file=sys.stderr)
+            sys.exit(1)
+        _, _, size = index.lookup(addr)
+        words = args.words or max(1, size // 4)
+        with open(vmlinux, "rb") as f:
+            f.seek(index.offset(addr))
+            data = f.read(4 * words)
+        print(f"{args.symbol} @ 0x{addr:08X} ({size} bytes)")
+        for i in range(len(data) // 4):
+            word, = struct.unpack_from("<I", data, 4 * i)
+            target = index.lookup(word)
+            note = f"  -> {index.symbolize(word)}" if target is not None else ""
+            print(f"  +0x{4 * i:03X}  0x{word:08X}{note}")
+
+
+if __name__ == "__main__":
+    main()
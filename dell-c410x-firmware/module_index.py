@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""Index of the kernel modules (lib/modules/*.ko) across firmware versions.
+
+Every .ko found in the given sources - .pec images or firmware zips (read
+straight from the rootfs with pec_container.py) or extracted directory
+trees - is analysed once, in a process pool, and stored in an SQLite
+index keyed by the module's SHA-256. A module shipped unchanged in
+several firmware versions is analysed once and listed under each.
+
+Per module the index keeps:
+
+- sections, .modinfo (license, author, vermagic, depends, ...)
+- symbols, defined and imported
+- relocations, each with the function it sits in
+- strings from the data sections, with the functions that load them
+- constants: ARM data-processing immediates (mov/cmp/orr/...) and
+  ldr-literal pool words, again with their function
+- I2C address lists (2.6.23 ``normal_i2c``-style u16 arrays ending in
+  I2C_CLIENT_END) and ``i2c_device_id`` tables
+
+Queries are plain indexed SQL, so they answer across every indexed
+module and firmware version at once.
+
+Usage:
+    python3 module_index.py build backup/c410xbmc135.zip extracted/rootfs --version 1.35 [--jobs N]
+    python3 module_index.py i2c 0x4C           # 7-bit address
+    python3 module_index.py gpio E             # on-chip GPIO bank
+    python3 module_index.py const 0x1E780000
+    python3 module_index.py sym i2c_transfer   # who defines / imports it
+    python3 module_index.py strings 'PCA95\\d\\d'
+    python3 module_index.py stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from pec_container import PecError, PecImage  # noqa: E402
+
+DEFAULT_DB = "extracted/module_index.sqlite"
+MODULE_DIR = "/lib/modules"
+
+# Bump when analyze_module() output changes; older rows are then redone
+ANALYZER_VERSION = 1
+# Bump when the files table changes meaning; its rows are then dropped and
+# come back with the next build (2: sources keyed by absolute path)
+FILES_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS modules (
+    sha256      TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    vermagic    TEXT NOT NULL,
+    license     TEXT NOT NULL,
+    author      TEXT NOT NULL,
+    description TEXT NOT NULL,
+    error       TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    source  TEXT NOT NULL,
+    version TEXT NOT NULL,
+    path    TEXT NOT NULL,
+    sha256  TEXT NOT NULL,
+    PRIMARY KEY (source, path)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    sha256 TEXT NOT NULL, name TEXT NOT NULL, type INTEGER NOT NULL,
+    flags INTEGER NOT NULL, size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS modinfo (
+    sha256 TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    sha256 TEXT NOT NULL, name TEXT NOT NULL, section TEXT NOT NULL,
+    value INTEGER NOT NULL, size INTEGER NOT NULL, type TEXT NOT NULL, bind TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS relocations (
+    sha256 TEXT NOT NULL, section TEXT NOT NULL, offset INTEGER NOT NULL,
+    type INTEGER NOT NULL, symbol TEXT NOT NULL, function TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS strings (
+    sha256 TEXT NOT NULL, section TEXT NOT NULL, offset INTEGER NOT NULL,
+    text TEXT NOT NULL, functions TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS constants (
+    sha256 TEXT NOT NULL, section TEXT NOT NULL, offset INTEGER NOT NULL,
+    value INTEGER NOT NULL, kind TEXT NOT NULL, function TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS i2c_ids (
+    sha256 TEXT NOT NULL, symbol TEXT NOT NULL, name TEXT NOT NULL,
+    address INTEGER, driver_data INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_sha ON files (sha256);
+CREATE INDEX IF NOT EXISTS constants_value ON constants (value);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS relocations_symbol ON relocations (symbol);
+CREATE INDEX IF NOT EXISTS i2c_ids_address ON i2c_ids (address);
+"""
+DETAIL_TABLES = ("sections", "modinfo", "symbols", "relocations", "strings", "constants", "i2c_ids")
+
+# ELF
+ET_REL = 1
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_RELA = 4
+SHT_REL = 9
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+SHN_UNDEF = 0
+SHN_ABS = 0xFFF1
+EM_ARM = 40
+R_ARM_ABS32 = 2
+STT_NAMES = {0: "notype", 1: "object", 2: "func", 3: "section", 4: "file"}
+STB_NAMES = {0: "local", 1: "global", 2: "weak"}
+
+# ARM data-processing opcodes whose immediate is worth indexing, and how
+# to turn the encoded immediate into the value the code means
+DP_OPCODES = {
+    0x0: "and", 0x1: "eor", 0x2: "sub", 0x3: "rsb", 0x4: "add", 0x8: "tst", 0x9: "teq",
+    0xA: "cmp", 0xB: "cmn", 0xC: "orr", 0xD: "mov", 0xE: "bic", 0xF: "mvn",
+}
+MIN_STRING = 4
+I2C_CLIENT_END = 0xFFFE
+I2C_NAME_SIZE = 20
+MAX_I2C_LIST = 64
+
+# On-chip GPIO register groups (ANALYSIS.md, io-tables/IO_fl.bin.md):
+# banks -> offset from the controller base, register span
+GPIO_BASE = 0x1E780000
+GPIO_GROUPS = {"ABCD": (0x000, 0x20), "EFGH": (0x020, 0x20), "IJKL": (0x070, 0x08),
+               "MNOP": (0x078, 0x08)}
+
+
+class ElfError(ValueError):
+    """Not a 32-bit little-endian ARM relocatable."""
+
+
+# ---------------------------------------------------------------------------
+# Analysis (runs in worker processes)
+# ---------------------------------------------------------------------------
+
+def _cstr(data: bytes, offset: int) -> str:
+    end = data.find(b"\0", offset)
+    return data[offset:end if end != -1 else len(data)].decode("latin-1")
+
+
+def _ror(value: int, amount: int) -> int:
+    return ((value >> amount) | (value << (32 - amount))) & 0xFFFFFFFF if amount else value
+
+
+def _strings_in(data: bytes) -> list[tuple[int, str]]:
+    """NUL-terminated printable runs of at least MIN_STRING characters."""
+    return [(m.start(), m.group(1).decode("ascii"))
+            for m in re.finditer(rb"([\t\n\r\x20-\x7e]{%d,})\0" % MIN_STRING, data)]
+
+
+class _Functions:
+    """Name of the function covering an offset in one section."""
+
+    def __init__(self, symbols: list[tuple[int, int, str]]) -> None:
+        self.starts = [s for s, _, _ in symbols]
+        self.symbols = symbols
+
+    def at(self, offset: int) -> str:
+        i = bisect.bisect_right(self.starts, offset) - 1
+        if i < 0:
+            return ""
+        start, size, name = self.symbols[i]
+        return name if not size or offset < start + size else ""
+
+
+def analyze_module(data: bytes) -> dict:
+    """Everything the index stores about one .ko.
+
+    Returns:
+        {"modinfo": [...], "sections": [...], "symbols": [...], ...} with
+        rows ready for the matching tables (minus the sha256 column).
+
+    Raises:
+        ElfError: Not an ARM ELF32 LE relocatable.
+    """
+    if data[:4] != b"\x7fELF" or data[4] != 1 or data[5] != 1:
+        raise ElfError("not an ELF32 little-endian file")
+    e_type, e_machine = struct.unpack_from("<HH", data, 16)
+    if e_machine != EM_ARM:
+        raise ElfError(f"e_machine {e_machine}, not ARM")
+    if e_type != ET_REL:
+        raise ElfError(f"e_type {e_type}, not a relocatable module")
+    shoff, = struct.unpack_from("<I", data, 32)
+    shentsize, shnum, shstrndx = struct.unpack_from("<HHH", data, 46)
+    if not shoff or shoff + shnum * shentsize > len(data):
+        raise ElfError("no section headers")
+    headers = [struct.unpack_from("<10I", data, shoff + i * shentsize) for i in range(shnum)]
+    shstr = headers[shstrndx][4] if shstrndx < shnum else 0
+    sections = []
+    for name, stype, flags, _, offset, size, link, info, _, entsize in headers:
+        sections.append({"name": _cstr(data, shstr + name) if shstr else "", "type": stype,
+                         "flags": flags, "offset": offset, "size": size, "link": link,
+                         "info": info, "entsize": entsize})
+
+    def body(sec: dict) -> bytes:
+        return data[sec["offset"]:sec["offset"] + sec["size"]] if sec["type"] != 8 else b""
+
+    # Symbols
+    symbols = []
+    symtab = next((s for s in sections if s["type"] == SHT_SYMTAB), None)
+    if symtab is not None:
+        strtab = body(sections[symtab["link"]])
+        raw = body(symtab)
+        for off in range(0, len(raw) - 15, 16):
+            name, value, size, info, _, shndx = struct.unpack_from("<IIIBBH", raw, off)
+            stype = info & 0xF
+            sym_name = _cstr(strtab, name)
+            if stype == 3 and shndx < len(sections):
+                sym_name = sections[shndx]["name"]
+            symbols.append({"name": sym_name, "value": value, "size": size,
+                            "type": STT_NAMES.get(stype, str(stype)),
+                            "bind": STB_NAMES.get(info >> 4, str(info >> 4)), "shndx": shndx})
+
+    # Functions and ARM mapping symbols ($a code / $d data) per section
+    functions: dict[int, list[tuple[int, int, str]]] = {}
+    mapping: dict[int, list[tuple[int, str]]] = {}
+    for sym in symbols:
+        if sym["name"] in ("$a", "$d", "$t") or sym["name"].startswith(("$a.", "$d.")):
+            mapping.setdefault(sym["shndx"], []).append((sym["value"], sym["name"][1]))
+        elif sym["type"] == "func":
+            functions.setdefault(sym["shndx"], []).append((sym["value"], sym["size"], sym["name"]))
+    finder = {i: _Functions(sorted(f)) for i, f in functions.items()}
+    for marks in mapping.values():
+        marks.sort()
+
+    def function_at(shndx: int, offset: int) -> str:
+        f = finder.get(shndx)
+        return f.at(offset) if f else ""
+
+    # Relocations: remember which words are relocated and at what
+    relocations = []
+    relocated: dict[tuple[int, int], tuple[int, dict]] = {}
+    for sec in sections:
+        if sec["type"] not in (SHT_REL, SHT_RELA) or sec["info"] >= len(sections):
+            continue
+        entsize = 8 if sec["type"] == SHT_REL else 12
+        target = sec["info"]
+        raw = body(sec)
+        for off in range(0, len(raw) - entsize + 1, entsize):
+            r_offset, r_info = struct.unpack_from("<II", raw, off)
+            sym = symbols[r_info >> 8] if (r_info >> 8) < len(symbols) else None
+            rtype = r_info & 0xFF
+            relocated[(target, r_offset)] = (rtype, sym)
+            relocations.append((sections[target]["name"], r_offset, rtype,
+                                sym["name"] if sym else "", function_at(target, r_offset)))
+
+    # Strings in the allocated data sections
+    strings = []
+    string_index: dict[tuple[int, int], int] = {}
+    for i, sec in enumerate(sections):
+        if (sec["type"] == SHT_PROGBITS and sec["flags"] & SHF_ALLOC
+                and not sec["flags"] & SHF_EXECINSTR):
+            for offset, text in _strings_in(body(sec)):
+                string_index[(i, offset)] = len(strings)
+                strings.append([sec["name"], offset, text, set()])
+
+    # Code: immediates and literal-pool loads
+    constants = []
+    for i, sec in enumerate(sections):
+        if sec["type"] != SHT_PROGBITS or not sec["flags"] & SHF_EXECINSTR:
+            continue
+        code = body(sec)
+        marks = mapping.get(i, [])
+        mark_starts = [m for m, _ in marks]
+
+        def is_data(offset: int) -> bool:
+            j = bisect.bisect_right(mark_starts, offset) - 1
+            return j >= 0 and marks[j][1] == "d"
+
+        for off in range(0, len(code) - 3, 4):
+            if marks and is_data(off):
+                continue
+            insn, = struct.unpack_from("<I", code, off)
+            if insn >> 28 == 0xF:
+                continue
+            if (insn >> 25) & 7 == 1:
+                opcode = (insn >> 21) & 0xF
+                kind = DP_OPCODES.get(opcode)
+                if kind is None:
+                    continue
+                value = _ror(insn & 0xFF, 2 * ((insn >> 8) & 0xF))
+                if kind == "mvn":
+                    value = ~value & 0xFFFFFFFF
+                constants.append((sec["name"], off, value, kind, function_at(i, off)))
+            elif insn & 0x0F7F0000 == 0x051F0000:
+                # ldr rd, [pc, #+/-imm12]
+                imm = insn & 0xFFF
+                literal = off + 8 + (imm if insn & (1 << 23) else -imm)
+                if not 0 <= literal <= len(code) - 4:
+                    continue
+                word, = struct.unpack_from("<I", code, literal)
+                reloc = relocated.get((i, literal))
+                func = function_at(i, off)
+                if reloc is None:
+                    constants.append((sec["name"], off, word, "literal", func))
+                    continue
+                rtype, sym = reloc
+                if rtype == R_ARM_ABS32 and sym is not None and sym["type"] == "section":
+                    hit = string_index.get((sym["shndx"], word))
+                    if hit is not None and func:
+                        strings[hit][3].add(func)
+                elif rtype == R_ARM_ABS32 and sym is not None:
+                    # symbol + addend: the string may sit inside a named object
+                    hit = string_index.get((sym["shndx"], sym["value"] + word))
+                    if hit is not None and func:
+                        strings[hit][3].add(func)
+
+    # I2C address lists and device id tables
+    i2c_ids = []
+    for sym in symbols:
+        if sym["type"] != "object" or not 0 < sym["shndx"] < len(sections):
+            continue
+        raw = body(sections[sym["shndx"]])
+        start = sym["value"]
+        if sym["name"].endswith("normal_i2c") or "normal_i2c_range" in sym["name"]:
+            for k in range(MAX_I2C_LIST):
+                if start + 2 * k + 2 > len(raw):
+                    break
+                addr, = struct.unpack_from("<H", raw, start + 2 * k)
+                if addr == I2C_CLIENT_END:
+                    break
+                i2c_ids.append((sym["name"], "", addr, None))
+        elif "i2c_device_table" in sym["name"] or sym["name"].endswith("_i2c_id"):
+            entry = I2C_NAME_SIZE + 4
+            for k in range(MAX_I2C_LIST):
+                pos = start + k * entry
+                if pos + entry > len(raw) or not raw[pos]:
+                    break
+                name = _cstr(raw[pos:pos + I2C_NAME_SIZE], 0)
+                driver_data, = struct.unpack_from("<I", raw, pos + I2C_NAME_SIZE)
+                i2c_ids.append((sym["name"], name, None, driver_data))
+
+    modinfo = []
+    for sec in sections:
+        if sec["name"] == ".modinfo":
+            for field in body(sec).split(b"\0"):
+                key, sep, value = field.decode("latin-1").partition("=")
+                if sep:
+                    modinfo.append((key, value))
+
+    return {
+        "modinfo": modinfo,
+        "sections": [(s["name"], s["type"], s["flags"], s["size"]) for s in sections if s["name"]],
+        "symbols": [(s["name"], sections[s["shndx"]]["name"] if 0 < s["shndx"] < len(sections)
+                     else ("UND" if s["shndx"] == SHN_UNDEF else "ABS"),
+                     s["value"], s["size"], s["type"], s["bind"])
+                    for s in symbols if s["name"] and s["type"] not in ("section", "file")
+                    and not s["name"].startswith("$")],
+        "relocations": relocations,
+        "strings": [(section, offset, text, " ".join(sorted(funcs)))
+                    for section, offset, text, funcs in strings],
+        "constants": constants,
+        "i2c_ids": i2c_ids,
+    }
+
+
+def _analyze(data: bytes) -> dict:
+    """Worker wrapper: a broken module is recorded, not fatal."""
+    try:
+        return analyze_module(data)
+    except (ElfError, struct.error, IndexError) as e:
+        return {"error": str(e) or type(e).__name__}
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+def read_source(source: str) -> tuple[str, dict[str, bytes]]:
+    """(firmware version, {path: bytes}) of the modules in a source.
+
+    A source is a .pec / firmware zip, or a directory (an extracted rootfs
+    or any tree of .ko files).
+    """
+    modules = {}
+    if os.path.isdir(source):
+        for root, _, names in os.walk(source):
+            for name in sorted(names):
+                if name.endswith(".ko"):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        modules["/" + os.path.relpath(path, source)] = f.read()
+        return "", modules
+    pec = PecImage.load(source)
+    fs = pec.squashfs
+    try:
+        for path, inode in fs.walk(MODULE_DIR):
+            if inode.is_file and path.endswith(".ko"):
+                modules[path] = fs.read(inode)
+    except FileNotFoundError:
+        pass
+    return pec.header.version, modules
+
+
+def open_db(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    row = db.execute("SELECT value FROM meta WHERE key = 'analyzer'").fetchone()
+    if row is None or int(row[0]) != ANALYZER_VERSION:
+        # Analyses from another version of analyze_module(): redo them
+        for table in ("modules",) + DETAIL_TABLES:
+            db.execute(f"DELETE FROM {table}")
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('analyzer', ?)", (str(ANALYZER_VERSION),))
+        db.commit()
+    row = db.execute("SELECT value FROM meta WHERE key = 'files'").fetchone()
+    if row is None or int(row[0]) != FILES_VERSION:
+        db.execute("DELETE FROM files")
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('files', ?)", (str(FILES_VERSION),))
+        db.commit()
+    return db
+
+
+def _store(db: sqlite3.Connection, sha: str, name: str, size: int, result: dict) -> None:
+    info = dict(result.get("modinfo", []))
+    db.execute("INSERT OR REPLACE INTO modules VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+               (sha, name, size, info.get("vermagic", ""), info.get("license", ""),
+                info.get("author", ""), info.get("description", ""), result.get("error")))
+    for table in DETAIL_TABLES:
+        rows = result.get(table, [])
+        if rows:
+            marks = ", ".join("?" * (len(rows[0]) + 1))
+            db.executemany(f"INSERT INTO {table} VALUES ({marks})", [(sha, *row) for row in rows])
+
+
+def build(db: sqlite3.Connection, sources: list[str], jobs: Optional[int] = None,
+          rebuild: bool = False, versions: Optional[dict[str, str]] = None) -> dict:
+    """Index the modules of every source; only new hashes are analysed.
+
+    Sources are keyed by absolute path, so two trees with the same name
+    stay apart. versions gives the firmware version of sources that do
+    not carry one (directories); a .pec / zip reports its own.
+
+    Returns:
+        Counts of "files", "analyzed", "failed" and "unchanged" modules.
+    """
+    if rebuild:
+        for table in ("modules",) + DETAIL_TABLES:
+            db.execute(f"DELETE FROM {table}")
+    known = {sha for sha, in db.execute("SELECT sha256 FROM modules")}
+    todo: dict[str, tuple[str, bytes]] = {}
+    seen: set[str] = set()
+    files = 0
+    for source in sources:
+        source = os.path.abspath(source)
+        version, modules = read_source(source)
+        version = (versions or {}).get(source) or version
+        label = os.path.basename(os.path.normpath(source))
+        db.execute("DELETE FROM files WHERE source = ?", (source,))
+        for path, blob in modules.items():
+            sha = hashlib.sha256(blob).hexdigest()
+            db.execute("INSERT INTO files VALUES (?, ?, ?, ?)", (source, version, path, sha))
+            seen.add(sha)
+            if sha not in known:
+                todo.setdefault(sha, (os.path.basename(path), blob))
+        files += len(modules)
+        print(f"[modules] {label}: {len(modules)} module(s)" + (f", version {version}" if version else ""))
+    # Analyses nothing refers to any more
+    for table in ("modules",) + DETAIL_TABLES:
+        db.execute(f"DELETE FROM {table} WHERE sha256 NOT IN (SELECT sha256 FROM files)")
+    db.commit()
+
+    start = time.monotonic()
+    failed = 0
+    if todo:
+        print(f"[modules] Analysing {len(todo)} module(s)...")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {sha: pool.submit(_analyze, blob) for sha, (_, blob) in todo.items()}
+            for sha, future in futures.items():
+                name, blob = todo[sha]
+                result = future.result()
+                if "error" in result:
+                    print(f"[modules]   WARN: {name}: {result['error']}")
+                    failed += 1
+                _store(db, sha, name, len(blob), result)
+                db.commit()
+        print(f"[modules] Analysed in {time.monotonic() - start:.1f}s")
+    return {"files": files, "analyzed": len(todo) - failed, "failed": failed,
+            "unchanged": len(seen & known)}
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def _where_shipped(db: sqlite3.Connection) -> dict[str, str]:
+    """{sha256: "source@version:path, ..."} for labelling hits (source by name)."""
+    shipped: dict[str, list[str]] = {}
+    for sha, source, version, path in db.execute(
+            "SELECT sha256, source, version, path FROM files ORDER BY version, source, path"):
+        label = os.path.basename(os.path.normpath(source))
+        shipped.setdefault(sha, []).append(f"{label}{'@' + version if version else ''}:{path}")
+    return {sha: ", ".join(places) for sha, places in shipped.items()}
+
+
+def _names(db: sqlite3.Connection) -> dict[str, str]:
+    return dict(db.execute("SELECT sha256, name FROM modules"))
+
+
+def query_constants(db: sqlite3.Connection, values: list[int],
+                    kinds: Optional[tuple[str, ...]] = None) -> list[tuple]:
+    """[(sha256, section, offset, value, kind, function)] for any of ``values``."""
+    where = f"value IN ({','.join('?' * len(values))})"
+    params: list = list(values)
+    if kinds:
+        where += f" AND kind IN ({','.join('?' * len(kinds))})"
+        params += list(kinds)
+    return db.execute(f"SELECT sha256, section, offset, value, kind, function FROM constants "
+                      f"WHERE {where} ORDER BY sha256, section, offset", params).fetchall()
+
+
+def query_strings(db: sqlite3.Connection, pattern: str) -> list[tuple]:
+    """[(sha256, section, offset, text, functions)] whose text matches a regex."""
+    regex = re.compile(pattern, re.IGNORECASE)
+    db.create_function("regexp", 2, lambda p, s: regex.search(s) is not None, deterministic=True)
+    return db.execute("SELECT sha256, section, offset, text, functions FROM strings "
+                      "WHERE regexp(?, text) ORDER BY sha256, offset", (pattern,)).fetchall()
+
+
+def query_i2c(db: sqlite3.Connection, address: int) -> dict[str, list[tuple]]:
+    """Everything pointing at a 7-bit I2C address.
+
+    Immediates compared against it (in 7-bit or 8-bit read/write form) are
+    suggestive rather than proof - small constants are everywhere - so
+    they are reported apart from address lists and strings.
+    """
+    eight = address << 1
+    return {
+        "address lists": db.execute(
+            "SELECT sha256, symbol, name, address FROM i2c_ids WHERE address IN (?, ?)",
+            (address, eight)).fetchall(),
+        "strings": query_strings(db, rf"(?:0x0*(?:{address:x}|{eight:x}|{eight | 1:x})\b)"),
+        "immediates": query_constants(db, [address, eight, eight | 1], ("mov", "cmp", "orr")),
+    }
+
+
+def gpio_registers(bank: str) -> list[int]:
+    """Register addresses of the on-chip GPIO group holding ``bank``."""
+    bank = bank.upper()
+    for banks, (offset, span) in GPIO_GROUPS.items():
+        if bank in banks:
+            return [GPIO_BASE + offset + i for i in range(0, span, 4)]
+    raise ValueError(f"GPIO bank {bank} not in {', '.join(GPIO_GROUPS)}")
+
+
+def query_gpio(db: sqlite3.Connection, bank: str) -> dict[str, list[tuple]]:
+    """Register literals and strings that point at an on-chip GPIO bank."""
+    bank = bank.upper()
+    return {
+        "registers": query_constants(db, gpio_registers(bank)),
+        "strings": query_strings(db, rf"\bGPIO[_ ]?{bank}(?:\d|\b)|\bGP{bank}\d\b"),
+        "symbols": db.execute("SELECT sha256, name, section, value, size, type, bind FROM symbols "
+                              "WHERE name LIKE ?", (f"%gpio{bank}%",)).fetchall(),
+    }
+
+
+def query_symbol(db: sqlite3.Connection, name: str) -> list[tuple]:
+    """[(sha256, name, section, value, size, type, bind)] for a name or LIKE pattern."""
+    return db.execute("SELECT sha256, name, section, value, size, type, bind FROM symbols "
+                      "WHERE name LIKE ? ORDER BY sha256, section = 'UND', name",
+                      (name,)).fetchall()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _print_hits(db: sqlite3.Connection, groups: dict[str, list[tuple]]) -> int:
+    names = _names(db)
+    shipped = _where_shipped(db)
+    total = 0
+    for title, rows in groups.items():
+        if not rows:
+            continue
+        print(f"{title}:")
+        by_module: dict[str, list[tuple]] = {}
+        for row in rows:
+            by_module.setdefault(row[0], []).append(row[1:])
+        for sha, hits in by_module.items():
+            print(f"  {names.get(sha, sha[:12])}  [{shipped.get(sha, '')}]")
+            for hit in hits:
+                print("    " + "  ".join(f"0x{v:X}" if isinstance(v, int) and v > 9 else str(v)
+                                         for v in hit if v not in ("", None)))
+        total += len(rows)
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Index and query the firmware kernel modules.")
+    parser.add_argument("--db", help=f"Index file (default: {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="Index the modules in .pec images, zips or directories")
+    p.add_argument("sources", nargs="+")
+    p.add_argument("--jobs", type=int, help="Analysis processes (default: CPU count)")
+    p.add_argument("--rebuild", action="store_true", help="Analyse every module again")
+    p.add_argument("--version", action="append", default=[], dest="versions",
+                   help="Firmware version of a directory source; give one per directory, "
+                        "in the order the directories are listed")
+    p = sub.add_parser("i2c", help="Modules referring to a 7-bit I2C address")
+    p.add_argument("address", type=lambda s: int(s, 0))
+    p = sub.add_parser("gpio", help="Modules referring to an on-chip GPIO bank")
+    p.add_argument("bank")
+    p = sub.add_parser("const", help="Modules using a constant")
+    p.add_argument("values", nargs="+", type=lambda s: int(s, 0))
+    p = sub.add_parser("sym", help="Modules defining or importing a symbol (LIKE pattern)")
+    p.add_argument("name")
+    p = sub.add_parser("strings", help="Strings matching a regex")
+    p.add_argument("pattern")
+    sub.add_parser("stats", help="List the indexed modules")
+    args = parser.parse_args()
+
+    sources = [os.path.abspath(s) for s in getattr(args, "sources", [])]
+    db_path = os.path.abspath(args.db) if args.db else None
+    os.chdir(SCRIPT_DIR)
+    if db_path is None:
+        os.makedirs(os.path.dirname(DEFAULT_DB), exist_ok=True)
+        db_path = DEFAULT_DB
+    db = open_db(db_path)
+
+    if args.command == "build":
+        directories = [s for s in sources if os.path.isdir(s)]
+        if len(args.versions) != len(directories):
+            print(f"[modules] ERROR: {len(directories)} directory source(s) need as many --version "
+                  f"(got {len(args.versions)})", file=sys.stderr)
+            sys.exit(1)
+        try:
+            counts = build(db, sources, args.jobs, args.rebuild, dict(zip(directories, args.versions)))
+        except (PecError, OSError) as e:
+            print(f"[modules] ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"[modules] {counts['files']} file(s): {counts['analyzed']} analysed, "
+              f"{counts['failed']} failed, {counts['unchanged']} unchanged")
+        return
+
+    if args.command == "stats":
+        shipped = _where_shipped(db)
+        for sha, name, size, vermagic, author, description, error in db.execute(
+                "SELECT sha256, name, size, vermagic, author, description, error FROM modules "
+                "ORDER BY name"):
+            print(f"{name:28s} {size:>8,d}  {sha[:12]}  {error or vermagic.split(' ')[0]}  "
+                  f"{author}  {description}")
+            print(f"    {shipped.get(sha, '')}")
+        return
+
+    start = time.perf_counter()
+    try:
+        if args.command == "i2c":
+            groups = query_i2c(db, args.address)
+        elif args.command == "gpio":
+            groups = query_gpio(db, args.bank)
+        elif args.command == "const":
+            groups = {"constants": query_constants(db, args.values)}
+        elif args.command == "sym":
+            groups = {"symbols": query_symbol(db, args.name)}
+        else:
+            groups = {"strings": query_strings(db, args.pattern)}
+    except (ValueError, re.error) as e:
+        print(f"[modules] ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    total = _print_hits(db, groups)
+    print(f"[modules] {total} hit(s) in {elapsed * 1000:.1f} ms")
+    if not total:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
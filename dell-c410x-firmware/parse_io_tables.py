@@ -9,8 +9,147 @@ import os
 import struct
 import sys
 
+from iosapi_catalogue import load_catalogue
+
 BASE = "extracted/rootfs/etc/default/ipmi/evb"
 
+# Sensor drivers whose IS_fl.bin register byte selects a mux channel
+MUX_FIELD_NAMES = {"ADT7462": "mux_sel", "TMP100": "mux_ch"}
+
+# Table geometry
+IS_HEADER_SIZE = 4
+IS_ENTRY_SIZE = 22
+IO_DISPATCH_SLOTS = 37
+IO_ENTRY_START = 4 + IO_DISPATCH_SLOTS * 4
+IO_ENTRY_SIZE = 12
+
+# IO_fl.bin entry types (dispatch table slot numbers)
+IO_TYPE_EEPROM = 9
+IO_TYPE_ADT7462 = 13
+IO_TYPE_GPIO = 14
+IO_TYPE_PCA9544 = 20
+IO_TYPE_IRQ = 23
+IO_TYPE_LED = 24
+IO_TYPE_PMBUS = 31
+
+# The type 20 entries configure the PCA9544A in front of the ADT7462s; the
+# entries themselves only carry per-channel settings, so the 7-bit address
+# (8-bit 0xE0) comes from io-tables/IO_fl.bin.md
+PCA9544_ADDRESS = 0x70
+
+# Type 14 port_cfg values for AST2050 on-chip GPIO, mapped to the two
+# port letters covered by the 16-bit pin mask (low byte, high byte)
+ONCHIP_GPIO_PORTS = {0x4000: "AB", 0x4002: "EF", 0x4004: "IJ", 0x4006: "MN"}
+
+
+def i2c_address_7bit(dev_addr):
+    """Normalise a table address byte: values above 0x7F are 8-bit."""
+    return dev_addr >> 1 if dev_addr > 0x7F else dev_addr
+
+
+def decode_is_fl(data):
+    """Decode IS_fl.bin into a list of sensor entry dicts."""
+    analog_count = data[2]
+    discrete_count = data[3]
+    sensors = []
+    for i in range(analog_count + discrete_count):
+        offset = IS_HEADER_SIZE + i * IS_ENTRY_SIZE
+        entry = data[offset:offset + IS_ENTRY_SIZE]
+        if len(entry) < IS_ENTRY_SIZE:
+            break
+        sensors.append({
+            "index": i,
+            "offset": offset,
+            "analog": i < analog_count,
+            "sensor": entry[0],
+            "flags": entry[1],
+            "dev_addr": entry[14],
+            "bus": entry[15],
+            "reg_mux": entry[16],
+            "iosapi": struct.unpack_from('<I', entry, 18)[0],
+        })
+    return sensors
+
+
+def decode_io_fl(data):
+    """Decode IO_fl.bin into {type: [entry dicts]} via the dispatch table."""
+    types = {}
+    for t in range(IO_DISPATCH_SLOTS):
+        count, start = struct.unpack_from('<HH', data, 4 + t * 4)
+        entries = []
+        for idx in range(start, start + count):
+            offset = IO_ENTRY_START + idx * IO_ENTRY_SIZE
+            if offset + IO_ENTRY_SIZE > len(data):
+                break
+            addr_mask, reg_bus, port_cfg, driver, dev_id = struct.unpack_from(
+                '<HHHIH', data, offset)
+            entries.append({
+                "index": idx,
+                "offset": offset,
+                "type": t,
+                "addr_mask": addr_mask,
+                "reg_bus": reg_bus,
+                "port_cfg": port_cfg,
+                "driver": driver,
+                "dev_id": dev_id,
+            })
+        if entries:
+            types[t] = entries
+    return types
+
+
+def decode_sdr(data):
+    """Split NVRAM_SDR00.dat into a list of SDR record dicts.
+
+    Each record is record ID (2), SDR version (1), record type (1), body
+    length (1) and the body; "raw" holds the whole record as Get SDR
+    returns it. Decoding stops at the first length that does not fit.
+    """
+    records = []
+    offset = 0
+    while offset + 5 <= len(data):
+        rec_id, sdr_ver, rec_type, rec_len = struct.unpack_from('<HBBB', data, offset)
+        if rec_len == 0 or rec_len > 64 or offset + 5 + rec_len > len(data):
+            break
+        records.append({
+            "offset": offset,
+            "record_id": rec_id,
+            "version": sdr_ver,
+            "type": rec_type,
+            "raw": data[offset:offset + 5 + rec_len],
+        })
+        offset += 5 + rec_len
+    return records
+
+
+def onchip_gpio_pins(entry):
+    """Return the AST2050 pin names (e.g. "B3") selected by a type 14 entry."""
+    letters = ONCHIP_GPIO_PORTS.get(entry["port_cfg"])
+    if letters is None:
+        return []
+    return [f"{letters[bit // 8]}{bit % 8}"
+            for bit in range(16) if entry["addr_mask"] & (1 << bit)]
+
+
+def pca9555_location(entry):
+    """Return (bus, 7-bit address) for a PCA9555 type 14 entry, else None."""
+    if entry["port_cfg"] in ONCHIP_GPIO_PORTS:
+        return None
+    return (entry["port_cfg"] >> 8) & 0xFF, (entry["port_cfg"] & 0xFF) >> 1
+
+
+def describe_sensor_driver(driver, dev_addr, reg_mux):
+    """Build the notes column for an IS_fl.bin entry from its catalogue entry."""
+    if driver is None:
+        return ""
+    notes = driver["label"]
+    field = MUX_FIELD_NAMES.get((driver.get("chip") or "").upper())
+    if field:
+        notes += f" ({field}=0x{reg_mux:02X})"
+    elif dev_addr > 0x7F:
+        notes += f" (7-bit=0x{dev_addr >> 1:02X})"
+    return notes
+
 
 def parse_is_fl_bin():
     """Parse IS_fl.bin - the sensor table."""
@@ -20,6 +159,10 @@ def parse_is_fl_bin():
 
     print(f"IS_fl.bin: {len(data)} bytes")
 
+    drivers = load_catalogue()
+    if not drivers:
+        print("  (no driver catalogue: extract sbin/fullfw to classify drivers)")
+
     # Header
     version = data[0]
     analog_count = data[2]
@@ -36,52 +179,30 @@ def parse_is_fl_bin():
     print(f"  {'#':>3s} {'Sensor':>6s} {'Flags':>5s} {'DevAddr':>7s} {'Bus':>4s} {'Reg/Mux':>7s} {'IOSAPI':>10s}  Notes")
     print(f"  {'':->3s} {'':->6s} {'':->5s} {'':->7s} {'':->4s} {'':->7s} {'':->10s}  {'':->40s}")
 
-    for i in range(total):
-        offset = 4 + i * 22
-        entry = data[offset:offset + 22]
-        if len(entry) < 22:
-            break
-
-        sensor_num = entry[0]
-        sensor_flags = entry[1]
+    for sensor in decode_is_fl(data):
+        i = sensor["index"]
+        sensor_num = sensor["sensor"]
+        sensor_flags = sensor["flags"]
 
         # Bytes 14-15: I2C device address (low) + bus ID (high)
-        dev_addr = entry[14]
-        bus_id = entry[15]
+        dev_addr = sensor["dev_addr"]
+        bus_id = sensor["bus"]
 
         # Byte 16: register or mux index
-        reg_mux = entry[16]
+        reg_mux = sensor["reg_mux"]
 
         # Bytes 18-21: IOSAPI driver pointer
-        iosapi = struct.unpack_from('<I', entry, 18)[0]
-
-        # Classify the sensor
-        notes = ""
-        if iosapi == 0x000fcc0c:
-            notes = f"INA219 Power (7-bit=0x{dev_addr >> 1:02X})" if dev_addr > 0x7F else f"INA219 Power"
-        elif iosapi == 0x000fcbcc:
-            notes = f"ADT7462 Temp (mux_sel=0x{reg_mux:02X})"
-        elif iosapi == 0x000fcbdc:
-            notes = f"ADT7462 Fan (mux_sel=0x{reg_mux:02X})"
-        elif iosapi == 0x000fcbfc:
-            notes = f"TMP100 Temp (mux_ch=0x{reg_mux:02X})"
-        elif iosapi == 0x000fc344:
-            notes = f"FB Temp (7-bit=0x{dev_addr >> 1:02X})" if dev_addr > 0x7F else "FB Temp"
-        elif iosapi == 0x000fc3d4:
-            notes = f"PMBus PSU"
-        elif iosapi == 0x0010a5a8:
-            notes = "PCIe Presence (GPIO)"
-        elif iosapi == 0x0010a5b0:
-            notes = "PSU Presence (GPIO)"
-        elif iosapi == 0x0010a5b8:
-            notes = "Sys Power Monitor (GPIO)"
+        iosapi = sensor["iosapi"]
+
+        # Classify the sensor from the fullfw driver catalogue
+        notes = describe_sensor_driver(drivers.get(iosapi), dev_addr, reg_mux)
 
         # Determine if address is 7-bit or 8-bit
         addr_str = f"0x{dev_addr:02X}"
         if dev_addr > 0x7F:
             addr_str += f" (7b=0x{dev_addr >> 1:02X})"
 
-        category = "A" if i < analog_count else "D"
+        category = "A" if sensor["analog"] else "D"
         print(f"  {i:3d} 0x{sensor_num:02X}  0x{sensor_flags:02X} {addr_str:>15s} 0x{bus_id:02X} 0x{reg_mux:02X}    0x{iosapi:08X}  {notes}")
 
     print()
@@ -284,24 +405,16 @@ def parse_sdr():
         data = f.read()
     print(f"\nNVRAM_SDR00.dat: {len(data)} bytes")
 
-    # SDR records start after a header
-    # Each record: record ID (2), version (1), record type (1), length (1), data...
-    offset = 0
     record_count = 0
 
     # Simple SDR parsing - look for Full Sensor Records (type 0x01)
-    while offset + 5 <= len(data):
-        rec_id = struct.unpack_from('<H', data, offset)[0]
-        sdr_ver = data[offset + 2]
-        rec_type = data[offset + 3]
-        rec_len = data[offset + 4]
-
-        if rec_len == 0 or rec_len > 64 or offset + 5 + rec_len > len(data):
-            break
+    for record in decode_sdr(data):
+        rec_type = record["type"]
+        rec_data = record["raw"][5:]
+        rec_len = len(rec_data)
 
         if rec_type == 0x01 and rec_len >= 43:
             # Full Sensor Record
-            rec_data = data[offset + 5:offset + 5 + rec_len]
             sensor_num = rec_data[2]
             entity_id = rec_data[3]
             entity_instance = rec_data[4]
@@ -333,7 +446,6 @@ def parse_sdr():
 
         elif rec_type == 0x02 and rec_len >= 21:
             # Compact Sensor Record
-            rec_data = data[offset + 5:offset + 5 + rec_len]
             sensor_num = rec_data[2]
             entity_id = rec_data[3]
             entity_instance = rec_data[4]
@@ -347,8 +459,6 @@ def parse_sdr():
             print(f"  Sensor 0x{sensor_num:02X}: type=0x{sensor_type:02X} entity={entity_id}.{entity_instance} name='{name_str}' [compact]")
             record_count += 1
 
-        offset += 5 + rec_len
-
     print(f"  Total sensor records: {record_count}")
 
 
@@ -0,0 +1,720 @@
+#!/usr/bin/env python3
+"""Model of the _DCSI_ .pec firmware container, with in-place repacking.
+
+A C410X .pec image (see ANALYSIS.md, "PEC File Format") is laid out as:
+
+    0x000000  _DCSI_ header, AEVB section marker at 0x70   (0x258 bytes)
+    0x000258  uImage: 64-byte header + gzip'd kernel
+    ........  SquashFS 3.1 (little endian, zlib) root filesystem
+    ........  U-Boot 1.2.0
+
+PecImage parses the header fields and locates the regions; SquashFS3 is a
+small read-only SquashFS 3.x reader (superblock, inode and directory
+tables, fragment table) that can also rewrite a file's contents in place.
+
+Repacking never moves anything. A replacement file must keep its size;
+only the data blocks and fragment blocks that hold changed bytes are
+decompressed, patched and recompressed, and each must fit in the space
+its old compressed copy used (the rest is zero padding, which the kernel's
+inflate stops short of). Since no block moves or changes its recorded
+size, the inode, directory and fragment tables stay valid as they are.
+If a block does not fit, RepackError is raised and nothing is written -
+that edit needs a full mksquashfs rebuild. The uImage header and data
+CRCs are re-checked and fixed before saving.
+
+Usage:
+    python3 pec_container.py info backup/c410xbmc135.zip
+    python3 pec_container.py ls BM3P135.pec etc/default/ipmi/evb
+    python3 pec_container.py cat BM3P135.pec etc/default/ipmi/evb/IO_fl.bin -o IO_fl.bin
+    python3 pec_container.py replace BM3P135.pec \\
+        etc/default/ipmi/evb/IO_fl.bin=IO_fl.bin -o BM3P135-patched.pec
+    python3 pec_container.py split BM3P135-patched.pec tftp/   # uImage + rootfs for tftp_boot.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+
+DCSI_MAGIC = b"_DCSI_"
+AEVB_MARKER = b"AEVB"
+AEVB_OFFSET = 0x70
+DCSI_HEADER_SIZE = 0x258
+
+# Documented _DCSI_ header fields: name -> (offset, size). Everything else
+# in the header is kept byte for byte.
+DCSI_FIELDS = {
+    "product": (0x0B, 15),
+    "platform": (0x1B, 9),
+    "version": (0x25, 4),
+    "vendor": (0x2A, 4),
+    "timestamp": (0x2F, 12),
+}
+
+UIMAGE_MAGIC = 0x27051956
+UIMAGE_HEADER_SIZE = 64
+UIMAGE_HEADER_FMT = ">7I4B32s"
+
+# U-Boot's ARM start.S: "b reset" followed by seven "ldr pc, [pc, #0x14]"
+UBOOT_VECTORS = b"\x14\xf0\x9f\xe5" * 6
+
+# SquashFS 3.x
+SQUASHFS_MAGIC = b"hsqs"
+SQUASHFS_SUPERBLOCK_SIZE = 119
+SQUASHFS_COMPRESSED_BIT = 1 << 15         # metadata block header: stored
+SQUASHFS_COMPRESSED_BIT_BLOCK = 1 << 24   # data block / fragment size: stored
+SQUASHFS_INVALID_FRAG = 0xFFFFFFFF
+SQUASHFS_CHECK = 0x04
+SQUASHFS_FRAGMENT_ENTRY_SIZE = 16
+SQUASHFS_METADATA_SIZE = 8192
+
+DIR_TYPE = 1
+REG_TYPE = 2
+SYMLINK_TYPE = 3
+BLKDEV_TYPE = 4
+CHRDEV_TYPE = 5
+FIFO_TYPE = 6
+SOCKET_TYPE = 7
+LDIR_TYPE = 8
+LREG_TYPE = 9
+
+# Fixed part of each inode type, before any block list / name / index
+INODE_SIZES = {
+    DIR_TYPE: 28, REG_TYPE: 32, SYMLINK_TYPE: 18, BLKDEV_TYPE: 18, CHRDEV_TYPE: 18,
+    FIFO_TYPE: 16, SOCKET_TYPE: 16, LDIR_TYPE: 31, LREG_TYPE: 40,
+}
+TYPE_CHARS = {DIR_TYPE: "d", LDIR_TYPE: "d", REG_TYPE: "-", LREG_TYPE: "-", SYMLINK_TYPE: "l",
+              BLKDEV_TYPE: "b", CHRDEV_TYPE: "c", FIFO_TYPE: "p", SOCKET_TYPE: "s"}
+
+DIR_HEADER_SIZE = 8
+DIR_ENTRY_SIZE = 5
+
+
+class PecError(ValueError):
+    """The image is not a .pec container we understand."""
+
+
+class RepackError(PecError):
+    """An edit cannot be applied in place."""
+
+
+# ---------------------------------------------------------------------------
+# Container headers
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Region:
+    name: str
+    offset: int
+    size: int
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+@dataclass
+class DcsiHeader:
+    """The _DCSI_ header; ``raw`` keeps the undocumented bytes."""
+
+    product: str
+    platform: str
+    version: str
+    vendor: str
+    timestamp: str
+    raw: bytes = field(repr=False)
+
+    @classmethod
+    def parse(cls, data: bytes) -> DcsiHeader:
+        if data[:len(DCSI_MAGIC)] != DCSI_MAGIC:
+            raise PecError(f"no {DCSI_MAGIC.decode()} magic (starts with {bytes(data[:8])!r})")
+        if data[AEVB_OFFSET:AEVB_OFFSET + 4] != AEVB_MARKER:
+            raise PecError(f"no AEVB section marker at 0x{AEVB_OFFSET:X}")
+        fields = {name: bytes(data[off:off + size]).split(b"\0")[0].decode("ascii", "replace")
+                  for name, (off, size) in DCSI_FIELDS.items()}
+        return cls(raw=bytes(data[:DCSI_HEADER_SIZE]), **fields)
+
+    def pack(self) -> bytes:
+        raw = bytearray(self.raw)
+        for name, (off, size) in DCSI_FIELDS.items():
+            value = getattr(self, name).encode("ascii")
+            if len(value) > size:
+                raise PecError(f"{name} {value!r} longer than {size} bytes")
+            raw[off:off + size] = value.ljust(size, b"\0")
+        return bytes(raw)
+
+
+@dataclass
+class UImageHeader:
+    """U-Boot legacy image header (big endian)."""
+
+    magic: int
+    hcrc: int
+    time: int
+    size: int
+    load: int
+    ep: int
+    dcrc: int
+    os: int
+    arch: int
+    type: int
+    comp: int
+    name: str
+
+    @classmethod
+    def parse(cls, data: bytes, offset: int = 0) -> UImageHeader:
+        values = struct.unpack_from(UIMAGE_HEADER_FMT, data, offset)
+        if values[0] != UIMAGE_MAGIC:
+            raise PecError(f"no uImage magic at 0x{offset:X}")
+        return cls(*values[:11], name=values[11].split(b"\0")[0].decode("ascii", "replace"))
+
+    def pack(self) -> bytes:
+        """Header bytes with ``hcrc`` recomputed."""
+        def packed(hcrc: int) -> bytes:
+            return struct.pack(UIMAGE_HEADER_FMT, self.magic, hcrc, self.time, self.size,
+                               self.load, self.ep, self.dcrc, self.os, self.arch, self.type,
+                               self.comp, self.name.encode("ascii")[:32])
+        self.hcrc = zlib.crc32(packed(0))
+        return packed(self.hcrc)
+
+
+# ---------------------------------------------------------------------------
+# SquashFS 3.x
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Inode:
+    ref: int
+    type: int
+    mode: int
+    number: int
+    mtime: int
+    file_size: int = 0
+    start_block: int = 0
+    offset: int = 0
+    fragment: int = SQUASHFS_INVALID_FRAG
+    frag_offset: int = 0
+    block_list: list[int] = field(default_factory=list)
+    target: str = ""
+
+    @property
+    def is_dir(self) -> bool:
+        return self.type in (DIR_TYPE, LDIR_TYPE)
+
+    @property
+    def is_file(self) -> bool:
+        return self.type in (REG_TYPE, LREG_TYPE)
+
+
+@dataclass
+class DirEntry:
+    name: str
+    type: int
+    inode_ref: int
+
+
+@dataclass
+class Extent:
+    """Where one piece of a file is stored on disk."""
+
+    kind: str            # "block" or "fragment"
+    file_offset: int
+    length: int
+    disk_offset: int     # absolute, in the containing buffer
+    disk_size: int
+    compressed: bool
+    inner_offset: int    # where the piece starts in the decompressed block
+
+
+@dataclass
+class BlockPatch:
+    path: str
+    kind: str
+    disk_offset: int
+    disk_size: int
+    new_size: int
+    level: Optional[int]  # zlib level, None for a stored block
+    data: bytes = field(repr=False, default=b"")
+
+
+class _MetaStream:
+    """Sequential reader over a SquashFS metadata table."""
+
+    def __init__(self, fs: SquashFS3, table_start: int, block: int, offset: int) -> None:
+        self.fs = fs
+        self.pos = table_start + block
+        self.offset = offset
+
+    def read(self, length: int) -> bytes:
+        out = bytearray()
+        while len(out) < length:
+            block, next_pos = self.fs.metadata_block(self.pos)
+            chunk = block[self.offset:self.offset + length - len(out)]
+            out += chunk
+            self.offset += len(chunk)
+            if self.offset >= len(block):
+                self.pos, self.offset = next_pos, 0
+            elif not chunk:
+                raise PecError(f"metadata read past end of block at 0x{self.pos:X}")
+        return bytes(out)
+
+
+class SquashFS3:
+    """SquashFS 3.x (little endian) inside a larger buffer.
+
+    Args:
+        buf: The buffer holding the filesystem; repacking writes into it.
+        base: Offset of the superblock in ``buf``.
+    """
+
+    def __init__(self, buf: bytearray, base: int = 0) -> None:
+        self.buf = buf
+        self.base = base
+        sb = bytes(buf[base:base + SQUASHFS_SUPERBLOCK_SIZE])
+        if sb[:4] != SQUASHFS_MAGIC:
+            raise PecError(f"no little-endian SquashFS magic at 0x{base:X}")
+        self.inodes, = struct.unpack_from("<I", sb, 4)
+        self.major, self.minor = struct.unpack_from("<HH", sb, 28)
+        if self.major != 3:
+            raise PecError(f"SquashFS {self.major}.{self.minor} at 0x{base:X}, expected 3.x")
+        self.flags = sb[36]
+        self.mkfs_time, self.root_inode, self.block_size, self.fragments = \
+            struct.unpack_from("<iQII", sb, 39)
+        (self.bytes_used, _, _, self.inode_table_start, self.directory_table_start,
+         self.fragment_table_start, _) = struct.unpack_from("<7Q", sb, 63)
+        self._meta_cache: dict[int, tuple[bytes, int]] = {}
+
+    @property
+    def size(self) -> int:
+        return self.bytes_used
+
+    def metadata_block(self, pos: int) -> tuple[bytes, int]:
+        """Decompressed metadata block at ``pos`` (relative to the superblock),
+        and the position of the one after it."""
+        cached = self._meta_cache.get(pos)
+        if cached is not None:
+            return cached
+        start = self.base + pos
+        header, = struct.unpack_from("<H", self.buf, start)
+        length = header & ~SQUASHFS_COMPRESSED_BIT
+        start += 2 + (1 if self.flags & SQUASHFS_CHECK else 0)
+        raw = bytes(self.buf[start:start + length])
+        try:
+            block = raw if header & SQUASHFS_COMPRESSED_BIT else zlib.decompress(raw)
+        except zlib.error as e:
+            raise PecError(f"bad metadata block at 0x{pos:X}: {e}") from None
+        result = (block, start + length - self.base)
+        self._meta_cache[pos] = result
+        return result
+
+    # -- inodes and directories ---------------------------------------------
+
+    def inode(self, ref: int) -> Inode:
+        """Read the inode at ``ref`` ((block << 16) | offset into the inode table)."""
+        stream = _MetaStream(self, self.inode_table_start, ref >> 16, ref & 0xFFFF)
+        base = stream.read(12)
+        word, mtime, number = struct.unpack_from("<IiI", base)
+        itype = word & 0xF
+        if itype not in INODE_SIZES:
+            raise PecError(f"bad inode type {itype} at ref 0x{ref:X}")
+        raw = base + stream.read(INODE_SIZES[itype] - 12)
+        inode = Inode(ref, itype, (word >> 4) & 0xFFF, number, mtime)
+
+        if itype == REG_TYPE:
+            inode.start_block, inode.fragment, inode.frag_offset, inode.file_size = \
+                struct.unpack_from("<QIII", raw, 12)
+        elif itype == LREG_TYPE:
+            inode.start_block, inode.fragment, inode.frag_offset, inode.file_size = \
+                struct.unpack_from("<QIIQ", raw, 16)
+        elif itype == DIR_TYPE:
+            packed, inode.start_block = struct.unpack_from("<II", raw, 16)
+            inode.file_size, inode.offset = packed & 0x7FFFF, packed >> 19
+        elif itype == LDIR_TYPE:
+            packed = int.from_bytes(raw[16:21], "little")
+            inode.file_size, inode.offset = packed & 0x7FFFFFF, packed >> 27
+            inode.start_block, = struct.unpack_from("<I", raw, 21)
+        elif itype == SYMLINK_TYPE:
+            length, = struct.unpack_from("<H", raw, 16)
+            inode.target = stream.read(length).decode("utf-8", "replace")
+
+        if inode.is_file:
+            if inode.fragment == SQUASHFS_INVALID_FRAG:
+                count = -(-inode.file_size // self.block_size)
+            else:
+                count = inode.file_size // self.block_size
+            inode.block_list = list(struct.unpack(f"<{count}I", stream.read(4 * count)))
+        return inode
+
+    def listdir(self, inode: Inode) -> list[DirEntry]:
+        if not inode.is_dir:
+            raise PecError(f"inode {inode.number} is not a directory")
+        stream = _MetaStream(self, self.directory_table_start, inode.start_block, inode.offset)
+        entries = []
+        consumed = 0
+        # The recorded size may include 3 bytes for "." and "..": stop once
+        # there is no room left for another header and entry
+        while consumed + DIR_HEADER_SIZE + DIR_ENTRY_SIZE <= inode.file_size:
+            word, _ = struct.unpack("<Ii", stream.read(DIR_HEADER_SIZE))
+            count, start_block = (word & 0xFF) + 1, word >> 8
+            consumed += DIR_HEADER_SIZE
+            for _ in range(count):
+                bits = int.from_bytes(stream.read(DIR_ENTRY_SIZE), "little")
+                offset, etype, size = bits & 0x1FFF, (bits >> 13) & 0x7, (bits >> 16) & 0xFF
+                name = stream.read(size + 1).decode("utf-8", "replace")
+                consumed += DIR_ENTRY_SIZE + size + 1
+                entries.append(DirEntry(name, etype, start_block << 16 | offset))
+        return entries
+
+    def lookup(self, path: str) -> Inode:
+        inode = self.inode(self.root_inode)
+        for part in [p for p in path.strip("/").split("/") if p]:
+            match = None
+            if inode.is_dir:
+                match = next((e for e in self.listdir(inode) if e.name == part), None)
+            if match is None:
+                raise FileNotFoundError(f"{path}: not in the root filesystem")
+            inode = self.inode(match.inode_ref)
+        return inode
+
+    # -- file data ------------------------------------------------------------
+
+    def fragment_entry(self, index: int) -> tuple[int, int]:
+        """(start, size word) of fragment ``index``."""
+        if index >= self.fragments:
+            raise PecError(f"fragment {index} out of range ({self.fragments})")
+        per_block = SQUASHFS_METADATA_SIZE // SQUASHFS_FRAGMENT_ENTRY_SIZE
+        location, = struct.unpack_from(
+            "<Q", self.buf, self.base + self.fragment_table_start + 8 * (index // per_block))
+        stream = _MetaStream(self, 0, location,
+                             (index % per_block) * SQUASHFS_FRAGMENT_ENTRY_SIZE)
+        start, size, _ = struct.unpack("<QII", stream.read(SQUASHFS_FRAGMENT_ENTRY_SIZE))
+        return start, size
+
+    def extents(self, inode: Inode) -> list[Extent]:
+        if not inode.is_file:
+            raise PecError(f"inode {inode.number} is not a regular file")
+        extents = []
+        disk = inode.start_block
+        for i, word in enumerate(inode.block_list):
+            size = word & ~SQUASHFS_COMPRESSED_BIT_BLOCK
+            length = min(self.block_size, inode.file_size - i * self.block_size)
+            extents.append(Extent("block", i * self.block_size, length, self.base + disk, size,
+                                  not word & SQUASHFS_COMPRESSED_BIT_BLOCK, 0))
+            disk += size
+        if inode.fragment != SQUASHFS_INVALID_FRAG:
+            start, word = self.fragment_entry(inode.fragment)
+            offset = len(inode.block_list) * self.block_size
+            extents.append(Extent("fragment", offset, inode.file_size - offset, self.base + start,
+                                  word & ~SQUASHFS_COMPRESSED_BIT_BLOCK,
+                                  not word & SQUASHFS_COMPRESSED_BIT_BLOCK, inode.frag_offset))
+        return extents
+
+    def _block(self, extent: Extent) -> bytes:
+        """The whole decompressed block or fragment block holding ``extent``."""
+        if extent.disk_size == 0:
+            return bytes(extent.length)  # sparse block
+        raw = bytes(self.buf[extent.disk_offset:extent.disk_offset + extent.disk_size])
+        if not extent.compressed:
+            return raw
+        try:
+            # decompressobj: the stream may be followed by zero padding
+            return zlib.decompressobj().decompress(raw)
+        except zlib.error as e:
+            raise PecError(f"bad {extent.kind} at 0x{extent.disk_offset:X}: {e}") from None
+
+    def read(self, inode: Inode) -> bytes:
+        out = bytearray()
+        for extent in self.extents(inode):
+            block = self._block(extent)
+            out += block[extent.inner_offset:extent.inner_offset + extent.length]
+        return bytes(out)
+
+    def read_file(self, path: str) -> bytes:
+        return self.read(self.lookup(path))
+
+    def plan_replace(self, path: str, data: bytes) -> list[BlockPatch]:
+        """Work out the block rewrites that turn ``path`` into ``data``.
+
+        Raises:
+            RepackError: The size differs, or a block no longer fits.
+        """
+        inode = self.lookup(path)
+        if len(data) != inode.file_size:
+            raise RepackError(f"{path}: new size {len(data)} != {inode.file_size}; "
+                              f"changing a file's size needs a full rebuild")
+        patches = []
+        for extent in self.extents(inode):
+            lo, hi = extent.file_offset, extent.file_offset + extent.length
+            block = self._block(extent)
+            piece = block[extent.inner_offset:extent.inner_offset + extent.length]
+            if piece == data[lo:hi]:
+                continue
+            if extent.disk_size == 0:
+                raise RepackError(f"{path}: block at file offset {lo} is sparse")
+            new = (block[:extent.inner_offset] + data[lo:hi]
+                   + block[extent.inner_offset + extent.length:])
+            patches.append(self._recompress(path, extent, new))
+        return patches
+
+    def _recompress(self, path: str, extent: Extent, block: bytes) -> BlockPatch:
+        if not extent.compressed:
+            return BlockPatch(path, extent.kind, extent.disk_offset, extent.disk_size,
+                              len(block), None, block)
+        best = None
+        for level in range(9, 0, -1):
+            packed = zlib.compress(block, level)
+            if best is None or len(packed) < len(best[1]):
+                best = (level, packed)
+            if len(packed) <= extent.disk_size:
+                return BlockPatch(path, extent.kind, extent.disk_offset, extent.disk_size,
+                                  len(packed), level,
+                                  packed + bytes(extent.disk_size - len(packed)))
+        raise RepackError(f"{path}: {extent.kind} at 0x{extent.disk_offset:X} recompresses to "
+                          f"{len(best[1])} bytes (level {best[0]}), only {extent.disk_size} "
+                          f"available; needs a full rebuild")
+
+    def apply(self, patches: list[BlockPatch]) -> None:
+        for patch in patches:
+            self.buf[patch.disk_offset:patch.disk_offset + patch.disk_size] = patch.data
+
+    def walk(self, path: str = "/"):
+        """Yield (path, inode) for everything under ``path``."""
+        inode = self.lookup(path)
+        yield path, inode
+        if inode.is_dir:
+            for entry in self.listdir(inode):
+                yield from self.walk(f"{path.rstrip('/')}/{entry.name}")
+
+
+def find_squashfs_superblock(data: bytes, start: int = 0) -> int:
+    """Offset of the first plausible SquashFS 3.x superblock at or after ``start``."""
+    pos = data.find(SQUASHFS_MAGIC, start)
+    while pos != -1:
+        if pos + SQUASHFS_SUPERBLOCK_SIZE <= len(data):
+            inodes, = struct.unpack_from("<I", data, pos + 4)
+            major, = struct.unpack_from("<H", data, pos + 28)
+            if major == 3 and 10 < inodes < 100000:
+                return pos
+        pos = data.find(SQUASHFS_MAGIC, pos + 1)
+    raise PecError("no SquashFS 3.x superblock found")
+
+
+# ---------------------------------------------------------------------------
+# The container
+# ---------------------------------------------------------------------------
+
+class PecImage:
+    """A parsed .pec image; edits go into ``data`` until save()."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = bytearray(data)
+        self.header = DcsiHeader.parse(self.data)
+        self.uimage = UImageHeader.parse(self.data, DCSI_HEADER_SIZE)
+        kernel = Region("uImage", DCSI_HEADER_SIZE, UIMAGE_HEADER_SIZE + self.uimage.size)
+        self.squashfs = SquashFS3(self.data, find_squashfs_superblock(self.data, kernel.end))
+        rootfs = Region("squashfs", self.squashfs.base, self.squashfs.size)
+
+        self.regions = [Region("dcsi_header", 0, DCSI_HEADER_SIZE), kernel]
+        if rootfs.offset > kernel.end:
+            self.regions.append(Region("gap", kernel.end, rootfs.offset - kernel.end))
+        self.regions.append(rootfs)
+        vectors = self.data.find(UBOOT_VECTORS, rootfs.end)
+        uboot_start = vectors - 4 if vectors >= rootfs.end + 4 else -1
+        if uboot_start >= 0:
+            if uboot_start > rootfs.end:
+                self.regions.append(Region("gap", rootfs.end, uboot_start - rootfs.end))
+            self.regions.append(Region("u-boot", uboot_start, len(self.data) - uboot_start))
+        elif rootfs.end < len(self.data):
+            self.regions.append(Region("trailer", rootfs.end, len(self.data) - rootfs.end))
+        self.patches: list[BlockPatch] = []
+
+    @classmethod
+    def load(cls, path: str) -> PecImage:
+        """Load a .pec, or the first .pec inside a firmware .zip."""
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                names = [n for n in zf.namelist() if n.lower().endswith(".pec")]
+                if not names:
+                    raise PecError(f"{path}: no .pec inside")
+                return cls(zf.read(names[0]))
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def region(self, name: str) -> Region:
+        for region in self.regions:
+            if region.name == name:
+                return region
+        raise KeyError(name)
+
+    def region_bytes(self, name: str) -> bytes:
+        region = self.region(name)
+        return bytes(self.data[region.offset:region.end])
+
+    def replace_files(self, files: dict[str, bytes]) -> list[BlockPatch]:
+        """Rewrite files in the root filesystem in place, all or nothing.
+
+        Raises:
+            RepackError: Some edit cannot be done in place; nothing changed.
+            FileNotFoundError: A path does not exist.
+        """
+        # Files can share a fragment block, so each file is planned against
+        # the image with the previous ones already applied. The work happens
+        # on a copy that replaces self.data only once every file reads back.
+        work = bytearray(self.data)
+        fs = SquashFS3(work, self.squashfs.base)
+        patches: list[BlockPatch] = []
+        for path, data in files.items():
+            for patch in fs.plan_replace(path, data):
+                fs.apply([patch])
+                earlier = next((p for p in patches if p.disk_offset == patch.disk_offset), None)
+                if earlier is not None:
+                    patches.remove(earlier)
+                    patch.path = f"{earlier.path}, {patch.path}"
+                patches.append(patch)
+        for path, data in files.items():
+            if fs.read_file(path) != data:
+                raise PecError(f"{path}: read-back after repack does not match")
+        self.data[:] = work
+        self.patches += patches
+        return patches
+
+    def check(self) -> list[str]:
+        """Problems with the checksums we know about."""
+        problems = []
+        header = bytes(self.data[DCSI_HEADER_SIZE:DCSI_HEADER_SIZE + UIMAGE_HEADER_SIZE])
+        if zlib.crc32(header[:4] + bytes(4) + header[8:]) != self.uimage.hcrc:
+            problems.append("uImage header CRC")
+        start = DCSI_HEADER_SIZE + UIMAGE_HEADER_SIZE
+        if zlib.crc32(self.data[start:start + self.uimage.size]) != self.uimage.dcrc:
+            problems.append("uImage data CRC")
+        return problems
+
+    def fix_checksums(self) -> list[str]:
+        """Recompute the checksums check() reports; returns what was fixed."""
+        problems = self.check()
+        if problems:
+            start = DCSI_HEADER_SIZE + UIMAGE_HEADER_SIZE
+            self.uimage.dcrc = zlib.crc32(self.data[start:start + self.uimage.size])
+            self.data[DCSI_HEADER_SIZE:start] = self.uimage.pack()
+        self.data[:DCSI_HEADER_SIZE] = self.header.pack()
+        return problems
+
+    def save(self, path: str) -> None:
+        self.fix_checksums()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.data)
+        os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def print_info(pec: PecImage) -> None:
+    h, u, fs = pec.header, pec.uimage, pec.squashfs
+    print(f"_DCSI_ header: product={h.product!r} platform={h.platform!r} version={h.version!r} "
+          f"vendor={h.vendor!r} timestamp={h.timestamp!r}")
+    print(f"uImage: {u.name!r} size={u.size:,} load=0x{u.load:08X} ep=0x{u.ep:08X} "
+          f"created={time.strftime('%Y-%m-%d', time.gmtime(u.time))}")
+    print(f"SquashFS {fs.major}.{fs.minor}: {fs.inodes} inodes, {fs.bytes_used:,} bytes, "
+          f"{fs.block_size // 1024}K blocks, {fs.fragments} fragments, "
+          f"created {time.strftime('%Y-%m-%d', time.gmtime(fs.mkfs_time))}")
+    print()
+    print(f"  {'region':12s} {'offset':>10s} {'end':>10s} {'size':>12s}")
+    for r in pec.regions:
+        print(f"  {r.name:12s} 0x{r.offset:08X} 0x{r.end:08X} {r.size:12,d}")
+    problems = pec.check()
+    print(f"\nChecksums: {'BAD ' + ', '.join(problems) if problems else 'uImage header and data OK'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect and repack _DCSI_ .pec firmware images.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("info", help="Header fields, regions and checksums")
+    p.add_argument("image")
+    p = sub.add_parser("ls", help="List a directory of the root filesystem")
+    p.add_argument("image")
+    p.add_argument("path", nargs="?", default="/")
+    p.add_argument("-R", action="store_true", dest="recursive", help="Recurse")
+    p = sub.add_parser("cat", help="Extract one file")
+    p.add_argument("image")
+    p.add_argument("path")
+    p.add_argument("-o", "--output", help="Write here instead of stdout")
+    p = sub.add_parser("replace", help="Replace files in place and write a new image")
+    p.add_argument("image")
+    p.add_argument("files", nargs="+", metavar="PATH=FILE")
+    p.add_argument("-o", "--output", required=True)
+    p = sub.add_parser("split", help="Write the regions (uImage, rootfs, U-Boot) to a directory")
+    p.add_argument("image")
+    p.add_argument("directory")
+    args = parser.parse_args()
+
+    try:
+        pec = PecImage.load(args.image)
+        if args.command == "info":
+            print_info(pec)
+
+        elif args.command == "ls":
+            fs = pec.squashfs
+            entries = fs.walk(args.path) if args.recursive else (
+                (f"{args.path.rstrip('/')}/{e.name}", fs.inode(e.inode_ref))
+                for e in fs.listdir(fs.lookup(args.path)))
+            for path, inode in entries:
+                mode = TYPE_CHARS.get(inode.type, "?") + format(inode.mode & 0o777, "03o")
+                link = f" -> {inode.target}" if inode.target else ""
+                print(f"{mode} {inode.file_size:>10,d}  {path}{link}")
+
+        elif args.command == "cat":
+            data = pec.squashfs.read_file(args.path)
+            if args.output:
+                with open(args.output, "wb") as f:
+                    f.write(data)
+            else:
+                sys.stdout.buffer.write(data)
+
+        elif args.command == "replace":
+            files = {}
+            for spec in args.files:
+                path, sep, source = spec.partition("=")
+                if not sep:
+                    parser.error(f"expected PATH=FILE, got {spec!r}")
+                with open(source, "rb") as f:
+                    files[path] = f.read()
+            start = time.perf_counter()
+            patches = pec.replace_files(files)
+            fixed = pec.fix_checksums()
+            pec.save(args.output)
+            for p in patches:
+                how = f"zlib -{p.level}" if p.level else "stored"
+                print(f"[pec] {p.path}: {p.kind} at 0x{p.disk_offset:08X} "
+                      f"{p.new_size:,}/{p.disk_size:,} bytes ({how})")
+            if not patches:
+                print("[pec] No changes")
+            if fixed:
+                print(f"[pec] Fixed: {', '.join(fixed)}")
+            print(f"[pec] Wrote {args.output} in {time.perf_counter() - start:.2f}s")
+
+        else:
+            os.makedirs(args.directory, exist_ok=True)
+            names = {"uImage": "uImage", "squashfs": "rootfs.sqfs", "u-boot": "u-boot.bin"}
+            for region in pec.regions:
+                if region.name in names:
+                    out = os.path.join(args.directory, names[region.name])
+                    with open(out, "wb") as f:
+                        f.write(pec.region_bytes(region.name))
+                    print(f"[pec] {out}: {region.size:,} bytes")
+    except (PecError, FileNotFoundError, zipfile.BadZipFile) as e:
+        print(f"[pec] ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
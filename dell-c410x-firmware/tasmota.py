@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#   "requests>=2.28",
+# ]
+# ///
+"""Tasmota smart-plug power control for the C410X test rigs.
+
+All plugs share one pooled requests.Session (PowerController), so
+repeated commands reuse connections and many plugs can be switched at
+once from a thread pool.
+
+Every switch is verified against the POWER state the plug reports. A
+power cycle keeps the plug off only until its energy monitor ("Status
+8") shows the load has drained - at least DRAIN_READINGS consecutive
+readings below DRAIN_POWER_W and DRAIN_CURRENT_A, and no less than the
+minimum off time - instead of a fixed sleep. Plugs without an energy
+monitor fall back to the fixed off time.
+
+PowerSequencer hands out power-on turns at least ``stagger`` seconds
+apart, so a fleet's units come back as soon as each has drained while
+their inrush currents stay spread out.
+
+Usage:
+    python3 tasmota.py --host au-plug-1.iot.welland.mithis.com status
+    python3 tasmota.py --host plug-a --host plug-b cycle [--stagger 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_POOL_SIZE = 16
+
+# Off-time bounds for a power cycle: never shorter than the minimum (let
+# the BMC's rails collapse), and give up if the load has not drained by
+# DRAIN_TIMEOUT (relay stuck, or plug not switching the load)
+DEFAULT_MIN_OFF_TIME = 1.0
+DEFAULT_OFF_TIME = 5.0
+DRAIN_TIMEOUT = 30.0
+
+# A plug is drained below both of these for DRAIN_READINGS polls in a row.
+# Tasmota refreshes its energy readings about once a second.
+DRAIN_POWER_W = 1.0
+DRAIN_CURRENT_A = 0.02
+DRAIN_READINGS = 2
+ENERGY_POLL_INTERVAL = 0.5
+
+
+class TasmotaError(RuntimeError):
+    """A plug did not do what it was told."""
+
+
+@dataclass
+class EnergyReading:
+    """One "Status 8" ENERGY sample."""
+
+    power: float
+    current: float
+    voltage: float
+
+    @property
+    def drained(self) -> bool:
+        return self.power < DRAIN_POWER_W and self.current < DRAIN_CURRENT_A
+
+
+def _power_state(response: dict) -> Optional[bool]:
+    """ON/OFF from a Power command response ({"POWER": "ON"} or POWER1)."""
+    for key in ("POWER", "POWER1"):
+        if key in response:
+            return str(response[key]).upper() == "ON"
+    return None
+
+
+class PowerSequencer:
+    """Hands out power-on turns at least ``stagger`` seconds apart.
+
+    Turns go to callers in the order they ask, so a unit that drains
+    first also powers on first.
+    """
+
+    def __init__(self, stagger: float) -> None:
+        self.stagger = stagger
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait_turn(self) -> float:
+        """Block until this caller may power on; returns the time waited."""
+        with self._lock:
+            now = time.monotonic()
+            turn = max(now, self._next)
+            self._next = turn + self.stagger
+        delay = turn - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class TasmotaPlug:
+    """One plug, talking through its controller's session.
+
+    Args:
+        host: Plug hostname or IP.
+        session: Shared HTTP session.
+        timeout: Per-request timeout in seconds.
+    """
+
+    def __init__(self, host: str, session: requests.Session, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.host = host
+        self.session = session
+        self.timeout = timeout
+        self.has_energy: Optional[bool] = None
+
+    def command(self, command: str) -> dict:
+        """Send a command via the HTTP API and return its JSON response."""
+        resp = self.session.get(f"http://{self.host}/cm", params={"cmnd": command},
+                                timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def state(self) -> Optional[bool]:
+        """Current relay state (True = on), None if the plug did not say."""
+        return _power_state(self.command("Power"))
+
+    def set_power(self, on: bool) -> dict:
+        """Switch the relay and verify the state the plug reports.
+
+        Raises:
+            TasmotaError: The reported state is not the requested one.
+        """
+        response = self.command("Power On" if on else "Power Off")
+        state = _power_state(response)
+        if state is None:
+            state = self.state()
+        if state != on:
+            raise TasmotaError(f"{self.host}: asked for power {'on' if on else 'off'}, "
+                               f"plug reports {response}")
+        return response
+
+    def energy(self) -> Optional[EnergyReading]:
+        """Current energy reading, or None if the plug has no energy monitor."""
+        if self.has_energy is False:
+            return None
+        sensors = self.command("Status 8").get("StatusSNS", {})
+        energy = sensors.get("ENERGY")
+        self.has_energy = energy is not None
+        if energy is None:
+            return None
+        return EnergyReading(
+            power=float(energy.get("Power", 0) or 0),
+            current=float(energy.get("Current", 0) or 0),
+            voltage=float(energy.get("Voltage", 0) or 0),
+        )
+
+    def wait_drained(
+        self,
+        off_at: float,
+        min_off_time: float = DEFAULT_MIN_OFF_TIME,
+        off_time: float = DEFAULT_OFF_TIME,
+        timeout: float = DRAIN_TIMEOUT,
+        log: Callable[[str], None] = print,
+    ) -> float:
+        """Wait until the switched-off load has drained.
+
+        Args:
+            off_at: time.monotonic() when the relay opened.
+            min_off_time: Never return earlier than this after ``off_at``.
+            off_time: Fixed off time used when there is no energy monitor.
+            timeout: Give up after this long off.
+            log: Progress output.
+
+        Returns:
+            Seconds the plug has been off.
+
+        Raises:
+            TasmotaError: The load still draws power after ``timeout``.
+        """
+        reading = self.energy()
+        if reading is None:
+            remaining = off_at + off_time - time.monotonic()
+            log(f"[tasmota] {self.host}: no energy monitor, waiting {max(0.0, remaining):.1f}s")
+            if remaining > 0:
+                time.sleep(remaining)
+            return time.monotonic() - off_at
+
+        consecutive = 0
+        while True:
+            elapsed = time.monotonic() - off_at
+            consecutive = consecutive + 1 if reading.drained else 0
+            if consecutive >= DRAIN_READINGS and elapsed >= min_off_time:
+                log(f"[tasmota] {self.host}: drained after {elapsed:.1f}s "
+                    f"({reading.power:.1f} W, {reading.current:.3f} A)")
+                return elapsed
+            if elapsed >= timeout:
+                raise TasmotaError(f"{self.host}: still drawing {reading.power:.1f} W / "
+                                   f"{reading.current:.3f} A after {elapsed:.0f}s off")
+            time.sleep(ENERGY_POLL_INTERVAL)
+            reading = self.energy()
+
+    def power_cycle(
+        self,
+        min_off_time: float = DEFAULT_MIN_OFF_TIME,
+        off_time: float = DEFAULT_OFF_TIME,
+        sequencer: Optional[PowerSequencer] = None,
+        log: Callable[[str], None] = print,
+    ) -> float:
+        """Off, wait until drained, (wait for a turn,) on.
+
+        Returns:
+            Seconds the plug was off.
+        """
+        log(f"[tasmota] Powering OFF via {self.host}")
+        log(f"[tasmota]   Response: {self.set_power(False)}")
+        off_at = time.monotonic()
+        self.wait_drained(off_at, min_off_time, off_time, log=log)
+        if sequencer is not None:
+            delay = sequencer.wait_turn()
+            if delay > 0:
+                log(f"[tasmota] {self.host}: waited {delay:.1f}s for power-on turn (staggered)")
+        log(f"[tasmota] Powering ON via {self.host}")
+        log(f"[tasmota]   Response: {self.set_power(True)}")
+        return time.monotonic() - off_at
+
+
+class PowerController:
+    """Pooled HTTP client for any number of plugs.
+
+    Args:
+        timeout: Per-request timeout in seconds.
+        pool_size: Connections kept per plug, and plugs with pools.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self._plugs: dict[str, TasmotaPlug] = {}
+        self._lock = threading.Lock()
+
+    def plug(self, host: str) -> TasmotaPlug:
+        with self._lock:
+            if host not in self._plugs:
+                self._plugs[host] = TasmotaPlug(host, self.session, self.timeout)
+            return self._plugs[host]
+
+    def run_all(self, hosts: list[str], action: Callable[[TasmotaPlug], object]) -> dict:
+        """Run ``action(plug)`` for every host concurrently.
+
+        Returns:
+            {host: result or the exception it raised}
+        """
+        def call(host: str) -> object:
+            try:
+                return action(self.plug(host))
+            except (requests.RequestException, TasmotaError, ValueError) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, len(hosts))) as pool:
+            return dict(zip(hosts, pool.map(call, hosts)))
+
+    def cycle_all(
+        self,
+        hosts: list[str],
+        stagger: float = 0.0,
+        min_off_time: float = DEFAULT_MIN_OFF_TIME,
+        off_time: float = DEFAULT_OFF_TIME,
+        log: Callable[[str], None] = print,
+    ) -> dict:
+        """Power cycle every plug at once; power-ons at least ``stagger`` apart."""
+        sequencer = PowerSequencer(stagger)
+        return self.run_all(hosts, lambda plug: plug.power_cycle(
+            min_off_time, off_time, sequencer, log=log))
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_controller: Optional[PowerController] = None
+_default_lock = threading.Lock()
+
+
+def default_controller() -> PowerController:
+    """Process-wide controller shared by tftp_boot.py's helpers."""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = PowerController()
+        return _default_controller
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Control Tasmota plugs concurrently.")
+    parser.add_argument("--host", action="append", required=True, help="Plug host; repeatable")
+    parser.add_argument("--stagger", type=float, default=0.0,
+                        help="Seconds between power-ons when cycling (default: %(default)s)")
+    parser.add_argument("--min-off-time", type=float, default=DEFAULT_MIN_OFF_TIME,
+                        help="Minimum off time when cycling (default: %(default)s)")
+    parser.add_argument("--off-time", type=float, default=DEFAULT_OFF_TIME,
+                        help="Off time for plugs without energy monitor (default: %(default)s)")
+    parser.add_argument("action", choices=["status", "on", "off", "cycle"])
+    args = parser.parse_args()
+
+    controller = PowerController()
+
+    def status(plug: TasmotaPlug) -> str:
+        state = plug.state()
+        reading = plug.energy()
+        text = {True: "ON", False: "OFF", None: "?"}[state]
+        if reading:
+            text += f"  {reading.power:.1f} W  {reading.current:.3f} A  {reading.voltage:.0f} V"
+        return text
+
+    start = time.monotonic()
+    if args.action == "status":
+        results = controller.run_all(args.host, status)
+    elif args.action in ("on", "off"):
+        results = controller.run_all(args.host, lambda p: p.set_power(args.action == "on"))
+    else:
+        results = controller.cycle_all(args.host, args.stagger, args.min_off_time, args.off_time)
+
+    failed = False
+    for host, result in results.items():
+        if isinstance(result, Exception):
+            failed = True
+            print(f"{host:40s} ERROR: {result}")
+        elif isinstance(result, float):
+            print(f"{host:40s} off for {result:.1f}s")
+        else:
+            print(f"{host:40s} {result}")
+    print(f"[tasmota] {len(results)} plug(s) in {time.monotonic() - start:.1f}s")
+    controller.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
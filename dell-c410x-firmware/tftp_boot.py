@@ -12,9 +12,23 @@ Automates the full boot sequence:
   1. Power cycle via Tasmota smart plug
   2. Interrupt U-Boot autoboot
   3. Configure DHCP + TFTP boot
-  4. Optionally deploy dnsmasq override to TFTP server
+  4. Optionally deploy dnsmasq override to TFTP server, or serve the
+     images from this machine with the built-in server (--serve-tftp)
   5. Drop into interactive serial console
 
+With --unit (repeatable) several units are booted concurrently instead,
+with staggered power-on, per-unit prefixed console logs and a summary.
+
+Every boot's phases (power-on, U-Boot prompt, dhcp, tftpboot, bootm,
+kernel banner, login) are timed from the serial stream and appended to
+--timing-log, with a comparison against earlier runs (boot_timing.py).
+All serial output is also kept in compressed, indexed logs under
+--console-log; query them with console_log.py.
+
+Without hardware, point --serial-port at the pty of uboot_sim.py (which
+can replay sessions recorded here with --record); bench_serial.py
+measures this module's serial pipeline against it.
+
 The Dell C410X BMC runs an Aspeed AST2050 with U-Boot 1.2.0 (Avocent).
 It uses legacy uImage format and has bootdelay=1 with autoload=n.
 
@@ -24,24 +38,45 @@ Usage:
 
     uv run tftp_boot.py --no-power-cycle --kernel uImage-ast2050 \\
         --initrd initrd-ast2050 --setup-dnsmasq
+
+    # Whole boot sequence in one U-Boot command list
+    uv run tftp_boot.py --pipelined --kernel uImage-ast2050 --initrd initrd-ast2050
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import os
 import re
-import select
+import selectors
 import subprocess
 import sys
 import termios
+import threading
 import time
 import tty
-from typing import Optional
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
 
 import requests
 import serial
 
+from boot_timing import DEFAULT_HISTORY, BootTimer, finish_boot_timing
+from console_log import DEFAULT_LOG_DIR as DEFAULT_CONSOLE_LOG_DIR, ConsoleLogWriter, SessionRecorder
+from tasmota import (
+    DEFAULT_MIN_OFF_TIME,
+    DEFAULT_OFF_TIME,
+    PowerSequencer,
+    TasmotaError,
+    default_controller,
+)
+from tftp_server import TftpServer, TftpServerThread
+
 # ---------------------------------------------------------------------------
 # Known C410X BMC units (MAC → hostname, IP)
 # These are registered in dnsmasq on ten64.welland via gdoc2netcfg.
@@ -58,6 +93,35 @@ UBOOT_PROMPTS = [b"ast2050evb>", b"=> ", b"> "]
 # Error patterns in U-Boot output
 UBOOT_ERRORS = [b"ERROR", b"error", b"Retry count exceeded", b"T T T", b"not found"]
 
+# Output that means a TFTP load failed
+TFTP_ERRORS = [b"T T T", b"Retry count exceeded", b"not found"]
+
+# Errors that stop a pipelined boot during a fatal step (U-Boot would
+# otherwise retry forever): the TFTP_ERRORS the step-by-step mode checks,
+# plus bootm rejecting the image. During a non-fatal step they only warn,
+# as in the step-by-step mode.
+PIPELINE_ERRORS = TFTP_ERRORS + [b"Bad Magic Number", b"Bad Data CRC"]
+
+# CFG_CBSIZE of the AST2050 EVB U-Boot: console lines must stay below it
+UBOOT_CBSIZE = 256
+
+# Environment variables holding the guarded steps of a pipelined boot
+PIPELINE_VAR_PREFIX = "tb"
+
+# Autoboot interrupt pacing. bootdelay=1 gives a one second window; a
+# space every 20 ms is ~50 attempts and still only 0.2% of 115200 baud.
+INTERRUPT_INTERVAL = 0.02
+
+# Seeing the countdown banner triggers an immediate interrupt burst
+AUTOBOOT_BANNERS = [b"Hit any key", b"autoboot"]
+
+# Keyboard input is forwarded to the serial port in batches of up to this
+CONSOLE_READ_SIZE = 1024
+
+# Most recent console output kept for callers (MAC extraction, TFTP error
+# checks). Older output is still echoed to stdout, just not retained.
+CONSOLE_CAPTURE_BYTES = 256 * 1024
+
 # Default addresses from U-Boot environment
 DEFAULT_KERNEL_ADDR = "0x41400000"
 DEFAULT_INITRD_ADDR = "0x42600000"
@@ -65,6 +129,10 @@ DEFAULT_TFTP_SERVER = "10.1.5.1"
 DNSMASQ_HOST = "ten64.welland.mithis.com"
 DNSMASQ_OVERRIDE_PATH = "/etc/dnsmasq.d/internal/override-dell-c410x-tftp.conf"
 
+# Fleet mode: delay between successive power-ons to limit inrush current
+DEFAULT_FLEET_STAGGER = 3.0
+DEFAULT_FLEET_LOG_DIR = "fleet-logs"
+
 
 # ---------------------------------------------------------------------------
 # Tasmota power control
@@ -80,29 +148,29 @@ def tasmota_command(host: str, command: str) -> dict:
     Returns:
         JSON response from the device.
     """
-    url = f"http://{host}/cm?cmnd={command}"
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    return resp.json()
+    return default_controller().plug(host).command(command)
 
 
-def power_cycle(host: str, off_time: float = 5.0) -> None:
+def power_cycle(
+    host: str,
+    off_time: float = DEFAULT_OFF_TIME,
+    min_off_time: float = DEFAULT_MIN_OFF_TIME,
+    sequencer: Optional[PowerSequencer] = None,
+) -> None:
     """Power cycle a device via its Tasmota smart plug.
 
+    Power comes back as soon as the plug's energy monitor shows the load
+    has drained (but not before ``min_off_time``), and the plug's
+    reported state is checked after each switch.
+
     Args:
         host: Tasmota plug hostname.
-        off_time: Seconds to keep power off before turning back on.
+        off_time: Seconds to keep power off if the plug has no energy monitor.
+        min_off_time: Minimum seconds off.
+        sequencer: Fleet power-on sequencer to wait for a turn from.
     """
-    print(f"[tasmota] Powering OFF via {host}")
-    result = tasmota_command(host, "Power Off")
-    print(f"[tasmota]   Response: {result}")
-
-    print(f"[tasmota] Waiting {off_time:.0f}s with power off...")
-    time.sleep(off_time)
-
-    print(f"[tasmota] Powering ON via {host}")
-    result = tasmota_command(host, "Power On")
-    print(f"[tasmota]   Response: {result}")
+    default_controller().plug(host).power_cycle(
+        min_off_time=min_off_time, off_time=off_time, sequencer=sequencer)
 
 
 # ---------------------------------------------------------------------------
@@ -122,6 +190,116 @@ def open_serial(port: str, baudrate: int = 115200) -> serial.Serial:
     return ser
 
 
+class RingBuffer:
+    """Bounded byte buffer that keeps only the most recent ``capacity`` bytes.
+
+    Reads are kept as a deque of chunks and whole chunks are dropped from
+    the left once the rest still covers ``capacity``, so each byte is
+    copied at most once on the way in and appending stays linear over an
+    arbitrarily long console session. Memory is bounded by ``capacity``
+    plus one chunk; ``getvalue`` trims that chunk's stale head.
+    """
+
+    def __init__(self, capacity: int = CONSOLE_CAPTURE_BYTES) -> None:
+        self.capacity = capacity
+        self._chunks: deque[bytes] = deque()
+        self._size = 0
+
+    def append(self, data: bytes) -> None:
+        if len(data) > self.capacity:
+            data = data[-self.capacity:]
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        while self._size - len(self._chunks[0]) >= self.capacity:
+            self._size -= len(self._chunks.popleft())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._chunks)[-self.capacity:]
+
+    def __len__(self) -> int:
+        return min(self._size, self.capacity)
+
+
+class StreamMatcher:
+    """Incremental multi-pattern matcher for chunked serial data.
+
+    Keeps the last ``len(longest pattern) - 1`` bytes of the stream as a
+    carry, so a pattern split across two reads is still found. Each
+    occurrence is reported exactly once.
+    """
+
+    def __init__(self, patterns: list[bytes]) -> None:
+        self.patterns = list(patterns)
+        # Longest first so "ast2050evb>" wins over "> " at the same spot
+        ordered = sorted(self.patterns, key=len, reverse=True)
+        self._regex = re.compile(b"|".join(re.escape(p) for p in ordered))
+        self._keep = max((len(p) for p in self.patterns), default=1) - 1
+        self._carry = b""
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Add a chunk and return the patterns completed by it, in order."""
+        window = self._carry + chunk
+        carried = len(self._carry)
+        found = [m.group() for m in self._regex.finditer(window) if m.end() > carried]
+        self._carry = window[-self._keep:] if self._keep else b""
+        return found
+
+    def reset(self) -> None:
+        self._carry = b""
+
+
+# Per-port observers of the raw serial stream (boot timing, logging)
+_console_taps: "weakref.WeakKeyDictionary[serial.Serial, list[Callable[[bytes], None]]]" = (
+    weakref.WeakKeyDictionary())
+
+
+def add_console_tap(ser: serial.Serial, tap: Callable[[bytes], None]) -> None:
+    """Call ``tap(chunk)`` with every chunk read from ``ser``."""
+    _console_taps.setdefault(ser, []).append(tap)
+
+
+def remove_console_tap(ser: serial.Serial, tap: Callable[[bytes], None]) -> None:
+    taps = _console_taps.get(ser)
+    if taps and tap in taps:
+        taps.remove(tap)
+
+
+def start_session_recorder(
+    ser: serial.Serial, path: Optional[str], unit: Optional[str] = None
+) -> Optional[SessionRecorder]:
+    """Record everything received on ``ser`` for replay by uboot_sim.py.
+
+    Args:
+        ser: Open serial port.
+        path: Output JSONL file, or None to not record.
+        unit: Fleet unit name, inserted before the extension.
+
+    Returns:
+        The recorder (close it when done), or None.
+    """
+    if not path:
+        return None
+    if unit:
+        root, ext = os.path.splitext(path)
+        path = f"{root}-{unit}{ext}"
+    recorder = SessionRecorder(path)
+    add_console_tap(ser, recorder)
+    print(f"[record] Recording session to {path}")
+    return recorder
+
+
+def _feed_taps(ser: serial.Serial, chunk: bytes) -> None:
+    for tap in _console_taps.get(ser, ()):
+        tap(chunk)
+
+
+def _emit_console(ser: serial.Serial, chunk: bytes) -> None:
+    """Echo serial output to stdout as it arrives and feed the port's taps."""
+    sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.flush()
+    _feed_taps(ser, chunk)
+
+
 def read_until_prompt(
     ser: serial.Serial,
     prompts: list[bytes],
@@ -130,7 +308,9 @@ def read_until_prompt(
 ) -> tuple[bytes, bool]:
     """Read serial data until a prompt pattern is detected or timeout.
 
-    All received data is printed to stdout in real-time.
+    All received data is printed to stdout in real-time. Prompts and
+    error patterns are matched incrementally, including across chunk
+    boundaries; only the last CONSOLE_CAPTURE_BYTES are retained.
 
     Args:
         ser: Open serial port.
@@ -139,30 +319,28 @@ def read_until_prompt(
         error_patterns: Optional patterns that indicate an error occurred.
 
     Returns:
-        Tuple of (all_data_received, prompt_found).
+        Tuple of (recent_data_received, prompt_found).
     """
-    buf = b""
+    buf = RingBuffer()
+    prompt_matcher = StreamMatcher(prompts)
+    error_matcher = StreamMatcher(error_patterns) if error_patterns else None
     start = time.monotonic()
     while time.monotonic() - start < timeout:
         chunk = ser.read(ser.in_waiting or 1)
         if chunk:
-            buf += chunk
-            # Print to stdout in real-time
-            sys.stdout.buffer.write(chunk)
-            sys.stdout.buffer.flush()
-
-            # Check for prompt
-            for prompt in prompts:
-                if prompt in buf[-(len(prompt) + 80):]:
-                    return buf, True
+            buf.append(chunk)
+            _emit_console(ser, chunk)
 
             # Check for errors (warn but don't stop)
-            if error_patterns:
-                for pattern in error_patterns:
-                    if pattern in chunk:
-                        print(f"\n[warning] Detected error pattern: {pattern!r}",
-                              file=sys.stderr)
-    return buf, False
+            if error_matcher:
+                for pattern in error_matcher.feed(chunk):
+                    print(f"\n[warning] Detected error pattern: {pattern!r}",
+                          file=sys.stderr)
+
+            # Check for prompt
+            if prompt_matcher.feed(chunk):
+                return buf.getvalue(), True
+    return buf.getvalue(), False
 
 
 def send_command(
@@ -193,11 +371,24 @@ def send_command(
     return b"", True
 
 
+def _read_available(ser: serial.Serial) -> bytes:
+    """Read whatever the serial port has buffered without blocking.
+
+    Reading no more than in_waiting returns at once whatever the port
+    timeout is, so the port is not reconfigured on every poll.
+    """
+    waiting = ser.in_waiting
+    return ser.read(waiting) if waiting else b""
+
+
 def interrupt_autoboot(ser: serial.Serial, timeout: float = 30.0) -> Optional[bytes]:
     """Interrupt U-Boot autoboot by sending space characters.
 
-    The C410X has bootdelay=1, so we need aggressive timing.
-    Sends space every 100ms while watching for the U-Boot prompt.
+    The C410X has bootdelay=1, so we need aggressive timing. Spaces are
+    sent on a fixed INTERRUPT_INTERVAL schedule (driven by the monotonic
+    clock, so slow reads do not stretch it), and a burst is sent as soon
+    as the autoboot banner is seen. Between sends we sleep in a selector
+    that wakes the moment serial data arrives.
 
     Args:
         ser: Open serial port.
@@ -207,29 +398,44 @@ def interrupt_autoboot(ser: serial.Serial, timeout: float = 30.0) -> Optional[by
         All captured boot output if U-Boot prompt was detected, None on timeout.
     """
     print("[uboot] Sending interrupt characters to catch autoboot...")
-    buf = b""
+    buf = RingBuffer()
+    matcher = StreamMatcher(UBOOT_PROMPTS)
+    banner = StreamMatcher(AUTOBOOT_BANNERS)
     start = time.monotonic()
+    deadline = start + timeout
+    next_send = start
 
-    while time.monotonic() - start < timeout:
-        # Send space to interrupt autoboot
-        ser.write(b" ")
-        ser.flush()
-
-        # Read any available data
-        chunk = ser.read(ser.in_waiting or 1)
-        if chunk:
-            buf += chunk
-            sys.stdout.buffer.write(chunk)
-            sys.stdout.buffer.flush()
+    with selectors.DefaultSelector() as sel:
+        sel.register(ser, selectors.EVENT_READ)
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now >= next_send:
+                ser.write(b" ")
+                ser.flush()
+                # Stay on the original grid; skip slots we slept through
+                missed = int((now - next_send) / INTERRUPT_INTERVAL)
+                next_send += (missed + 1) * INTERRUPT_INTERVAL
+
+            if not sel.select(min(next_send, deadline) - time.monotonic()):
+                continue
+
+            chunk = _read_available(ser)
+            if not chunk:
+                continue
+            buf.append(chunk)
+            _emit_console(ser, chunk)
 
             # Check for U-Boot prompt
-            for prompt in UBOOT_PROMPTS:
-                if prompt in buf[-(len(prompt) + 80):]:
-                    print("\n[uboot] Got U-Boot prompt!")
-                    return buf
+            if matcher.feed(chunk):
+                print("\n[uboot] Got U-Boot prompt!")
+                return buf.getvalue()
 
-        # Brief pause between interrupt attempts
-        time.sleep(0.1)
+            # Countdown started: interrupt now rather than at the next tick
+            if banner.feed(chunk):
+                ser.write(b"   ")
+                ser.flush()
 
     print("\n[uboot] Timeout waiting for U-Boot prompt!", file=sys.stderr)
     return None
@@ -270,6 +476,33 @@ def extract_mac_from_output(data: bytes) -> Optional[str]:
     return None
 
 
+def report_detected_mac(ser: serial.Serial, boot_output: bytes) -> Optional[str]:
+    """Drain trailing boot output and report the unit's MAC address.
+
+    Args:
+        ser: Serial port sitting at the U-Boot prompt.
+        boot_output: Output captured while interrupting autoboot.
+
+    Returns:
+        The detected MAC address, or None.
+    """
+    # Re-read any buffered data for MAC extraction
+    time.sleep(0.5)
+    remaining = ser.read(ser.in_waiting or 0)
+    if remaining:
+        _emit_console(ser, remaining)
+
+    mac = extract_mac_from_output(boot_output + remaining)
+    if mac:
+        info = KNOWN_C410X_UNITS.get(mac)
+        if info:
+            print(f"\n[info] Detected known C410X: {info['name']} "
+                  f"(MAC {mac}, IP {info['ip']})")
+        else:
+            print(f"\n[info] Detected MAC: {mac} (not in known units list)")
+    return mac
+
+
 # ---------------------------------------------------------------------------
 # dnsmasq override deployment
 # ---------------------------------------------------------------------------
@@ -368,24 +601,78 @@ def deploy_dnsmasq_override(
 # U-Boot TFTP boot sequence
 # ---------------------------------------------------------------------------
 
-def uboot_tftp_boot(
-    ser: serial.Serial,
+@dataclass
+class BootStep:
+    """One U-Boot command of the TFTP boot sequence.
+
+    Attributes:
+        label: Progress heading.
+        command: U-Boot command line.
+        timeout: Seconds to wait for the prompt; None for bootm, after
+            which the kernel takes over.
+        fatal: Whether a failure aborts the boot (otherwise a warning).
+        done: Output that marks the command as finished, for following
+            progress when commands are pipelined.
+    """
+
+    label: str
+    command: str
+    timeout: Optional[float]
+    fatal: bool = False
+    done: Optional[bytes] = None
+
+
+def build_boot_steps(
     kernel: str,
     kernel_addr: str,
     tftp_server: str,
     initrd: Optional[str] = None,
     initrd_addr: str = DEFAULT_INITRD_ADDR,
     bootargs: Optional[str] = None,
-) -> bool:
-    """Execute the TFTP boot sequence in U-Boot.
+) -> list[BootStep]:
+    """Build the TFTP boot sequence shared by the step-by-step and
+    pipelined modes.
 
     Steps:
       1. Run DHCP to get an IP (autoload=n prevents auto-loading)
-      2. Set TFTP server IP explicitly
+      2. Set TFTP server IP explicitly (in case DHCP didn't set it)
       3. Load kernel via TFTP
       4. Load initrd via TFTP (if provided)
       5. Set bootargs (if provided)
       6. Boot with bootm
+    """
+    steps = [
+        BootStep("Step 1: DHCP", "dhcp", 30, done=b"DHCP client bound"),
+        BootStep("Step 2: Set TFTP server", f"setenv serverip {tftp_server}", 5),
+        BootStep(f"Step 3: TFTP load kernel ({kernel})", f"tftpboot {kernel_addr} {kernel}",
+                 120, fatal=True, done=b"Bytes transferred"),
+    ]
+    if initrd:
+        steps.append(BootStep(f"Step 4: TFTP load initrd ({initrd})",
+                              f"tftpboot {initrd_addr} {initrd}",
+                              120, fatal=True, done=b"Bytes transferred"))
+    if bootargs:
+        steps.append(BootStep("Step 5: Set bootargs", f"setenv bootargs {bootargs}", 5))
+    bootm = f"bootm {kernel_addr} {initrd_addr}" if initrd else f"bootm {kernel_addr}"
+    steps.append(BootStep("Booting!", bootm, None, fatal=True, done=b"Starting kernel"))
+    return steps
+
+
+def uboot_tftp_boot(
+    ser: serial.Serial,
+    kernel: str,
+    kernel_addr: str,
+    tftp_server: str,
+    initrd: Optional[str] = None,
+    initrd_addr: str = DEFAULT_INITRD_ADDR,
+    bootargs: Optional[str] = None,
+    pipelined: bool = False,
+) -> bool:
+    """Execute the TFTP boot sequence in U-Boot.
+
+    Sends the build_boot_steps() commands one at a time, waiting for the
+    prompt after each, or with ``pipelined`` as a single script (see
+    uboot_tftp_boot_pipelined).
 
     Args:
         ser: Serial port with U-Boot prompt active.
@@ -395,57 +682,169 @@ def uboot_tftp_boot(
         initrd: Optional initrd filename on TFTP server.
         initrd_addr: Memory address to load initrd at.
         bootargs: Optional kernel boot arguments.
+        pipelined: Send the whole sequence at once.
 
     Returns:
         True if boot command was sent successfully.
     """
-    # Step 1: DHCP to get an IP address
-    print("\n[boot] === Step 1: DHCP ===")
-    output, ok = send_command(ser, "dhcp", timeout=30)
-    if not ok:
-        print("[boot] WARNING: DHCP may have timed out", file=sys.stderr)
-
-    # Step 2: Set TFTP server IP explicitly (in case DHCP didn't set it)
-    print("\n[boot] === Step 2: Set TFTP server ===")
-    send_command(ser, f"setenv serverip {tftp_server}", timeout=5)
-
-    # Step 3: Load kernel via TFTP
-    print(f"\n[boot] === Step 3: TFTP load kernel ({kernel}) ===")
-    output, ok = send_command(ser, f"tftpboot {kernel_addr} {kernel}", timeout=120)
-    if not ok:
-        print("[boot] ERROR: Kernel TFTP load timed out!", file=sys.stderr)
-        return False
-
-    # Check for TFTP errors in output
-    if any(err in output for err in [b"T T T", b"Retry count exceeded", b"not found"]):
-        print("[boot] ERROR: Kernel TFTP load failed!", file=sys.stderr)
-        return False
-
-    # Step 4: Load initrd via TFTP (if provided)
-    if initrd:
-        print(f"\n[boot] === Step 4: TFTP load initrd ({initrd}) ===")
-        output, ok = send_command(
-            ser, f"tftpboot {initrd_addr} {initrd}", timeout=120
-        )
+    steps = build_boot_steps(kernel, kernel_addr, tftp_server, initrd, initrd_addr, bootargs)
+    if pipelined:
+        try:
+            return uboot_tftp_boot_pipelined(ser, steps)
+        except ValueError as e:
+            print(f"[boot] Cannot pipeline ({e}); sending commands one by one",
+                  file=sys.stderr)
+
+    for step in steps:
+        print(f"\n[boot] === {step.label} ===")
+        if step.timeout is None:
+            # Don't wait for prompt after bootm — the kernel takes over
+            send_command(ser, step.command, expect_prompt=False)
+            return True
+
+        output, ok = send_command(ser, step.command, timeout=step.timeout)
+        if not step.fatal:
+            if not ok:
+                print(f"[boot] WARNING: {step.label} may have timed out", file=sys.stderr)
+            continue
         if not ok:
-            print("[boot] ERROR: Initrd TFTP load timed out!", file=sys.stderr)
+            print(f"[boot] ERROR: {step.label} timed out!", file=sys.stderr)
+            return False
+        # Check for TFTP errors in output
+        if any(err in output for err in TFTP_ERRORS):
+            print(f"[boot] ERROR: {step.label} failed!", file=sys.stderr)
             return False
+    return True
 
-    # Step 5: Set bootargs (if provided)
-    if bootargs:
-        print(f"\n[boot] === Step 5: Set bootargs ===")
-        send_command(ser, f"setenv bootargs {bootargs}", timeout=5)
 
-    # Step 6: Boot!
-    print("\n[boot] === Booting! ===")
-    if initrd:
-        bootm_cmd = f"bootm {kernel_addr} {initrd_addr}"
-    else:
-        bootm_cmd = f"bootm {kernel_addr}"
+def build_pipelined_script(
+    steps: list[BootStep], cbsize: int = UBOOT_CBSIZE
+) -> tuple[list[str], list[BootStep]]:
+    """Pack boot steps into as few U-Boot command lines as possible.
 
-    # Don't wait for prompt after bootm — the kernel takes over
-    send_command(ser, bootm_cmd, expect_prompt=False)
-    return True
+    U-Boot 1.2.0 (no hush) keeps running a ';' list after a command
+    fails, which would bootm whatever is in RAM after a failed TFTP. The
+    fatal steps are therefore stored in environment variables and run
+    with a single "run" — do_run() stops at the first variable whose
+    command fails. Non-fatal steps (dhcp, setenv) run first, in order.
+
+    Args:
+        steps: Sequence from build_boot_steps().
+        cbsize: U-Boot console buffer size; lines are kept below it.
+
+    Returns:
+        (command lines, steps in the order U-Boot will execute them).
+
+    Raises:
+        ValueError: A command contains ';' or does not fit in a line.
+    """
+    defines, plain, guarded = [], [], []
+    for step in steps:
+        if ";" in step.command:
+            raise ValueError(f"';' in {step.command!r}")
+        if step.fatal:
+            var = f"{PIPELINE_VAR_PREFIX}{len(guarded) + 1}"
+            defines.append(f"setenv {var} {step.command}")
+            guarded.append(var)
+        else:
+            plain.append(step.command)
+    commands = defines + plain
+    if guarded:
+        commands.append("run " + " ".join(guarded))
+
+    # readline() accepts at most CBSIZE - 2 characters
+    limit = cbsize - 2
+    lines: list[str] = []
+    for command in commands:
+        if len(command) > limit:
+            raise ValueError(f"{command[:40]!r}... is longer than {limit} characters")
+        if lines and len(lines[-1]) + 1 + len(command) <= limit:
+            lines[-1] += ";" + command
+        else:
+            lines.append(command)
+    order = [s for s in steps if not s.fatal] + [s for s in steps if s.fatal]
+    return lines, order
+
+
+def uboot_tftp_boot_pipelined(ser: serial.Serial, steps: list[BootStep]) -> bool:
+    """Send the boot sequence as one script and follow it in the output.
+
+    Only one prompt turnaround per command line (usually one or two in
+    total) instead of one per command. Progress is tracked from each
+    step's completion output; on an error pattern a Ctrl-C is sent,
+    which stops the whole list (and the TFTP retry loop) at once.
+
+    Args:
+        ser: Serial port with U-Boot prompt active.
+        steps: Sequence from build_boot_steps().
+
+    Returns:
+        True once the kernel is starting.
+
+    Raises:
+        ValueError: The sequence cannot be pipelined.
+    """
+    lines, order = build_pipelined_script(steps)
+    pending = [s for s in order if s.done]
+    for step in order:
+        print(f"[boot] {step.label}: {step.command}")
+
+    for n, line in enumerate(lines, 1):
+        last = n == len(lines)
+        print(f"\n[boot] === Pipelined line {n}/{len(lines)} ({len(line)} chars) ===")
+        print(f"[uboot] >>> {line}")
+        ser.write(f"{line}\n".encode())
+        ser.flush()
+
+        # Budget: every step that can finish in this line (all of them
+        # for the last line, which runs the guarded steps)
+        timeout = 10 + sum(s.timeout or 30 for s in pending)
+        done = [s.done for s in pending]
+        matcher = StreamMatcher(list(dict.fromkeys(done)) + PIPELINE_ERRORS + UBOOT_PROMPTS)
+        deadline = time.monotonic() + timeout
+        while True:
+            if time.monotonic() >= deadline:
+                print(f"\n[boot] ERROR: timed out during {pending[0].label if pending else 'pipeline'}",
+                      file=sys.stderr)
+                _abort_uboot_command(ser)
+                return False
+            chunk = ser.read(ser.in_waiting or 1)
+            if not chunk:
+                continue
+            _emit_console(ser, chunk)
+            prompt = False
+            for match in matcher.feed(chunk):
+                if pending and match == pending[0].done:
+                    step = pending.pop(0)
+                    print(f"\n[boot] --- {step.label}: done")
+                    if step.timeout is None:
+                        return True
+                elif match in PIPELINE_ERRORS and pending and not pending[0].fatal:
+                    step = pending.pop(0)
+                    print(f"\n[boot] WARNING: {match!r} during {step.label}", file=sys.stderr)
+                elif match in PIPELINE_ERRORS:
+                    blame = pending[0].label if pending else "pipeline"
+                    print(f"\n[boot] ERROR: {match!r} during {blame}", file=sys.stderr)
+                    _abort_uboot_command(ser)
+                    return False
+                elif match in UBOOT_PROMPTS:
+                    prompt = True
+            if prompt:
+                break
+
+        if last:
+            # The list ended at a prompt without starting the kernel
+            blame = pending[0].label if pending else "pipeline"
+            print(f"\n[boot] ERROR: U-Boot stopped during {blame}", file=sys.stderr)
+            return False
+    return False
+
+
+def _abort_uboot_command(ser: serial.Serial) -> None:
+    """Ctrl-C the running command and wait for the prompt."""
+    ser.write(b"\x03")
+    ser.flush()
+    read_until_prompt(ser, UBOOT_PROMPTS, timeout=10)
 
 
 # ---------------------------------------------------------------------------
@@ -460,7 +859,9 @@ def interactive_console(ser: serial.Serial) -> None:
       - Serial output is displayed on the terminal
       - Ctrl+] exits (like telnet)
 
-    Terminal is put into raw mode and restored on exit.
+    Terminal is put into raw mode and restored on exit. The loop blocks
+    in a selector with no timeout, so an idle console uses no CPU, and
+    keyboard input (including pastes) is forwarded in batches.
 
     Args:
         ser: Open serial port.
@@ -470,34 +871,314 @@ def interactive_console(ser: serial.Serial) -> None:
 
     fd = sys.stdin.fileno()
     old_settings = termios.tcgetattr(fd)
+    sel = selectors.DefaultSelector()
 
     try:
         tty.setraw(fd)
         ser.timeout = 0  # Non-blocking reads
+        sel.register(ser, selectors.EVENT_READ)
+        sel.register(fd, selectors.EVENT_READ)
 
         while True:
-            # Check for data from serial port
-            # Check for data from keyboard
-            rlist, _, _ = select.select([ser, sys.stdin], [], [], 0.01)
-
-            for source in rlist:
-                if source is ser:
+            for key, _ in sel.select():
+                if key.fileobj is ser:
                     data = ser.read(ser.in_waiting or 1)
                     if data:
                         os.write(sys.stdout.fileno(), data)
-                elif source is sys.stdin:
-                    char = os.read(sys.stdin.fileno(), 1)
-                    if char == b"\x1d":  # Ctrl+]
+                        _feed_taps(ser, data)
+                else:
+                    data = os.read(fd, CONSOLE_READ_SIZE)
+                    if not data:
+                        return
+                    exit_at = data.find(b"\x1d")  # Ctrl+]
+                    if exit_at >= 0:
+                        if exit_at:
+                            ser.write(data[:exit_at])
+                            ser.flush()
                         return
-                    ser.write(char)
+                    ser.write(data)
                     ser.flush()
 
     finally:
+        sel.close()
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
         print("\n[console] " + "=" * 60)
         print("[console] Exited interactive console")
 
 
+# ---------------------------------------------------------------------------
+# Fleet mode
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FleetUnit:
+    """One C410X in a fleet boot, and how its boot went."""
+
+    name: str
+    serial_port: str
+    tasmota_host: Optional[str] = None
+    ok: bool = False
+    error: Optional[str] = None
+    mac: Optional[str] = None
+    # Phase name -> seconds since the fleet started
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def parse_unit_spec(spec: str) -> FleetUnit:
+    """Parse a --unit NAME:SERIAL[:TASMOTA] specification.
+
+    Args:
+        spec: e.g. "dell-c410x-1:/dev/ttyUSB0:au-plug-1.iot.welland.mithis.com".
+
+    Returns:
+        The FleetUnit described.
+    """
+    parts = spec.split(":", 2)
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        raise argparse.ArgumentTypeError(
+            f"bad --unit {spec!r}, expected NAME:SERIAL[:TASMOTA]")
+    return FleetUnit(name=parts[0], serial_port=parts[1],
+                     tasmota_host=parts[2] if len(parts) > 2 and parts[2] else None)
+
+
+class _UnitSink:
+    """Per-unit log file plus the partial line awaiting a prefix."""
+
+    def __init__(self, name: str, log_path: str) -> None:
+        self.prefix = f"[{name}] ".encode()
+        self.log = open(log_path, "ab")
+        self.pending = b""
+
+
+class ConsoleRouter:
+    """Multiplex stdout/stderr of fleet worker threads into prefixed lines.
+
+    Installed as sys.stdout and sys.stderr while a fleet boot runs. Writes
+    from a thread attached to a unit are appended verbatim to that unit's
+    log file and echoed to the real stdout one complete line at a time,
+    prefixed with the unit name, so concurrent consoles never interleave
+    mid-line. Writes from other threads pass straight through.
+    """
+
+    def __init__(self, stream, log_dir: str) -> None:
+        self._stream = stream
+        self._log_dir = log_dir
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.buffer = _RouterBuffer(self)
+        os.makedirs(log_dir, exist_ok=True)
+
+    @contextmanager
+    def attach(self, name: str) -> Iterator[str]:
+        """Route the calling thread's output to unit ``name``; yields the log path."""
+        log_path = os.path.join(self._log_dir, f"{name}.log")
+        sink = _UnitSink(name, log_path)
+        self._local.sink = sink
+        try:
+            yield log_path
+        finally:
+            if sink.pending:
+                self._emit(sink.prefix + sink.pending.rstrip(b"\r") + b"\n")
+            sink.log.close()
+            self._local.sink = None
+
+    def write_bytes(self, data: bytes) -> None:
+        sink = getattr(self._local, "sink", None)
+        if sink is None:
+            self._emit(data)
+            return
+        sink.log.write(data)
+        lines = (sink.pending + data).split(b"\n")
+        sink.pending = lines.pop()
+        if lines:
+            self._emit(b"".join(sink.prefix + line.rstrip(b"\r") + b"\n"
+                                for line in lines))
+
+    def _emit(self, data: bytes) -> None:
+        with self._lock:
+            self._stream.buffer.write(data)
+            self._stream.buffer.flush()
+
+    # Text stream interface used by print()
+    def write(self, text: str) -> int:
+        self.write_bytes(text.encode("utf-8", errors="replace"))
+        return len(text)
+
+    def flush(self) -> None:
+        sink = getattr(self._local, "sink", None)
+        if sink is not None:
+            sink.log.flush()
+
+    def fileno(self) -> int:
+        return self._stream.fileno()
+
+    def isatty(self) -> bool:
+        return False
+
+
+class _RouterBuffer:
+    """Binary ``sys.stdout.buffer`` view of a ConsoleRouter."""
+
+    def __init__(self, router: ConsoleRouter) -> None:
+        self._router = router
+
+    def write(self, data: bytes) -> int:
+        self._router.write_bytes(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        self._router.flush()
+
+
+def boot_fleet_unit(
+    unit: FleetUnit,
+    args: argparse.Namespace,
+    fleet_start: float,
+    sequencer: PowerSequencer,
+    router: ConsoleRouter,
+    console_log: Optional[ConsoleLogWriter] = None,
+) -> None:
+    """Power cycle and TFTP boot one unit (runs in a worker thread).
+
+    Power is cut immediately and comes back once the plug reports the
+    load drained and ``sequencer`` gives this unit its turn, so units
+    come up staggered.
+
+    Args:
+        unit: The unit to boot; its result fields are filled in.
+        args: Parsed command line (kernel, addresses, off time...).
+        fleet_start: time.monotonic() when the fleet boot started.
+        sequencer: Hands out staggered power-on turns.
+        router: Console router to attach this thread to.
+        console_log: Persistent console log, if enabled.
+    """
+    def mark(phase: str) -> None:
+        unit.timings[phase] = time.monotonic() - fleet_start
+
+    with router.attach(unit.name) as log_path:
+        print(f"[fleet] Logging to {log_path}")
+        try:
+            print(f"[serial] Opening {unit.serial_port} at 115200 8N1")
+            ser = open_serial(unit.serial_port)
+        except (serial.SerialException, OSError) as e:
+            unit.error = f"serial: {e}"
+            print(f"[fleet] ERROR: {unit.error}", file=sys.stderr)
+            return
+
+        timer = BootTimer() if args.timing_log else None
+        if timer:
+            add_console_tap(ser, timer.feed)
+        recorder = start_session_recorder(ser, args.record, unit.name)
+        if console_log:
+            console_log.begin_boot(unit.name, serial_port=unit.serial_port, kernel=args.kernel)
+            add_console_tap(ser, console_log.tap(unit.name))
+        try:
+            if unit.tasmota_host and not args.no_power_cycle:
+                power_cycle(unit.tasmota_host, off_time=args.off_time,
+                            min_off_time=args.min_off_time, sequencer=sequencer)
+                if timer:
+                    timer.mark("power_on")
+            mark("power_on")
+
+            boot_output = interrupt_autoboot(ser, timeout=30)
+            if not boot_output:
+                unit.error = "no U-Boot prompt"
+                return
+            mark("uboot_prompt")
+
+            unit.mac = report_detected_mac(ser, boot_output)
+            if not uboot_tftp_boot(
+                ser=ser,
+                kernel=args.kernel,
+                kernel_addr=args.kernel_addr,
+                tftp_server=args.tftp_server,
+                initrd=args.initrd,
+                initrd_addr=args.initrd_addr,
+                bootargs=args.bootargs,
+                pipelined=args.pipelined,
+            ):
+                unit.error = "U-Boot TFTP boot failed"
+                return
+            mark("bootm")
+
+            if args.expect:
+                _, found = read_until_prompt(
+                    ser, [args.expect.encode()], timeout=args.expect_timeout)
+                if not found:
+                    unit.error = f"{args.expect!r} not seen after bootm"
+                    return
+                mark("expect")
+
+            unit.ok = True
+        except (requests.RequestException, TasmotaError, serial.SerialException, OSError) as e:
+            unit.error = f"{type(e).__name__}: {e}"
+        finally:
+            ser.close()
+            if recorder:
+                recorder.close()
+            print(f"[fleet] {'OK' if unit.ok else 'FAILED: ' + str(unit.error)}")
+            if console_log:
+                console_log.end_boot(unit.name, ok=unit.ok, error=unit.error, mac=unit.mac)
+            if timer:
+                finish_boot_timing(timer, args.timing_log, unit=unit.name,
+                                   kernel=args.kernel, initrd=args.initrd, ok=unit.ok)
+
+
+async def fleet_boot(
+    units: list[FleetUnit],
+    args: argparse.Namespace,
+    console_log: Optional[ConsoleLogWriter] = None,
+) -> bool:
+    """Boot every unit concurrently, one worker thread per serial port.
+
+    Args:
+        units: Units to boot.
+        args: Parsed command line.
+        console_log: Persistent console log, if enabled.
+
+    Returns:
+        True if every unit booted.
+    """
+    router = ConsoleRouter(sys.stdout, args.log_dir)
+    sequencer = PowerSequencer(args.stagger)
+    fleet_start = time.monotonic()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = router
+    # Not asyncio.to_thread: the default executor is capped at
+    # min(32, cpus + 4) workers, and units past the cap would queue
+    # instead of booting alongside the rest
+    loop = asyncio.get_running_loop()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(units)), thread_name_prefix="unit") as pool:
+            await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, boot_fleet_unit, unit, args, fleet_start, sequencer, router, console_log)
+                for unit in units
+            ))
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+    print_fleet_summary(units, time.monotonic() - fleet_start)
+    return all(unit.ok for unit in units)
+
+
+def print_fleet_summary(units: list[FleetUnit], elapsed: float) -> None:
+    """Print per-unit result and phase timings."""
+    phases = ["power_on", "uboot_prompt", "bootm", "expect"]
+    print("\n[fleet] " + "=" * 60)
+    print(f"[fleet] {'unit':16s} {'result':6s} "
+          + " ".join(f"{p:>12s}" for p in phases))
+    for unit in units:
+        cells = [f"{unit.timings[p]:11.1f}s" if p in unit.timings else f"{'-':>12s}"
+                 for p in phases]
+        print(f"[fleet] {unit.name:16s} {'OK' if unit.ok else 'FAIL':6s} "
+              + " ".join(cells))
+        if unit.error:
+            print(f"[fleet]   {unit.error}")
+    ok = sum(unit.ok for unit in units)
+    print(f"[fleet] {ok}/{len(units)} units booted in {elapsed:.1f}s")
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -526,6 +1207,11 @@ examples:
   uv run tftp_boot.py \\
       --tasmota-host au-plug-1.iot.welland.mithis.com \\
       --kernel uImage-ast2050 --setup-dnsmasq
+
+  # Boot several units at once (power-ons staggered 3s apart)
+  uv run tftp_boot.py --kernel uImage-ast2050 --expect "login:" \\
+      --unit dell-c410x-1:/dev/ttyUSB0:au-plug-1.iot.welland.mithis.com \\
+      --unit dell-c410x-2:/dev/ttyUSB1:au-plug-2.iot.welland.mithis.com
 """,
     )
 
@@ -577,8 +1263,16 @@ examples:
     parser.add_argument(
         "--off-time",
         type=float,
-        default=5.0,
-        help="Power-off duration in seconds (default: %(default)s)",
+        default=DEFAULT_OFF_TIME,
+        help="Power-off duration in seconds for plugs without an energy "
+        "monitor; with one, power returns once the load has drained "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-off-time",
+        type=float,
+        default=DEFAULT_MIN_OFF_TIME,
+        help="Minimum power-off duration in seconds (default: %(default)s)",
     )
     parser.add_argument(
         "--setup-dnsmasq",
@@ -586,8 +1280,84 @@ examples:
         help="Deploy dnsmasq TFTP boot override to ten64.welland via SSH",
     )
 
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Send the whole boot sequence as one U-Boot command list "
+        "instead of waiting for the prompt after each command",
+    )
+    parser.add_argument(
+        "--timing-log",
+        default=DEFAULT_HISTORY,
+        help="Append per-boot phase timings to this JSONL file and compare "
+        "with earlier runs; '' disables (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--console-log",
+        default=DEFAULT_CONSOLE_LOG_DIR,
+        metavar="DIR",
+        help="Keep all serial output in compressed, indexed logs here "
+        "(console_log.py queries them); '' disables (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="FILE",
+        help="Record the serial session (JSONL) for replay with uboot_sim.py; "
+        "fleet units get -<unit> appended to the name",
+    )
+    parser.add_argument(
+        "--serve-tftp",
+        metavar="DIR",
+        default=None,
+        help="Serve DIR over TFTP from this machine (kernel/initrd cached in "
+        "memory) instead of relying on an external server. Pass this "
+        "machine's address as --tftp-server.",
+    )
+    parser.add_argument(
+        "--tftp-port",
+        type=int,
+        default=69,
+        help="UDP port for --serve-tftp (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--unit",
+        action="append",
+        type=parse_unit_spec,
+        metavar="NAME:SERIAL[:TASMOTA]",
+        help="Fleet mode: boot this unit (repeatable). Replaces "
+        "--serial-port/--tasmota-host and skips the interactive console.",
+    )
+    parser.add_argument(
+        "--stagger",
+        type=float,
+        default=DEFAULT_FLEET_STAGGER,
+        help="Fleet mode: seconds between successive power-ons (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=DEFAULT_FLEET_LOG_DIR,
+        help="Fleet mode: directory for per-unit console logs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--expect",
+        default=None,
+        help="Fleet mode: console text that marks a successful boot (e.g. 'login:')",
+    )
+    parser.add_argument(
+        "--expect-timeout",
+        type=float,
+        default=300.0,
+        help="Fleet mode: seconds to wait for --expect after bootm (default: %(default)s)",
+    )
+
     args = parser.parse_args()
 
+    if args.unit:
+        names = [unit.name for unit in args.unit]
+        if len(set(names)) != len(names):
+            parser.error("--unit names must be unique")
+        return args
+
     if not args.no_power_cycle and not args.tasmota_host:
         parser.error("--tasmota-host is required unless --no-power-cycle is used")
 
@@ -598,24 +1368,52 @@ examples:
 # Main
 # ---------------------------------------------------------------------------
 
-def main() -> None:
-    args = parse_args()
+def start_tftp_server(args: argparse.Namespace) -> TftpServerThread:
+    """Start the built-in TFTP server and cache the boot images.
 
-    # Step 0: Deploy dnsmasq override if requested
-    if args.setup_dnsmasq:
-        deploy_dnsmasq_override(
-            boot_filename=args.kernel,
-            tftp_server=args.tftp_server,
-        )
+    Args:
+        args: Parsed command line (serve_tftp, tftp_port, kernel, initrd).
 
+    Returns:
+        The running server thread.
+    """
+    server = TftpServer(args.serve_tftp, port=args.tftp_port)
+    try:
+        server.cache.preload([f for f in (args.kernel, args.initrd) if f])
+        return TftpServerThread(server).start()
+    except OSError as e:
+        print(f"[tftp] ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def boot_single_unit(
+    args: argparse.Namespace, console_log: Optional[ConsoleLogWriter] = None
+) -> None:
+    """Boot the unit on --serial-port and drop into its console."""
     # Step 1: Open serial port
     print(f"[serial] Opening {args.serial_port} at 115200 8N1")
     ser = open_serial(args.serial_port)
 
+    # Time the boot phases from the serial stream
+    timer = BootTimer() if args.timing_log else None
+    if timer:
+        add_console_tap(ser, timer.feed)
+    recorder = start_session_recorder(ser, args.record)
+    unit_name = args.serial_port
+    mac = None
+    log_unit = os.path.basename(args.serial_port)
+    if console_log:
+        console_log.begin_boot(log_unit, serial_port=args.serial_port, kernel=args.kernel)
+        add_console_tap(ser, console_log.tap(log_unit))
+    ok = False
+
     try:
         # Step 2: Power cycle (unless skipped)
         if not args.no_power_cycle:
-            power_cycle(args.tasmota_host, off_time=args.off_time)
+            power_cycle(args.tasmota_host, off_time=args.off_time,
+                        min_off_time=args.min_off_time)
+            if timer:
+                timer.mark("power_on")
 
         # Step 3: Interrupt U-Boot autoboot
         boot_output = interrupt_autoboot(ser, timeout=30)
@@ -624,21 +1422,9 @@ def main() -> None:
             sys.exit(1)
 
         # Step 4: Extract MAC from boot output (for informational purposes)
-        # Re-read any buffered data for MAC extraction
-        time.sleep(0.5)
-        remaining = ser.read(ser.in_waiting or 0)
-        if remaining:
-            sys.stdout.buffer.write(remaining)
-            sys.stdout.buffer.flush()
-
-        mac = extract_mac_from_output(boot_output + remaining)
+        mac = report_detected_mac(ser, boot_output)
         if mac:
-            info = KNOWN_C410X_UNITS.get(mac)
-            if info:
-                print(f"\n[info] Detected known C410X: {info['name']} "
-                      f"(MAC {mac}, IP {info['ip']})")
-            else:
-                print(f"\n[info] Detected MAC: {mac} (not in known units list)")
+            unit_name = KNOWN_C410X_UNITS.get(mac, {}).get("name", mac)
 
         # Step 5: TFTP boot sequence
         ok = uboot_tftp_boot(
@@ -649,6 +1435,7 @@ def main() -> None:
             initrd=args.initrd,
             initrd_addr=args.initrd_addr,
             bootargs=args.bootargs,
+            pipelined=args.pipelined,
         )
 
         if not ok:
@@ -661,6 +1448,38 @@ def main() -> None:
     finally:
         ser.close()
         print("[serial] Port closed")
+        if recorder:
+            recorder.close()
+        if console_log:
+            console_log.end_boot(log_unit, ok=ok, mac=mac, name=unit_name)
+        if timer:
+            finish_boot_timing(timer, args.timing_log, unit=unit_name,
+                               kernel=args.kernel, initrd=args.initrd, ok=ok)
+
+
+def main() -> None:
+    args = parse_args()
+
+    # Step 0: Deploy dnsmasq override if requested
+    if args.setup_dnsmasq:
+        deploy_dnsmasq_override(
+            boot_filename=args.kernel,
+            tftp_server=args.tftp_server,
+        )
+
+    tftpd = start_tftp_server(args) if args.serve_tftp else None
+    console_log = ConsoleLogWriter(args.console_log) if args.console_log else None
+    try:
+        if args.unit:
+            ok = asyncio.run(fleet_boot(args.unit, args, console_log))
+            sys.exit(0 if ok else 1)
+        boot_single_unit(args, console_log)
+    finally:
+        if console_log is not None:
+            console_log.close()
+            print(f"[log] Console output saved under {args.console_log}")
+        if tftpd is not None:
+            tftpd.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""Minimal asyncio TFTP server for serving C410X boot images.
+
+Read-only (RRQ) TFTP server that serves files from a root directory out
+of an in-memory cache, so repeated boots of the same kernel/initrd never
+touch the disk. Supports the option extensions
+that matter for transfer speed:
+
+  - RFC 2347 option negotiation (OACK)
+  - RFC 2348 blksize
+  - RFC 2349 tsize and timeout
+  - RFC 7440 windowsize
+
+Every transfer gets its own UDP socket and runs as an independent
+asyncio protocol, so many clients (a whole fleet) can boot at once.
+Lost DATA/OACK packets are retransmitted on timeout.
+
+U-Boot 1.2.0 on the C410X sends no options and gets classic 512-byte
+lock-step transfers; newer U-Boot (tftpblocksize/tftpwindowsize) and
+Linux clients get the negotiated sizes.
+
+Usage:
+    uv run tftp_server.py --root /srv/tftp [--port 69] [--preload uImage-ast2050]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+# Opcodes
+OP_RRQ = 1
+OP_WRQ = 2
+OP_DATA = 3
+OP_ACK = 4
+OP_ERROR = 5
+OP_OACK = 6
+
+# Error codes
+ERR_NOT_DEFINED = 0
+ERR_NOT_FOUND = 1
+ERR_ACCESS = 2
+ERR_ILLEGAL_OP = 4
+ERR_UNKNOWN_TID = 5
+ERR_OPTION = 8
+
+DEFAULT_BLKSIZE = 512
+MIN_BLKSIZE = 8
+MAX_BLKSIZE = 65464
+# Largest block that fits a 1500-byte Ethernet MTU without IP fragmentation
+# (1500 - 20 IP - 8 UDP - 4 TFTP); old U-Boot network stacks cannot
+# reassemble fragments
+DEFAULT_MAX_BLKSIZE = 1468
+DEFAULT_MAX_WINDOWSIZE = 64
+DEFAULT_TIMEOUT = 1.0
+DEFAULT_RETRIES = 5
+
+# Reads of a file that keeps changing underneath are given up after this many tries
+LOAD_ATTEMPTS = 3
+
+
+def _error_packet(code: int, message: str) -> bytes:
+    return struct.pack("!HH", OP_ERROR, code) + message.encode("ascii", "replace") + b"\0"
+
+
+def parse_request(packet: bytes) -> tuple[int, str, str, dict[str, str]]:
+    """Parse an RRQ/WRQ packet.
+
+    Args:
+        packet: Raw UDP payload.
+
+    Returns:
+        Tuple of (opcode, filename, mode, options) with option names lowercased.
+
+    Raises:
+        ValueError: If the packet is malformed.
+    """
+    if len(packet) < 4:
+        raise ValueError("short request")
+    opcode = struct.unpack_from("!H", packet)[0]
+    fields = packet[2:].split(b"\0")
+    if len(fields) < 3 or fields[-1] != b"":
+        raise ValueError("request not NUL terminated")
+    fields = [f.decode("ascii", "replace") for f in fields[:-1]]
+    filename, mode, rest = fields[0], fields[1].lower(), fields[2:]
+    if len(rest) % 2:
+        raise ValueError("odd number of option fields")
+    options = {rest[i].lower(): rest[i + 1] for i in range(0, len(rest), 2)}
+    return opcode, filename, mode, options
+
+
+# ---------------------------------------------------------------------------
+# Image cache
+# ---------------------------------------------------------------------------
+
+class ImageCache:
+    """Serve files under a root directory from memory.
+
+    Entries are keyed by path and revalidated against (inode, mtime, size)
+    on every lookup, so rebuilding a kernel is picked up by the next boot
+    without restarting the server. Files are copied into memory rather
+    than mmap'd: a transfer keeps sending its own snapshot even if the
+    image is rebuilt or truncated in place meanwhile (a mapping would
+    SIGBUS on the truncated pages).
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.realpath(root)
+        self._entries: dict[str, tuple[tuple[int, int, int], memoryview]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, filename: str) -> str:
+        """Map a TFTP filename to a path inside the root.
+
+        Raises:
+            PermissionError: If the name escapes the root directory.
+        """
+        path = os.path.realpath(os.path.join(self.root, filename.lstrip("/")))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise PermissionError(filename)
+        return path
+
+    def get(self, filename: str) -> memoryview:
+        """Return the file contents, loading or refreshing the cache entry.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            PermissionError: If the name escapes the root directory.
+            OSError: If the file kept changing while it was read.
+        """
+        path = self.resolve(filename)
+        st = os.stat(path)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached and cached[0] == (st.st_ino, st.st_mtime_ns, st.st_size):
+                return cached[1]
+            # Transfers still sending the previous contents keep their own
+            # view of it alive until they finish
+            for _ in range(LOAD_ATTEMPTS):
+                with open(path, "rb") as f:
+                    before = os.fstat(f.fileno())
+                    data = f.read()
+                    after = os.fstat(f.fileno())
+                key = (before.st_ino, before.st_mtime_ns, before.st_size)
+                if key == (after.st_ino, after.st_mtime_ns, after.st_size) and len(data) == before.st_size:
+                    break
+            else:
+                raise OSError(f"{filename} changed while being read")
+            view = memoryview(data)
+            self._entries[path] = (key, view)
+            return view
+
+    def preload(self, filenames: list[str]) -> None:
+        for name in filenames:
+            size = len(self.get(name))
+            print(f"[tftp] Cached {name} ({size} bytes)")
+
+
+# ---------------------------------------------------------------------------
+# Transfers
+# ---------------------------------------------------------------------------
+
+class _ReadTransfer(asyncio.DatagramProtocol):
+    """Send one file to one client, windowsize blocks per round trip."""
+
+    def __init__(
+        self,
+        data: memoryview,
+        peer: tuple,
+        blksize: int,
+        windowsize: int,
+        timeout: float,
+        retries: int,
+        oack: Optional[bytes],
+        done: asyncio.Future,
+    ) -> None:
+        self.data = data
+        self.peer = peer
+        self.blksize = blksize
+        self.windowsize = windowsize
+        self.timeout = timeout
+        self.retries = retries
+        self.oack = oack
+        self.done = done
+        # Always end with a short (possibly empty) block
+        self.total_blocks = len(data) // blksize + 1
+        self.acked = 0              # highest block acknowledged (absolute)
+        self.retransmits = 0
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tries_left = retries
+
+    # -- sending ----------------------------------------------------------
+
+    def _block(self, n: int) -> bytes:
+        start = (n - 1) * self.blksize
+        return struct.pack("!HH", OP_DATA, n & 0xFFFF) + self.data[start:start + self.blksize]
+
+    def _send_window(self) -> None:
+        last = min(self.acked + self.windowsize, self.total_blocks)
+        for n in range(self.acked + 1, last + 1):
+            self.transport.sendto(self._block(n), self.peer)
+
+    def _send_current(self) -> None:
+        if self.oack is not None:
+            self.transport.sendto(self.oack, self.peer)
+        else:
+            self._send_window()
+        self._arm_timer()
+
+    def _arm_timer(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(self.timeout, self._on_timeout)
+
+    def _on_timeout(self) -> None:
+        self._tries_left -= 1
+        if self._tries_left <= 0:
+            self._finish(TimeoutError(f"no ACK after {self.retries} retries"))
+            return
+        self.retransmits += 1
+        self._send_current()
+
+    def _finish(self, exc: Optional[BaseException] = None) -> None:
+        if self._timer:
+            self._timer.cancel()
+        if self.transport:
+            self.transport.close()
+        if not self.done.done():
+            if exc is None:
+                self.done.set_result(self)
+            else:
+                self.done.set_exception(exc)
+
+    # -- protocol ---------------------------------------------------------
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self._send_current()
+
+    def datagram_received(self, packet: bytes, addr: tuple) -> None:
+        if addr[:2] != self.peer[:2]:
+            self.transport.sendto(_error_packet(ERR_UNKNOWN_TID, "unknown transfer ID"), addr)
+            return
+        if len(packet) < 4:
+            return
+        opcode, block = struct.unpack_from("!HH", packet)
+        if opcode == OP_ERROR:
+            message = packet[4:].split(b"\0")[0].decode("ascii", "replace")
+            self._finish(ConnectionAbortedError(f"client error {block}: {message}"))
+            return
+        if opcode != OP_ACK:
+            self.transport.sendto(_error_packet(ERR_ILLEGAL_OP, "expected ACK"), self.peer)
+            self._finish(ConnectionAbortedError(f"unexpected opcode {opcode}"))
+            return
+
+        if self.oack is not None:
+            if block != 0:
+                return
+            self.oack = None
+        else:
+            # Map the 16-bit block number onto the outstanding window. An
+            # ACK for an earlier block in the window means the client saw a
+            # gap; duplicates of the current base are ignored (retransmit
+            # is timer driven, avoiding Sorcerer's Apprentice).
+            delta = (block - self.acked) & 0xFFFF
+            if delta == 0 or delta > self.windowsize:
+                return
+            self.acked += delta
+
+        self._tries_left = self.retries
+        if self.acked >= self.total_blocks:
+            self._finish()
+            return
+        self._send_current()
+
+    def error_received(self, exc: Exception) -> None:
+        self._finish(exc)
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _ListenProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "TftpServer") -> None:
+        self.server = server
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, packet: bytes, addr: tuple) -> None:
+        self.server.handle_request(packet, addr, self.transport)
+
+
+class TftpServer:
+    """Asyncio read-only TFTP server backed by an ImageCache."""
+
+    def __init__(
+        self,
+        root: str,
+        host: str = "0.0.0.0",
+        port: int = 69,
+        max_blksize: int = DEFAULT_MAX_BLKSIZE,
+        max_windowsize: int = DEFAULT_MAX_WINDOWSIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.cache = ImageCache(root)
+        self.host = host
+        self.port = port
+        self.max_blksize = max_blksize
+        self.max_windowsize = max_windowsize
+        self.timeout = timeout
+        self.retries = retries
+        self.log = log
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.active: set[asyncio.Task] = set()
+        self.stats = {"transfers": 0, "failed": 0, "bytes": 0, "retransmits": 0}
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ListenProtocol(self), local_addr=(self.host, self.port))
+        self.port = self.transport.get_extra_info("sockname")[1]
+        self.log(f"[tftp] Serving {self.cache.root} on {self.host}:{self.port}")
+
+    def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+        for task in self.active:
+            task.cancel()
+
+    def negotiate(self, options: dict[str, str], size: int) -> tuple[int, int, float, dict[str, str]]:
+        """Apply client options; return (blksize, windowsize, timeout, accepted)."""
+        blksize, windowsize, timeout = DEFAULT_BLKSIZE, 1, self.timeout
+        accepted: dict[str, str] = {}
+        for name, value in options.items():
+            try:
+                number = int(value)
+            except ValueError:
+                continue
+            if name == "blksize" and number >= MIN_BLKSIZE:
+                blksize = min(number, MAX_BLKSIZE, self.max_blksize)
+                accepted[name] = str(blksize)
+            elif name == "windowsize" and number >= 1:
+                windowsize = min(number, 65535, self.max_windowsize)
+                accepted[name] = str(windowsize)
+            elif name == "tsize":
+                accepted[name] = str(size)
+            elif name == "timeout" and 1 <= number <= 255:
+                timeout = float(number)
+                accepted[name] = str(number)
+        return blksize, windowsize, timeout, accepted
+
+    def handle_request(self, packet: bytes, addr: tuple, transport) -> None:
+        try:
+            opcode, filename, mode, options = parse_request(packet)
+        except ValueError as e:
+            transport.sendto(_error_packet(ERR_NOT_DEFINED, str(e)), addr)
+            return
+        if opcode == OP_WRQ:
+            transport.sendto(_error_packet(ERR_ACCESS, "read-only server"), addr)
+            return
+        if opcode != OP_RRQ:
+            transport.sendto(_error_packet(ERR_ILLEGAL_OP, "expected RRQ"), addr)
+            return
+        if mode != "octet":
+            transport.sendto(_error_packet(ERR_NOT_DEFINED, "only octet mode is supported"), addr)
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._serve(filename, addr, options, transport))
+        self.active.add(task)
+        task.add_done_callback(self.active.discard)
+
+    async def _load(self, filename: str, peer: tuple, transport) -> Optional[memoryview]:
+        """Fetch a file from the cache off the event loop; None after an error reply."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, self.cache.get, filename)
+        except FileNotFoundError:
+            self.log(f"[tftp] {peer[0]}:{peer[1]} RRQ {filename}: not found")
+            transport.sendto(_error_packet(ERR_NOT_FOUND, "file not found"), peer)
+        except (PermissionError, IsADirectoryError):
+            transport.sendto(_error_packet(ERR_ACCESS, "access violation"), peer)
+        except OSError as e:
+            self.log(f"[tftp] {peer[0]}:{peer[1]} RRQ {filename}: {e}")
+            transport.sendto(_error_packet(ERR_NOT_DEFINED, e.strerror or str(e)), peer)
+        return None
+
+    async def _serve(self, filename: str, peer: tuple, options: dict[str, str], transport) -> None:
+        data = await self._load(filename, peer, transport)
+        if data is None:
+            return
+        blksize, windowsize, timeout, accepted = self.negotiate(options, len(data))
+        oack = None
+        if accepted:
+            oack = struct.pack("!H", OP_OACK) + b"".join(
+                k.encode() + b"\0" + v.encode() + b"\0" for k, v in accepted.items())
+
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        start = time.monotonic()
+        transfer: Optional[_ReadTransfer] = None
+        try:
+            _, proto = await loop.create_datagram_endpoint(
+                lambda: _ReadTransfer(data, peer, blksize, windowsize, timeout,
+                                      self.retries, oack, done),
+                local_addr=(self.host, 0))
+            transfer = proto
+            await done
+        except (OSError, TimeoutError, ConnectionAbortedError) as e:
+            self.stats["failed"] += 1
+            self.log(f"[tftp] {peer[0]}:{peer[1]} RRQ {filename} failed: {e}")
+            return
+        finally:
+            if transfer is not None:
+                self.stats["retransmits"] += transfer.retransmits
+
+        elapsed = time.monotonic() - start
+        self.stats["transfers"] += 1
+        self.stats["bytes"] += len(data)
+        rate = len(data) / elapsed / 1e6 if elapsed > 0 else 0.0
+        self.log(f"[tftp] {peer[0]}:{peer[1]} RRQ {filename}: {len(data)} bytes "
+                 f"in {elapsed:.2f}s ({rate:.2f} MB/s, blksize={blksize}, "
+                 f"windowsize={windowsize}, retransmits={transfer.retransmits})")
+
+
+class TftpServerThread:
+    """Run a TftpServer on its own event loop in a daemon thread.
+
+    Lets synchronous code (tftp_boot.py) serve images while it drives the
+    serial console.
+    """
+
+    def __init__(self, server: TftpServer) -> None:
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="tftp-server", daemon=True)
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.server.start())
+        except BaseException as e:  # report bind errors to start()
+            self._error = e
+            self._started.set()
+            return
+        self._started.set()
+        self.loop.run_forever()
+
+    def start(self) -> "TftpServerThread":
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self) -> None:
+        if not self._thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve boot images over TFTP.")
+    parser.add_argument("--root", required=True, help="Directory to serve")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to bind (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=69, help="UDP port (default: %(default)s)")
+    parser.add_argument("--max-blksize", type=int, default=DEFAULT_MAX_BLKSIZE,
+                        help="Largest blksize granted (default: %(default)s)")
+    parser.add_argument("--max-windowsize", type=int, default=DEFAULT_MAX_WINDOWSIZE,
+                        help="Largest windowsize granted (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Retransmit timeout in seconds (default: %(default)s)")
+    parser.add_argument("--preload", action="append", default=[],
+                        help="File to load into the cache at startup (repeatable)")
+    return parser.parse_args()
+
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    server = TftpServer(args.root, args.host, args.port, args.max_blksize,
+                        args.max_windowsize, args.timeout)
+    server.cache.preload(args.preload)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+        print(f"[tftp] {server.stats}")
+
+
+def main() -> None:
+    args = parse_args()
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+    except PermissionError:
+        print(f"ERROR: cannot bind UDP port {args.port} (try --port 6969 or run as root)",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
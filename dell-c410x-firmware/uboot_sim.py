@@ -0,0 +1,970 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""Simulated C410X U-Boot 1.2.0 console on a pseudo-terminal.
+
+Stand-in for the real board when working on tftp_boot.py: it creates a
+pty, prints the slave path, and behaves like the AST2050 U-Boot on the
+other end:
+
+  - Power-on output is replayed from a recorded session (or a built-in
+    C410X boot) with the recorded inter-chunk timing, paced at the
+    simulated baud rate.
+  - "Hit any key to stop autoboot" counts down bootdelay seconds exactly
+    like abortboot(); a key interrupts, otherwise bootcmd runs.
+  - The prompt supports line editing, ';' command lists, $(var)/${var}
+    expansion, CBSIZE truncation, and the 16-byte UART FIFO (type-ahead
+    beyond it is lost; during network commands it is consumed by the
+    ctrlc() polling, as on the real board).
+  - dhcp, setenv, printenv, saveenv, tftpboot, bootm, md, crc32, saves,
+    run, echo, version, sleep and reset are implemented. bootm replays the recorded
+    kernel log up to the login prompt.
+  - Faults can be injected per command: "--fault tftpboot#2=timeout"
+    makes the second tftpboot of each boot print "T T T ... Retry count
+    exceeded".
+
+Closing the pty (the client exiting) powers the board off; the next
+open powers it on again, so each tftp_boot.py run sees a fresh boot.
+
+Sessions for replay are recorded with ``tftp_boot.py --record FILE``
+(JSONL, one received chunk per line). The "+secs line" transcripts
+written by boot_timing.BootTimer are accepted too.
+
+Usage:
+    python3 uboot_sim.py [--transcript boot.jsonl] [--baud 115200]
+        [--fault tftpboot=timeout] [--tftp-root /srv/tftp]
+    uv run tftp_boot.py --no-power-cycle --serial-port /dev/pts/N --kernel uImage
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import json
+import os
+import re
+import select
+import sys
+import termios
+import threading
+import time
+import tty
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+PROMPT = b"ast2050evb> "
+UBOOT_BANNER = "U-Boot 1.2.0 (Oct 27 2010 - 14:05:52) Avocent (0.2.3) EVB"
+
+DEFAULT_BAUD = 115200
+DEFAULT_MAC = "1c:6f:65:ec:f0:b1"
+DEFAULT_IP = "10.1.5.80"
+DEFAULT_SERVERIP = "10.1.5.1"
+
+# Console buffer size and UART receive FIFO depth of the AST2050 U-Boot
+CBSIZE = 256
+RX_FIFO = 16
+
+# Simulated TFTP: 512-byte lock-step blocks, one '#' per 10 blocks,
+# 65 '#' per line (U-Boot 1.2.0 net/tftp.c)
+DEFAULT_IMAGE_SIZE = 2 * 1024 * 1024
+DEFAULT_TFTP_RATE = 400_000  # bytes/s
+TFTP_HASH_BYTES = 10 * 512
+TFTP_HASHES_PER_LINE = 65
+
+# Output is written in slices of about this many seconds of line time
+PACE_SLICE = 0.001
+POLL_INTERVAL = 0.05
+
+FLASH_KERNEL_ADDR = 0x14100000
+ENV_SIZE = 0x10000 - 4
+
+DEFAULT_ENV = {
+    "bootargs": "root=/dev/mtdblock3 mem=96M console=ttyS0",
+    "bootcmd": "fwu boot",
+    "bootdelay": "1",
+    "baudrate": "115200",
+    "console": "ttyS0",
+    "autoload": "n",
+    "mac0intf": "1",
+    "kernel_start": "14100000",
+    "rootfs_start": "14300000",
+    "rootfs_size": "D00000",
+    "stdin": "serial",
+    "stdout": "serial",
+    "stderr": "serial",
+}
+
+FAULT_KINDS = ("timeout", "notfound", "crc", "hang")
+
+# Chunks are (seconds since the start of the section, bytes)
+Chunk = tuple[float, bytes]
+
+BUILTIN_PREBOOT: list[tuple[float, str]] = [
+    (0.000, ""),
+    (0.001, UBOOT_BANNER),
+    (0.004, ""),
+    (0.012, "DRAM:  128 MB"),
+    (0.180, "Flash: 16 MB"),
+    (0.195, "In:    serial"),
+    (0.196, "Out:   serial"),
+    (0.197, "Err:   serial"),
+    (0.210, "Board: AST2050"),
+    (0.215, "MAC:   {mac}"),
+    (0.220, "Net:   ast_eth0, ast_eth1"),
+]
+
+BUILTIN_KERNEL: list[tuple[float, str]] = [
+    (0.000, "Uncompressing Linux................................................. done, booting the kernel."),
+    (1.420, "Linux version 2.6.23.1-ASPEED-v.0.11 (root@build) (gcc version 4.1.1) #1 Mon Mar 10 2014"),
+    (1.421, "CPU: ARM926EJ-S [41069265] revision 5 (ARMv5TEJ), cr=00053177"),
+    (1.422, "Machine: ASPEED-AST2050"),
+    (1.423, "Memory policy: ECC disabled, Data cache writeback"),
+    (1.430, "Built 1 zonelists in Zone order.  Total pages: 24384"),
+    (1.431, "Kernel command line: root=/dev/ram rw console=ttyS0,115200n8 mem=96M"),
+    (1.440, "PID hash table entries: 512 (order: 9, 2048 bytes)"),
+    (1.480, "Console: colour dummy device 80x30"),
+    (1.520, "Memory: 96MB = 96MB total"),
+    (1.600, "Mount-cache hash table entries: 512"),
+    (1.700, "NET: Registered protocol family 16"),
+    (1.900, "Serial: 8250/16550 driver $Revision: 1.90 $ 4 ports, IRQ sharing disabled"),
+    (1.910, "serial8250.0: ttyS0 at MMIO 0x1e783000 (irq = 9) is a 16550A"),
+    (2.300, "RAMDISK driver initialized: 16 RAM disks of 16384K size 1024 blocksize"),
+    (2.500, "ast_eth0: 10/100 Ethernet at 0x1e660000"),
+    (2.900, "i2c /dev entries driver"),
+    (3.200, "NET: Registered protocol family 17"),
+    (3.300, "RAMDISK: Compressed image found at block 0"),
+    (4.600, "VFS: Mounted root (ext2 filesystem)."),
+    (4.610, "Freeing init memory: 96K"),
+    (5.200, "init started: BusyBox v1.1.3 (2014.03.10-03:02+0000) multi-call binary"),
+    (6.800, ""),
+    (6.801, "Welcome to the C410X BMC"),
+    (6.802, ""),
+]
+
+
+class _Disconnected(Exception):
+    """The client closed its end of the console."""
+
+
+class _Reset(Exception):
+    """The board was reset; start a new power-on cycle."""
+
+
+class _Stopped(Exception):
+    """The simulator is shutting down."""
+
+
+# ---------------------------------------------------------------------------
+# Transcripts
+# ---------------------------------------------------------------------------
+
+def _builtin(lines: list[tuple[float, str]], mac: str) -> list[Chunk]:
+    return [(t, line.format(mac=mac).encode() + b"\r\n") for t, line in lines]
+
+
+def load_transcript(path: str) -> list[Chunk]:
+    """Load a recorded console session.
+
+    Two formats are accepted: console_log.SessionRecorder JSONL ({"t": secs, "rx":
+    latin-1 text} per line; other directions are ignored) and the
+    "+secs line" transcripts written by boot_timing.BootTimer.
+    """
+    chunks = []
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.rstrip(b"\n")
+            if not line.strip():
+                continue
+            if line.startswith(b"{"):
+                record = json.loads(line)
+                if "rx" in record:
+                    chunks.append((float(record["t"]), record["rx"].encode("latin-1")))
+            elif line.startswith(b"+"):
+                stamp, _, text = line[1:].lstrip().partition(b" ")
+                chunks.append((float(stamp), text + b"\r\n"))
+    return chunks
+
+
+def _slice(chunks: list[Chunk], start: int, end: int) -> list[Chunk]:
+    """Bytes [start, end) of the concatenated chunks, retimed to start at 0."""
+    out = []
+    pos = 0
+    t0 = None
+    for t, data in chunks:
+        lo, hi = max(start, pos), min(end, pos + len(data))
+        if lo < hi:
+            if t0 is None:
+                t0 = t
+            out.append((t - t0, data[lo - pos:hi - pos]))
+        pos += len(data)
+    return out
+
+
+def split_transcript(chunks: list[Chunk]) -> tuple[Optional[list[Chunk]], Optional[list[Chunk]]]:
+    """Cut a session into the power-on output and the kernel log.
+
+    Returns:
+        (preboot, kernel): everything before the autoboot countdown, and
+        everything after "Starting kernel ..." up to the login prompt.
+        Either is None if the session does not contain it.
+    """
+    data = b"".join(d for _, d in chunks)
+    preboot = kernel = None
+    countdown = data.find(b"Hit any key to stop autoboot")
+    if countdown > 0:
+        preboot = _slice(chunks, 0, data.rfind(b"\n", 0, countdown) + 1)
+    starting = data.find(b"Starting kernel")
+    if starting >= 0:
+        start = data.find(b"\n", starting) + 1
+        login = data.find(b"login: ", start)
+        end = login + len(b"login: ") if login >= 0 else len(data)
+        if start and end > start:
+            kernel = _slice(chunks, start, end)
+    return preboot, kernel
+
+
+# ---------------------------------------------------------------------------
+# Fault injection
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Fault:
+    """Inject ``kind`` into the ``nth`` run of ``command`` (every run if 0)."""
+
+    command: str
+    kind: str
+    nth: int = 0
+
+
+def parse_fault(spec: str) -> Fault:
+    """Parse ``CMD[#N]=KIND``, e.g. ``tftpboot#2=timeout``."""
+    target, sep, kind = spec.partition("=")
+    command, _, nth = target.partition("#")
+    if not sep or not command or kind not in FAULT_KINDS:
+        raise ValueError(f"bad fault {spec!r}: expected CMD[#N]=" + "|".join(FAULT_KINDS))
+    return Fault(command, kind, int(nth) if nth else 0)
+
+
+def _split_commands(line: str) -> list[str]:
+    """Split a command line on ';' like U-Boot's non-hush parser.
+
+    A backslash escapes the next character and single quotes protect
+    ';' (the quotes themselves are kept for the argument splitter).
+    """
+    commands, current, quoted, i = [], [], False, 0
+    while i < len(line):
+        c = line[i]
+        if c == "\\" and i + 1 < len(line):
+            current.append(line[i + 1])
+            i += 2
+            continue
+        if c == "'":
+            quoted = not quoted
+        if c == ";" and not quoted:
+            commands.append("".join(current))
+            current = []
+        else:
+            current.append(c)
+        i += 1
+    commands.append("".join(current))
+    return commands
+
+
+def _parse_args(command: str) -> list[str]:
+    """Whitespace split, with single-quoted arguments kept whole."""
+    return [quoted or word for quoted, word in re.findall(r"'([^']*)'|(\S+)", command)]
+
+
+# ---------------------------------------------------------------------------
+# Simulator
+# ---------------------------------------------------------------------------
+
+class UBootSim:
+    """U-Boot console state machine driving one file descriptor.
+
+    Args:
+        fd: Console fd (pty master or one end of a socketpair).
+        preboot: Power-on output chunks; built-in C410X boot if None.
+        kernel: Kernel log chunks replayed by bootm; built-in if None.
+        baud: Simulated line rate (8N1); 0 writes as fast as possible.
+        time_scale: Multiplier for the recorded gaps between chunks.
+        bootdelay: Autoboot countdown in seconds.
+        faults: Faults to inject.
+        tftp_root: Directory tftpboot serves from (sizes, missing files);
+            without it every file exists with ``image_size`` bytes.
+        image_size: Size of simulated files.
+        tftp_rate: Simulated TFTP throughput in bytes/s.
+        mac: MAC printed by the built-in boot.
+        ip: Address handed out by dhcp.
+        turnaround: Extra seconds before each command line runs, to model
+            a slow prompt round trip.
+        wait_for_open: Power on only once a client has the pty open, and
+            power off when it closes (pty masters only).
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        preboot: Optional[list[Chunk]] = None,
+        kernel: Optional[list[Chunk]] = None,
+        baud: int = DEFAULT_BAUD,
+        time_scale: float = 1.0,
+        bootdelay: int = 1,
+        faults: tuple[Fault, ...] = (),
+        tftp_root: Optional[str] = None,
+        image_size: int = DEFAULT_IMAGE_SIZE,
+        tftp_rate: float = DEFAULT_TFTP_RATE,
+        mac: str = DEFAULT_MAC,
+        ip: str = DEFAULT_IP,
+        turnaround: float = 0.0,
+        wait_for_open: bool = False,
+    ) -> None:
+        self.fd = fd
+        self.preboot = preboot if preboot is not None else _builtin(BUILTIN_PREBOOT, mac)
+        self.kernel = kernel if kernel is not None else _builtin(BUILTIN_KERNEL, mac)
+        self.baud = baud
+        self.time_scale = time_scale
+        self.faults = list(faults)
+        self.tftp_root = tftp_root
+        self.image_size = image_size
+        self.tftp_rate = tftp_rate
+        self.ip = ip
+        self.turnaround = turnaround
+        self.wait_for_open = wait_for_open
+        self.saved_env = dict(DEFAULT_ENV, ethaddr=mac, bootdelay=str(bootdelay))
+        self.env: dict[str, str] = {}
+        # (event, monotonic time): power_on, autoboot_banner, interrupt,
+        # prompt, command, kernel, login, disconnect
+        self.events: list[tuple[str, float]] = []
+        self.boots = 0
+        self.dropped = 0
+        self._rx = bytearray()
+        self._counts: dict[str, int] = {}
+        self._loaded: dict[int, tuple[str, int]] = {}
+        self._line_free = 0.0
+        self._had_ctrlc = False
+        self._stop = threading.Event()
+        self._poll = select.poll()
+        self._poll.register(fd, select.POLLIN | select.POLLHUP)
+        os.set_blocking(fd, False)
+
+    # -- events -----------------------------------------------------------
+
+    def event(self, name: str) -> None:
+        self.events.append((name, time.monotonic()))
+
+    def last_event(self, name: str, after: int = 0) -> Optional[float]:
+        """Time of the latest ``name`` event at index >= ``after``."""
+        for event, t in reversed(self.events[after:]):
+            if event == name:
+                return t
+        return None
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # -- low-level I/O ----------------------------------------------------
+
+    def _wait(self, timeout: float) -> int:
+        if self._stop.is_set():
+            raise _Stopped()
+        events = self._poll.poll(max(0.0, timeout) * 1000)
+        return events[0][1] if events else 0
+
+    def _recv(self) -> bytes:
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return b""
+        except OSError as e:
+            if e.errno == errno.EIO:
+                raise _Disconnected() from None
+            raise
+        if not data:
+            raise _Disconnected()
+        return data
+
+    def _read(self, timeout: float) -> bytes:
+        """Wait up to ``timeout`` for input; b"" on timeout."""
+        mask = self._wait(timeout)
+        if mask & select.POLLIN:
+            return self._recv()
+        if mask & select.POLLHUP:
+            raise _Disconnected()
+        return b""
+
+    def _write_all(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            try:
+                n = os.write(self.fd, view)
+            except BlockingIOError:
+                n = 0
+            except (BrokenPipeError, ConnectionResetError):
+                raise _Disconnected() from None
+            except OSError as e:
+                if e.errno == errno.EIO:
+                    raise _Disconnected() from None
+                raise
+            view = view[n:]
+            if view:
+                # Client is not reading; wait for room (or for it to go away)
+                if self._wait(POLL_INTERVAL) & select.POLLHUP:
+                    raise _Disconnected()
+
+    def write(self, data: bytes) -> None:
+        """Write console output at the simulated baud rate."""
+        if not self.baud:
+            self._write_all(data)
+            return
+        cps = self.baud / 10
+        step = max(1, int(cps * PACE_SLICE))
+        self._line_free = max(self._line_free, time.monotonic())
+        for i in range(0, len(data), step):
+            piece = data[i:i + step]
+            delay = self._line_free - time.monotonic()
+            if delay > 0:
+                if self._stop.wait(delay):
+                    raise _Stopped()
+            self._write_all(piece)
+            self._line_free += len(piece) / cps
+
+    def puts(self, text: str) -> None:
+        self.write(text.replace("\n", "\r\n").encode("latin-1", "replace"))
+
+    def replay(self, chunks: list[Chunk]) -> None:
+        """Write recorded chunks, keeping their (scaled) relative timing."""
+        base = time.monotonic()
+        for t, data in chunks:
+            delay = base + t * self.time_scale - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                raise _Stopped()
+            self.write(data)
+
+    def _sleep(self, seconds: float, network: bool = False) -> bool:
+        """Busy for ``seconds``; returns True if Ctrl-C was pressed.
+
+        During network commands input is consumed (and lost) by ctrlc()
+        polling; otherwise it stays queued for the FIFO.
+        """
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if not network:
+                if self._stop.wait(min(remaining, POLL_INTERVAL)):
+                    raise _Stopped()
+                continue
+            data = self._read(min(remaining, POLL_INTERVAL))
+            if b"\x03" in data:
+                return True
+            self.dropped += len(data)
+
+    def _fill_fifo(self) -> None:
+        """Move queued input into the UART FIFO; overflow is lost."""
+        while True:
+            data = self._read(0)
+            if not data:
+                return
+            room = max(0, RX_FIFO - len(self._rx))
+            self._rx += data[:room]
+            self.dropped += len(data) - min(room, len(data))
+
+    # -- main loop --------------------------------------------------------
+
+    def run(self) -> None:
+        """Simulate power cycles until stop() is called."""
+        try:
+            while True:
+                if self.wait_for_open:
+                    self._wait_for_client()
+                try:
+                    self._power_on()
+                except _Reset:
+                    continue
+                except _Disconnected:
+                    self.event("disconnect")
+                    self._power_off()
+        except _Stopped:
+            pass
+
+    def _wait_for_client(self) -> None:
+        while self._wait(POLL_INTERVAL) & select.POLLHUP:
+            time.sleep(POLL_INTERVAL)
+
+    def _power_off(self) -> None:
+        # Drop anything still queued for the old session
+        try:
+            termios.tcflush(self.fd, termios.TCIOFLUSH)
+        except termios.error:
+            pass
+        if not self.wait_for_open:
+            raise _Stopped()
+
+    def _power_on(self) -> None:
+        self.boots += 1
+        self.env = dict(self.saved_env)
+        self._counts.clear()
+        self._loaded.clear()
+        self._rx.clear()
+        self._line_free = 0.0
+        self.event("power_on")
+        print(f"[sim] Power on (boot {self.boots})", file=sys.stderr)
+        self.replay(self.preboot)
+
+        if self._abortboot():
+            self._command_loop()
+        else:
+            self.event("autoboot")
+            self.run_command(self.env.get("bootcmd", ""))
+            self._command_loop()
+
+    def _abortboot(self) -> bool:
+        """abortboot(): count down bootdelay, True if a key stopped it."""
+        delay = int(self.env.get("bootdelay", "1") or 0)
+        self.puts(f"Hit any key to stop autoboot: {delay:2d} ")
+        self.event("autoboot_banner")
+        self._fill_fifo()
+        aborted = bool(self._rx)
+        while delay > 0 and not aborted:
+            delay -= 1
+            for _ in range(100):
+                data = self._read(0.01)
+                if data:
+                    self._rx += data[:RX_FIFO]
+                    aborted = True
+                    delay = 0
+                    break
+            self.puts(f"\b\b\b{delay:2d} ")
+        if aborted:
+            self.event("interrupt")
+            del self._rx[:1]
+        self.puts("\n")
+        return aborted
+
+    def _command_loop(self) -> None:
+        while True:
+            # "prompt" is when the recognisable part has been sent
+            self.write(PROMPT.rstrip())
+            self.event("prompt")
+            self.write(PROMPT[len(PROMPT.rstrip()):])
+            line = self._readline()
+            self._had_ctrlc = False
+            if line:
+                self.event("command")
+                self._sleep(self.turnaround)
+                self.run_command(line)
+
+    def _readline(self) -> str:
+        line = bytearray()
+        while True:
+            if not self._rx:
+                self._rx += self._read(POLL_INTERVAL)
+                continue
+            echo = bytearray()
+            while self._rx:
+                c = self._rx.pop(0)
+                if c in (0x0D, 0x0A):
+                    self.write(bytes(echo) + b"\r\n")
+                    return line.decode("latin-1")
+                if c == 0x03:
+                    self.write(bytes(echo) + b"<INTERRUPT>\r\n")
+                    return ""
+                if c in (0x08, 0x7F):
+                    if line:
+                        line.pop()
+                        echo += b"\b \b"
+                    continue
+                if c == 0x09:
+                    c = 0x20
+                if c < 0x20 or c >= 0x7F:
+                    continue
+                if len(line) >= CBSIZE - 2:
+                    echo += b"\a"
+                    continue
+                line.append(c)
+                echo.append(c)
+            self.write(bytes(echo))
+
+    # -- commands ---------------------------------------------------------
+
+    def _expand(self, command: str) -> str:
+        return re.sub(r"\$[({](\w+)[)}]", lambda m: self.env.get(m.group(1), ""), command)
+
+    def run_command(self, line: str) -> bool:
+        """Run a ';'-separated command line; False if a command failed.
+
+        Like U-Boot's run_command(), later commands still run after a
+        failure.
+        """
+        if len(line) >= CBSIZE:
+            self.puts("## Command too long!\n")
+            return False
+        ok = True
+        for command in _split_commands(line):
+            argv = _parse_args(self._expand(command))
+            if argv and not self._dispatch(argv):
+                ok = False
+            if self._had_ctrlc:
+                # Ctrl-C stops the rest of the list
+                return False
+        self._fill_fifo()
+        return ok
+
+    def _fault(self, name: str) -> Optional[str]:
+        n = self._counts.get(name, 0)
+        for fault in self.faults:
+            if fault.command == name and fault.nth in (0, n):
+                return fault.kind
+        return None
+
+    def _dispatch(self, argv: list[str]) -> bool:
+        name = argv[0].split(".")[0]
+        name = {"tftp": "tftpboot", "bootp": "dhcp"}.get(name, name)
+        handler = getattr(self, f"_cmd_{name}", None)
+        if handler is None:
+            self.puts(f"Unknown command '{argv[0]}' - try 'help'\n")
+            return False
+        self._counts[name] = self._counts.get(name, 0) + 1
+        if self._fault(name) == "hang":
+            while True:
+                self._read(POLL_INTERVAL)
+        return handler(argv)
+
+    def _cmd_help(self, argv: list[str]) -> bool:
+        for name in sorted(n[5:] for n in dir(self) if n.startswith("_cmd_")):
+            self.puts(f"{name:10s}- {name}\n")
+        return True
+
+    def _cmd_version(self, argv: list[str]) -> bool:
+        self.puts(f"\n{UBOOT_BANNER}\n")
+        return True
+
+    def _cmd_echo(self, argv: list[str]) -> bool:
+        self.puts(" ".join(argv[1:]) + "\n")
+        return True
+
+    def _cmd_sleep(self, argv: list[str]) -> bool:
+        if len(argv) > 1:
+            self._sleep(float(int(argv[1], 10)))
+        return True
+
+    def _cmd_setenv(self, argv: list[str]) -> bool:
+        if len(argv) < 2:
+            self.puts("Usage:\nsetenv name value ...\n")
+            return False
+        if len(argv) == 2:
+            self.env.pop(argv[1], None)
+        else:
+            self.env[argv[1]] = " ".join(argv[2:])
+        return True
+
+    def _cmd_printenv(self, argv: list[str]) -> bool:
+        names = argv[1:] or list(self.env)
+        for name in names:
+            if name not in self.env:
+                self.puts(f'## Error: "{name}" not defined\n')
+                return False
+            self.puts(f"{name}={self.env[name]}\n")
+        if not argv[1:]:
+            size = sum(len(k) + len(v) + 2 for k, v in self.env.items())
+            self.puts(f"\nEnvironment size: {size}/{ENV_SIZE} bytes\n")
+        return True
+
+    def _cmd_saveenv(self, argv: list[str]) -> bool:
+        self.puts("Saving Environment to Flash...\nUn-Protected 1 sectors\n"
+                  "Erasing Flash...\n. done\nErased 1 sectors\n")
+        self._sleep(0.8)
+        self.puts("Writing to Flash... done\nProtected 1 sectors\n")
+        self.saved_env = dict(self.env)
+        return True
+
+    def _cmd_run(self, argv: list[str]) -> bool:
+        for name in argv[1:]:
+            if name not in self.env:
+                self.puts(f'## Error: "{name}" not defined\n')
+                return False
+            # do_run() stops at the first variable whose commands fail
+            if not self.run_command(self.env[name]):
+                return False
+        return True
+
+    def _cmd_reset(self, argv: list[str]) -> bool:
+        self.puts("resetting ...\n")
+        raise _Reset()
+
+    def _cmd_dhcp(self, argv: list[str]) -> bool:
+        if self._fault("dhcp") == "timeout":
+            for attempt in range(1, 6):
+                self.puts(f"BOOTP broadcast {attempt}\n")
+                if self._sleep(1.0, network=True):
+                    return self._abort()
+            self.puts("\nRetry count exceeded; starting again\n")
+            return False
+        self.puts("BOOTP broadcast 1\n")
+        if self._sleep(0.3, network=True):
+            return self._abort()
+        self.env["ipaddr"] = self.ip
+        self.env.setdefault("serverip", DEFAULT_SERVERIP)
+        self.puts(f"DHCP client bound to address {self.ip}\n")
+        return True
+
+    def _abort(self) -> bool:
+        self._had_ctrlc = True
+        self.puts("\nAbort\n")
+        return False
+
+    def _image_size(self, filename: str) -> Optional[int]:
+        if not self.tftp_root:
+            return self.image_size
+        path = os.path.join(self.tftp_root, filename.lstrip("/"))
+        return os.path.getsize(path) if os.path.isfile(path) else None
+
+    def _cmd_tftpboot(self, argv: list[str]) -> bool:
+        addr = int(argv[1], 16) if len(argv) > 1 else int(self.env.get("loadaddr", "41400000"), 16)
+        filename = argv[2] if len(argv) > 2 else self.env.get("bootfile", "")
+        for var in ("ipaddr", "serverip"):
+            if var not in self.env:
+                self.puts(f"*** ERROR: `{var}' not set\n")
+                return False
+        fault = self._fault("tftpboot")
+        size = self._image_size(filename)
+
+        self.puts(f"Using MAC0 device\nTFTP from server {self.env['serverip']}; "
+                  f"our IP address is {self.env['ipaddr']}\n"
+                  f"Filename '{filename}'.\nLoad address: 0x{addr:x}\nLoading: ")
+        if fault == "timeout":
+            for _ in range(10):
+                if self._sleep(0.5, network=True):
+                    return self._abort()
+                self.puts("T ")
+            self.puts("\nRetry count exceeded; starting again\n")
+            return False
+        if fault == "notfound" or size is None:
+            self.puts("\nTFTP error: 'File not found' (1)\nStarting again\n\n")
+            return False
+
+        hashes = 0
+        per_hash = TFTP_HASH_BYTES / self.tftp_rate
+        for _ in range(max(1, size // TFTP_HASH_BYTES)):
+            if self._sleep(per_hash, network=True):
+                return self._abort()
+            self.puts("#")
+            hashes += 1
+            if hashes % TFTP_HASHES_PER_LINE == 0:
+                self.puts("\n\t ")
+        self.puts(f"\ndone\nBytes transferred = {size} ({size:x} hex)\n")
+        self._loaded[addr] = (filename, size)
+        self.env["filesize"] = f"{size:x}"
+        self.env["fileaddr"] = f"{addr:x}"
+        return True
+
+    def _cmd_fwu(self, argv: list[str]) -> bool:
+        # Avocent firmware update command; "fwu boot" boots from flash
+        if argv[1:2] != ["boot"]:
+            self.puts("Usage:\nfwu boot\n")
+            return False
+        self._loaded[FLASH_KERNEL_ADDR] = ("flash", 0x200000)
+        return self._cmd_bootm(["bootm", f"{FLASH_KERNEL_ADDR:x}"])
+
+    def _cmd_bootm(self, argv: list[str]) -> bool:
+        addr = int(argv[1], 16) if len(argv) > 1 else int(self.env.get("loadaddr", "41400000"), 16)
+        self.puts(f"## Booting image at {addr:08x} ...\n")
+        if addr not in self._loaded:
+            self.puts("Bad Magic Number\n")
+            return False
+        name, size = self._loaded[addr]
+        self.puts(f"   Image Name:   Linux-2.6.23.1-ASPEED-v.0.11\n"
+                  f"   Image Type:   ARM Linux Kernel Image (gzip compressed)\n"
+                  f"   Data Size:    {size} Bytes = {size / 1024:.1f} kB\n"
+                  f"   Load Address: 40008000\n   Entry Point:  40008000\n"
+                  f"   Verifying Checksum ... ")
+        self._sleep(size / 20e6)
+        if self._fault("bootm") == "crc":
+            self.puts("Bad Data CRC\n")
+            return False
+        self.puts("OK\n   Uncompressing Kernel Image ... OK\n")
+        if len(argv) > 2:
+            initrd = int(argv[2], 16)
+            self.puts(f"## Loading Ramdisk Image at {initrd:08x} ...\n")
+            if initrd not in self._loaded:
+                self.puts("Bad Magic Number\n")
+                return False
+            self.puts("   Verifying Checksum ... OK\n")
+        self.puts("\nStarting kernel ...\n\n")
+        self.event("kernel")
+        self.replay(self.kernel)
+        self.event("login")
+        self._linux_console()
+        return True
+
+    def _linux_console(self) -> None:
+        """After boot: echo input and re-prompt on Enter, until power off."""
+        data = self.kernel[-1][1] if self.kernel else b""
+        if not data.endswith(b"login: "):
+            self.write(b"\r\nc410x login: ")
+        while True:
+            data = self._read(POLL_INTERVAL)
+            for c in data:
+                if c in (0x0D, 0x0A):
+                    self.write(b"\r\nc410x login: ")
+                elif 0x20 <= c < 0x7F:
+                    self.write(bytes([c]))
+
+    def read_memory(self, addr: int, length: int) -> bytes:
+        """Deterministic stand-in memory contents (a hash of each word address)."""
+        words = bytearray()
+        for word in range(addr & ~3, addr + length, 4):
+            words += ((word * 0x9E3779B1) & 0xFFFFFFFF).to_bytes(4, "little")
+        start = addr & 3
+        return bytes(words[start:start + length])
+
+    def _cmd_md(self, argv: list[str]) -> bool:
+        size = {"b": 1, "w": 2, "l": 4}.get(argv[0].partition(".")[2] or "l")
+        if size is None or len(argv) < 2:
+            self.puts("Usage:\nmd [.b, .w, .l] address [# of objects]\n")
+            return False
+        addr = int(argv[1], 16)
+        count = int(argv[2], 16) if len(argv) > 2 else 64
+        data = self.read_memory(addr, count * size)
+        if self._fault("md") == "crc" and data:
+            # A character garbled on the line
+            data = bytearray(data)
+            data[len(data) // 2] ^= 0x10
+        for offset in range(0, len(data), 16):
+            row = data[offset:offset + 16]
+            units = " ".join(
+                f"{int.from_bytes(row[i:i + size], 'little'):0{size * 2}x}"
+                for i in range(0, len(row), size))
+            text = "".join(chr(b) if 0x20 <= b < 0x7F else "." for b in row)
+            self.puts(f"{addr + offset:08x}: {units}    {text}\n")
+        return True
+
+    def _cmd_crc32(self, argv: list[str]) -> bool:
+        if len(argv) < 3:
+            self.puts("Usage:\ncrc32 address count [addr]\n")
+            return False
+        addr, length = int(argv[1], 16), int(argv[2], 16)
+        crc = zlib.crc32(self.read_memory(addr, length))
+        self.puts(f"CRC32 for {addr:08x} ... {addr + length - 1:08x} ==> {crc:08x}\n")
+        return True
+
+    def _cmd_saves(self, argv: list[str]) -> bool:
+        """S-Record upload (cmd_load.c): waits for CR, then S0, S3 x n, S7."""
+        addr = int(argv[1], 16) if len(argv) > 1 else 0
+        size = int(argv[2], 16) if len(argv) > 2 else 0
+        self.puts("## Ready for S-Record upload, press ENTER to proceed ...\n")
+        while True:
+            if not self._rx:
+                self._rx += self._read(POLL_INTERVAL)
+                continue
+            if self._rx.pop(0) == 0x0D:
+                break
+        data = bytearray(self.read_memory(addr, size))
+        if self._fault("saves") == "crc" and data:
+            data[len(data) // 2] ^= 0x10
+            garbled = len(data) // 2 // 16
+        else:
+            garbled = -1
+        lines = ["S0030000FC"]
+        for n, offset in enumerate(range(0, len(data), 16)):
+            row = data[offset:offset + 16]
+            body = bytes((len(row) + 5,)) + (addr + offset).to_bytes(4, "big") + bytes(row)
+            checksum = ~sum(body if n != garbled else body[:5] + self.read_memory(addr + offset, len(row)))
+            lines.append(f"S3{body.hex().upper()}{checksum & 0xFF:02X}")
+        lines.append("S70500000000FA")
+        self.puts("\n".join(lines) + "\n## S-Record upload complete\n")
+        return True
+
+
+def open_pty() -> tuple[int, str]:
+    """Create a raw pty; returns (master fd, slave path).
+
+    The slave is closed again so the simulator can see when a client
+    opens and closes it.
+    """
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    name = os.ttyname(slave)
+    os.close(slave)
+    return master, name
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Simulated C410X U-Boot console on a pty.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--transcript",
+                        help="Recorded session to replay (tftp_boot.py --record, "
+                        "or a boot_timing transcript); built-in boot if omitted")
+    parser.add_argument("--baud", type=int, default=DEFAULT_BAUD,
+                        help="Simulated line rate, 0 = unpaced (default: %(default)s)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Scale recorded gaps between chunks (default: %(default)s)")
+    parser.add_argument("--bootdelay", type=int, default=1,
+                        help="Autoboot countdown in seconds (default: %(default)s)")
+    parser.add_argument("--fault", action="append", default=[], type=parse_fault,
+                        metavar="CMD[#N]=KIND",
+                        help="Inject a fault (" + ", ".join(FAULT_KINDS) + ") into "
+                        "every or the Nth run of CMD per boot; repeatable")
+    parser.add_argument("--tftp-root", help="Serve file sizes from this directory")
+    parser.add_argument("--image-size", type=int, default=DEFAULT_IMAGE_SIZE,
+                        help="Size of simulated TFTP files without --tftp-root "
+                        "(default: %(default)s)")
+    parser.add_argument("--tftp-rate", type=float, default=DEFAULT_TFTP_RATE,
+                        help="Simulated TFTP bytes/s (default: %(default)s)")
+    parser.add_argument("--mac", default=DEFAULT_MAC, help="MAC shown by the built-in boot")
+    parser.add_argument("--ip", default=DEFAULT_IP, help="Address dhcp hands out")
+    parser.add_argument("--turnaround", type=float, default=0.0,
+                        help="Extra delay before each command line runs (default: %(default)s)")
+    parser.add_argument("--link", help="Also create this symlink to the pty")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    preboot = kernel = None
+    if args.transcript:
+        preboot, kernel = split_transcript(load_transcript(args.transcript))
+        print(f"[sim] Replaying {args.transcript}: "
+              f"power-on {'recorded' if preboot else 'built-in'}, "
+              f"kernel {'recorded' if kernel else 'built-in'}")
+
+    master, slave = open_pty()
+    if args.link:
+        if os.path.islink(args.link):
+            os.unlink(args.link)
+        os.symlink(slave, args.link)
+    print(f"[sim] U-Boot console on {slave}" + (f" ({args.link})" if args.link else ""))
+    for fault in args.fault:
+        print(f"[sim] Fault: {fault.command}{'#' + str(fault.nth) if fault.nth else ''} "
+              f"-> {fault.kind}")
+
+    sim = UBootSim(
+        master, preboot=preboot, kernel=kernel, baud=args.baud,
+        time_scale=args.time_scale, bootdelay=args.bootdelay,
+        faults=tuple(args.fault), tftp_root=args.tftp_root,
+        image_size=args.image_size, tftp_rate=args.tftp_rate,
+        mac=args.mac, ip=args.ip, turnaround=args.turnaround, wait_for_open=True,
+    )
+    try:
+        sim.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.link and os.path.islink(args.link):
+            os.unlink(args.link)
+        os.close(master)
+
+
+if __name__ == "__main__":
+    main()
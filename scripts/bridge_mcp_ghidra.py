@@ -7,9 +7,18 @@
 # ///
 
 import sys
+import asyncio
+import functools
+import itertools
 import requests
 import argparse
 import logging
+import re
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 from mcp.server.fastmcp import FastMCP
@@ -23,17 +32,36 @@ mcp = FastMCP("ghidra-mcp")
 # Initialize ghidra_server_url with default value
 ghidra_server_url = DEFAULT_GHIDRA_SERVER
 
-def safe_get(endpoint: str, params: dict = None) -> list:
-    """
-    Perform a GET request with optional query parameters.
-    """
-    if params is None:
-        params = {}
-
+# Single-flight request layer. Identical GETs that are in flight at the
+# same time share one upstream request and every caller gets its result.
+# POSTs are barriers: a POST waits for the reads in flight to finish, and
+# reads issued while it is pending wait for it, so a read never returns
+# data from before a write that was issued ahead of it. Reads and writes
+# take a ticket on arrival and only wait for the other kind queued ahead
+# of them, so a run of writes (batch_apply_edits chunks) lets the reads
+# that arrived in between go before its next write.
+_flight_lock = threading.Condition()
+_flights = {}
+_reads_in_flight = 0
+_tickets = itertools.count()
+_readers_waiting = set()   # tickets of reads held up by an earlier write
+_writers_waiting = set()   # tickets of writes not finished yet
+_writing = False
+
+# Tool calls mostly wait on Ghidra, so run plenty of them side by side
+_tool_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="ghidra-tool")
+
+class _Flight:
+    def __init__(self, tag=None):
+        self.done = threading.Event()
+        self.result = ["Request failed: request aborted"]
+        self.tag = tag
+
+def _get(endpoint: str, params: dict, session=None) -> list:
     url = urljoin(ghidra_server_url, endpoint)
 
     try:
-        response = requests.get(url, params=params, timeout=5)
+        response = (session or requests).get(url, params=params, timeout=5)
         response.encoding = 'utf-8'
         if response.ok:
             return response.text.splitlines()
@@ -42,13 +70,114 @@ def safe_get(endpoint: str, params: dict = None) -> list:
     except Exception as e:
         return [f"Request failed: {str(e)}"]
 
+def _wait_for_earlier_writes():
+    """
+    Wait, holding _flight_lock, until the writes queued ahead of this read are done.
+    """
+    ticket = next(_tickets)
+    _readers_waiting.add(ticket)
+    while _writers_waiting and min(_writers_waiting) < ticket:
+        _flight_lock.wait()
+    _readers_waiting.discard(ticket)
+    # A write queued after this read may be waiting for it to get going
+    _flight_lock.notify_all()
+
+def _single_flight(key: tuple, fetch):
+    """
+    Run fetch() for key, or wait for the identical call already in flight.
+    """
+    return _join_flight(key, fetch)[0]
+
+def _join_flight(key: tuple, fetch, tag=None) -> tuple:
+    """
+    _single_flight() that also says whose flight it was: returns (result,
+    the leader's tag) when this call joined a flight in progress, and
+    (result, None) when it ran fetch() itself.
+    """
+    global _reads_in_flight
+    with _flight_lock:
+        _wait_for_earlier_writes()
+        flight = _flights.get(key)
+        if flight is not None:
+            logger.debug(f"Joined in-flight {key}")
+            leader = False
+        else:
+            flight = _flights[key] = _Flight(tag)
+            _reads_in_flight += 1
+            leader = True
+
+    if leader:
+        try:
+            flight.result = fetch()
+        finally:
+            with _flight_lock:
+                del _flights[key]
+                _reads_in_flight -= 1
+                _flight_lock.notify_all()
+            flight.done.set()
+    else:
+        flight.done.wait()
+    return flight.result, None if leader else flight.tag
+
+def safe_get(endpoint: str, params: dict = None) -> list:
+    """
+    Perform a GET request with optional query parameters.
+    """
+    if params is None:
+        params = {}
+
+    key = ("GET", endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+    return list(_single_flight(key, lambda: _get(endpoint, params)))
+
+# Endpoints that take a POST body but do not modify the program
+READ_ONLY_POSTS = {"decompile"}
+
 def safe_post(endpoint: str, data: dict | str) -> str:
+    """
+    Perform a POST request.
+
+    Writes wait until no reads are in flight; read-only endpoints are
+    coalesced like GETs.
+    """
+    if endpoint in READ_ONLY_POSTS:
+        body = tuple(sorted(data.items())) if isinstance(data, dict) else data
+        return _single_flight(("POST", endpoint, body), lambda: _post(endpoint, data))
+
+    with _write_barrier():
+        return _post(endpoint, data)
+
+@contextmanager
+def _write_barrier():
+    """
+    Hold off new reads and wait for the ones in flight, for writes.
+
+    Writes go in arrival order, each after the reads that arrived before it.
+    """
+    global _writing
+    with _flight_lock:
+        ticket = next(_tickets)
+        _writers_waiting.add(ticket)
+        while (_reads_in_flight or _writing or min(_writers_waiting) != ticket
+               or (_readers_waiting and min(_readers_waiting) < ticket)):
+            _flight_lock.wait()
+        _writing = True
+    try:
+        yield
+    finally:
+        function_cache.invalidate()
+        with _flight_lock:
+            _writing = False
+            _writers_waiting.discard(ticket)
+            _flight_lock.notify_all()
+
+def _post(endpoint: str, data: dict | str, session=None) -> str:
     try:
         url = urljoin(ghidra_server_url, endpoint)
+        http = session or requests
         if isinstance(data, dict):
-            response = requests.post(url, data=data, timeout=5)
+            response = http.post(url, data=data, timeout=5)
         else:
-            response = requests.post(url, data=data.encode("utf-8"), timeout=5)
+            response = http.post(url, data=data.encode("utf-8"), timeout=5)
         response.encoding = 'utf-8'
         if response.ok:
             return response.text.strip()
@@ -57,77 +186,310 @@ def safe_post(endpoint: str, data: dict | str) -> str:
     except Exception as e:
         return f"Request failed: {str(e)}"
 
-@mcp.tool()
+def threaded_tool():
+    """
+    Register a blocking tool to run in a worker thread.
+
+    FastMCP calls plain functions on its event loop, so parallel tool calls
+    would otherwise queue behind each other and never share a request.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_tool_executor, functools.partial(fn, *args, **kwargs))
+        return mcp.tool()(wrapper)
+    return decorator
+
+# Function output cache. Holds decompile and disassembly output, keyed by
+# endpoint and function address, for cache_ttl seconds, least recently
+# used first out past max_bytes. Any write through the bridge empties it;
+# edits made in the Ghidra UI show up once the TTL runs out. Off (ttl 0)
+# unless the bridge is started with --prefetch or --cache-ttl, so by
+# default every read goes to Ghidra as before.
+class FunctionCache:
+    def __init__(self, max_bytes: int = 16 << 20, ttl: float = 0.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> [lines, size, stored at, prefetched and unused]
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "prefetched": 0, "prefetch_hits": 0, "prefetch_wasted": 0}
+
+    def _drop(self, key):
+        lines, size, stored, unused = self._entries.pop(key)
+        self._bytes -= size
+        if unused:
+            self.stats["prefetch_wasted"] += 1
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[2] > self.ttl:
+            self._drop(key)
+            entry = None
+        return entry
+
+    def contains(self, key) -> bool:
+        with self._lock:
+            return self._live(key) is not None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            if entry[3]:
+                entry[3] = False
+                self.stats["prefetch_hits"] += 1
+            return list(entry[0])
+
+    def joined_prefetch(self, key):
+        """
+        Count a lookup that missed and then joined the prefetch of key in
+        flight as a hit on that prefetch.
+        """
+        with self._lock:
+            self.stats["misses"] -= 1
+            self.stats["hits"] += 1
+            entry = self._live(key)
+            if entry is not None and entry[3]:
+                entry[3] = False
+                self.stats["prefetch_hits"] += 1
+
+    def put(self, key, lines: list, generation: int, prefetched: bool = False):
+        """
+        Store lines fetched when the cache was at generation (dropped if a
+        write has happened since).
+        """
+        size = sum(len(line) + 1 for line in lines)
+        with self._lock:
+            if generation != self.generation or self.ttl <= 0 or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = [list(lines), size, time.monotonic(), prefetched]
+            self._bytes += size
+            if prefetched:
+                self.stats["prefetched"] += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            for key in list(self._entries):
+                self._drop(key)
+
+    def report(self) -> list:
+        with self._lock:
+            stats = dict(self.stats)
+            entries, used = len(self._entries), self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        ttl = f"ttl {self.ttl:g}s" if self.ttl > 0 else "off (start the bridge with --cache-ttl or --prefetch)"
+        lines = [f"function cache: {entries} entries, {used / 1024:.0f} of {self.max_bytes / 1024:.0f} KiB, {ttl}",
+                 f"hits: {stats['hits']}/{lookups}" + (f" ({100 * stats['hits'] / lookups:.0f}%)" if lookups else "")]
+        if stats["prefetched"]:
+            lines.append(f"prefetched: {stats['prefetched']}, used {stats['prefetch_hits']} "
+                         f"({100 * stats['prefetch_hits'] / stats['prefetched']:.0f}%), "
+                         f"dropped unused {stats['prefetch_wasted']}")
+        return lines
+
+function_cache = FunctionCache()
+
+def _address_key(address: str) -> str | None:
+    try:
+        return f"{int(address.strip(), 16):x}"
+    except ValueError:
+        return None
+
+def _function_output(endpoint: str, address: str, prefetch: bool = False) -> list:
+    """
+    Decompile or disassemble through the cache. Addresses are sent in one
+    spelling so a request joins an identical prefetch still in flight.
+    """
+    key = _address_key(address)
+    if key is None:
+        return safe_get(endpoint, {"address": address})
+    key = (endpoint, key)
+    if not prefetch:
+        # A hit must not overtake a write issued ahead of it either
+        with _flight_lock:
+            _wait_for_earlier_writes()
+        lines = function_cache.get(key)
+        if lines is not None:
+            return lines
+    params = {"address": "0x" + key[1]}
+
+    def fetch():
+        # Only the flight's leader stores the result; a joiner storing it
+        # again would drop a prefetched entry as unused
+        generation = function_cache.generation
+        lines = _get(endpoint, params)
+        if lines and not lines[0].startswith(("Error", "Request failed")):
+            function_cache.put(key, lines, generation, prefetch)
+        return lines
+
+    # Same flight key as safe_get(), so plain reads of it coalesce too
+    flight_key = ("GET", endpoint, tuple(sorted(params.items())))
+    lines, joined = _join_flight(flight_key, fetch, "prefetch" if prefetch else None)
+    if joined == "prefetch" and not prefetch:
+        function_cache.joined_prefetch(key)
+    return list(lines)
+
+# Speculative decompile along the call graph. After a function is
+# decompiled, its call sites (from disassemble_function, resolved with
+# get_xrefs_from) are queued and decompiled in the background into the
+# cache. The newest work goes first; the queue is bounded so a fast-moving
+# caller never waits on stale prefetches.
+_DISASM_LINE = re.compile(r"^\s*([0-9A-Fa-f]+):\s+(\S+)")
+_XREF_LINE = re.compile(r"^To\s+(\S+)(.*)\[([A-Za-z_]+)\]")
+# ARM conditional branches that look like calls (b + lt/le/ls/lo)
+_NOT_CALLS = {"blt", "ble", "bls", "blo"}
+
+def _call_sites(address: str) -> list:
+    sites = []
+    for line in safe_get("disassemble_function", {"address": address}):
+        m = _DISASM_LINE.match(line)
+        if not m:
+            continue
+        mnemonic = m.group(2).lower().split(".")[0]
+        if mnemonic.startswith(("bl", "call", "jal", "bsr")) and mnemonic not in _NOT_CALLS:
+            sites.append(m.group(1))
+    return sites
+
+def _callees(address: str, limit: int) -> list:
+    callees = []
+    for site in _call_sites(address):
+        for line in safe_get("xrefs_from", {"address": site, "offset": 0, "limit": 10}):
+            m = _XREF_LINE.match(line)
+            if m and ("to function" in m.group(2) or "CALL" in m.group(3)):
+                key = _address_key(m.group(1))
+                if key and key not in callees:
+                    callees.append(key)
+        if len(callees) >= limit:
+            break
+    return callees[:limit]
+
+class Prefetcher:
+    def __init__(self, workers: int = 2, callees: int = 8, queue: int = 64):
+        self.callees = callees
+        self._queue = deque(maxlen=queue)
+        self._queued = set()
+        self._cond = threading.Condition()
+        for n in range(workers):
+            threading.Thread(target=self._run, name=f"ghidra-prefetch-{n}", daemon=True).start()
+
+    def _push(self, task):
+        with self._cond:
+            if task in self._queued:
+                return
+            if len(self._queue) == self._queue.maxlen:
+                self._queued.discard(self._queue.popleft())
+            self._queue.append(task)
+            self._queued.add(task)
+            self._cond.notify()
+
+    def after_decompile(self, address: str):
+        key = _address_key(address)
+        if key is not None:
+            self._push(("expand", key))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                task = self._queue.pop()
+                self._queued.discard(task)
+            kind, key = task
+            try:
+                if kind == "expand":
+                    # Pushed last-first so the first callee is decompiled first
+                    for callee in reversed(_callees("0x" + key, self.callees)):
+                        if not function_cache.contains(("decompile_function", callee)):
+                            self._push(("decompile", callee))
+                elif not function_cache.contains(("decompile_function", key)):
+                    _function_output("decompile_function", "0x" + key, prefetch=True)
+            except Exception:
+                logger.exception(f"Prefetch {kind} 0x{key} failed")
+
+prefetcher = None
+
+@threaded_tool()
 def list_methods(offset: int = 0, limit: int = 100) -> list:
     """
     List all function names in the program with pagination.
     """
     return safe_get("methods", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def list_classes(offset: int = 0, limit: int = 100) -> list:
     """
     List all namespace/class names in the program with pagination.
     """
     return safe_get("classes", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def decompile_function(name: str) -> str:
     """
     Decompile a specific function by name and return the decompiled C code.
     """
     return safe_post("decompile", name)
 
-@mcp.tool()
+@threaded_tool()
 def rename_function(old_name: str, new_name: str) -> str:
     """
     Rename a function by its current name to a new user-defined name.
     """
     return safe_post("renameFunction", {"oldName": old_name, "newName": new_name})
 
-@mcp.tool()
+@threaded_tool()
 def rename_data(address: str, new_name: str) -> str:
     """
     Rename a data label at the specified address.
     """
     return safe_post("renameData", {"address": address, "newName": new_name})
 
-@mcp.tool()
+@threaded_tool()
 def list_segments(offset: int = 0, limit: int = 100) -> list:
     """
     List all memory segments in the program with pagination.
     """
     return safe_get("segments", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def list_imports(offset: int = 0, limit: int = 100) -> list:
     """
     List imported symbols in the program with pagination.
     """
     return safe_get("imports", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def list_exports(offset: int = 0, limit: int = 100) -> list:
     """
     List exported functions/symbols with pagination.
     """
     return safe_get("exports", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def list_namespaces(offset: int = 0, limit: int = 100) -> list:
     """
     List all non-global namespaces in the program with pagination.
     """
     return safe_get("namespaces", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def list_data_items(offset: int = 0, limit: int = 100) -> list:
     """
     List defined data labels and their values with pagination.
     """
     return safe_get("data", {"offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def search_functions_by_name(query: str, offset: int = 0, limit: int = 100) -> list:
     """
     Search for functions whose name contains the given substring.
@@ -136,7 +498,7 @@ def search_functions_by_name(query: str, offset: int = 0, limit: int = 100) -> l
         return ["Error: query string is required"]
     return safe_get("searchFunctions", {"query": query, "offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def rename_variable(function_name: str, old_name: str, new_name: str) -> str:
     """
     Rename a local variable within a function.
@@ -147,84 +509,199 @@ def rename_variable(function_name: str, old_name: str, new_name: str) -> str:
         "newName": new_name
     })
 
-@mcp.tool()
+@threaded_tool()
 def get_function_by_address(address: str) -> str:
     """
     Get a function by its address.
     """
     return "\n".join(safe_get("get_function_by_address", {"address": address}))
 
-@mcp.tool()
+@threaded_tool()
 def get_current_address() -> str:
     """
     Get the address currently selected by the user.
     """
     return "\n".join(safe_get("get_current_address"))
 
-@mcp.tool()
+@threaded_tool()
 def get_current_function() -> str:
     """
     Get the function currently selected by the user.
     """
     return "\n".join(safe_get("get_current_function"))
 
-@mcp.tool()
+@threaded_tool()
 def list_functions() -> list:
     """
     List all functions in the database.
     """
     return safe_get("list_functions")
 
-@mcp.tool()
+@threaded_tool()
 def decompile_function_by_address(address: str) -> str:
     """
     Decompile a function at the given address.
     """
-    return "\n".join(safe_get("decompile_function", {"address": address}))
+    lines = _function_output("decompile_function", address)
+    if prefetcher is not None:
+        prefetcher.after_decompile(address)
+    return "\n".join(lines)
 
-@mcp.tool()
+@threaded_tool()
 def disassemble_function(address: str) -> list:
     """
     Get assembly code (address: instruction; comment) for a function.
     """
-    return safe_get("disassemble_function", {"address": address})
+    return _function_output("disassemble_function", address)
+
+def _term_pattern(term: str) -> str:
+    """
+    Regex for an address, constant or name. Numbers match in any hex
+    spelling: 0x1e780000, 1e780000: and DAT_1e780000 all match 0x1E780000.
+    A term is a number if int() takes it with base 0 (0x1e78, 42) or if it
+    is bare hex with at least one digit (1e780000); bare digits are decimal.
+    """
+    term = term.strip()
+    word = r"(?<!\w)" + re.escape(term) + r"(?!\w)"
+    try:
+        value = int(term, 0)
+        spellings = []
+    except ValueError:
+        if not re.fullmatch(r"[0-9A-Fa-f]*[0-9][0-9A-Fa-f]*", term):
+            return word
+        value = int(term, 16)
+        # Could still be a name such as b1, so keep the literal word too
+        spellings = [word]
+    spellings += [rf"0x0*{value:x}(?![0-9a-f])", rf"(?<![\w.]){value}(?![\w.])"]
+    if value >= 0x1000:
+        # Long enough to be an address or label suffix without 0x
+        spellings.append(rf"(?<![0-9a-f])0*{value:x}(?![0-9a-f])")
+    return "|".join(spellings)
+
+def _filter_lines(lines: list, start: int = 0, end: int = 0, pattern: str = None,
+                  match: list = None, context: int = 2) -> list:
+    """
+    Window lines to start..end (1-based, inclusive), keep the ones matching
+    pattern or any of match plus context around them, and number them.
+    The filters are ORed: a line is kept if it matches either one.
+    """
+    if lines and lines[0].startswith(("Error", "Request failed")):
+        return lines
+    first = max(start, 1) - 1
+    last = min(end, len(lines)) if end > 0 else len(lines)
+    regexes = []
+    try:
+        if pattern:
+            regexes.append(re.compile(pattern))
+        if match:
+            regexes.append(re.compile("|".join(_term_pattern(term) for term in match), re.IGNORECASE))
+    except re.error as e:
+        return [f"Error: bad pattern: {e}"]
+
+    if regexes:
+        keep = set()
+        for n in range(first, last):
+            if any(regex.search(lines[n]) for regex in regexes):
+                keep.update(range(max(first, n - context), min(last, n + context + 1)))
+    else:
+        keep = set(range(first, last))
+
+    out = [f"{len(keep)} of {len(lines)} lines"]
+    previous = None
+    for n in sorted(keep):
+        if previous is not None and n != previous + 1:
+            out.append("...")
+        out.append(f"{n + 1:5d}  {lines[n]}")
+        previous = n
+    return out
+
+@threaded_tool()
+def decompile_function_lines(address: str, start: int = 0, end: int = 0, pattern: str = None,
+                             match: list[str] = None, context: int = 2) -> str:
+    """
+    Decompile a function at the given address and return only the lines asked for.
+
+    Filtering runs in the bridge on cached output, so narrowing or repeating
+    a query costs no extra decompile.
+
+    Args:
+        address: Function address in hex format (e.g. "0x1400010a0")
+        start: First line to return, 1-based (default: the first line)
+        end: Last line to return (default: the last line)
+        pattern: Only lines matching this regular expression
+        match: Only lines mentioning any of these addresses, constants or names
+            (e.g. ["0x1e780000", "i2c_read"]); numbers match in any hex spelling,
+            and bare hex such as "1e780000" counts as a number. Lines matching
+            either pattern or match are kept
+        context: Lines to show around each matching line (default: 2)
 
-@mcp.tool()
+    Returns:
+        The selected lines with their line numbers; "..." marks skipped lines
+    """
+    lines = _function_output("decompile_function", address)
+    if prefetcher is not None:
+        prefetcher.after_decompile(address)
+    return "\n".join(_filter_lines(lines, start, end, pattern, match, context))
+
+@threaded_tool()
+def disassemble_function_lines(address: str, start: int = 0, end: int = 0, pattern: str = None,
+                               match: list[str] = None, context: int = 2) -> list:
+    """
+    Get only the assembly lines asked for from a function.
+
+    Args:
+        address: Function address in hex format (e.g. "0x1400010a0")
+        start: First line to return, 1-based (default: the first line)
+        end: Last line to return (default: the last line)
+        pattern: Only lines matching this regular expression (e.g. "^\\S+: bl ")
+        match: Only lines mentioning any of these addresses, constants or names
+            (e.g. ["0x1e780000", "i2c_read"]); numbers match in any hex spelling,
+            and bare hex such as "1e780000" counts as a number. Lines matching
+            either pattern or match are kept
+        context: Lines to show around each matching line (default: 2)
+
+    Returns:
+        The selected lines with their line numbers; "..." marks skipped lines
+    """
+    lines = _function_output("disassemble_function", address)
+    return _filter_lines(lines, start, end, pattern, match, context)
+
+@threaded_tool()
 def set_decompiler_comment(address: str, comment: str) -> str:
     """
     Set a comment for a given address in the function pseudocode.
     """
     return safe_post("set_decompiler_comment", {"address": address, "comment": comment})
 
-@mcp.tool()
+@threaded_tool()
 def set_disassembly_comment(address: str, comment: str) -> str:
     """
     Set a comment for a given address in the function disassembly.
     """
     return safe_post("set_disassembly_comment", {"address": address, "comment": comment})
 
-@mcp.tool()
+@threaded_tool()
 def rename_function_by_address(function_address: str, new_name: str) -> str:
     """
     Rename a function by its address.
     """
     return safe_post("rename_function_by_address", {"function_address": function_address, "new_name": new_name})
 
-@mcp.tool()
+@threaded_tool()
 def set_function_prototype(function_address: str, prototype: str) -> str:
     """
     Set a function's prototype.
     """
     return safe_post("set_function_prototype", {"function_address": function_address, "prototype": prototype})
 
-@mcp.tool()
+@threaded_tool()
 def set_local_variable_type(function_address: str, variable_name: str, new_type: str) -> str:
     """
     Set a local variable's type.
     """
     return safe_post("set_local_variable_type", {"function_address": function_address, "variable_name": variable_name, "new_type": new_type})
 
-@mcp.tool()
+@threaded_tool()
 def get_xrefs_to(address: str, offset: int = 0, limit: int = 100) -> list:
     """
     Get all references to the specified address (xref to).
@@ -239,7 +716,7 @@ def get_xrefs_to(address: str, offset: int = 0, limit: int = 100) -> list:
     """
     return safe_get("xrefs_to", {"address": address, "offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def get_xrefs_from(address: str, offset: int = 0, limit: int = 100) -> list:
     """
     Get all references from the specified address (xref from).
@@ -254,7 +731,7 @@ def get_xrefs_from(address: str, offset: int = 0, limit: int = 100) -> list:
     """
     return safe_get("xrefs_from", {"address": address, "offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def get_function_xrefs(name: str, offset: int = 0, limit: int = 100) -> list:
     """
     Get all references to the specified function by name.
@@ -269,7 +746,7 @@ def get_function_xrefs(name: str, offset: int = 0, limit: int = 100) -> list:
     """
     return safe_get("function_xrefs", {"name": name, "offset": offset, "limit": limit})
 
-@mcp.tool()
+@threaded_tool()
 def list_strings(offset: int = 0, limit: int = 2000, filter: str = None) -> list:
     """
     List all defined strings in the program with their addresses.
@@ -287,6 +764,192 @@ def list_strings(offset: int = 0, limit: int = 2000, filter: str = None) -> list
         params["filter"] = filter
     return safe_get("strings", params)
 
+# Edits batch_apply_edits understands: op (the single-edit tool's name) ->
+# (endpoint, {tool parameter: POST field})
+BATCH_EDIT_OPS = {
+    "rename_function": ("renameFunction", {"old_name": "oldName", "new_name": "newName"}),
+    "rename_function_by_address": ("rename_function_by_address",
+                                   {"function_address": "function_address", "new_name": "new_name"}),
+    "rename_data": ("renameData", {"address": "address", "new_name": "newName"}),
+    "rename_variable": ("renameVariable",
+                        {"function_name": "functionName", "old_name": "oldName", "new_name": "newName"}),
+    "set_function_prototype": ("set_function_prototype",
+                               {"function_address": "function_address", "prototype": "prototype"}),
+    "set_local_variable_type": ("set_local_variable_type",
+                                {"function_address": "function_address", "variable_name": "variable_name",
+                                 "new_type": "new_type"}),
+    "set_decompiler_comment": ("set_decompiler_comment", {"address": "address", "comment": "comment"}),
+    "set_disassembly_comment": ("set_disassembly_comment", {"address": "address", "comment": "comment"}),
+}
+
+def _edit_error(edit) -> str | None:
+    if not isinstance(edit, dict):
+        return "not an object"
+    op = edit.get("op")
+    if op not in BATCH_EDIT_OPS:
+        return f"unknown op {op!r}"
+    missing = [name for name in BATCH_EDIT_OPS[op][1] if edit.get(name) in (None, "")]
+    if missing:
+        return "missing " + ", ".join(missing)
+    return None
+
+# What the plugin answers each edit with when it worked. Its failure
+# replies vary ("Rename failed", "Failed to ...", "Function not found",
+# "Variable not found", "No program loaded", "Error: ..."), as do _post's
+# ("Error 404: ...", "Request failed: ..."), so anything else is a failure.
+# renameData reports nothing either way, so it always counts as applied.
+EDIT_SUCCESS_MESSAGES = {
+    "rename_function": "Renamed successfully",
+    "rename_function_by_address": "Function renamed successfully",
+    "rename_data": "Rename data attempted",
+    "rename_variable": "Variable renamed",
+    "set_function_prototype": "Function prototype set successfully",
+    "set_local_variable_type": "Variable type set successfully",
+    "set_decompiler_comment": "Comment set successfully",
+    "set_disassembly_comment": "Comment set successfully",
+}
+
+def _edit_failed(edit: dict, response: str) -> bool:
+    # startswith: set_function_prototype appends warnings after the message
+    return not response.strip().startswith(EDIT_SUCCESS_MESSAGES[edit["op"]])
+
+def _describe_edit(edit: dict) -> str:
+    return edit["op"] + " " + " ".join(f"{name}={edit[name]!r}" for name in BATCH_EDIT_OPS[edit["op"]][1])
+
+def _function_info(address: str, session=None) -> dict:
+    """
+    Name and signature of the function at address ({} if none).
+    """
+    info = {}
+    for line in _get("get_function_by_address", {"address": address}, session):
+        if line.startswith("Function: ") and " at " in line:
+            info["name"] = line[len("Function: "):].rsplit(" at ", 1)[0]
+        elif line.startswith("Signature: "):
+            info["signature"] = line[len("Signature: "):]
+    return info
+
+def _inverse_edit(edit: dict, session=None) -> dict | None:
+    """
+    The edit that undoes edit, read from the program before it is applied.
+
+    Comments and variable types have no read-back endpoint, so they have
+    no inverse.
+    """
+    op = edit["op"]
+    if op in ("rename_function", "rename_variable"):
+        return dict(edit, old_name=edit["new_name"], new_name=edit["old_name"])
+    if op in ("rename_function_by_address", "set_function_prototype"):
+        info = _function_info(edit["function_address"], session)
+        if op == "rename_function_by_address" and "name" in info:
+            return dict(edit, new_name=info["name"])
+        if op == "set_function_prototype" and "signature" in info:
+            return dict(edit, prototype=info["signature"])
+    return None
+
+def _apply_edit(edit: dict, session) -> str:
+    endpoint, fields = BATCH_EDIT_OPS[edit["op"]]
+    return _post(endpoint, {field: str(edit[name]) for name, field in fields.items()}, session)
+
+@threaded_tool()
+def batch_apply_edits(edits: list[dict], chunk_size: int = 50, dry_run: bool = False,
+                      on_error: str = "continue") -> list:
+    """
+    Apply many renames, prototypes, variable types and comments in one call.
+
+    Edits are applied in order over one connection, chunk_size at a time.
+    A chunk holds off other tool calls while it runs, but the batch as a
+    whole is not atomic: other writers can land between chunks, and a
+    rollback (run as one pass once the batch stops) puts back the values
+    read just before each edit, undoing any change made to the same
+    function in between.
+
+    Args:
+        edits: Edits, each {"op": <edit tool name>, <that tool's arguments>}, e.g.
+            {"op": "rename_function_by_address", "function_address": "0x1400010a0", "new_name": "main"}.
+            Ops: rename_function, rename_function_by_address, rename_data, rename_variable,
+            set_function_prototype, set_local_variable_type, set_decompiler_comment,
+            set_disassembly_comment
+        chunk_size: Edits sent per chunk (default: 50)
+        dry_run: Only validate the edits and report what would change
+        on_error: "continue" with the remaining edits (default), "stop" at the first
+            failure, or "rollback" to also undo the edits already applied (function
+            and variable renames and prototypes; comments and types cannot be undone)
+
+    Returns:
+        One status line per edit, then a summary line
+    """
+    if on_error not in ("continue", "stop", "rollback"):
+        return [f"Error: on_error must be continue, stop or rollback, not {on_error!r}"]
+    chunk_size = max(1, chunk_size)
+    outcome = [None] * len(edits)
+    detail = [""] * len(edits)
+    for n, edit in enumerate(edits):
+        error = _edit_error(edit)
+        if error:
+            outcome[n], detail[n] = "invalid", error
+    if on_error != "continue" and any(outcome):
+        # Nothing is applied from a batch that cannot be applied whole
+        outcome = [state or "skipped" for state in outcome]
+    pending = [n for n in range(len(edits)) if outcome[n] is None]
+
+    session = requests.Session()
+    if dry_run:
+        for n in pending:
+            outcome[n], detail[n] = "would apply", _describe_edit(edits[n])
+            if "function_address" in edits[n]:
+                info = _function_info(edits[n]["function_address"], session)
+                current = info.get("signature" if edits[n]["op"] == "set_function_prototype" else "name")
+                detail[n] += f" (currently {current})" if info else " (no function there)"
+        pending = []
+
+    applied = []
+    failed = False
+    for start in range(0, len(pending), chunk_size):
+        with _write_barrier():
+            for n in pending[start:start + chunk_size]:
+                if failed and on_error != "continue":
+                    outcome[n] = "skipped"
+                    continue
+                inverse = _inverse_edit(edits[n], session) if on_error == "rollback" else None
+                response = _apply_edit(edits[n], session)
+                detail[n] = response
+                if _edit_failed(edits[n], response):
+                    outcome[n] = "failed"
+                    failed = True
+                else:
+                    outcome[n] = "ok"
+                    applied.append((n, inverse))
+
+    if on_error == "rollback" and failed:
+        with _write_barrier():
+            for n, inverse in reversed(applied):
+                if inverse is None:
+                    outcome[n], detail[n] = "not rolled back", "cannot be undone"
+                    continue
+                response = _apply_edit(inverse, session)
+                if _edit_failed(inverse, response):
+                    outcome[n], detail[n] = "rollback failed", response
+                else:
+                    outcome[n], detail[n] = "rolled back", ""
+    session.close()
+
+    lines = [f"[{n}] {state}" + (f": {text}" if text else "") for n, (state, text) in enumerate(zip(outcome, detail))]
+    counts = {}
+    for state in outcome:
+        counts[state] = counts.get(state, 0) + 1
+    lines.append(f"{len(edits)} edits: " + ", ".join(f"{count} {state}" for state, count in counts.items()))
+    return lines
+
+@threaded_tool()
+def get_bridge_stats() -> list:
+    """
+    Show the bridge's function cache and prefetch hit rates.
+    """
+    lines = function_cache.report()
+    if prefetcher is None:
+        lines.append("prefetch: off (start the bridge with --prefetch)")
+    return lines
+
 def main():
     parser = argparse.ArgumentParser(description="MCP server for Ghidra")
     parser.add_argument("--ghidra-server", type=str, default=DEFAULT_GHIDRA_SERVER,
@@ -297,12 +960,31 @@ def main():
                         help="Port to run MCP server on (only used for sse), default: 8081")
     parser.add_argument("--transport", type=str, default="stdio", choices=["stdio", "sse"],
                         help="Transport protocol for MCP, default: stdio")
+    parser.add_argument("--cache-ttl", type=float,
+                        help="Seconds to keep decompile/disassembly output (0 disables the cache); "
+                             "edits made in the Ghidra UI can show up this late, "
+                             "default: 30 with --prefetch, otherwise 0")
+    parser.add_argument("--cache-mb", type=int, default=16,
+                        help="Function cache size in MB, default: 16")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Decompile callees in the background after each decompile_function_by_address")
+    parser.add_argument("--prefetch-workers", type=int, default=2,
+                        help="Concurrent background decompiles, default: 2")
+    parser.add_argument("--prefetch-callees", type=int, default=8,
+                        help="Callees queued per decompiled function, default: 8")
     args = parser.parse_args()
     
     # Use the global variable to ensure it's properly updated
-    global ghidra_server_url
+    global ghidra_server_url, prefetcher
     if args.ghidra_server:
         ghidra_server_url = args.ghidra_server
+
+    if args.cache_ttl is None:
+        args.cache_ttl = 30.0 if args.prefetch else 0.0
+    function_cache.ttl = args.cache_ttl
+    function_cache.max_bytes = args.cache_mb << 20
+    if args.prefetch and args.cache_ttl > 0:
+        prefetcher = Prefetcher(args.prefetch_workers, args.prefetch_callees)
     
     if args.transport == "sse":
         try: